@@ -0,0 +1,142 @@
+"""
+Payload size and latency of the Redis cache serializers and compressors
+(`shared.utils.cache_backends`) against a local Redis.
+
+Three payloads are stored: a session-sized dict, a `TieredCache` envelope
+around a ~2 KB API response and a batch of `--events` Matrix events. For
+every serializer x compressor pair the table reports the stored size, the
+encode/decode CPU time and the SET+GET round-trip p50/p99 measured with the
+same connection, so network transfer of the larger values is included.
+
+Example:
+    docker compose up -d redis
+    python -m benchmarks.cache_codecs --url redis://127.0.0.1:6379/15 --iterations 500
+"""
+
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+app = typer.Typer(help="Compare cache serializers and compressors for size and latency.")
+console = Console()
+
+KEY = "benchmarks:cache_codecs"
+
+
+def _payloads(events):
+    from benchmarks.event_types import make_corpus  # pylint: disable=import-outside-toplevel
+
+    response = {
+        "rooms": [
+            {"room_id": f"!room{index}abcdef:example.org", "name": f"Room {index}", "members": index * 3}
+            for index in range(20)
+        ]
+    }
+    return {
+        "session": {"_auth_user_id": "42", "_auth_user_backend": "django.contrib.auth.backends.ModelBackend"},
+        "envelope": {"value": response, "delta": 0.0123, "expires": 1_700_000_000.5},
+        "event batch": {"events": json.loads(make_corpus(events, 10, 100))},
+    }
+
+
+def _codec(serializer, compressor):
+    # pylint: disable=import-outside-toplevel
+    from django.utils.module_loading import import_string
+
+    from shared.utils.cache_backends import SERIALIZERS, ThresholdCompressor
+
+    options = {"COMPRESS_ALGORITHM": compressor, "COMPRESS_MIN_LENGTH": 1024}
+    serializer = import_string(SERIALIZERS[serializer])(options)
+    if compressor == "none":
+        return serializer.dumps, serializer.loads
+    compressor = ThresholdCompressor(options)
+    return (
+        lambda value: compressor.compress(serializer.dumps(value)),
+        lambda raw: serializer.loads(compressor.decompress(raw)),
+    )
+
+
+def _percentile(samples, fraction):
+    return sorted(samples)[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def _table(title):
+    table = Table(title=title, header_style="bold magenta")
+    for column in ("Serializer", "Compressor", "Bytes", "Encode µs", "Decode µs", "p50 µs", "p99 µs"):
+        table.add_column(column, justify="left" if column in ("Serializer", "Compressor") else "right")
+    return table
+
+
+def _measure(client, codec, payload, iterations):
+    """Stored size, encode/decode CPU time and SET+GET p50/p99 of `payload`, formatted for the table."""
+    encode, decode = codec
+    raw = encode(payload)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        encode(payload)
+    encode_us = (time.perf_counter() - started) / iterations * 1e6
+    started = time.perf_counter()
+    for _ in range(iterations):
+        decode(raw)
+    decode_us = (time.perf_counter() - started) / iterations * 1e6
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        client.set(KEY, encode(payload), px=60_000)
+        decode(client.get(KEY))
+        samples.append((time.perf_counter() - started) * 1e6)
+    return (
+        f"{len(raw):,}",
+        f"{encode_us:,.1f}",
+        f"{decode_us:,.1f}",
+        f"{statistics.median(samples):,.0f}",
+        f"{_percentile(samples, 0.99):,.0f}",
+    )
+
+
+@app.command()
+def main(
+    url: str = typer.Option("redis://127.0.0.1:6379/15", help="Redis to measure against (its keys are left alone)."),
+    iterations: int = typer.Option(300, help="Round-trips per serializer/compressor/payload."),
+    events: int = typer.Option(500, help="Events in the event batch payload."),
+    serializer: List[str] = typer.Option(["pickle", "json", "msgpack"], help="Serializers to compare."),
+    compressor: List[str] = typer.Option(["none", "zlib", "lz4", "zstd"], help="Compressors to compare."),
+):
+    """
+    **Print size, encode/decode time and round-trip latency per codec.**
+    """
+    import redis  # pylint: disable=import-outside-toplevel
+
+    from shared.utils.cache_backends import compressor_available  # pylint: disable=import-outside-toplevel
+
+    client = redis.Redis.from_url(url)
+    client.ping()
+    compressors = [name for name in compressor if compressor_available(name)]
+    for skipped in sorted(set(compressor) - set(compressors)):
+        console.print(f"[yellow]Skipping {skipped}: library not installed[/]")
+
+    for payload_name, payload in _payloads(events).items():
+        table = _table(f"{payload_name} ({iterations} round-trips)")
+        for serializer_name in serializer:
+            for compressor_name in compressors:
+                table.add_row(
+                    serializer_name,
+                    compressor_name,
+                    *_measure(client, _codec(serializer_name, compressor_name), payload, iterations),
+                )
+        console.print(table)
+    client.delete(KEY)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,127 @@
+"""
+Cold-start time of the `apps` CLI as the number of services grows.
+
+A synthetic project is generated for every service count: `scripts/main.py`
+(from the working tree, or from `--ref` to measure an older revision) plus
+`services/svc_<n>/scripts/commands.py` Typer modules. Each module can burn
+`--import-cost-ms` at import time to mimic services that pull in heavier
+dependencies. Every measurement is a fresh interpreter running
+`main.py --help` and `main.py svc_0 task1`.
+
+Example:
+    python -m benchmarks.cli_startup --services 1 --services 10 --services 50 --ref HEAD~1
+"""
+
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+project_root = Path(__file__).resolve().parent.parent
+
+app = typer.Typer(help="Measure apps CLI cold start against the number of services.")
+console = Console()
+
+SERVICE_TEMPLATE = '''import time
+
+import typer
+
+app = typer.Typer(name="{name}")
+
+_deadline = time.perf_counter() + {import_cost}
+while time.perf_counter() < _deadline:  # simulated import-time work
+    pass
+
+
+@app.command()
+def task1():
+    """Run task 1"""
+    print("Task 1 executed for {name}")
+
+
+@app.command()
+def task2():
+    """Run task 2"""
+    print("Task 2 executed for {name}")
+'''
+
+
+def build_project(destination: Path, main_source: str, services: int, import_cost_ms: float):
+    """Write a synthetic project with `services` services, each costing `import_cost_ms` to import."""
+    (destination / "scripts").mkdir(parents=True)
+    (destination / "scripts" / "__init__.py").write_text("")
+    (destination / "scripts" / "main.py").write_text(main_source)
+    (destination / "services").mkdir()
+    (destination / "services" / "__init__.py").write_text("")
+    for index in range(services):
+        service_dir = destination / "services" / f"svc_{index}"
+        (service_dir / "scripts").mkdir(parents=True)
+        (service_dir / "__init__.py").write_text("")
+        (service_dir / "scripts" / "__init__.py").write_text("")
+        (service_dir / "scripts" / "commands.py").write_text(
+            SERVICE_TEMPLATE.format(name=f"svc_{index}", import_cost=import_cost_ms / 1000)
+        )
+
+
+def time_run(main_file: Path, args: List[str], runs: int):
+    """Median wall time, in seconds, of `runs` fresh `main_file *args` interpreters."""
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(
+            [sys.executable, str(main_file), *args],
+            cwd=main_file.parent.parent,
+            capture_output=True,
+            check=False,
+        )
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def read_main(ref: Optional[str]):
+    """Source of `scripts/main.py` in the working tree, or at the git revision `ref`."""
+    if ref is None:
+        return (project_root / "scripts" / "main.py").read_text(encoding="utf-8")
+    return subprocess.run(
+        ["git", "show", f"{ref}:scripts/main.py"], cwd=project_root, capture_output=True, text=True, check=True
+    ).stdout
+
+
+@app.command()
+def main(
+    services: List[int] = typer.Option([1, 10, 50], help="Service counts to measure. Repeatable."),
+    runs: int = typer.Option(5, help="Fresh interpreters per measurement."),
+    import_cost_ms: float = typer.Option(5.0, help="Simulated import cost of each service module."),
+    ref: Optional[List[str]] = typer.Option(None, help="Git revision of scripts/main.py to compare. Repeatable."),
+):
+    """
+    **Print median cold-start times of `apps --help` and `apps svc_0 task1`.**
+    """
+    variants = [("working tree", read_main(None))] + [(revision, read_main(revision)) for revision in ref or []]
+    table = Table(title=f"apps CLI cold start (median of {runs})", header_style="bold magenta")
+    for column in ("main.py", "Services", "--help (ms)", "svc_0 task1 (ms)"):
+        table.add_column(column, justify="left" if column == "main.py" else "right")
+    for label, source in variants:
+        for count in services:
+            with tempfile.TemporaryDirectory() as tmp:
+                build_project(Path(tmp), source, count, import_cost_ms)
+                main_file = Path(tmp) / "scripts" / "main.py"
+                time_run(main_file, ["--help"], 1)  # warm bytecode and manifest caches
+                table.add_row(
+                    label,
+                    str(count),
+                    f"{time_run(main_file, ['--help'], runs) * 1000:.1f}",
+                    f"{time_run(main_file, ['svc_0', 'task1'], runs) * 1000:.1f}",
+                )
+    console.print(table)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,210 @@
+"""
+Deep-page cost of the bridge event API (`services.bridge.api`) on a large
+event table.
+
+Seeds `--rows` synthetic events (once; they are tagged `txn_id="benchmark"`
+and reused by later runs) over `--rooms` rooms, `--hot-share` of them in one
+busy room. Pages of that room at increasing depths are then fetched through
+DRF, rendered to JSON:
+
+- offset: `LimitOffsetPagination` over full model rows and a `ModelSerializer`
+  (what a default DRF list view does),
+- keyset: `RoomEventList` (`KeysetPagination`, `values()` projection,
+  `FlatSerializer`),
+- 304: the same keyset page with a matching `If-None-Match`.
+
+Run it against the Postgres of the settings (`POSTGRES_*`); `--drop` deletes
+the seeded rows afterwards.
+
+Example:
+    docker compose up -d db && python manage.py migrate
+    python -m benchmarks.event_api --rows 1000000 --depth 1 --depth 100 --depth 1000
+"""
+
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+import typer
+from rich.console import Console
+from rich.progress import Progress
+from rich.table import Table
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+app = typer.Typer(help="Measure offset vs keyset pagination of the bridge event API.")
+console = Console()
+
+HOT_ROOM = "!hot:benchmark.local"
+
+
+def seed(model, rows, rooms, hot_share, batch_size=5000):
+    """Create the `txn_id="benchmark"` events unless exactly `rows` of them exist."""
+    existing = model.objects.filter(txn_id="benchmark").count()
+    if existing == rows:
+        return
+    model.objects.filter(txn_id="benchmark").delete()
+    now = int(time.time() * 1000) - rows
+    with Progress(console=console) as progress:
+        job = progress.add_task(f"Seeding {rows:,} events", total=rows)
+        for start in range(0, rows, batch_size):
+            batch = []
+            for index in range(start, min(rows, start + batch_size)):
+                room = HOT_ROOM if random.random() < hot_share else f"!r{random.randrange(rooms)}:benchmark.local"
+                batch.append(
+                    model(
+                        event_id=f"$benchmark{index}",
+                        room_id=room,
+                        sender=f"@u{index % 500}:benchmark.local",
+                        type="m.room.message",
+                        origin_server_ts=now + index // 3,  # ties exercise the id tie-breaker
+                        content={"msgtype": "m.text", "body": f"message {index}"},
+                        txn_id="benchmark",
+                    )
+                )
+            model.objects.bulk_create(batch)
+            progress.advance(job, len(batch))
+
+
+def timed(view, request, runs):
+    """Median milliseconds of `runs` calls of `view`, and the last response."""
+    samples, response = [], None
+    for _ in range(runs):
+        started = time.perf_counter()
+        response = view(request)
+        if hasattr(response, "render"):  # 304s are plain Django responses
+            response.render()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000, response
+
+
+def _offset_view():
+    # pylint: disable=import-outside-toplevel
+    from rest_framework import generics, serializers
+    from rest_framework.pagination import LimitOffsetPagination
+
+    from services.bridge.models import MatrixEvent
+
+    class ModelEventSerializer(serializers.ModelSerializer):
+        """The bridge's event fields, serialized field by field from model instances."""
+
+        class Meta:
+            model = MatrixEvent
+            fields = ["event_id", "room_id", "sender", "type", "state_key", "origin_server_ts", "content"]
+
+    class OffsetEventList(generics.ListAPIView):
+        """A default DRF list view of the busy room: `LIMIT/OFFSET` over full rows."""
+
+        serializer_class = ModelEventSerializer
+        pagination_class = LimitOffsetPagination
+
+        def get_queryset(self):
+            return MatrixEvent.objects.filter(room_id=HOT_ROOM).order_by("-origin_server_ts", "-id")
+
+    return OffsetEventList.as_view()
+
+
+class Pages:
+    """
+    Timed requests of the busy room's pages through both paginations, as an
+    admin (authentication is forced, not measured).
+    """
+
+    def __init__(self, limit, runs):
+        # pylint: disable=import-outside-toplevel
+        from django.contrib.auth import get_user_model
+        from rest_framework.test import APIRequestFactory
+
+        from services.bridge.api import RoomEventList
+
+        self.limit = limit
+        self.runs = runs
+        self.factory = APIRequestFactory()
+        self.admin = get_user_model()(username="benchmark", is_staff=True, is_superuser=True)
+        self.offset_view = _offset_view()
+        self.keyset_view = RoomEventList.as_view()
+
+    def request(self, url, **headers):
+        """An authenticated GET of `url`."""
+        from rest_framework.test import force_authenticate  # pylint: disable=import-outside-toplevel
+
+        built = self.factory.get(url, **headers)
+        force_authenticate(built, self.admin)
+        return built
+
+    def measure(self, offset):
+        """Median ms of the page at `offset`: offset pagination, keyset pagination and keyset 304."""
+        # pylint: disable=import-outside-toplevel
+        from services.bridge.models import MatrixEvent
+        from shared.utils.rest import KeysetPagination
+
+        token = ""
+        if offset:
+            last = (
+                MatrixEvent.objects.filter(room_id=HOT_ROOM)
+                .order_by("-origin_server_ts", "-id")
+                .values_list("origin_server_ts", "id")[offset - 1]
+            )
+            token = KeysetPagination.encode_cursor(last)
+
+        def keyset(built):
+            return self.keyset_view(built, room_id=HOT_ROOM)
+
+        offset_ms, _ = timed(self.offset_view, self.request(f"/offset?limit={self.limit}&offset={offset}"), self.runs)
+        keyset_url = f"/api/bridge/rooms/{HOT_ROOM}/events?limit={self.limit}&from={token}"
+        keyset_ms, response = timed(keyset, self.request(keyset_url), self.runs)
+        not_modified_ms, _ = timed(keyset, self.request(keyset_url, HTTP_IF_NONE_MATCH=response["ETag"]), self.runs)
+        return f"{offset_ms:.2f}", f"{keyset_ms:.2f}", f"{not_modified_ms:.2f}"
+
+    def rooms_ms(self):
+        """Median ms of the first page of the room list."""
+        from services.bridge.api import RoomList  # pylint: disable=import-outside-toplevel
+
+        return timed(RoomList.as_view(), self.request(f"/api/bridge/rooms?limit={self.limit}"), self.runs)[0]
+
+
+@app.command()
+def main(
+    rows: int = typer.Option(1_000_000, help="Events in the fixture."),
+    rooms: int = typer.Option(1000, help="Rooms besides the busy one."),
+    hot_share: float = typer.Option(0.3, help="Share of the events in the busy room."),
+    limit: int = typer.Option(100, help="Page size."),
+    depth: List[int] = typer.Option([1, 10, 100, 1000], help="Page numbers to fetch. Repeatable."),
+    runs: int = typer.Option(5, help="Requests per measurement (median)."),
+    drop: bool = typer.Option(False, help="Delete the fixture afterwards."),
+):  # pylint: disable=too-many-arguments,too-many-positional-arguments
+    """
+    **Print per-page latency of offset and keyset pagination.**
+    """
+    import django  # pylint: disable=import-outside-toplevel
+
+    django.setup()
+    from services.bridge.models import MatrixEvent  # pylint: disable=import-outside-toplevel
+
+    seed(MatrixEvent, rows, rooms, hot_share)
+    hot_rows = MatrixEvent.objects.filter(room_id=HOT_ROOM).count()
+    pages = Pages(limit, runs)
+    table = Table(
+        title=f"{rows:,} events, busy room {hot_rows:,}, pages of {limit} (median ms)", header_style="bold magenta"
+    )
+    for column in ("Page", "offset + ModelSerializer", "keyset + FlatSerializer", "keyset 304"):
+        table.add_column(column, justify="right")
+    for page in depth:
+        offset = (page - 1) * limit
+        if offset >= hot_rows:
+            console.print(f"[yellow]Page {page} is past the busy room's {hot_rows:,} events, skipped[/]")
+            continue
+        table.add_row(f"{page:,}", *pages.measure(offset))
+    console.print(table)
+    console.print(f"First page of /api/bridge/rooms: {pages.rooms_ms():.2f} ms")
+    if drop:
+        MatrixEvent.objects.filter(txn_id="benchmark").delete()
+
+if __name__ == "__main__":
+    app()
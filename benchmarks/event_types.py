@@ -0,0 +1,117 @@
+"""
+Memory footprint and parse throughput of `shared.types.RoomEvent` against
+plain dicts, over a synthetic corpus of Matrix events.
+
+The corpus mimics bridge traffic: `--events` events spread over `--rooms`
+rooms and `--users` senders, mostly messages with some membership events.
+Memory is what the decoded events keep alive (measured with tracemalloc,
+including the JSON strings they reference); parse time covers decoding the
+JSON array and, for `RoomEvent`, validation and interning of the ids.
+
+Example:
+    python -m benchmarks.event_types --events 200000 --rooms 200 --users 2000
+"""
+
+import gc
+import json
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from shared.types import RoomEvent  # noqa: E402  pylint: disable=wrong-import-position
+
+app = typer.Typer(help="Compare RoomEvent with dicts for memory and parse throughput.")
+console = Console()
+
+
+def make_events(events, rooms, users):
+    """`events` decoded events spread over `rooms` rooms and `users` senders."""
+    corpus = []
+    for index in range(events):
+        sender = f"@user{random.randrange(users)}:example.org"
+        event = {
+            "event_id": f"$ev{index:012d}abcdefghijklmnopqrstuv",
+            "room_id": f"!room{random.randrange(rooms)}abcdef:example.org",
+            "sender": sender,
+            "origin_server_ts": 1_700_000_000_000 + index,
+            "unsigned": {"age": random.randrange(1000)},
+        }
+        if index % 10 == 0:
+            event.update(type="m.room.member", state_key=sender, content={"membership": "join"})
+        else:
+            event.update(type="m.room.message", content={"msgtype": "m.text", "body": f"message {index}"})
+        corpus.append(event)
+    return corpus
+
+
+def make_corpus(events, rooms, users):
+    """JSON array of `events` events spread over `rooms` rooms and `users` senders, encoded."""
+    return json.dumps(make_events(events, rooms, users)).encode()
+
+
+def measure(build):
+    """Return the memory retained by `build()`'s result (bytes) and its run time without tracing (s)."""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - started
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # Timing without tracemalloc's per-allocation overhead.
+    del result
+    gc.collect()
+    started = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - started
+    del result
+    return retained, elapsed
+
+
+@app.command()
+def main(
+    events: int = typer.Option(100_000, help="Events in the corpus."),
+    rooms: int = typer.Option(100, help="Distinct rooms."),
+    users: int = typer.Option(1000, help="Distinct senders."),
+):
+    """
+    **Print retained memory and parse throughput for dicts and RoomEvent.**
+    """
+    raw = make_corpus(events, rooms, users)
+    variants = {
+        "dict (json.loads)": lambda: json.loads(raw),
+        "RoomEvent": lambda: RoomEvent.parse_many(json.loads(raw)),
+    }
+    try:
+        import orjson  # pylint: disable=import-outside-toplevel
+
+        variants["RoomEvent (orjson)"] = lambda: RoomEvent.parse_many(orjson.loads(raw))
+    except ImportError:
+        pass
+
+    table = Table(title=f"{events:,} events, {rooms} rooms, {users} senders", header_style="bold magenta")
+    for column in ("Representation", "Retained (MiB)", "Bytes/event", "Parse (s)", "Events/s"):
+        table.add_column(column, justify="left" if column == "Representation" else "right")
+    for label, build in variants.items():
+        retained, elapsed = measure(build)
+        table.add_row(
+            label,
+            f"{retained / 2**20:.1f}",
+            f"{retained / events:.0f}",
+            f"{elapsed:.3f}",
+            f"{events / elapsed:,.0f}",
+        )
+    console.print(table)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,155 @@
+"""
+Fake Matrix homeserver replaying application-service transactions.
+
+Generates `--transactions` transactions of `--events` synthetic room events
+and PUTs them to the bridge's `/_matrix/app/v1/transactions/{txnId}` endpoint
+over `--concurrency` keep-alive connections, like a homeserver catching up
+on a backlog. A `--retry-ratio` share of transactions is sent a second time
+with the same id, which is what a homeserver does after a timeout, to
+measure the cost of deduplicated retries separately.
+
+Run the bridge first (`python manage.py serve` or `runserver`), with
+`MATRIX_HS_TOKEN` matching `--hs-token`.
+
+Example:
+    python -m benchmarks.fake_homeserver --transactions 500 --events 200 --concurrency 8 --retry-ratio 0.2
+"""
+
+import asyncio
+import json
+import random
+import statistics
+import time
+import uuid
+from urllib.parse import urlsplit
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+from benchmarks.http_load import read_response
+
+app = typer.Typer(help="Replay Matrix application-service transactions against the bridge.")
+console = Console()
+
+
+def make_transaction(events, rooms, content_size):
+    """Body of a transaction of `events` text messages spread over `rooms` rooms."""
+    now = int(time.time() * 1000)
+    return {
+        "events": [
+            {
+                "event_id": f"${uuid.uuid4().hex}:fake.hs",
+                "room_id": f"!room{random.randrange(rooms)}:fake.hs",
+                "sender": f"@user{random.randrange(1000)}:fake.hs",
+                "type": "m.room.message",
+                "origin_server_ts": now + index,
+                "content": {"msgtype": "m.text", "body": "x" * content_size},
+            }
+            for index in range(events)
+        ]
+    }
+
+
+async def _sender(host, port, token, queue, results):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            try:
+                kind, txn_id, body = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            request = (
+                f"PUT /_matrix/app/v1/transactions/{txn_id} HTTP/1.1\r\nHost: {host}:{port}\r\n"
+                f"Authorization: Bearer {token}\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: keep-alive\r\n\r\n"
+            ).encode("latin-1") + body
+            started = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status, keep_alive = await read_response(reader)
+            results[kind]["latencies"].append(time.perf_counter() - started)
+            if status != 200:
+                results[kind]["errors"] += 1
+            if not keep_alive:
+                writer.close()
+                reader, writer = await asyncio.open_connection(host, port)
+    finally:
+        writer.close()
+
+
+def build_requests(transactions, events, retry_ratio, rooms, content_size):
+    """Return `(kind, txn_id, body)` for every transaction, then for the retried ones."""
+    requests, retries = [], []
+    for _ in range(transactions):
+        item = ("new", uuid.uuid4().hex, json.dumps(make_transaction(events, rooms, content_size)).encode())
+        requests.append(item)
+        if random.random() < retry_ratio:
+            retries.append(("retry", item[1], item[2]))
+    # Retries go after the originals, as a homeserver resends after a timeout.
+    return requests + retries
+
+
+async def replay(url, token, requests, concurrency):
+    """
+    PUT `requests` over `concurrency` connections.
+
+    Returns:
+        tuple[dict, float]: Latencies and errors per kind, and the elapsed seconds.
+    """
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    queue = asyncio.Queue()
+    for item in requests:
+        queue.put_nowait(item)
+    results = {kind: {"latencies": [], "errors": 0} for kind in ("new", "retry")}
+    started = time.perf_counter()
+    await asyncio.gather(*(_sender(host, port, token, queue, results) for _ in range(concurrency)))
+    return results, time.perf_counter() - started
+
+
+def render(results, elapsed, events, concurrency):
+    """Print one row per kind of transaction and the event throughput."""
+    table = Table(
+        title=f"AS transactions ({events} events each, {concurrency} connections)", header_style="bold magenta"
+    )
+    for column in ("Kind", "Txns", "p50 (ms)", "p99 (ms)", "Mean (ms)", "Errors"):
+        table.add_column(column, justify="left" if column == "Kind" else "right")
+    for kind, result in results.items():
+        latencies = sorted(result["latencies"])
+        if not latencies:
+            continue
+        table.add_row(
+            kind,
+            str(len(latencies)),
+            f"{latencies[len(latencies) // 2] * 1000:.2f}",
+            f"{latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000:.2f}",
+            f"{statistics.fmean(latencies) * 1000:.2f}",
+            str(result["errors"]),
+        )
+    console.print(table)
+    stored = len(results["new"]["latencies"]) * events
+    console.print(f"Events delivered: {stored} in {elapsed:.2f}s ({stored / elapsed:,.0f} events/s)")
+
+
+@app.command()
+def main(
+    url: str = typer.Option("http://127.0.0.1:8000", help="Base URL of the bridge."),
+    hs_token: str = typer.Option("", envvar="MATRIX_HS_TOKEN", help="Homeserver token sent as Bearer."),
+    transactions: int = typer.Option(200, help="Transactions to send."),
+    events: int = typer.Option(100, help="Events per transaction."),
+    concurrency: int = typer.Option(4, help="Concurrent homeserver connections."),
+    retry_ratio: float = typer.Option(0.1, help="Share of transactions resent with the same id."),
+    rooms: int = typer.Option(50, help="Distinct rooms the events are spread over."),
+    content_size: int = typer.Option(64, help="Bytes of message body per event."),
+):  # pylint: disable=too-many-arguments,too-many-positional-arguments
+    """
+    **Print transaction latency and event throughput for new and retried transactions.**
+    """
+    requests = build_requests(transactions, events, retry_ratio, rooms, content_size)
+    results, elapsed = asyncio.run(replay(url, hs_token, requests, concurrency))
+    render(results, elapsed, events, concurrency)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,199 @@
+"""
+HTTP load generator used to compare serving modes (WSGI vs ASGI, dev server vs
+production workers) on the same endpoints.
+
+It only depends on the standard library: every virtual user keeps one
+HTTP/1.1 keep-alive connection open and fires requests back to back, so the
+numbers reflect server throughput rather than client connection setup.
+
+Example:
+    python -m benchmarks.http_load \\
+        --target wsgi=http://127.0.0.1:8000 \\
+        --target asgi=http://127.0.0.1:8001 \\
+        --path /core/ --path / --concurrency 64 --duration 15
+"""
+
+import asyncio
+import statistics
+import time
+from dataclasses import dataclass, field
+from typing import List
+from urllib.parse import urlsplit
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+app = typer.Typer(help="Measure throughput and tail latency of HTTP endpoints.")
+console = Console()
+
+
+@dataclass
+class LoadResult:
+    """Requests completed against one target path during the measurement window."""
+
+    target: str
+    path: str
+    duration: float
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+
+    @property
+    def throughput(self):
+        """Completed requests per second."""
+        return len(self.latencies) / self.duration if self.duration else 0.0
+
+    def percentile(self, pct):
+        """Latency (seconds) at the `pct` percentile."""
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+async def read_headers(reader):
+    """Read an HTTP/1.1 header block off `reader`; returns the headers keyed by lower-cased name."""
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            return headers
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+
+async def read_response(reader):
+    """Read one HTTP/1.1 response off `reader`; returns its status and whether the connection stays open."""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed by server")
+    status = int(status_line.split()[1])
+    headers = await read_headers(reader)
+    length = int(headers.get("content-length", 0))
+    if "connection" in headers:
+        keep_alive = headers["connection"].lower() != "close"
+    else:
+        keep_alive = status_line.startswith(b"HTTP/1.1")
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            await reader.readexactly(size + 2)  # chunk data and its CRLF
+            if size == 0:
+                break
+    elif length:
+        await reader.readexactly(length)
+    return status, keep_alive
+
+
+async def _user(host, port, request, deadline, result):
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            started = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status, keep_alive = await read_response(reader)
+            elapsed = time.perf_counter() - started
+            if status >= 400:
+                result.errors += 1
+            else:
+                result.latencies.append(elapsed)
+            if not keep_alive:
+                writer.close()
+                writer = None
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+            result.errors += 1
+            if writer is not None:
+                writer.close()
+            writer = None
+            await asyncio.sleep(0.01)
+    if writer is not None:
+        writer.close()
+
+
+async def run_load(name, base_url, path, concurrency, duration, warmup=1.0):  # pylint: disable=R0913,R0917
+    """
+    Drive `concurrency` keep-alive connections against `base_url + path`.
+
+    Args:
+        name (str): Label of the target, used in the report.
+        base_url (str): Scheme, host and port of the server, e.g. `http://127.0.0.1:8000`.
+        path (str): Request path.
+        concurrency (int): Number of concurrent connections.
+        duration (float): Measurement window in seconds.
+        warmup (float): Seconds of unrecorded traffic before measuring.
+
+    Returns:
+        LoadResult: Latencies and error count collected during the window.
+    """
+    parts = urlsplit(base_url)
+    host, port = parts.hostname, parts.port or 80
+    request = (
+        f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\n"
+        "Connection: keep-alive\r\nAccept: application/json\r\n\r\n"
+    ).encode("latin-1")
+
+    if warmup:
+        scratch = LoadResult(name, path, warmup)
+        deadline = time.perf_counter() + warmup
+        await asyncio.gather(
+            *(_user(host, port, request, deadline, scratch) for _ in range(concurrency))
+        )
+
+    result = LoadResult(name, path, duration)
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(
+        *(_user(host, port, request, deadline, result) for _ in range(concurrency))
+    )
+    return result
+
+
+def render(results):
+    """Print one table row per `LoadResult`."""
+    table = Table(title="HTTP load results", header_style="bold magenta")
+    for column in ("Target", "Path", "Requests", "Req/s", "p50 (ms)", "p99 (ms)", "Mean (ms)", "Errors"):
+        table.add_column(column, justify="right" if column not in ("Target", "Path") else "left")
+    for result in results:
+        table.add_row(
+            result.target,
+            result.path,
+            str(len(result.latencies)),
+            f"{result.throughput:,.0f}",
+            f"{result.percentile(50) * 1000:.2f}",
+            f"{result.percentile(99) * 1000:.2f}",
+            f"{(statistics.fmean(result.latencies) if result.latencies else 0) * 1000:.2f}",
+            str(result.errors),
+        )
+    console.print(table)
+
+
+@app.command()
+def main(
+    target: List[str] = typer.Option(
+        ["wsgi=http://127.0.0.1:8000", "asgi=http://127.0.0.1:8001"],
+        help="NAME=URL of a running server. Repeat to compare several servers.",
+    ),
+    path: List[str] = typer.Option(["/core/", "/"], help="Endpoint to load. Repeatable."),
+    concurrency: int = typer.Option(32, help="Concurrent keep-alive connections."),
+    duration: float = typer.Option(10.0, help="Measurement window per endpoint, in seconds."),
+    warmup: float = typer.Option(1.0, help="Warm-up window per endpoint, in seconds."),
+):
+    """
+    **Run the same load against every target and print throughput and p99.**
+    """
+    results = []
+    for spec in target:
+        name, _, url = spec.partition("=")
+        if not url:
+            name, url = spec, spec
+        for endpoint in path:
+            console.print(f"[cyan]Loading[/cyan] {name} {endpoint} x{concurrency} for {duration}s")
+            results.append(asyncio.run(run_load(name, url, endpoint, concurrency, duration, warmup)))
+    render(results)
+
+
+if __name__ == "__main__":
+    app()
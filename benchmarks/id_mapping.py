@@ -0,0 +1,170 @@
+"""
+Cost of translating a batch of remote ids to Matrix ids.
+
+Seeds `--mappings` user mappings of a `benchmark` network (once; reused by
+later runs), then translates batches of `--batch` remote ids, `--unknown`
+of them without a mapping, the way a bridge does for the senders and
+mentions of incoming messages:
+
+- orm: one `filter().first()` per id (the N+1 a naive adapter does),
+- cold: `IdMap.get_many` with empty caches (one `MGET`, one query),
+- redis: `get_many` with the Redis tier warm and the local tier empty,
+- local: `get_many` answered by the in-process LRU,
+- aget: one `IdMap.aget` task per id, gathered (batched into one lookup),
+  with empty caches.
+
+Run it against the Postgres and Redis of the settings; `--drop` deletes the
+seeded rows afterwards.
+
+Example:
+    docker compose up -d db redis && python manage.py migrate
+    python -m benchmarks.id_mapping --mappings 100000 --batch 10 --batch 100 --batch 1000
+"""
+
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+app = typer.Typer(help="Measure batched remote -> Matrix id translation against per-id queries.")
+console = Console()
+
+NETWORK = "benchmark"
+
+
+def seed(model, mappings, batch_size=5000):
+    """Create the `benchmark` network's user mappings unless exactly `mappings` of them exist."""
+    existing = model.objects.filter(network=NETWORK).count()
+    if existing == mappings:
+        return
+    model.objects.filter(network=NETWORK).delete()
+    for start in range(0, mappings, batch_size):
+        model.objects.bulk_create(
+            model(network=NETWORK, kind="user", remote_id=f"u{index}", matrix_id=f"@benchmark_u{index}:benchmark.local")
+            for index in range(start, min(mappings, start + batch_size))
+        )
+
+
+def measure(call, prepare, runs):
+    """
+    Median milliseconds, database queries and cache round-trips of `call()`;
+    `prepare()` runs untimed before each run.
+    """
+    # pylint: disable=import-outside-toplevel
+    from shared.utils.instrumentation import RequestStats, request_stats_var
+
+    samples, stats = [], RequestStats()
+    for _ in range(runs):
+        prepare()
+        stats = RequestStats()
+        token = request_stats_var.set(stats)  # also seen by `sync_to_async` threads
+        try:
+            started = time.perf_counter()
+            call()
+            samples.append(time.perf_counter() - started)
+        finally:
+            request_stats_var.reset(token)
+    return statistics.median(samples) * 1000, stats.db_queries, stats.cache_calls
+
+
+def count_queries():
+    """Count the queries of every connection, worker threads included, in `RequestStats`."""
+    # pylint: disable=import-outside-toplevel
+    from django.db import connection
+    from django.db.backends.signals import connection_created
+
+    from shared.utils.instrumentation import install_query_timer
+
+    connection_created.connect(install_query_timer)
+    install_query_timer(None, connection)
+
+
+def sample(mappings, size, unknown):
+    """`size` random remote ids, an `unknown` share of them without a mapping."""
+    return [
+        f"u{random.randrange(mappings)}" if random.random() >= unknown else f"missing{random.getrandbits(48)}"
+        for _ in range(size)
+    ]
+
+
+def strategies(id_map, remote_ids):
+    """`(call, prepare)` pairs of each column, translating `remote_ids`."""
+    model = id_map.model
+    keys = [id_map._key(NETWORK, "user", remote_id) for remote_id in remote_ids]  # pylint: disable=protected-access
+
+    def cold():
+        id_map.clear_local()
+        id_map.cache.delete_many(keys)
+
+    def orm():
+        for remote_id in remote_ids:
+            model.objects.filter(network=NETWORK, kind="user", remote_id=remote_id).values_list(
+                "matrix_id", flat=True
+            ).first()
+
+    def gathered():
+        async def lookups():
+            return await asyncio.gather(*(id_map.aget(NETWORK, "user", remote_id) for remote_id in remote_ids))
+
+        asyncio.run(lookups())
+
+    def get_many():
+        id_map.get_many(NETWORK, "user", remote_ids)
+
+    return [
+        (orm, lambda: None),
+        (get_many, cold),
+        (get_many, id_map.clear_local),
+        (get_many, lambda: None),
+        (gathered, cold),
+    ]
+
+
+@app.command()
+def main(
+    mappings: int = typer.Option(100_000, help="Mappings in the fixture."),
+    batch: List[int] = typer.Option([10, 100, 1000], help="Remote ids per batch. Repeatable."),
+    unknown: float = typer.Option(0.1, help="Share of the ids without a mapping."),
+    runs: int = typer.Option(5, help="Batches per measurement (median)."),
+    drop: bool = typer.Option(False, help="Delete the fixture afterwards."),
+):
+    """
+    **Print per-batch latency and queries of each lookup strategy.**
+    """
+    import django  # pylint: disable=import-outside-toplevel
+
+    django.setup()
+    from shared.datasources.idmap import IdMap  # pylint: disable=import-outside-toplevel
+
+    count_queries()
+    id_map = IdMap()
+    seed(id_map.model, mappings)
+
+    table = Table(title=f"{mappings:,} mappings, {unknown:.0%} unknown ids (median ms / queries / cache calls)")
+    table.add_column("Batch", justify="right")
+    for column in ("orm", "cold", "redis", "local", "aget"):
+        table.add_column(column, justify="right")
+
+    for size in batch:
+        pairs = strategies(id_map, sample(mappings, size, unknown))
+        results = [measure(call, prepare, runs) for call, prepare in pairs]
+        table.add_row(f"{size:,}", *(f"{ms:.2f} / {queries} / {calls}" for ms, queries, calls in results))
+    console.print(table)
+
+    if drop:
+        id_map.model.objects.filter(network=NETWORK).delete()
+
+if __name__ == "__main__":
+    app()
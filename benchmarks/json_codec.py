@@ -0,0 +1,119 @@
+"""
+Encode/decode throughput of the stdlib JSON paths against
+`shared.utils.fastjson` (orjson when installed), on batches of Matrix events.
+
+Each batch is an application-service transaction body
+(`{"events": [...]}`) of `--batch` events built like the `event_types`
+corpus. Every row encodes and decodes the same batches:
+
+- `JsonResponse`: Django's `json.dumps(cls=DjangoJSONEncoder)` / `json.loads`,
+- `DRF JSON`: DRF's `JSONRenderer` / `JSONParser`,
+- `cache pickle`: django-redis' default pickle serializer,
+
+each next to its `fastjson` replacement.
+
+Example:
+    python -m benchmarks.json_codec --batches 200 --batch 100
+"""
+
+import io
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+app = typer.Typer(help="Compare stdlib and fast JSON encode/decode on Matrix event batches.")
+console = Console()
+
+
+def _codecs():
+    import django  # pylint: disable=import-outside-toplevel
+
+    django.setup()
+    # pylint: disable=import-outside-toplevel
+    from django.core.serializers.json import DjangoJSONEncoder
+    from django_redis.serializers.pickle import PickleSerializer
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+
+    from shared.utils import fastjson
+    from shared.utils.rest import FastJSONParser, FastJSONRenderer
+
+    pickle_serializer = PickleSerializer({})
+    json_serializer = fastjson.JSONSerializer({})
+    drf_renderer, drf_parser = JSONRenderer(), JSONParser()
+    fast_renderer, fast_parser = FastJSONRenderer(), FastJSONParser()
+    return [
+        (
+            "JsonResponse (json)",
+            lambda data: json.dumps(data, cls=DjangoJSONEncoder).encode(),
+            json.loads,
+        ),
+        (f"JsonResponse ({fastjson.BACKEND})", fastjson.dumps, fastjson.loads),
+        ("DRF JSONRenderer/Parser", drf_renderer.render, lambda raw: drf_parser.parse(io.BytesIO(raw))),
+        ("DRF FastJSONRenderer/Parser", fast_renderer.render, lambda raw: fast_parser.parse(io.BytesIO(raw))),
+        ("cache pickle", pickle_serializer.dumps, pickle_serializer.loads),
+        ("cache JSONSerializer", json_serializer.dumps, json_serializer.loads),
+    ]
+
+
+def _best(function, items, rounds):
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for item in items:
+            function(item)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def _measure(name, encode, decode, transactions, rounds):
+    encoded = [encode(transaction) for transaction in transactions]
+    assert decode(encoded[0]) == transactions[0], name
+    size = sum(len(raw) for raw in encoded)
+    encode_time = _best(encode, transactions, rounds)
+    decode_time = _best(decode, encoded, rounds)
+    return (
+        f"{size // len(encoded):,}",
+        f"{len(encoded) / encode_time:,.0f}",
+        f"{size / encode_time / 1e6:,.1f}",
+        f"{len(encoded) / decode_time:,.0f}",
+        f"{size / decode_time / 1e6:,.1f}",
+    )
+
+
+@app.command()
+def main(
+    batches: int = typer.Option(200, help="Transactions per measurement."),
+    batch: int = typer.Option(100, help="Events per transaction."),
+    rooms: int = typer.Option(50, help="Distinct rooms in the corpus."),
+    users: int = typer.Option(500, help="Distinct senders in the corpus."),
+    rounds: int = typer.Option(5, help="Repetitions; the best one is reported."),
+):
+    """
+    **Print batches/s and MB/s for encoding and decoding each codec.**
+    """
+    from benchmarks.event_types import make_corpus  # pylint: disable=import-outside-toplevel
+
+    events = json.loads(make_corpus(batches * batch, rooms, users))
+    transactions = [{"events": events[index : index + batch]} for index in range(0, len(events), batch)]
+
+    table = Table(title=f"{batches} transactions of {batch} events", header_style="bold magenta")
+    for column in ("Codec", "Bytes/txn", "Encode txn/s", "Encode MB/s", "Decode txn/s", "Decode MB/s"):
+        table.add_column(column, justify="left" if column == "Codec" else "right")
+    for name, encode, decode in _codecs():
+        table.add_row(name, *_measure(name, encode, decode, transactions, rounds))
+    console.print(table)
+
+
+if __name__ == "__main__":
+    app()
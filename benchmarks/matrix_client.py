@@ -0,0 +1,226 @@
+"""
+Stub Matrix homeserver and send-throughput benchmark for
+`shared.datasources.matrix.MatrixClient`.
+
+`stub` serves the handful of client-server endpoints the client uses
+(send, profile, room state) with an optional per-request latency and a
+token-bucket rate limit answering `M_LIMIT_EXCEEDED` with `retry_after_ms`.
+It only depends on the standard library and counts the requests it receives
+(`GET /_stub/stats`).
+
+`send` starts the stub in a subprocess, sends `--messages` messages spread
+over `--rooms` rooms with a naive client (one connection per request,
+rooms sent one after the other) and with `MatrixClient`, and reports
+messages per second. It then fires `--readers` concurrent identical profile
+lookups to show how many reach the homeserver.
+
+Example:
+    python -m benchmarks.matrix_client send --messages 5000 --rooms 50 --latency-ms 2
+    python -m benchmarks.matrix_client stub --port 8448 --rate-limit 500
+"""
+
+import asyncio
+import json
+import subprocess
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+from benchmarks.http_load import read_headers
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+app = typer.Typer(help="Stub homeserver and MatrixClient send benchmark.")
+console = Console()
+
+
+class StubHomeserver:
+    """
+    Minimal homeserver: idempotent sends, profiles and room state, with an
+    optional per-request latency and token-bucket rate limit (`429`).
+    """
+
+    def __init__(self, latency_ms=0.0, rate_limit=0.0):
+        self.latency = latency_ms / 1000
+        self.rate_limit = rate_limit
+        self.tokens = rate_limit
+        self.refilled = time.monotonic()
+        self.stats = {"requests": 0, "sent": 0, "rate_limited": 0, "profile": 0, "state": 0}
+        self.transactions = {}
+
+    def _allow(self):
+        if not self.rate_limit:
+            return True
+        now = time.monotonic()
+        self.tokens = min(self.rate_limit, self.tokens + (now - self.refilled) * self.rate_limit)
+        self.refilled = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    async def route(self, method, path):
+        """Return the status and JSON body answering `method path`."""
+        if path == "/_stub/stats":
+            return 200, self.stats
+        self.stats["requests"] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if not self._allow():
+            self.stats["rate_limited"] += 1
+            return 429, {"errcode": "M_LIMIT_EXCEEDED", "error": "Too many requests", "retry_after_ms": 50}
+        parts = path.split("?")[0].split("/")
+        if method == "PUT" and "send" in parts:
+            txn = tuple(parts[-4:])
+            if txn not in self.transactions:  # idempotent per transaction id, like a real homeserver
+                self.stats["sent"] += 1
+                self.transactions[txn] = f"${uuid.uuid4().hex}:stub"
+            return 200, {"event_id": self.transactions[txn]}
+        if method == "GET" and "profile" in parts:
+            self.stats["profile"] += 1
+            return 200, {"displayname": parts[-1], "avatar_url": None}
+        if method == "GET" and parts[-1] == "state":
+            self.stats["state"] += 1
+            return 200, []
+        return 404, {"errcode": "M_UNRECOGNIZED", "error": "Unrecognized request"}
+
+    async def handle(self, reader, writer):
+        """Serve HTTP/1.1 keep-alive requests of one connection."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                length = int((await read_headers(reader)).get("content-length", 0))
+                if length:
+                    await reader.readexactly(length)
+                status, payload = await self.route(method, path)
+                body = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} X\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+@app.command()
+def stub(
+    port: int = typer.Option(8448, help="Port to listen on."),
+    latency_ms: float = typer.Option(0.0, help="Simulated processing time per request."),
+    rate_limit: float = typer.Option(0.0, help="Requests per second before M_LIMIT_EXCEEDED (0 = unlimited)."),
+):
+    """
+    **Run the stub homeserver.**
+    """
+
+    async def serve():
+        homeserver = StubHomeserver(latency_ms, rate_limit)
+        server = await asyncio.start_server(homeserver.handle, "127.0.0.1", port, backlog=1024)
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(serve())
+
+
+async def _naive(url, messages, rooms):
+    import httpx  # pylint: disable=import-outside-toplevel
+
+    started = time.perf_counter()
+    for room in range(rooms):
+        for index in range(messages // rooms):
+            # A fresh client per call: new TCP connection, no retries, no ordering queue.
+            async with httpx.AsyncClient(base_url=url) as client:
+                await client.put(
+                    f"/_matrix/client/v3/rooms/%21room{room}%3Astub/send/m.room.message/{uuid.uuid4().hex}",
+                    json={"msgtype": "m.text", "body": str(index)},
+                )
+    return time.perf_counter() - started
+
+
+async def _pooled(url, messages, rooms):
+    from shared.datasources.matrix import MatrixClient  # pylint: disable=import-outside-toplevel
+
+    async with MatrixClient(url, "token") as client:
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(
+                client.send_message(f"!room{index % rooms}:stub", str(index))
+                for index in range(messages // rooms * rooms)
+            )
+        )
+        return time.perf_counter() - started, dict(client.stats)
+
+
+async def _readers(url, readers):
+    import httpx  # pylint: disable=import-outside-toplevel
+
+    from shared.datasources.matrix import MatrixClient  # pylint: disable=import-outside-toplevel
+
+    async with httpx.AsyncClient(base_url=url) as raw:
+        before = (await raw.get("/_stub/stats")).json()["profile"]
+        async with MatrixClient(url, "token") as client:
+            await asyncio.gather(*(client.get_profile("@alice:stub") for _ in range(readers)))
+        return (await raw.get("/_stub/stats")).json()["profile"] - before
+
+
+def render(title, rows):
+    """Print `(client, messages, seconds)` rows with their throughput."""
+    table = Table(title=title, header_style="bold magenta")
+    for column in ("Client", "Messages", "Seconds", "Msgs/s"):
+        table.add_column(column, justify="left" if column == "Client" else "right")
+    for client, messages, seconds in rows:
+        table.add_row(client, str(messages), f"{seconds:.2f}", f"{messages / seconds:,.0f}")
+    console.print(table)
+
+
+@app.command()
+def send(
+    messages: int = typer.Option(2000, help="Messages per measurement."),
+    rooms: int = typer.Option(20, help="Rooms the messages are spread over."),
+    latency_ms: float = typer.Option(1.0, help="Stub processing time per request."),
+    rate_limit: float = typer.Option(0.0, help="Stub rate limit in requests/s (0 = unlimited)."),
+    readers: int = typer.Option(100, help="Concurrent identical profile lookups."),
+    naive_messages: int = typer.Option(500, help="Messages sent by the naive client (it is slow)."),
+    port: int = typer.Option(18448, help="Port of the stub homeserver."),
+):  # pylint: disable=too-many-arguments,too-many-positional-arguments
+    """
+    **Print messages/s of a naive client and of MatrixClient against the stub.**
+    """
+    process = subprocess.Popen(  # pylint: disable=consider-using-with
+        [
+            sys.executable, "-m", "benchmarks.matrix_client", "stub",
+            f"--port={port}", f"--latency-ms={latency_ms}", f"--rate-limit={rate_limit}",
+        ],
+        cwd=project_root,
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        time.sleep(1.0)
+        naive = asyncio.run(_naive(url, naive_messages, rooms))
+        pooled, stats = asyncio.run(_pooled(url, messages, rooms))
+        upstream = asyncio.run(_readers(url, readers))
+    finally:
+        process.terminate()
+        process.wait()
+
+    render(
+        f"Messages sent ({rooms} rooms, {latency_ms} ms stub latency)",
+        [("naive", naive_messages, naive), ("MatrixClient", messages // rooms * rooms, pooled)],
+    )
+    console.print(f"MatrixClient stats: {stats}")
+    console.print(f"{readers} concurrent identical profile GETs -> {upstream} homeserver request(s)")
+
+
+if __name__ == "__main__":
+    app()
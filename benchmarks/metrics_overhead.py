@@ -0,0 +1,139 @@
+"""
+Per-request overhead of the `/metrics` registry (`shared.utils.metrics`).
+
+Times the metric updates a request triggers, for the in-memory store and the
+mmap-backed multiprocess store: a labelled counter increment, a histogram
+observation, `observe_request` (what `ServerTimingMiddleware` records per
+request) and a "typical" request that also runs three DB queries and two
+cache round-trips. `--threads` runs the same loop on several threads at once
+to expose lock contention. Finally it times a scrape summing `--workers`
+worker files.
+
+Example:
+    python -m benchmarks.metrics_overhead --iterations 200000 --threads 1 --threads 4
+"""
+
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import List
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from shared.utils.metrics import (  # noqa: E402  pylint: disable=wrong-import-position
+    ROUNDTRIP_BUCKETS,
+    Counter,
+    Histogram,
+    MetricsRegistry,
+    MmapStore,
+)
+
+app = typer.Typer(help="Measure the per-request cost of metric updates.")
+console = Console()
+
+
+def build(registry):
+    """Return `{label: operation}` updating metrics of `registry` like a request does."""
+    requests = Counter("http_requests", "requests", ("view", "method", "status"), registry=registry)
+    latency = Histogram("http_request_duration_seconds", "latency", ("view",), registry=registry)
+    queries = Histogram("db_query_duration_seconds", "db", ("alias",), registry=registry, buckets=ROUNDTRIP_BUCKETS)
+    cache = Histogram(
+        "cache_roundtrip_duration_seconds", "cache", ("op",), registry=registry, buckets=ROUNDTRIP_BUCKETS
+    )
+
+    def counter_inc():
+        requests.inc(1, "sample_api", "GET", "200")
+
+    def histogram_observe():
+        latency.observe(0.0123, "sample_api")
+
+    def observe_request():
+        requests.inc(1, "sample_api", "GET", "200")
+        latency.observe(0.0123, "sample_api")
+
+    def typical_request():
+        observe_request()
+        for _ in range(3):
+            queries.observe(0.0008, "default")
+        cache.observe(0.0002, "get")
+        cache.observe(0.0003, "set")
+
+    return {
+        "counter.inc": counter_inc,
+        "histogram.observe": histogram_observe,
+        "observe_request": observe_request,
+        "typical request": typical_request,
+    }
+
+
+def run(operation, iterations, threads):
+    """Return the mean wall time per operation (µs) with `threads` threads running it."""
+    per_thread = iterations // threads
+    barrier = threading.Barrier(threads + 1)
+
+    def worker():
+        barrier.wait()
+        for _ in range(per_thread):
+            operation()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    return (time.perf_counter() - started) / (per_thread * threads) * 1e6
+
+
+def scrape(registry, directory, workers, rounds=50):
+    """Print the render cost of `registry` once `workers` worker files sit in `directory`."""
+    # Simulate other workers by copying this process's store file.
+    source = Path(registry.store.path).read_bytes()
+    for index in range(workers - 1):
+        (directory / f"metrics-worker{index}.db").write_bytes(source)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        registry.render()
+    elapsed = (time.perf_counter() - started) / rounds
+    series = len(MmapStore.read(registry.store.path))
+    console.print(f"Scrape of {workers} worker files ({series} values each): {elapsed * 1000:.2f} ms")
+
+
+@app.command()
+def main(
+    iterations: int = typer.Option(200_000, help="Operations per measurement."),
+    threads: List[int] = typer.Option([1, 4], help="Concurrent threads. Repeatable."),
+    workers: int = typer.Option(8, help="Worker files summed by the scrape measurement."),
+):
+    """
+    **Print µs per metric update for the memory and mmap stores, and the scrape cost.**
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        stores = {"memory": MetricsRegistry(), "mmap": MetricsRegistry(directory=directory)}
+        table = Table(title=f"Metric update cost ({iterations} ops)", header_style="bold magenta")
+        table.add_column("Operation", style="cyan")
+        for name in stores:
+            for count in threads:
+                table.add_column(f"{name} ×{count} (µs)", justify="right")
+        operations = {name: build(registry) for name, registry in stores.items()}
+        for label in operations["memory"]:
+            row = [label]
+            for name in stores:
+                operation = operations[name][label]
+                run(operation, min(iterations, 10_000), 1)  # warm up label keys
+                row.extend(f"{run(operation, iterations, count):.2f}" for count in threads)
+            table.add_row(*row)
+        console.print(table)
+        scrape(stores["mmap"], Path(directory), workers)
+
+
+if __name__ == "__main__":
+    app()
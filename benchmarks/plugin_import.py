@@ -0,0 +1,145 @@
+"""
+Discovery and import cost of bridge plugins (`shared.plugins`) as the number
+of installed bridges grows.
+
+A synthetic project is generated for every bridge count:
+`bridges/b_<n>/plugins.py` modules declaring a protocol adapter and a
+transformer, each burning `--import-cost-ms` at import time, plus the same
+number of adapters installed as `matrix_meta.protocols` entry points of a
+fake distribution. Every measurement is a fresh interpreter timing:
+
+- eager: glob the modules and import them all (ad-hoc discovery),
+- registry cold: `PluginRegistry.names()` with no manifest yet,
+- registry warm: `names()` with the manifest from a previous run,
+- first use: warm `names()` plus `get()` of one adapter.
+
+Example:
+    python -m benchmarks.plugin_import --bridges 1 --bridges 20 --bridges 100
+"""
+
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import textwrap
+from pathlib import Path
+from typing import List
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+project_root = Path(__file__).resolve().parent.parent
+
+app = typer.Typer(help="Measure plugin discovery and import cost against the number of bridges.")
+console = Console()
+
+PLUGIN_TEMPLATE = '''import time
+
+from shared.plugins import MessageTransformer, ProtocolAdapter, message_transformer, protocol_adapter
+
+_deadline = time.perf_counter() + {import_cost}
+while time.perf_counter() < _deadline:  # simulated import-time work
+    pass
+
+
+@protocol_adapter("{name}")
+class Adapter(ProtocolAdapter):
+    """Adapter of {name}."""
+
+    async def deliver(self, event):
+        """Drop the event."""
+
+
+@message_transformer("{name}")
+class Transformer(MessageTransformer):
+    """Transformer of {name}."""
+'''
+
+MEASURE = textwrap.dedent(
+    """
+    import glob, importlib, json, os, sys, time
+    root, site, project_root, mode = sys.argv[1:5]
+    sys.path[:0] = [root, site, project_root]
+    from shared.plugins.registry import PluginRegistry
+
+    started = time.perf_counter()
+    if mode == "eager":
+        for path in sorted(glob.glob(os.path.join(root, "bridges", "*", "plugins.py"))):
+            importlib.import_module(os.path.relpath(path, root)[:-3].replace(os.sep, "."))
+    else:
+        manifest = os.path.join(root, ".cache", "plugins-manifest.json")
+        if mode == "cold" and os.path.exists(manifest):
+            os.remove(manifest)
+        registry = PluginRegistry(root, ("bridges/*/plugins.py",), manifest=manifest)
+        registry.names("protocols")
+        if mode == "first":
+            registry.get("protocols", "b_0")
+    print(json.dumps(time.perf_counter() - started))
+    """
+)
+
+
+def build_project(destination: Path, bridges: int, import_cost_ms: float):
+    """Write `bridges` local plugin packages and an installed distribution with as many entry points."""
+    root, site = destination / "root", destination / "site"
+    (root / "bridges").mkdir(parents=True)
+    (root / "bridges" / "__init__.py").write_text("")
+    for index in range(bridges):
+        bridge_dir = root / "bridges" / f"b_{index}"
+        bridge_dir.mkdir()
+        (bridge_dir / "__init__.py").write_text("")
+        (bridge_dir / "plugins.py").write_text(
+            PLUGIN_TEMPLATE.format(name=f"b_{index}", import_cost=import_cost_ms / 1000)
+        )
+    dist_info = site / "fakebridges-1.0.dist-info"
+    dist_info.mkdir(parents=True)
+    (dist_info / "METADATA").write_text("Metadata-Version: 2.1\nName: fakebridges\nVersion: 1.0\n")
+    entry_points = "".join(f"ep_{index} = fakebridges:Adapter{index}\n" for index in range(bridges))
+    (dist_info / "entry_points.txt").write_text(f"[matrix_meta.protocols]\n{entry_points}")
+    return root, site
+
+
+def time_run(root: Path, site: Path, mode: str, runs: int):
+    """Median seconds a fresh interpreter takes to discover the plugins in `mode` (see `MEASURE`)."""
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", MEASURE, str(root), str(site), str(project_root), mode],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        samples.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+
+@app.command()
+def main(
+    bridges: List[int] = typer.Option([1, 20, 100], help="Bridge counts to measure. Repeatable."),
+    runs: int = typer.Option(5, help="Fresh interpreters per measurement."),
+    import_cost_ms: float = typer.Option(5.0, help="Simulated import cost of each plugin module."),
+):
+    """
+    **Print median discovery time of eager imports and the plugin registry.**
+    """
+    table = Table(title=f"Plugin discovery (median of {runs}, ms)", header_style="bold magenta")
+    for column in ("Bridges", "eager import", "registry cold", "registry warm", "first use"):
+        table.add_column(column, justify="right")
+    for count in bridges:
+        with tempfile.TemporaryDirectory() as tmp:
+            root, site = build_project(Path(tmp), count, import_cost_ms)
+            time_run(root, site, "eager", 1)  # warm bytecode caches
+            time_run(root, site, "cold", 1)
+            row = [str(count)]
+            for mode in ("eager", "cold", "warm", "first"):
+                if mode == "warm":
+                    time_run(root, site, "cold", 1)  # leave a manifest behind
+                row.append(f"{time_run(root, site, mode, runs) * 1000:.1f}")
+            table.add_row(*row)
+    console.print(table)
+
+
+if __name__ == "__main__":
+    app()
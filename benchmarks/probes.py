@@ -0,0 +1,123 @@
+"""
+Per-probe cost of the health endpoints, measured in-process through the real
+WSGI and ASGI handlers (full `MIDDLEWARE` stack, no network).
+
+Compares the legacy health check routed through every middleware (`/`) with
+the `ProbeMiddleware` liveness (`/livez`) and cached readiness (`/readyz`)
+paths. Readiness needs Postgres and Redis for a green result, but its cost is
+dominated by the cached path either way.
+
+Example:
+    python -m benchmarks.probes --iterations 20000
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+app = typer.Typer(help="Measure the per-request cost of health/readiness probes.")
+console = Console()
+
+
+def _bench_wsgi(handler, factory, path, iterations):
+    environ = factory.get(path, HTTP_HOST="localhost").environ
+
+    def start_response(status, headers, exc_info=None):  # pylint: disable=W0613
+        return None
+
+    for _ in range(min(iterations, 100)):
+        handler(dict(environ), start_response)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        handler(dict(environ), start_response)
+    return (time.perf_counter() - started) / iterations
+
+
+def _bench_asgi(handler, path, iterations):
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"localhost")],
+        "client": ("127.0.0.1", 12345),
+        "server": ("localhost", 80),
+    }
+
+    def make_receive():
+        messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            # Django listens for a disconnect until the response is sent.
+            await asyncio.Future()
+            return None
+
+        return receive
+
+    async def send(message):  # pylint: disable=W0613
+        return None
+
+    async def run():
+        for _ in range(min(iterations, 100)):
+            await handler(dict(scope), make_receive(), send)
+        started = time.perf_counter()
+        for _ in range(iterations):
+            await handler(dict(scope), make_receive(), send)
+        return (time.perf_counter() - started) / iterations
+
+    return asyncio.run(run())
+
+
+@app.command()
+def main(
+    iterations: int = typer.Option(5000, help="Requests per path and handler."),
+    path: List[str] = typer.Option(["/", "/livez", "/readyz"], help="Paths to probe. Repeatable."),
+):
+    """
+    **Print the mean in-process cost of each probe path under WSGI and ASGI.**
+    """
+    import django  # pylint: disable=import-outside-toplevel
+    from django.conf import settings  # pylint: disable=import-outside-toplevel
+
+    django.setup(set_prefix=False)
+    settings.ALLOWED_HOSTS = ["*"]
+    # A red readiness result (no local Postgres/Redis) would log every request.
+    logging.getLogger("django.request").setLevel(logging.CRITICAL)
+
+    from django.core.handlers.asgi import ASGIHandler  # pylint: disable=import-outside-toplevel
+    from django.core.handlers.wsgi import WSGIHandler  # pylint: disable=import-outside-toplevel
+    from django.test import RequestFactory  # pylint: disable=import-outside-toplevel
+
+    wsgi, asgi, factory = WSGIHandler(), ASGIHandler(), RequestFactory()
+    table = Table(title="Probe cost per request", header_style="bold magenta")
+    table.add_column("Path")
+    table.add_column("WSGI (µs)", justify="right")
+    table.add_column("ASGI (µs)", justify="right")
+    for endpoint in path:
+        wsgi_cost = _bench_wsgi(wsgi, factory, endpoint, iterations)
+        asgi_cost = _bench_asgi(asgi, endpoint, iterations)
+        table.add_row(endpoint, f"{wsgi_cost * 1e6:,.1f}", f"{asgi_cost * 1e6:,.1f}")
+    console.print(table)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,167 @@
+"""
+Throughput and accuracy of the Redis rate limiter (`shared.utils.ratelimit`)
+under contention.
+
+`--threads` threads (or as many asyncio tasks with `--mode async`) each make
+`--requests` checks against one shared key (every caller hits the same
+limit) or one key per caller. Every combination of algorithm and `--lease`
+is measured. The limit is `--limit` per day, so (almost) nothing refills during a run
+and the number of allowed checks on the shared key must equal the limit:
+"Allowed" shows allowed/expected. "Redis/check" is the share of checks that
+needed a Redis round-trip instead of the in-process lease; "Errors" counts
+checks allowed because Redis failed (`FAIL_OPEN`), which can push "Allowed"
+over the limit.
+
+Example:
+    docker compose up -d redis
+    python -m benchmarks.ratelimit_contention --threads 16 --requests 500 --lease 1 --lease 10
+"""
+
+import asyncio
+import functools
+import itertools
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import List
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+app = typer.Typer(help="Measure rate limit decisions/s, latency and accuracy under contention.")
+console = Console()
+
+
+def _percentile(samples, fraction):
+    return sorted(samples)[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def run_threads(limiter, callers, requests, shared):
+    """`requests` checks from each of `callers` threads; returns the elapsed time, latencies and allowed count."""
+    latencies, allowed = [], []
+    barrier = threading.Barrier(callers)
+
+    def caller(index):
+        identity = "shared" if shared else f"caller-{index}"
+        local_latencies, local_allowed = [], 0
+        barrier.wait()
+        for _ in range(requests):
+            started = time.perf_counter()
+            local_allowed += limiter.hit(identity).allowed
+            local_latencies.append(time.perf_counter() - started)
+        latencies.extend(local_latencies)
+        allowed.append(local_allowed)
+
+    workers = [threading.Thread(target=caller, args=(index,)) for index in range(callers)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - started, latencies, sum(allowed)
+
+
+def run_async(limiter, callers, requests, shared):
+    """`run_threads` with `callers` asyncio tasks calling `ahit`."""
+    latencies, allowed = [], []
+
+    async def caller(index):
+        identity = "shared" if shared else f"caller-{index}"
+        local_allowed = 0
+        for _ in range(requests):
+            started = time.perf_counter()
+            local_allowed += (await limiter.ahit(identity)).allowed
+            latencies.append(time.perf_counter() - started)
+        allowed.append(local_allowed)
+
+    async def gather_callers():
+        started = time.perf_counter()
+        await asyncio.gather(*(caller(index) for index in range(callers)))
+        return time.perf_counter() - started
+
+    elapsed = asyncio.run(gather_callers())
+    return elapsed, latencies, sum(allowed)
+
+
+def _table(title):
+    table = Table(title=title, header_style="bold magenta")
+    for column in ("Algorithm", "Keys", "Lease", "Checks/s", "p50 µs", "p99 µs", "Redis/check", "Errors", "Allowed"):
+        table.add_column(column, justify="left" if column in ("Algorithm", "Keys") else "right")
+    return table
+
+
+def _count_redis_calls(limiter):
+    """Wrap the Redis outcomes of `limiter` to count its round-trips and failures."""
+    counts = {"calls": 0, "errors": 0}
+    # pylint: disable=protected-access
+    decide, failed = limiter._decide, limiter._failed
+
+    def counted(*args):
+        counts["calls"] += 1
+        return decide(*args)
+
+    def counted_failure(error):
+        counts["errors"] += 1
+        return failed(error)
+
+    limiter._decide, limiter._failed = counted, counted_failure
+    return counts
+
+
+def _measure(limiter, run, shared, threads, expected):
+    """Table cells of one configuration, from a fresh key."""
+    identities = ["shared"] if shared else [f"caller-{index}" for index in range(threads)]
+    for identity in identities:
+        limiter.reset(identity)
+    counts = _count_redis_calls(limiter)
+    elapsed, latencies, allowed = run(limiter, shared=shared)
+    for identity in identities:
+        limiter.reset(identity)
+    return (
+        f"{len(latencies) / elapsed:,.0f}",
+        f"{_percentile(latencies, 0.5) * 1e6:,.0f}",
+        f"{_percentile(latencies, 0.99) * 1e6:,.0f}",
+        f"{counts['calls'] / len(latencies):.2f}",
+        str(counts["errors"]),
+        f"{allowed}/{expected}" if allowed == expected else f"[red]{allowed}/{expected}[/]",
+    )
+
+
+@app.command()
+def main(
+    threads: int = typer.Option(8, help="Concurrent callers."),
+    requests: int = typer.Option(500, help="Checks per caller."),
+    limit: int = typer.Option(1000, help="Allowed checks per key and day."),
+    lease: List[int] = typer.Option([1, 10], help="Lease sizes to compare. Repeatable."),
+    algorithm: List[str] = typer.Option(["token_bucket", "sliding_window"], help="Algorithms to compare."),
+    mode: str = typer.Option("threads", help="threads (hit) or async (ahit)."),
+):  # pylint: disable=too-many-arguments,too-many-positional-arguments
+    """
+    **Print decisions/s, latency, Redis round-trips and accuracy per configuration.**
+    """
+    import django  # pylint: disable=import-outside-toplevel
+
+    django.setup()
+    # pylint: disable=import-outside-toplevel
+    from shared.utils.ratelimit import RateLimit
+
+    run = functools.partial(run_async if mode == "async" else run_threads, callers=threads, requests=requests)
+    table = _table(f"{threads} {mode} callers x {requests} checks, {limit}/d per key")
+    for name, shared, size in itertools.product(algorithm, (True, False), lease):
+        limiter = RateLimit(f"{limit}/d", name, scope=f"benchmark:{name}:{size}:{shared}", lease=size)
+        expected = min(threads * requests, limit) if shared else threads * min(requests, limit)
+        table.add_row(
+            name, "shared" if shared else "per caller", str(size), *_measure(limiter, run, shared, threads, expected)
+        )
+    console.print(table)
+
+
+if __name__ == "__main__":
+    app()
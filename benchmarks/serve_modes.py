@@ -0,0 +1,113 @@
+"""
+Throughput of the development server against the production serve mode.
+
+Starts `manage.py runserver --noreload` and `manage.py serve` (gunicorn +
+uvicorn workers, or any `--serve-arg` override) on separate ports, waits for
+their liveness probe, drives the same keep-alive load against the core
+endpoints with `benchmarks.http_load`, then stops both servers.
+
+`/core/` needs Redis and `/` only the cache-free middleware stack; `/livez`
+isolates raw server overhead.
+
+Example:
+    python -m benchmarks.serve_modes --path /core/ --path / --concurrency 64 --duration 15
+"""
+
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+from typing import List
+
+import typer
+from rich.console import Console
+
+from benchmarks.http_load import render, run_load
+
+project_root = Path(__file__).resolve().parent.parent
+
+app = typer.Typer(help="Compare runserver with the production serve mode under load.")
+console = Console()
+
+
+def start(label, args, port):
+    """Start `manage.py *args` in its own session and wait until `/livez` answers on `port`."""
+    console.print(f"[cyan]Starting[/cyan] {label}: manage.py {' '.join(args)}")
+    process = subprocess.Popen(  # pylint: disable=consider-using-with
+        [sys.executable, "manage.py", *args],
+        cwd=project_root,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        env={**os.environ, "LOG_LEVEL": "WARNING"},
+        start_new_session=True,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise typer.Exit(code=1)
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/livez", timeout=1):
+                return process
+        except OSError:
+            time.sleep(0.2)
+    stop(process)
+    console.print(f"[red]{label} did not become live on port {port}[/red]")
+    raise typer.Exit(code=1)
+
+
+def stop(process):
+    """Terminate a server started by `start()` and its workers."""
+    # The servers run in their own session: stop the master and its workers.
+    os.killpg(process.pid, signal.SIGTERM)
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+
+
+@app.command()
+def main(
+    path: List[str] = typer.Option(["/core/", "/", "/livez"], help="Endpoint to load. Repeatable."),
+    concurrency: int = typer.Option(64, help="Concurrent keep-alive connections."),
+    duration: float = typer.Option(10.0, help="Measurement window per endpoint, in seconds."),
+    workers: int = typer.Option(0, help="Workers of the serve mode; 0 derives them from the CPUs."),
+    serve_arg: List[str] = typer.Option([], help="Extra `manage.py serve` argument. Repeatable."),
+    port: int = typer.Option(18000, help="First of the two ports used."),
+):  # pylint: disable=too-many-arguments,too-many-positional-arguments
+    """
+    **Print throughput and p99 of runserver vs serve on the same endpoints.**
+    """
+    modes = [
+        ("runserver", ["runserver", "--noreload", f"127.0.0.1:{port}"], port),
+        (
+            "serve",
+            [
+                "serve",
+                "--host=127.0.0.1",
+                f"--port={port + 1}",
+                *([f"--workers={workers}"] if workers else []),
+                *serve_arg,
+            ],
+            port + 1,
+        ),
+    ]
+    results = []
+    for label, args, mode_port in modes:
+        process = start(label, args, mode_port)
+        try:
+            for endpoint in path:
+                console.print(f"[cyan]Loading[/cyan] {label} {endpoint} x{concurrency} for {duration}s")
+                results.append(
+                    asyncio.run(run_load(label, f"http://127.0.0.1:{mode_port}", endpoint, concurrency, duration))
+                )
+        finally:
+            stop(process)
+    render(results)
+
+
+if __name__ == "__main__":
+    app()
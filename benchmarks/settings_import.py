@@ -0,0 +1,110 @@
+"""
+Startup cost of `import config.settings`, measured in fresh interpreters.
+
+Each run spawns `python -X importtime -c "import django.conf, config.settings"`
+and records the wall time of the interpreter and the cumulative import time
+reported for `config.settings` (`django.conf` is imported first, as Django
+always does, so shared dependencies are not attributed to the settings).
+Pass `--ref` to also measure another revision of the tree (exported with
+`git archive`), e.g. the commit before a settings change:
+
+Example:
+    python -m benchmarks.settings_import --runs 20 --ref HEAD~1 --env production
+"""
+
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+from io import BytesIO
+from pathlib import Path
+from typing import List, Optional
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+project_root = Path(__file__).resolve().parent.parent
+
+app = typer.Typer(help="Measure the import cost of config.settings.")
+console = Console()
+
+IMPORTTIME_RE = re.compile(r"import time:\s+\d+\s+\|\s+(\d+)\s+\|\s*config\.settings$")
+
+
+def measure(tree: Path, runs: int, env: dict):
+    """
+    Import `config.settings` `runs` times from `tree` in fresh interpreters.
+
+    Returns:
+        tuple[list[float], list[float]]: Wall times and cumulative import times, in seconds.
+    """
+    walls, imports = [], []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import django.conf, config.settings"],
+            cwd=tree,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        walls.append(time.perf_counter() - started)
+        for line in result.stderr.splitlines():
+            match = IMPORTTIME_RE.search(line.strip())
+            if match:
+                imports.append(int(match.group(1)) / 1e6)
+    return walls, imports
+
+
+def export_ref(ref: str, destination: Path):
+    """Extract the tree of the git revision `ref` into `destination`."""
+    archive = subprocess.run(
+        ["git", "archive", "--format=tar", ref], cwd=project_root, capture_output=True, check=True
+    ).stdout
+    with tarfile.open(fileobj=BytesIO(archive)) as tar:
+        tar.extractall(destination)  # nosec - archive of our own repository
+
+
+@app.command()
+def main(
+    runs: int = typer.Option(15, help="Fresh interpreters per tree."),
+    ref: Optional[List[str]] = typer.Option(None, help="Git revision to compare against. Repeatable."),
+    env_name: str = typer.Option("development", "--env", help="DJANGO_ENV profile to load."),
+):
+    """
+    **Print median wall time and `config.settings` import time per tree.**
+    """
+    env = {**os.environ, "DJANGO_ENV": env_name}
+    trees = [("working tree", project_root)]
+    with tempfile.TemporaryDirectory() as tmp:
+        for revision in ref or []:
+            destination = Path(tmp) / revision.replace("/", "_").replace("~", "-")
+            destination.mkdir()
+            export_ref(revision, destination)
+            trees.append((revision, destination))
+
+        table = Table(title=f"import config.settings ({runs} runs, DJANGO_ENV={env_name})",
+                      header_style="bold magenta")
+        for column in ("Tree", "Wall median (ms)", "Import median (ms)", "Import min (ms)"):
+            table.add_column(column, justify="left" if column == "Tree" else "right")
+        for label, tree in trees:
+            # One untimed run to populate bytecode and OS caches.
+            measure(tree, 1, env)
+            walls, imports = measure(tree, runs, env)
+            table.add_row(
+                label,
+                f"{statistics.median(walls) * 1000:.1f}",
+                f"{statistics.median(imports) * 1000:.1f}" if imports else "-",
+                f"{min(imports) * 1000:.1f}" if imports else "-",
+            )
+    console.print(table)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,137 @@
+"""
+Sender-side cost of bridge fan-out through Django's synchronous signals
+against `shared.signals.Signal` with queued receivers.
+
+Every simulated bridged message fans out to three receivers: a puppet
+profile sync (blocking, `--profile-ms`, coalesced per user), a read receipt
+(`async`, `--receipt-ms`) and a remote delivery (blocking, `--delivery-ms`).
+With Django's `Signal` all of it runs inside `send()`; with the bus `send()`
+only queues. The table reports the time senders spent in `send()`, the time
+until every delivery completed, and what the bus delivered, coalesced and
+dropped.
+
+Example:
+    python -m benchmarks.signal_bus --messages 500 --users 20 --queue-size 100
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+app = typer.Typer(help="Compare inline Django signals with the queued signal bus.")
+console = Console()
+
+
+def _receivers(profile_ms, receipt_ms, delivery_ms):
+    def sync_profile(**kwargs):
+        time.sleep(profile_ms / 1000)
+
+    async def send_receipt(**kwargs):
+        await asyncio.sleep(receipt_ms / 1000)
+
+    def deliver_remote(**kwargs):
+        time.sleep(delivery_ms / 1000)
+
+    return sync_profile, send_receipt, deliver_remote
+
+
+def _run(signal, messages, users):
+    samples = []
+    started = time.perf_counter()
+    for index in range(messages):
+        sent = time.perf_counter()
+        signal.send(sender=None, user=f"@user{index % users}:example.org", body=str(index))
+        samples.append((time.perf_counter() - sent) * 1000)
+    sending = time.perf_counter() - started
+    if hasattr(signal, "flush"):
+        signal.flush()
+    return samples, sending, time.perf_counter() - started
+
+
+def _signals(receivers, coalesce, options):
+    # pylint: disable=import-outside-toplevel
+    from django.dispatch import Signal as DjangoSignal
+
+    from shared.signals import Signal
+
+    inline = DjangoSignal()
+    for receiver in receivers:
+        inline.connect(receiver)
+
+    bus = Signal(name="benchmark")
+    bus.connect(receivers[0], coalesce=coalesce, coalesce_key=lambda user, **kwargs: user, **options)
+    for receiver in receivers[1:]:
+        bus.connect(receiver, **options)
+    return inline, bus
+
+
+def _render_dispatch(title, signals, messages, users):
+    table = Table(title=title, header_style="bold magenta")
+    for column in ("Dispatch", "send() p50 ms", "send() p99 ms", "Sending s", "All done s"):
+        table.add_column(column, justify="left" if column == "Dispatch" else "right")
+    for name, signal in signals.items():
+        samples, sending, done = _run(signal, messages, users)
+        table.add_row(
+            name,
+            f"{statistics.median(samples):.3f}",
+            f"{sorted(samples)[int(len(samples) * 0.99) - 1]:.3f}",
+            f"{sending:.2f}",
+            f"{done:.2f}",
+        )
+    console.print(table)
+
+
+def _render_stats(bus):
+    stats = Table(title="Signal bus receivers", header_style="bold magenta")
+    for column in ("Receiver", "Delivered", "Coalesced", "Dropped", "Avg wait ms", "Avg run ms"):
+        stats.add_column(column, justify="left" if column == "Receiver" else "right")
+    for receiver, values in bus.stats().items():
+        stats.add_row(
+            receiver.rsplit(".", 1)[-1],
+            str(values["delivered"]),
+            str(values["coalesced"]),
+            str(values["dropped"]),
+            f"{values['avg_wait_ms']:.1f}",
+            f"{values['avg_run_ms']:.1f}",
+        )
+    console.print(stats)
+
+
+@app.command()
+def main(
+    messages: int = typer.Option(300, help="Bridged messages sent."),
+    users: int = typer.Option(20, help="Distinct senders (profile syncs coalesce per user)."),
+    profile_ms: float = typer.Option(5.0, help="Cost of a puppet profile sync."),
+    receipt_ms: float = typer.Option(2.0, help="Cost of a read receipt (async)."),
+    delivery_ms: float = typer.Option(3.0, help="Cost of a remote delivery."),
+    queue_size: int = typer.Option(1000, help="Bus queue bound per receiver."),
+    overflow: str = typer.Option("block", help="Bus policy when a queue is full: block or drop."),
+    coalesce: float = typer.Option(0.05, help="Profile sync coalescing window, in seconds."),
+    concurrency: int = typer.Option(4, help="Tasks draining each bus queue."),
+):  # pylint: disable=too-many-arguments,too-many-positional-arguments
+    """
+    **Print send() latency and completion time for inline and queued fan-out.**
+    """
+    import django  # pylint: disable=import-outside-toplevel
+
+    django.setup()
+    options = {"background": True, "queue_size": queue_size, "overflow": overflow, "concurrency": concurrency}
+    inline, bus = _signals(_receivers(profile_ms, receipt_ms, delivery_ms), coalesce, options)
+    signals = {"django Signal (inline)": inline, "signal bus (queued)": bus}
+    _render_dispatch(f"{messages} messages, {users} users", signals, messages, users)
+    _render_stats(bus)
+
+
+if __name__ == "__main__":
+    app()
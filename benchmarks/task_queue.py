@@ -0,0 +1,109 @@
+"""
+End-to-end throughput of the background task queue (`shared.tasks`)
+against a local Redis.
+
+`--tasks` jobs that wait `--task-ms` (a stand-in for a homeserver call) are
+enqueued, then drained by a burst worker of every `--pool`. The table
+reports what the caller pays per `delay()` against running the job inline,
+and how long each pool took to drain the queue. Plain functions are used for
+`threads` and `processes`, an `async def` twin for `asyncio`.
+
+Example:
+    docker compose up -d redis
+    python -m benchmarks.task_queue --url redis://127.0.0.1:6379/14 --tasks 2000 --concurrency 16
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+import timeit
+from pathlib import Path
+from typing import List
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+app = typer.Typer(help="Measure enqueue cost and drain throughput of the task queue.")
+console = Console()
+
+
+def _percentile(samples, fraction):
+    return sorted(samples)[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def _drain(job, pool, tasks, concurrency):
+    """Enqueue `tasks` runs of `job`, drain them with a burst worker of `pool` and return the table row."""
+    from shared.tasks import get_broker, run_worker  # pylint: disable=import-outside-toplevel
+
+    samples = []
+    for _ in range(tasks):
+        sent = time.perf_counter()
+        job.delay()
+        samples.append((time.perf_counter() - sent) * 1e6)
+    started = time.perf_counter()
+    run_worker(["benchmark"], concurrency, pool, burst=True)
+    drain = time.perf_counter() - started
+    left = get_broker().depth("benchmark")
+    if left["ready"] or left["dead"]:
+        console.print(f"[yellow]{pool}: queue not drained: {left}[/]")
+    return (
+        f"{statistics.median(samples):,.0f}",
+        f"{_percentile(samples, 0.99):,.0f}",
+        f"{drain:.2f}",
+        f"{tasks / drain:,.0f}",
+    )
+
+
+@app.command()
+def main(
+    url: str = typer.Option("redis://127.0.0.1:6379/14", help="Redis to use (the database is flushed)."),
+    tasks: int = typer.Option(1000, help="Jobs per pool."),
+    task_ms: float = typer.Option(5.0, help="Time every job waits."),
+    concurrency: int = typer.Option(8, help="Worker concurrency (processes for the processes pool)."),
+    pool: List[str] = typer.Option(["threads", "asyncio", "processes"], help="Worker pools to compare."),
+):
+    """
+    **Print delay() latency and per-pool drain throughput.**
+    """
+    import django  # pylint: disable=import-outside-toplevel
+
+    django.setup()
+    # pylint: disable=import-outside-toplevel
+    import redis
+    from django.conf import settings
+
+    settings.TASKS = {**settings.TASKS, "REDIS_URL": url, "EAGER": False}
+    from shared.tasks import task
+
+    @task(name="benchmarks.wait", queue="benchmark")
+    def wait():
+        time.sleep(task_ms / 1000)
+
+    @task(name="benchmarks.await", queue="benchmark")
+    async def await_():
+        await asyncio.sleep(task_ms / 1000)
+
+    client = redis.Redis.from_url(url)
+    client.flushdb()
+
+    inline_ms = timeit.timeit(wait, number=min(tasks, 200)) / min(tasks, 200) * 1000
+
+    table = Table(title=f"{tasks} jobs of {task_ms} ms, concurrency {concurrency}", header_style="bold magenta")
+    for name in ("Pool", "delay() p50 µs", "delay() p99 µs", "Drain s", "Jobs/s"):
+        table.add_column(name, justify="left" if name == "Pool" else "right")
+    for name in pool:
+        table.add_row(name, *_drain(await_ if name == "asyncio" else wait, name, tasks, concurrency))
+    console.print(table)
+    console.print(f"Running a job inline instead costs the caller {inline_ms:.2f} ms.")
+    client.flushdb()
+
+
+if __name__ == "__main__":
+    app()
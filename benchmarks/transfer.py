@@ -0,0 +1,137 @@
+"""
+Cost of admin exports and imports: streaming and chunked against whole-table.
+
+Seeds `--rows` id mappings of a `benchmark` network (once; reused by later
+runs), then:
+
+- export, list: the table read into memory and written as one CSV (what an
+  export that builds its file before responding does),
+- export, stream: `shared.utils.transfer.iter_csv`, blocks of
+  `--chunk-size` rows from a server-side cursor,
+- import, save(): one `update_or_create()` per row of the exported file,
+  on `--import-rows` of them,
+- import, chunked: `import_rows` (one upsert per `--chunk-size` rows) on
+  the same rows.
+
+Time and peak Python memory (`tracemalloc`) are reported. Run it against
+the Postgres of the settings; `--drop` deletes the seeded rows afterwards.
+
+Example:
+    docker compose up -d db && python manage.py migrate
+    python -m benchmarks.transfer --rows 200000 --import-rows 10000
+"""
+
+import csv
+import io
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+from benchmarks.id_mapping import NETWORK, seed  # noqa: E402  pylint: disable=wrong-import-position
+
+app = typer.Typer(help="Compare streaming exports and chunked imports with whole-table ones.")
+console = Console()
+
+FIELDS = ["network", "kind", "remote_id", "matrix_id", "room_id"]
+
+
+def measure(call):
+    """Seconds and peak traced memory (MiB) of `call()`."""
+    tracemalloc.start()
+    try:
+        started = time.perf_counter()
+        call()
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+    return elapsed, peak
+
+
+def variants(queryset, rows, import_rows, chunk_size):
+    """`{label: (call, rows handled)}` of each strategy; imports load the first `import_rows` rows."""
+    # pylint: disable=import-outside-toplevel
+    from shared.utils.transfer import import_rows as load_rows
+    from shared.utils.transfer import iter_csv, read_rows
+
+    model = queryset.model
+
+    def export_list():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(FIELDS)
+        writer.writerows(list(queryset.order_by().values_list(*FIELDS)))
+        return len(buffer.getvalue().encode())
+
+    def export_stream():
+        return sum(len(block) for block in iter_csv(queryset, FIELDS, chunk_size))
+
+    exported = b"".join(iter_csv(queryset.order_by("pk")[:import_rows], FIELDS, chunk_size))
+
+    def import_save():
+        for row in read_rows(io.BytesIO(exported), "csv"):
+            model.objects.update_or_create(
+                network=row["network"],
+                kind=row["kind"],
+                remote_id=row["remote_id"],
+                defaults={"matrix_id": row["matrix_id"], "room_id": row["room_id"]},
+            )
+
+    def import_chunked():
+        load_rows(
+            model,
+            read_rows(io.BytesIO(exported), "csv"),
+            text=True,
+            unique_fields=["network", "kind", "remote_id"],
+            chunk_size=chunk_size,
+        )
+
+    return {
+        "export, list": (export_list, rows),
+        "export, stream": (export_stream, rows),
+        "import, save()": (import_save, import_rows),
+        "import, chunked": (import_chunked, import_rows),
+    }
+
+
+@app.command()
+def main(
+    rows: int = typer.Option(200_000, help="Mappings in the fixture (exported)."),
+    import_rows: int = typer.Option(10_000, help="Rows of the export imported back."),
+    chunk_size: int = typer.Option(2000, help="Rows per streamed block and per import transaction."),
+    drop: bool = typer.Option(False, help="Delete the fixture afterwards."),
+):
+    """
+    **Print time and peak memory of each export and import strategy.**
+    """
+    import django  # pylint: disable=import-outside-toplevel
+
+    django.setup()
+    from services.bridge.models import IdMapping  # pylint: disable=import-outside-toplevel
+
+    seed(IdMapping, rows)
+    queryset = IdMapping.objects.filter(network=NETWORK)
+
+    table = Table(title=f"{rows:,} rows exported, {import_rows:,} imported, blocks of {chunk_size:,}")
+    for column in ("Strategy", "Rows", "Time (s)", "Rows/s", "Peak memory (MiB)"):
+        table.add_column(column, justify="left" if column == "Strategy" else "right")
+    for label, (call, count) in variants(queryset, rows, import_rows, chunk_size).items():
+        elapsed, peak = measure(call)
+        table.add_row(label, f"{count:,}", f"{elapsed:.2f}", f"{count / elapsed:,.0f}", f"{peak:.1f}")
+    console.print(table)
+
+    if drop:
+        queryset.delete()
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,148 @@
+"""
+Validation cost of event batches: compiled `shared.validators` schemas
+against per-field DRF validation.
+
+Builds a batch of `--events` decoded events over `--rooms` rooms and
+`--users` senders (`--invalid` of them with a bad sender), then validates
+it with:
+
+- DRF: a `Serializer` with one field per key (`RegexValidator` on the ids,
+  `max_length`, integer bounds), `many=True` - DRF's per-item, per-field
+  `run_validation`,
+- SchemaSerializer: `services.bridge.serializers.EventSerializer` with
+  `many=True` (one `validate_many` call behind the DRF API),
+- schema: `EVENT_SCHEMA.validate_many` itself, with the identifier caches
+  warm and cleared before each run,
+- RoomEvent: `RoomEvent.parse_many`, the id checks ingestion did before.
+
+Example:
+    python -m benchmarks.validators --events 10000 --runs 10
+"""
+
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+from benchmarks.event_types import make_events  # noqa: E402  pylint: disable=wrong-import-position
+
+app = typer.Typer(help="Compare compiled schema validation with per-field DRF validation.")
+console = Console()
+
+
+def make_batch(events, rooms, users, invalid):
+    """The events of `benchmarks.event_types`, an `invalid` share of them with a malformed sender."""
+    batch = make_events(events, rooms, users)
+    for event in batch:
+        if random.random() < invalid:
+            event["sender"] = event["sender"][1:]
+    return batch
+
+
+def measure(run, runs, prepare=None):
+    """Median seconds of `run()`; `prepare()` runs untimed before each run."""
+    samples = []
+    for _ in range(runs):
+        if prepare is not None:
+            prepare()
+        started = time.perf_counter()
+        run()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def drf_serializer():
+    """A DRF `Serializer` checking `EVENT_SCHEMA`'s rules with one validated field per key."""
+    # pylint: disable=import-outside-toplevel
+    from django.core.validators import RegexValidator
+    from rest_framework import serializers
+
+    from shared.validators import IDENTIFIER_PATTERNS, MAX_CANONICAL_INT
+
+    def id_field(kind, **kwargs):
+        return serializers.CharField(
+            max_length=255, validators=[RegexValidator(rf"^(?:{IDENTIFIER_PATTERNS[kind].pattern})\Z")], **kwargs
+        )
+
+    class DRFEventSerializer(serializers.Serializer):  # pylint: disable=abstract-method
+        """A Matrix event, validated field by field."""
+
+        event_id = id_field("event_id")
+        room_id = id_field("room_id")
+        sender = id_field("user_id")
+        type = serializers.CharField(max_length=255)
+        origin_server_ts = serializers.IntegerField(min_value=0, max_value=MAX_CANONICAL_INT)
+        content = serializers.DictField(required=False, allow_null=True)
+        state_key = serializers.CharField(max_length=255, required=False, allow_blank=True, trim_whitespace=False)
+        unsigned = serializers.DictField(required=False, allow_null=True)
+
+    return DRFEventSerializer
+
+
+def variants(batch):
+    """`{label: (run, prepare)}` of each validator of `batch`."""
+    # pylint: disable=import-outside-toplevel
+    from services.bridge.serializers import EventSerializer
+    from shared.types import RoomEvent
+    from shared.validators import EVENT_SCHEMA, identifier_checker
+
+    drf_event_serializer = drf_serializer()
+
+    def clear_identifier_caches():
+        for kind in ("event_id", "room_id", "user_id"):
+            identifier_checker(kind).seen.clear()
+
+    def validate_all():  # every invalid event reported, as DRF does
+        try:
+            EVENT_SCHEMA.validate_many(batch, fail_fast=False)
+        except ValueError:
+            pass
+
+    return {
+        "DRF per-field (many=True)": (lambda: drf_event_serializer(data=batch, many=True).is_valid(), None),
+        "SchemaSerializer (many=True)": (lambda: EventSerializer(data=batch, many=True).is_valid(), None),
+        "schema validate_many": (validate_all, None),
+        "schema validate_many, cold id cache": (validate_all, clear_identifier_caches),
+        "RoomEvent.parse_many": (lambda: RoomEvent.parse_many(batch), None),
+    }
+
+
+@app.command()
+def main(
+    events: int = typer.Option(10_000, help="Events per batch."),
+    rooms: int = typer.Option(100, help="Distinct rooms."),
+    users: int = typer.Option(1000, help="Distinct senders."),
+    invalid: float = typer.Option(0.0, help="Share of events with an invalid sender."),
+    runs: int = typer.Option(5, help="Validations per measurement (median)."),
+):
+    """
+    **Print the time to validate one batch with each validator.**
+    """
+    import django  # pylint: disable=import-outside-toplevel
+
+    django.setup()
+
+    table = Table(
+        title=f"{events:,} events, {rooms} rooms, {users} senders, {invalid:.0%} invalid", header_style="bold magenta"
+    )
+    for column in ("Validator", "Batch (ms)", "Events/s", "vs DRF"):
+        table.add_column(column, justify="left" if column == "Validator" else "right")
+    baseline = None
+    for label, (run, prepare) in variants(make_batch(events, rooms, users, invalid)).items():
+        elapsed = measure(run, runs, prepare)
+        baseline = baseline or elapsed
+        table.add_row(label, f"{elapsed * 1000:.1f}", f"{events / elapsed:,.0f}", f"{baseline / elapsed:.1f}x")
+    console.print(table)
+
+if __name__ == "__main__":
+    app()
@@ -11,28 +11,45 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
 from pathlib import Path
-import os
-from dotenv import load_dotenv
-load_dotenv()
-
-# from dynaconf import DjangoDynaconf
-
-# DjangoDynaconf(__name__)
+from shared.utils.cache_backends import redis_cache, with_db
+from shared.utils.database import configure_connection_mode, default_connection_mode
+from shared.utils.layered_settings import LayeredSettings
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Layered configuration (lowest to highest precedence):
+#   1. the defaults passed to `setting()` below,
+#   2. `settings.toml` [default] table, then the profile selected by
+#      `DJANGO_ENV` (development when unset, e.g. `DJANGO_ENV=production`),
+#   3. `.env` / process environment, either `DJANGO_<NAME>` or plain `<NAME>`.
+# The files are read once, on the first `setting()` call, with `tomllib`;
+# Dynaconf is only imported when settings.toml uses its `@` tokens.
+config = LayeredSettings(BASE_DIR / "settings.toml", dotenv_path=BASE_DIR / ".env")
+
+
+def setting(name, default=None, cast=None):
+    """
+    Resolve a setting through the layers above.
+
+    Environment values stay strings (passwords and keys are never parsed)
+    unless `cast` is given or the lower layers hold a non-string value, whose
+    type they are converted to (`"false"` -> False, `"10"` -> 10,
+    `'["a"]'` -> list).
+    """
+    return config.get(name, default, cast)
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = "django-insecure-b3x39&*iqh1+1=#(6lsd^_&3a%9941cri4c*!26=nagda413q$"
+SECRET_KEY = setting("SECRET_KEY", "django-insecure-b3x39&*iqh1+1=#(6lsd^_&3a%9941cri4c*!26=nagda413q$")
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = setting("DEBUG", True)
 
-ALLOWED_HOSTS = ["127.0.0.1","0.0.0.0","localhost","185.73.113.2","next-hub.dev"]
+ALLOWED_HOSTS = setting("ALLOWED_HOSTS", ["127.0.0.1","0.0.0.0","localhost","185.73.113.2","next-hub.dev"])
 
 # Application definition
 
@@ -51,19 +68,78 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     "rest_framework",
-    "services.core",
+    "services.core.apps.CoreConfig",
+    "services.bridge.apps.BridgeConfig",
 ]
 
 MIDDLEWARE = [
+    "shared.middlewares.probes.ProbeMiddleware",  # first: probes skip sessions/auth
+    "shared.middlewares.request_id.RequestIdMiddleware",
+    "shared.middlewares.timing.ServerTimingMiddleware",
+    "shared.middlewares.timing.ProfilingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "shared.middlewares.ratelimit.RateLimitMiddleware",  # after auth: `user` keys need request.user
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Load-balancer probes answered by `ProbeMiddleware` before the rest of the stack
+HEALTH_PROBES = {
+    "LIVENESS_PATH": "/livez",
+    "READINESS_PATH": "/readyz",
+    "TIMEOUT": 1.0,  # seconds per dependency check
+    "CACHE_SECONDS": setting("HEALTH_PROBES_CACHE_SECONDS", 2.0),  # how long a readiness result is reused
+}
+
+# Per-request timings (`ServerTimingMiddleware`) and on-demand profiles (`ProfilingMiddleware`)
+# The header exposes DB/cache timings to clients: on by default only with DEBUG.
+SERVER_TIMING_HEADER = setting("SERVER_TIMING_HEADER", DEBUG)
+PROFILING = {
+    "ENABLED": setting("PROFILING_ENABLED", False),
+    "HEADER": "X-Profile",
+    "TOKEN": setting("PROFILING_TOKEN", ""),  # required header value; no token, no header-triggered profiles
+    "SAMPLE_RATE": setting("PROFILING_SAMPLE_RATE", 0.0),
+    "ENGINE": setting("PROFILING_ENGINE", "cprofile"),  # or "pyinstrument"
+    "DIR": BASE_DIR / "profiles",
+}
+
+# `/metrics` endpoint. With several gunicorn/uvicorn workers, point MULTIPROCESS_DIR
+# (or PROMETHEUS_MULTIPROC_DIR) at a directory shared by the workers so that every
+# scrape sums all of them; clear it before starting the server.
+METRICS = {
+    "MULTIPROCESS_DIR": setting("METRICS_MULTIPROCESS_DIR", None),
+    "TOKEN": setting("METRICS_TOKEN", ""),  # bearer token required by /metrics; unset, /metrics is 404
+}
+
+# Production server (`python manage.py serve`); WEB_CONCURRENCY=0 derives the
+# worker count from the CPUs available to the container.
+SERVER_INTERFACE = setting("SERVER_INTERFACE", "asgi")  # also picks the DB connection mode below
+SERVER = {
+    "SERVER": setting("SERVER", "auto"),  # auto, gunicorn or uvicorn
+    "INTERFACE": SERVER_INTERFACE,
+    "WORKERS": setting("WEB_CONCURRENCY", 0),
+    "MAX_WORKERS": setting("SERVER_MAX_WORKERS", 16),
+    "BACKLOG": setting("SERVER_BACKLOG", 2048),
+    "KEEP_ALIVE": setting("SERVER_KEEP_ALIVE", 5),
+    "TIMEOUT": setting("SERVER_TIMEOUT", 60),
+    "GRACEFUL_TIMEOUT": setting("SERVER_GRACEFUL_TIMEOUT", 30),
+    "MAX_REQUESTS": setting("SERVER_MAX_REQUESTS", 10000),
+    "MAX_REQUESTS_JITTER": 1000,
+}
+
+# Matrix application service (`services.bridge`)
+MATRIX_APPSERVICE = {
+    "HS_TOKEN": setting("MATRIX_HS_TOKEN", ""),  # token the homeserver sends; required outside DEBUG
+    "TXN_TTL": setting("MATRIX_TXN_TTL", 60 * 60 * 24),  # seconds a committed transaction id is remembered
+    "BATCH_SIZE": 500,  # rows per INSERT when storing a transaction's events
+    # Outbound client-server API calls (`shared.datasources.matrix.get_matrix_client`)
+    "HOMESERVER_URL": setting("MATRIX_HOMESERVER_URL", "http://localhost:8008"),
+    "AS_TOKEN": setting("MATRIX_AS_TOKEN", ""),
+}
 
 ROOT_URLCONF = "config.urls"
 
@@ -99,28 +175,194 @@ WSGI_APPLICATION = "config.wsgi.application"
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.postgresql",
-        "NAME": os.getenv("POSTGRES_DB"),
-        "USER": os.getenv("POSTGRES_USER"),
-        "PASSWORD":  os.getenv("POSTGRES_PASSWORD"),
-        "HOST": os.getenv("POSTGRES_HOST"),
-        "PORT": "5432",
+        "NAME": setting("POSTGRES_DB"),
+        "USER": setting("POSTGRES_USER"),
+        "PASSWORD":  setting("POSTGRES_PASSWORD"),
+        "HOST": setting("POSTGRES_HOST"),
+        "PORT": str(setting("POSTGRES_PORT", 5432)),
     }
 }
 
+# Connection reuse: "pool" (psycopg 3 native pool), "persistent" (CONN_MAX_AGE
+# + health checks) or "none". Inspect it with `python manage.py dbpool_stats`.
+# Unset, it follows the served interface: persistent under WSGI, pool (or
+# persistent with health checks without psycopg 3) under ASGI.
+configure_connection_mode(
+    DATABASES["default"],
+    mode=setting("DB_CONNECTION_MODE", default_connection_mode(SERVER_INTERFACE)),
+    conn_max_age=setting("DB_CONN_MAX_AGE", 600),
+    health_checks=setting("DB_CONN_HEALTH_CHECKS", True),
+    pool_options={
+        "min_size": setting("DB_POOL_MIN_SIZE", 2),
+        "max_size": setting("DB_POOL_MAX_SIZE", 10),
+        "timeout": setting("DB_POOL_TIMEOUT", 10.0),
+    },
+)
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django_redis.cache.RedisCache',
-        'LOCATION': 'redis://127.0.0.1:6379/1', 
-        'OPTIONS': {
-            'CLIENT_CLASS': 'django_redis.client.DefaultClient',
-        }
-    }
 
+# Redis caches (`shared.utils.cache_backends.redis_cache`): pickle (any Python
+# value), or opt-in JSON (orjson) / msgpack serialization for JSON-shaped data,
+# zstd/lz4/zlib compression above a size threshold and a bounded connection
+# pool per process with socket timeouts. Sessions and bulk payloads get their
+# own alias (database, pool and tuning), so large transfers never hold the
+# connections session lookups need. Point the aliases at separate instances to
+# keep their memory and eviction apart.
+REDIS_URL = setting("REDIS_URL", "redis://127.0.0.1:6379/1")
+
+CACHES = {
+    "default": redis_cache(
+        REDIS_URL,
+        serializer=setting("CACHE_SERIALIZER", "pickle"),  # "json" is faster but turns tuples into lists
+        compressor=setting("CACHE_COMPRESSOR", "zstd"),
+        compress_min_length=setting("CACHE_COMPRESS_MIN_LENGTH", 1024),
+        max_connections=setting("CACHE_MAX_CONNECTIONS", 50),
+        socket_timeout=setting("CACHE_SOCKET_TIMEOUT", 1.0),
+        socket_connect_timeout=setting("CACHE_SOCKET_CONNECT_TIMEOUT", 1.0),
+        timeout=setting("CACHE_TIMEOUT", 300),
+    ),
+    # Small values read on every authenticated request: never compressed.
+    "sessions": redis_cache(
+        setting("REDIS_SESSIONS_URL", with_db(REDIS_URL, 2)),
+        serializer="json",
+        compressor="none",
+        max_connections=setting("CACHE_SESSIONS_MAX_CONNECTIONS", 20),
+        socket_timeout=setting("CACHE_SOCKET_TIMEOUT", 1.0),
+        socket_connect_timeout=setting("CACHE_SOCKET_CONNECT_TIMEOUT", 1.0),
+        timeout=None,  # the session backend passes SESSION_COOKIE_AGE
+    ),
+    # Large payloads (event batches, exports): compressed from 256 bytes, few
+    # connections and a longer socket timeout for the transfers.
+    "bulk": redis_cache(
+        setting("REDIS_BULK_URL", with_db(REDIS_URL, 3)),
+        serializer=setting("CACHE_BULK_SERIALIZER", "json"),
+        compressor=setting("CACHE_COMPRESSOR", "zstd"),
+        compress_min_length=256,
+        max_connections=setting("CACHE_BULK_MAX_CONNECTIONS", 10),
+        socket_timeout=setting("CACHE_BULK_SOCKET_TIMEOUT", 5.0),
+        socket_connect_timeout=setting("CACHE_SOCKET_CONNECT_TIMEOUT", 1.0),
+        pool_timeout=5.0,
+        timeout=setting("CACHE_BULK_TIMEOUT", 3600),
+    ),
 }
 
 SESSION_ENGINE = "django.contrib.sessions.backends.cache"
-SESSION_CACHE_ALIAS = "default"
+SESSION_CACHE_ALIAS = "sessions"
+
+# Background tasks (`shared.tasks`): Redis Streams per queue, consumed by
+# `apps core worker`. Failed tasks are retried with exponential backoff and
+# dead-lettered after MAX_RETRIES; messages a dead worker left unacknowledged
+# for VISIBILITY_TIMEOUT seconds are handed to another worker. TASKS_EAGER
+# runs tasks inline instead (no worker needed).
+TASKS = {
+    "REDIS_URL": setting("TASKS_REDIS_URL", with_db(REDIS_URL, 4)),
+    "DEFAULT_QUEUE": "default",
+    "MAX_RETRIES": setting("TASKS_MAX_RETRIES", 3),
+    "RETRY_BACKOFF": setting("TASKS_RETRY_BACKOFF", 2.0),
+    "RETRY_BACKOFF_MAX": 600.0,
+    "VISIBILITY_TIMEOUT": setting("TASKS_VISIBILITY_TIMEOUT", 300),
+    "MAX_LENGTH": 100_000,
+    "EAGER": setting("TASKS_EAGER", False),
+}
+
+# Time-ordered primary keys (`shared.models.abstract`): every process leases a
+# node in the CACHE alias, which every worker of every host must share, so no
+# two processes generate the same ids. A process that cannot renew its lease
+# for LEASE_TTL seconds may see its node handed to another one.
+TIME_ORDERED_IDS = {
+    "CACHE": "default",
+    "LEASE_TTL": setting("ID_NODE_LEASE_TTL", 600),
+}
+
+# Monthly partitions of append-only tables (`shared.models.partitioning`):
+# bridge events by `origin_server_ts`. Run `manage.py partitions --ensure`
+# daily to create upcoming months and `--retention` to drop the months past
+# RETENTION_MONTHS (0 keeps everything).
+PARTITIONS = {
+    "MONTHS_AHEAD": setting("PARTITIONS_MONTHS_AHEAD", 3),
+    "RETENTION_MONTHS": {"bridge.MatrixEvent": setting("EVENT_RETENTION_MONTHS", 0)},
+}
+
+# Remote network id -> Matrix id mappings (`shared.datasources.idmap`):
+# lookups go through an in-process LRU, then Redis, then the database, in
+# batches. Writes refresh Redis; other processes may keep answering from
+# their LRU for LOCAL_TTL (LOCAL_NEGATIVE_TTL for ids cached as unknown).
+ID_MAPPING = {
+    "MODEL": "bridge.IdMapping",
+    "CACHE": "default",
+    "TTL": setting("IDMAP_TTL", 24 * 3600),
+    "NEGATIVE_TTL": setting("IDMAP_NEGATIVE_TTL", 30),
+    "LOCAL_TTL": setting("IDMAP_LOCAL_TTL", 300),
+    "LOCAL_NEGATIVE_TTL": setting("IDMAP_LOCAL_NEGATIVE_TTL", 2),
+    "LOCAL_MAXSIZE": setting("IDMAP_LOCAL_MAXSIZE", 100_000),
+}
+
+# Admin bulk transfers (`shared.utils.transfer`, `TransferAdminMixin`):
+# exports stream CHUNK_SIZE rows at a time from a server-side cursor; imports
+# are saved to the STORAGE storage (it must be shared with the task workers)
+# and loaded by a worker in transactions of CHUNK_SIZE rows, with progress in
+# the CACHE alias for JOB_TTL seconds.
+TRANSFER = {
+    "CHUNK_SIZE": setting("TRANSFER_CHUNK_SIZE", 2000),
+    "QUEUE": setting("TRANSFER_QUEUE", "default"),
+    "STORAGE": "default",
+    "UPLOAD_PREFIX": "imports/",
+    "CACHE": "default",
+    "JOB_TTL": 7 * 24 * 3600,
+}
+
+# Bridge plugins (`shared.plugins`): protocol adapters and message
+# transformers declared with `@protocol_adapter` / `@message_transformer` in
+# `services/*/plugins.py` or `services/*/plugins/*.py`, or installed as
+# `matrix_meta.protocols` / `matrix_meta.transformers` entry points. Discovery
+# is cached in MANIFEST and plugin modules are imported on first use.
+# DISABLED lists `group:name`; EXTRA maps `{group: {name: "module:attr"}}`.
+PLUGINS = {
+    "MANIFEST": BASE_DIR / ".cache" / "plugins-manifest.json",
+    "ENTRY_POINTS": setting("PLUGINS_ENTRY_POINTS", True),
+    "DISABLED": setting("PLUGINS_DISABLED", []),
+    "EXTRA": {},
+}
+
+# Rate limits (`shared.utils.ratelimit`): counters live in Redis (CACHE) and
+# are updated by atomic Lua scripts. RULES are applied by `RateLimitMiddleware`
+# to matching paths; views can add their own with `@ratelimit`. Each process
+# reserves up to LEASE units per Redis call while a caller is well under its
+# limit (set 1 for an exact count on every request).
+RATELIMIT = {
+    "ENABLED": setting("RATELIMIT_ENABLED", True),
+    "CACHE": "default",
+    "FAIL_OPEN": setting("RATELIMIT_FAIL_OPEN", True),
+    "LEASE": setting("RATELIMIT_LEASE", 10),
+    "LEASE_HEADROOM": 0.5,
+    "LEASE_TTL": 1.0,
+    "IP_HEADER": setting("RATELIMIT_IP_HEADER", ""),
+    "RULES": [
+        {"name": "core-api", "path": r"^/core/", "rate": "300/m", "burst": 60, "key": "ip"},
+        {
+            # One homeserver pushes every transaction: a safety net, not a quota.
+            "name": "transactions",
+            "path": r"^/(_matrix/app/v1/)?transactions/",
+            "methods": ["PUT"],
+            "rate": "6000/m",
+            "algorithm": "sliding_window",
+            "key": "ip",
+        },
+    ],
+}
+
+# DRF encodes and decodes JSON through orjson (`shared.utils.fastjson`),
+# falling back to the stdlib when it is not installed.
+REST_FRAMEWORK = {
+    "DEFAULT_RENDERER_CLASSES": [
+        "shared.utils.rest.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "shared.utils.rest.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+}
 
 
 # Password validation
@@ -143,6 +385,41 @@ SESSION_CACHE_ALIAS = "default"
 
 AUTH_PASSWORD_VALIDATORS = []
 
+# Logging
+# JSON lines on stdout, formatted and written by a background thread
+# (`NonBlockingHandler`), stamped with the request id and sampled per logger.
+
+LOG_LEVEL = setting("LOG_LEVEL", "INFO")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "filters": {
+        "request_id": {"()": "shared.utils.log.RequestIdFilter"},
+        "sampling": {
+            "()": "shared.utils.log.SamplingFilter",
+            # keep probability per logger prefix for high-volume events
+            "rates": setting("LOG_SAMPLE_RATES", {}),
+        },
+    },
+    "formatters": {
+        "json": {"()": "shared.utils.log.JsonFormatter"},
+    },
+    "handlers": {
+        "structured": {
+            "()": "shared.utils.log.NonBlockingHandler",
+            "stream": "ext://sys.stdout",
+            "formatter": "json",
+            "filters": ["request_id", "sampling"],
+        },
+    },
+    "root": {"handlers": ["structured"], "level": LOG_LEVEL},
+    "loggers": {
+        "django": {"handlers": ["structured"], "level": LOG_LEVEL, "propagate": False},
+    },
+}
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
 
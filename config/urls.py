@@ -1,7 +1,11 @@
 from django.contrib import admin
 from django.urls import include, path
 
+from services.core.views import metrics
+
 urlpatterns = [
+    path("metrics", metrics, name="metrics"),
     path("", include("services.core.urls")),
+    path("", include("services.bridge.urls")),
     path("admin/", admin.site.urls),
 ]
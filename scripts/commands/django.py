@@ -1,5 +1,20 @@
+import os
+import shlex
 import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List
+
 import typer
+from rich.console import Console
+from rich.table import Table
+
+project_root = Path(__file__).resolve().parents[2]  # matrix-meta
+console = Console()
+
+# Shared CLI state, filled by the root callback.
+state = {"in_process": os.getenv("DJANGO_CLI_IN_PROCESS", "false").lower() == "true"}
 
 # Create the main Typer app
 app = typer.Typer(
@@ -27,17 +42,70 @@ static_files_app = typer.Typer(help=" Static files and media commands.")
 misc_app = typer.Typer(help="🔧 Miscellaneous Django commands for advanced usage.")
 
 
-def execute_command(command: str, args: list = None):
+def setup_django():
+    """
+    Configure Django once for in-process command execution.
+
+    Subsequent calls are no-ops, so chained commands share a single settings
+    load and app registry population.
+    """
+    if state.get("django_ready"):
+        return
+    if str(project_root) not in sys.path:
+        sys.path.insert(0, str(project_root))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    import django  # pylint: disable=import-outside-toplevel
+
+    django.setup()
+    state["django_ready"] = True
+
+
+def call_command_in_process(command: str, args: list = None):
+    """
+    Run a management command through `django.core.management.call_command`.
+
+    Raises:
+        typer.Exit: When the command fails, with its exit code.
+    """
+    from django.core.management import call_command  # pylint: disable=import-outside-toplevel
+    from django.core.management.base import CommandError  # pylint: disable=import-outside-toplevel
+
+    setup_django()
+    try:
+        call_command(command, *(args or []))
+    except CommandError as e:
+        typer.secho(f"❌ {e}", fg=typer.colors.RED, bold=True)
+        raise typer.Exit(code=getattr(e, "returncode", 1))
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            raise typer.Exit(code=e.code if isinstance(e.code, int) else 1)
+
+
+def execute_command(command: str, args: list = None, in_process: bool = None):
     """
     Executes a Django management command.
+
+    By default the command runs in a `python manage.py` subprocess. With
+    `--in-process` (or `DJANGO_CLI_IN_PROCESS=true`) it runs in this
+    interpreter after a single `django.setup()`, which avoids re-importing
+    Django and reloading settings for every command.
     """
+    in_process = state["in_process"] if in_process is None else in_process
     full_command = ["python", "manage.py", command]
     if args:
         full_command.extend(args)
 
     typer.secho(
-        f"🔧 Running command: {' '.join(full_command)}", fg=typer.colors.CYAN, bold=True
+        f"🔧 Running command{' (in-process)' if in_process else ''}: {' '.join(full_command)}",
+        fg=typer.colors.CYAN,
+        bold=True,
     )
+    if in_process:
+        call_command_in_process(command, args)
+        typer.secho(
+            "✅ Command executed successfully!", fg=typer.colors.GREEN, bold=True
+        )
+        return
     try:
         subprocess.run(full_command, check=True)
         typer.secho(
@@ -52,7 +120,72 @@ def execute_command(command: str, args: list = None):
         raise typer.Exit(code=e.returncode)
 
 
-# Basic Commands
+@app.callback()
+def main(
+    in_process: bool = typer.Option(
+        state["in_process"],
+        "--in-process/--subprocess",
+        help="Run management commands in this process instead of `python manage.py`.",
+    ),
+):
+    """
+    Run Django management commands conveniently with Poetry.
+    """
+    state["in_process"] = in_process
+
+
+@app.command()
+def batch(
+    steps: List[str] = typer.Argument(
+        ..., help='Management commands with their arguments, e.g. "makemigrations" "migrate --plan".'
+    ),
+    keep_going: bool = typer.Option(False, help="Continue with the next step when one fails."),
+):
+    """
+    **Run several management commands in one process with per-step timing.**
+
+    Django is set up once, so `batch makemigrations migrate check` pays the
+    startup cost a single time. Blank steps are skipped; a failing step stops
+    the batch unless `--keep-going`.
+    """
+    started = time.perf_counter()
+    setup_django()
+    setup_time = time.perf_counter() - started
+
+    steps = [step for step in steps if step.strip()]
+    results = []
+    for step in steps:
+        typer.secho(f"🔧 Running step: {step}", fg=typer.colors.CYAN, bold=True)
+        step_started = time.perf_counter()
+        try:
+            command, *args = shlex.split(step)
+            call_command_in_process(command, args)
+            status = "✅"
+        except typer.Exit as e:
+            status = f"❌ ({e.exit_code})"
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            # A crashing step (or unbalanced quotes) must not hide the timing table.
+            typer.secho(f"❌ {type(e).__name__}: {e}", fg=typer.colors.RED, bold=True)
+            status = f"❌ ({type(e).__name__})"
+        results.append((step, status, time.perf_counter() - step_started))
+        if status != "✅" and not keep_going:
+            break
+
+    table = Table(title="Batch timings", header_style="bold magenta")
+    table.add_column("Step", style="cyan")
+    table.add_column("Status")
+    table.add_column("Time (ms)", justify="right")
+    table.add_row("django.setup()", "✅", f"{setup_time * 1000:.1f}")
+    for step, status, elapsed in results:
+        table.add_row(step, status, f"{elapsed * 1000:.1f}")
+    table.add_row("total", "", f"{(time.perf_counter() - started) * 1000:.1f}")
+    console.print(table)
+
+    failed = [result for result in results if result[1] != "✅"]
+    if failed or len(results) < len(steps):
+        raise typer.Exit(code=1)
+
+
 @basic_app.command()
 def startproject(projectname: str):
     """
@@ -83,6 +216,29 @@ def runserver(host:str="0.0.0.0",port: int = 8000):
     execute_command("runserver", [f"{host}:{port}"])
 
 
+@basic_app.command()
+def serve(
+    host: str = "0.0.0.0",
+    port: int = 8000,
+    workers: int = typer.Option(0, help="Worker processes; 0 derives them from the available CPUs."),
+    server: str = typer.Option("auto", help="auto, gunicorn or uvicorn."),
+    interface: str = typer.Option("asgi", help="asgi or wsgi."),
+    dry_run: bool = typer.Option(False, help="Print the server command without starting it."),
+):  # pylint: disable=too-many-arguments,too-many-positional-arguments
+    """
+    **Start the production server (multi-worker, no autoreload).**
+
+    Serves `config.asgi:application` with gunicorn + uvicorn workers. Send
+    SIGHUP to reload workers gracefully.
+    """
+    args = [f"--host={host}", f"--port={port}", f"--server={server}", f"--interface={interface}"]
+    if workers:
+        args.append(f"--workers={workers}")
+    if dry_run:
+        args.append("--dry-run")
+    execute_command("serve", args)
+
+
 @basic_app.command()
 def check():
     """
@@ -129,6 +285,20 @@ def dbshell():
     execute_command("dbshell")
 
 
+# Connection Pool Commands
+@database_app.command()
+def pool_stats(samples: int = 200, concurrency: int = 4, database: str = "default"):
+    """
+    **Report connection pool utilisation, wait time and checkout latency.**
+
+    Select the connection mode with `DB_CONNECTION_MODE` (pool, persistent or none).
+    """
+    execute_command(
+        "dbpool_stats",
+        [f"--samples={samples}", f"--concurrency={concurrency}", f"--database={database}"],
+    )
+
+
 # Testing and Debugging Commands
 @testing_app.command()
 def test(appname: str = typer.Argument(None)):
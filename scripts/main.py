@@ -1,79 +1,246 @@
+import ast
 import importlib
+import json
+import os
 import sys
 from pathlib import Path
+
+import click
 import typer
-# TODO: use package emoji for emojis
-# Enable rich help with Markdown
-app = typer.Typer(
-    help=(
-        "✨ **Matrix-Meta CLI Tool**\n\n"
-        "🚀 This tool dynamically loads commands for services in the `matrix-meta` project."
-        "🎯 **Features:**\n"
-        "- 🌟 **Dynamic Command Loading:** Automatically discovers and integrates commands.<br>"
-        "- 🛠️ **Custom Service Commands:** Each service can define its own command set.<br>"
-        "- 🔍 **Easy-to-Use CLI:** Simple and intuitive interface.\n\n"
-        "💡 **Usage:**<br>"
-        "Run `poetry run apps --help` to see available commands."
-    ),
-    rich_markup_mode="markdown",  # Enable Markdown rendering for help output
-)
+from typer.core import TyperGroup
 
-# Define root directories
 root_dir = Path(__file__).resolve().parent  # matrix-meta/scripts
 project_root = root_dir.parent  # matrix-meta
 apps_dir = project_root / "services"  # matrix-meta/services
+manifest_file = project_root / ".cache" / "apps-manifest.json"
+
+MANIFEST_VERSION = 1
 
-# Add the project root to Python's search path
 sys.path.append(str(project_root))
 
 
-def load_command(commands_file: Path):
+def _decorator_command_name(decorator, app_name):
+    """Return the command name declared by `@<app_name>.command(...)`, or None."""
+    call = decorator if isinstance(decorator, ast.Call) else None
+    target = call.func if call else decorator
+    if not (
+        isinstance(target, ast.Attribute)
+        and target.attr == "command"
+        and isinstance(target.value, ast.Name)
+        and target.value.id == app_name
+    ):
+        return None
+    if call and call.args and isinstance(call.args[0], ast.Constant):
+        return call.args[0].value
+    for keyword in call.keywords if call else []:
+        if keyword.arg == "name" and isinstance(keyword.value, ast.Constant):
+            return keyword.value.value
+    return ""
+
+
+def scan_commands_file(commands_file: Path):
     """
-    Attempt to dynamically load a command module and add it to the Typer app.
+    Statically describe a service `commands.py` without importing it.
+
+    Looks for a module-level `app = typer.Typer(...)` and the functions
+    decorated with `@app.command()`, mirroring the names Typer would give them.
 
     Args:
         commands_file (Path): Path to the `commands.py` file in a service directory.
+
+    Returns:
+        dict: The manifest entry (`module`, `group`, `help`, `commands`), or None
+        when the file does not define a Typer app.
+    """
+    tree = ast.parse(commands_file.read_text(encoding="utf-8"), filename=str(commands_file))
+    group_name = None
+    found_app = False
+    for node in tree.body:
+        if not (isinstance(node, ast.Assign) and isinstance(node.value, ast.Call)):
+            continue
+        func = node.value.func
+        is_typer = (isinstance(func, ast.Attribute) and func.attr == "Typer") or (
+            isinstance(func, ast.Name) and func.id == "Typer"
+        )
+        if is_typer and any(isinstance(t, ast.Name) and t.id == "app" for t in node.targets):
+            found_app = True
+            for keyword in node.value.keywords:
+                if keyword.arg == "name" and isinstance(keyword.value, ast.Constant):
+                    group_name = keyword.value.value
+    if not found_app:
+        return None
+
+    commands = {}
+    for node in tree.body:
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        for decorator in node.decorator_list:
+            name = _decorator_command_name(decorator, "app")
+            if name is None:
+                continue
+            doc = (ast.get_docstring(node) or "").strip().splitlines()
+            commands[name or node.name.replace("_", "-")] = doc[0] if doc else ""
+
+    group_name = group_name or commands_file.parent.parent.name
+    return {
+        "module": commands_file.relative_to(project_root).with_suffix("").as_posix().replace("/", "."),
+        "group": group_name,
+        "help": f"🌟 Commands for the `{group_name}` service.",
+        "commands": commands,
+    }
+
+
+def load_manifest():
+    """
+    Return `{group name: manifest entry}` for every service `commands.py`.
+
+    Entries are cached in `.cache/apps-manifest.json` and re-scanned only when
+    a file's mtime or size changes, so the common case costs a directory glob
+    and a few `stat` calls instead of importing every service.
+    """
+    try:
+        cached = json.loads(manifest_file.read_text(encoding="utf-8"))
+        if cached.get("version") != MANIFEST_VERSION:
+            cached = {}
+    except (OSError, ValueError):
+        cached = {}
+    cached_files = cached.get("files", {})
+
+    files, changed = {}, False
+    for commands_file in sorted(apps_dir.glob("*/scripts/commands.py")):
+        key = commands_file.relative_to(project_root).as_posix()
+        stat = commands_file.stat()
+        entry = cached_files.get(key)
+        if entry is None or entry["mtime_ns"] != stat.st_mtime_ns or entry["size"] != stat.st_size:
+            try:
+                service = scan_commands_file(commands_file)
+            except (OSError, SyntaxError) as e:
+                typer.secho(f"❌ Could not scan {key}: {e}", fg=typer.colors.RED, err=True)
+                service = None
+            entry = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "service": service}
+            changed = True
+        files[key] = entry
+
+    if changed or files.keys() != cached_files.keys():
+        try:
+            manifest_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = manifest_file.with_suffix(f".{os.getpid()}.tmp")
+            tmp_file.write_text(json.dumps({"version": MANIFEST_VERSION, "files": files}), encoding="utf-8")
+            tmp_file.replace(manifest_file)
+        except OSError:
+            pass  # read-only checkout: keep working from the in-memory scan
+
+    return {entry["service"]["group"]: entry["service"] for entry in files.values() if entry["service"]}
+
+
+def load_command(service: dict):
+    """
+    Import a service command module and build its click group.
+
+    Args:
+        service (dict): Manifest entry of the service.
+
+    Returns:
+        click.Command: The service's Typer app converted to a click group, or None.
     """
-    module_path = commands_file.relative_to(project_root).with_suffix("").as_posix()
+    module_path = service["module"]
     try:
-        # Import the module
-        module = importlib.import_module(module_path.replace("/", "."))
-        # Check if the module has a valid Typer app
+        module = importlib.import_module(module_path)
         if hasattr(module, "app") and isinstance(module.app, typer.Typer):
-            group_name = module.app.info.name or commands_file.parent.parent.name
-            app.add_typer(
-                module.app,
-                name=group_name,
-                help=f"🌟 Commands for the `{group_name}` service.",
-            )
-            typer.secho(
-                f"✅ Loaded commands from {module_path}.", fg=typer.colors.GREEN
-            )
-        else:
-            typer.secho(
-                f"⚠️ Skipping {module_path}: No valid Typer app found.",
-                fg=typer.colors.YELLOW,
-            )
+            command = typer.main.get_command(module.app)
+            command.help = command.help or service["help"]
+            return command
+        typer.secho(
+            f"⚠️ Skipping {module_path}: No valid Typer app found.",
+            fg=typer.colors.YELLOW,
+            err=True,
+        )
     except ImportError as e:
         typer.secho(
-            f"❌ ImportError while importing {module_path}: {e}", fg=typer.colors.RED
+            f"❌ ImportError while importing {module_path}: {e}", fg=typer.colors.RED, err=True
         )
     except AttributeError as e:
-        typer.secho(f"❌ AttributeError in {module_path}: {e}", fg=typer.colors.RED)
+        typer.secho(f"❌ AttributeError in {module_path}: {e}", fg=typer.colors.RED, err=True)
     # Fallback for unexpected errors
     except Exception as e:  # pylint: disable=W0718
-        typer.secho(f"❌ Unexpected error in {module_path}: {e}", fg=typer.colors.RED)
+        typer.secho(f"❌ Unexpected error in {module_path}: {e}", fg=typer.colors.RED, err=True)
+    return None
+
+
+class LazyServiceCommand(click.Group):
+    """
+    Placeholder for a service command group that imports the service on first use.
+
+    Help listings only need the name and help text from the manifest; the
+    service module is imported when the group is actually invoked (or its own
+    commands are listed, e.g. for `apps core --help` or shell completion).
+    """
+
+    def __init__(self, service: dict):
+        super().__init__(name=service["group"], help=service["help"])
+        self.service = service
+        self._command = None
+
+    def load(self):
+        """Import the service and return its real command group."""
+        if self._command is None:
+            self._command = load_command(self.service)
+            if self._command is None:
+                raise click.ClickException(f"Commands for `{self.name}` could not be loaded.")
+        return self._command
+
+    def make_context(self, info_name, args, parent=None, **extra):
+        # Hand the real group to click so its callback and options apply.
+        return self.load().make_context(info_name, args, parent=parent, **extra)
+
+    def list_commands(self, ctx):
+        return self.load().list_commands(ctx)
+
+    def get_command(self, ctx, cmd_name):
+        return self.load().get_command(ctx, cmd_name)
+
+
+class LazyServicesGroup(TyperGroup):
+    """
+    Root `apps` group whose service sub-groups come from the cached manifest.
+    """
+
+    _services = None
+
+    @property
+    def services(self):
+        """Lazy service groups keyed by command name, built from the manifest once."""
+        if self._services is None:
+            self._services = {name: LazyServiceCommand(service) for name, service in load_manifest().items()}
+        return self._services
+
+    def list_commands(self, ctx):
+        return sorted(set(super().list_commands(ctx)) | set(self.services))
+
+    def get_command(self, ctx, cmd_name):
+        return super().get_command(ctx, cmd_name) or self.services.get(cmd_name)
+
+
+app = typer.Typer(
+    cls=LazyServicesGroup,
+    help=(
+        "✨ **Matrix-Meta CLI Tool**\n\n"
+        "🚀 This tool dynamically loads commands for services in the `matrix-meta` project."
+        "🎯 **Features:**\n"
+        "- 🌟 **Dynamic Command Loading:** Automatically discovers and integrates commands.<br>"
+        "- 🛠️ **Custom Service Commands:** Each service can define its own command set.<br>"
+        "- 🔍 **Easy-to-Use CLI:** Simple and intuitive interface.\n\n"
+        "💡 **Usage:**<br>"
+        "Run `poetry run apps --help` to see available commands."
+    ),
+    rich_markup_mode="markdown",  # Enable Markdown rendering for help output
+)
+
 
+@app.callback()
+def main():
+    """Service commands are imported only when their group is invoked."""
 
-# Use map to process all commands files in the apps directory
-typer.secho("🔍 Scanning for commands in services...", fg=typer.colors.CYAN)
-list(map(load_command, apps_dir.glob("*/scripts/commands.py")))
 
-# Ensure the Typer app has commands or groups before running
-if not app.registered_groups and not app.registered_commands:
-    typer.secho(
-        "❌ No commands or sub-apps were registered. Exiting.", fg=typer.colors.RED
-    )
-else:
-    if __name__ == "__main__":
-        app()
+if __name__ == "__main__":
+    app()
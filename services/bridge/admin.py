@@ -0,0 +1,32 @@
+from django.contrib import admin
+from unfold.admin import ModelAdmin
+
+from shared.utils.admin import TransferAdminMixin
+
+from .models import IdMapping, MatrixEvent
+
+
+@admin.register(MatrixEvent)
+class MatrixEventAdmin(TransferAdminMixin, ModelAdmin):
+    """Stored events; imports are checked against `EVENT_SCHEMA`."""
+
+    list_display = ("event_id", "room_id", "type", "sender", "origin_server_ts", "received_at")
+    list_filter = ("type",)
+    search_fields = ("event_id", "room_id", "sender")
+    show_full_result_count = False  # COUNT(*) on a large event table is slow
+    # Ids are local to a database: events are matched on their Matrix id.
+    transfer_fields = ["event_id", "room_id", "sender", "type", "state_key", "origin_server_ts", "content", "txn_id"]
+    import_unique_fields = ["event_id", "origin_server_ts"]
+    import_schema = "shared.validators.EVENT_SCHEMA"
+
+
+@admin.register(IdMapping)
+class IdMappingAdmin(TransferAdminMixin, ModelAdmin):
+    """Remote id -> Matrix id mappings."""
+
+    list_display = ("network", "kind", "remote_id", "matrix_id", "room_id", "created_at")
+    list_filter = ("kind", "network")
+    search_fields = ("remote_id", "matrix_id")
+    show_full_result_count = False
+    transfer_fields = ["network", "kind", "remote_id", "matrix_id", "room_id"]
+    import_unique_fields = ["network", "kind", "remote_id"]
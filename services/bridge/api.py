@@ -0,0 +1,61 @@
+from django.db.models import Count, Max
+from rest_framework import generics
+from rest_framework.permissions import IsAdminUser
+
+from shared.utils.rest import ConditionalListMixin, InvalidParam, KeysetPagination
+
+from .models import MatrixEvent
+from .serializers import EventSerializer, RoomSerializer
+
+
+class RoomList(ConditionalListMixin, generics.ListAPIView):
+    """
+    Bridged rooms by `room_id`, with their event count and latest timestamp.
+
+    `GET /api/bridge/rooms?limit=&from=`. The page's rooms are aggregated
+    from the `(room_id, origin_server_ts, id)` index alone.
+    """
+
+    permission_classes = [IsAdminUser]
+    serializer_class = RoomSerializer
+    pagination_class = KeysetPagination
+    keyset_ordering = ("room_id",)
+    etag_fields = ("room_id", "events", "last_event_ts")
+
+    def get_queryset(self):
+        return MatrixEvent.objects.values("room_id").annotate(
+            events=Count("id"), last_event_ts=Max("origin_server_ts")
+        )
+
+
+class RoomEventList(ConditionalListMixin, generics.ListAPIView):
+    """
+    Events of a room, newest first (`dir=b`, default) or oldest first (`dir=f`).
+
+    `GET /api/bridge/rooms/{room_id}/events?dir=&limit=&from=&type=`. Pages
+    are index range scans of `(room_id, origin_server_ts, id)` whatever
+    their depth, and only the serialized columns are read.
+    """
+
+    permission_classes = [IsAdminUser]
+    serializer_class = EventSerializer
+    pagination_class = KeysetPagination
+    etag_fields = ("id",)  # stored events are never modified
+
+    @property
+    def keyset_ordering(self):
+        """Ordering of the events for `?dir=`."""
+        direction = self.request.query_params.get("dir", "b")
+        if direction not in ("b", "f"):
+            raise InvalidParam("dir must be 'b' or 'f'")
+        return ("-origin_server_ts", "-id") if direction == "b" else ("origin_server_ts", "id")
+
+    def get_queryset(self):
+        queryset = MatrixEvent.objects.filter(room_id=self.kwargs["room_id"])
+        event_type = self.request.query_params.get("type")
+        if event_type:
+            queryset = queryset.filter(type=event_type)
+        return queryset.values("id", *EventSerializer.projection())
+
+
+__all__ = ["RoomList", "RoomEventList"]
@@ -0,0 +1,18 @@
+from shared.models.base import BaseAppConfig
+
+
+class BridgeConfig(BaseAppConfig):
+    """
+    Matrix application-service bridge: receives homeserver transactions and
+    stores their events.
+    """
+
+    name = "services.bridge"
+    default_auto_field = "django.db.models.BigAutoField"
+
+    def ready(self):
+        # pylint: disable=import-outside-toplevel
+        from shared.datasources.idmap import forget_imported
+        from shared.utils.transfer import rows_imported
+
+        rows_imported.connect(forget_imported, sender=self.get_model("IdMapping"), dispatch_uid="bridge.idmap_import")
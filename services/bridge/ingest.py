@@ -0,0 +1,120 @@
+import logging
+
+from django.db import connections, models, router, transaction
+
+from shared.signals import Signal
+from shared.types import RoomEvent
+from shared.utils.metrics import Counter
+from shared.validators import partition_events
+
+from .models import MatrixEvent
+
+logger = logging.getLogger(__name__)
+
+# Sent after a transaction's events are committed, with `txn_id` and
+# `event_ids` (only the events that were new). Receivers are queued on the
+# signal bus by default so fan-out work never delays the homeserver's 200;
+# connect with `background=False` to run in the request instead.
+events_ingested = Signal(name="bridge.events_ingested", background=True)
+
+transactions_received = Counter(
+    "bridge_transactions", "Application-service transactions by result.", ("result",)
+)
+events_stored = Counter("bridge_events_stored", "Matrix events inserted by the bridge.")
+
+
+def build_events(txn_id, events):
+    """
+    Turn the `events` array of a transaction into unsaved `MatrixEvent` rows.
+
+    The batch is checked against `EVENT_SCHEMA` (id grammar, types, sizes
+    that the columns hold) in one pass, then parsed into `RoomEvent`.
+    Malformed events are logged and skipped: rejecting the whole transaction
+    would make the homeserver retry it forever, and letting one through
+    could fail the bulk insert of the others.
+    """
+    valid, issues = partition_events(events)
+    if issues:
+        logger.warning(
+            "Skipping %d malformed event(s) in transaction",
+            len(issues),
+            extra={"txn_id": txn_id, "issues": [issue.to_dict() for issue in issues[:10]]},
+        )
+    errors = []
+    parsed = RoomEvent.parse_many(valid, errors)
+    if errors:
+        logger.warning(
+            "Skipping %d unparsable event(s) in transaction",
+            len(errors),
+            extra={
+                "txn_id": txn_id,
+                "errors": [{"event_id": valid[index].get("event_id"), "error": str(e)} for index, e in errors[:10]],
+            },
+        )
+    rows, seen = [], set()
+    for event in parsed:
+        if event.event_id in seen:
+            continue
+        seen.add(event.event_id)
+        rows.append(
+            MatrixEvent(
+                event_id=event.event_id,
+                room_id=event.room_id,
+                sender=event.sender,
+                type=event.type_name,
+                state_key=event.state_key,
+                origin_server_ts=event.origin_server_ts,
+                content=event.content,
+                txn_id=txn_id,
+            )
+        )
+    return rows
+
+
+def _insert_new(rows, batch_size, using):
+    # INSERT ... ON CONFLICT DO NOTHING RETURNING: the database reports the
+    # rows it inserted, so a concurrent delivery of the same events cannot
+    # make both requests claim them (as a lookup before the insert would).
+    connection = connections[using]
+    meta, quote = MatrixEvent._meta, connection.ops.quote_name
+    fields = [field for field in meta.concrete_fields if not isinstance(field, models.AutoField)]
+    columns = ", ".join(quote(field.column) for field in fields)
+    unique = ", ".join(quote(meta.get_field(name).column) for name in ("event_id", "origin_server_ts"))
+    row_placeholder = f"({', '.join(['%s'] * len(fields))})"
+    inserted = []
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start : start + batch_size]
+            cursor.execute(
+                f"INSERT INTO {quote(meta.db_table)} ({columns}) VALUES {', '.join([row_placeholder] * len(batch))} "
+                f"ON CONFLICT ({unique}) DO NOTHING RETURNING {quote(meta.get_field('event_id').column)}",
+                [field.get_db_prep_save(field.pre_save(row, True), connection) for row in batch for field in fields],
+            )
+            inserted.extend(event_id for (event_id,) in cursor.fetchall())
+    return inserted
+
+
+def store_events(txn_id, events, batch_size=500):
+    """
+    Insert the events of a transaction in one database transaction.
+
+    Each INSERT carries `batch_size` rows, so a transaction of hundreds of
+    events costs one or two round-trips. Events already stored (a retried or
+    overlapping transaction, even one being stored concurrently) are skipped
+    by the unique `(event_id, origin_server_ts)` constraint instead of failing
+    the batch, and are not reported again.
+
+    Returns:
+        list[str]: Ids of the events this call inserted.
+    """
+    rows = build_events(txn_id, events)
+    if not rows:
+        return []
+    using = router.db_for_write(MatrixEvent)
+    with transaction.atomic(using=using):
+        event_ids = _insert_new(rows, batch_size, using)
+    events_stored.inc(len(event_ids))
+    return event_ids
+
+
+__all__ = ["events_ingested", "build_events", "store_events"]
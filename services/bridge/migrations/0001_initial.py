@@ -0,0 +1,32 @@
+# Generated by Django 5.1.5 on 2026-10-18 12:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MatrixEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.CharField(max_length=255, unique=True)),
+                ('room_id', models.CharField(max_length=255)),
+                ('sender', models.CharField(max_length=255)),
+                ('type', models.CharField(max_length=255)),
+                ('state_key', models.CharField(blank=True, max_length=255, null=True)),
+                ('origin_server_ts', models.BigIntegerField()),
+                ('content', models.JSONField(default=dict)),
+                ('txn_id', models.CharField(help_text='Application-service transaction that delivered the event.', max_length=255)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['room_id', 'origin_server_ts'], name='bridge_event_room_ts_idx')],
+            },
+        ),
+    ]
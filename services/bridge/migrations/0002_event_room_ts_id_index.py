@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bridge", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="matrixevent",
+            index=models.Index(fields=["room_id", "origin_server_ts", "id"], name="bridge_event_room_ts_id_idx"),
+        ),
+        migrations.RemoveIndex(
+            model_name="matrixevent",
+            name="bridge_event_room_ts_idx",
+        ),
+    ]
@@ -0,0 +1,57 @@
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+import shared.models.abstract
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bridge", "0002_event_room_ts_id_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IdMapping",
+            fields=[
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "id",
+                    shared.models.abstract.TimeOrderedIdField(
+                        default=shared.models.abstract.time_ordered_id,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(choices=[("event", "Event"), ("room", "Room"), ("user", "User")], max_length=8),
+                ),
+                ("network", models.CharField(help_text="Remote network (protocol adapter name).", max_length=64)),
+                ("remote_id", models.CharField(max_length=255)),
+                ("matrix_id", models.CharField(max_length=255)),
+                (
+                    "room_id",
+                    models.CharField(blank=True, default="", help_text="Room of an event mapping.", max_length=255),
+                ),
+            ],
+            options={
+                "get_latest_by": "created_at",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("network", "kind", "remote_id"),
+                        include=("matrix_id",),
+                        name="bridge_idmap_remote_uniq",
+                    )
+                ],
+                "indexes": [
+                    models.Index(
+                        fields=["kind", "matrix_id"], include=("network", "remote_id"), name="bridge_idmap_matrix_idx"
+                    ),
+                    django.contrib.postgres.indexes.BrinIndex(fields=["created_at"], name="bridge_idmap_created_brin"),
+                ],
+            },
+        ),
+    ]
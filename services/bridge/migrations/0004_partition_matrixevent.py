@@ -0,0 +1,44 @@
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+import shared.models.partitioning
+
+
+class Migration(migrations.Migration):
+    """
+    Move bridge events to monthly partitions of `origin_server_ts`.
+
+    The table is copied in this migration's transaction: on a large
+    installation run it in a maintenance window (the bridge's homeserver
+    retries the transactions it could not deliver meanwhile).
+    """
+
+    dependencies = [
+        ("bridge", "0003_idmapping"),
+    ]
+
+    operations = [
+        shared.models.partitioning.ConvertToPartitioned(
+            model_name="matrixevent",
+            partition_key="origin_server_ts",
+            operations=[
+                migrations.AlterField(
+                    model_name="matrixevent",
+                    name="event_id",
+                    field=models.CharField(max_length=255),
+                ),
+                migrations.AddConstraint(
+                    model_name="matrixevent",
+                    constraint=models.UniqueConstraint(
+                        fields=("event_id", "origin_server_ts"), name="bridge_event_id_ts_uniq"
+                    ),
+                ),
+                migrations.AddIndex(
+                    model_name="matrixevent",
+                    index=django.contrib.postgres.indexes.BrinIndex(
+                        fields=["received_at"], name="bridge_event_received_brin"
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,79 @@
+from django.contrib.postgres.indexes import BrinIndex
+from django.db import models
+
+from shared.models.abstract import TimeOrderedModel
+from shared.models.partitioning import PartitionedModel
+
+
+class MatrixEvent(PartitionedModel):
+    """
+    A Matrix room event pushed to the application service by the homeserver.
+
+    Stored in monthly partitions of `origin_server_ts` on PostgreSQL, so
+    retention drops whole months (`manage.py partitions --retention`). An
+    event always carries the same timestamp, so `(event_id, origin_server_ts)`
+    is as unique as `event_id`.
+    """
+
+    partition_key = "origin_server_ts"
+
+    event_id = models.CharField(max_length=255)
+    room_id = models.CharField(max_length=255)
+    sender = models.CharField(max_length=255)
+    type = models.CharField(max_length=255)
+    state_key = models.CharField(max_length=255, null=True, blank=True)
+    origin_server_ts = models.BigIntegerField()
+    content = models.JSONField(default=dict)
+    txn_id = models.CharField(max_length=255, help_text="Application-service transaction that delivered the event.")
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["event_id", "origin_server_ts"], name="bridge_event_id_ts_uniq")]
+        indexes = [
+            # Keyset pagination of a room's events seeks on (origin_server_ts, id).
+            models.Index(fields=["room_id", "origin_server_ts", "id"], name="bridge_event_room_ts_id_idx"),
+            # Rows arrive in received_at order: a few pages of BRIN summarise a month.
+            BrinIndex(fields=["received_at"], name="bridge_event_received_brin"),
+        ]
+
+    def __str__(self):
+        return f"{self.type} {self.event_id} in {self.room_id}"
+
+
+class IdMapping(TimeOrderedModel):
+    """
+    A remote network id and the Matrix id it was bridged to (event, room or user).
+
+    Not partitioned: lookups go by remote id across all time and the remote
+    id must stay unique. The unique index covers `matrix_id` and the reverse
+    index covers the remote side, so translations are index-only scans.
+    """
+
+    class Kind(models.TextChoices):  # pylint: disable=too-many-ancestors
+        """What the ids designate."""
+
+        EVENT = "event"
+        ROOM = "room"
+        USER = "user"
+
+    kind = models.CharField(max_length=8, choices=Kind.choices)
+    network = models.CharField(max_length=64, help_text="Remote network (protocol adapter name).")
+    remote_id = models.CharField(max_length=255)
+    matrix_id = models.CharField(max_length=255)
+    room_id = models.CharField(max_length=255, blank=True, default="", help_text="Room of an event mapping.")
+
+    class Meta(TimeOrderedModel.Meta):
+        constraints = [
+            models.UniqueConstraint(
+                fields=["network", "kind", "remote_id"], include=["matrix_id"], name="bridge_idmap_remote_uniq"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["kind", "matrix_id"], include=["network", "remote_id"], name="bridge_idmap_matrix_idx"
+            ),
+            BrinIndex(fields=["created_at"], name="bridge_idmap_created_brin"),
+        ]
+
+    def __str__(self):
+        return f"{self.network} {self.kind} {self.remote_id} -> {self.matrix_id}"
@@ -0,0 +1,29 @@
+from rest_framework import serializers
+
+from shared.utils.rest import FlatSerializer, SchemaSerializer
+from shared.validators import EVENT_SCHEMA
+
+
+class EventSerializer(SchemaSerializer, FlatSerializer):  # pylint: disable=abstract-method
+    """
+    A Matrix event: listed by the bridge API from `values()` rows, and
+    validated against `EVENT_SCHEMA` when used for input.
+    """
+
+    schema = EVENT_SCHEMA
+
+    event_id = serializers.CharField()
+    room_id = serializers.CharField()
+    sender = serializers.CharField()
+    type = serializers.CharField()
+    state_key = serializers.CharField(allow_null=True)
+    origin_server_ts = serializers.IntegerField()
+    content = serializers.JSONField()
+
+
+class RoomSerializer(FlatSerializer):  # pylint: disable=abstract-method
+    """A bridged room: the rooms the bridge has stored events of."""
+
+    room_id = serializers.CharField()
+    events = serializers.IntegerField(help_text="Number of stored events.")
+    last_event_ts = serializers.IntegerField(help_text="`origin_server_ts` of the latest event.")
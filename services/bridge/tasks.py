@@ -0,0 +1,22 @@
+from shared.datasources.matrix import get_matrix_client
+from shared.tasks import task
+
+
+@task(queue="bridge", max_retries=5, timeout=60)
+async def send_event(room_id, event_type, content, txn_id, user_id=None):
+    """
+    Send an event to the homeserver from a worker.
+
+    `txn_id` is required: the homeserver deduplicates on it, so a retry after
+    a lost response never posts the event twice.
+
+    Args:
+        room_id (str): Target room.
+        event_type (str): E.g. `m.room.message`.
+        content (dict): Event content.
+        txn_id (str): Idempotency key, generated by the caller.
+        user_id (str, optional): Puppet to masquerade as.
+    """
+    params = {"user_id": user_id} if user_id else None
+    client = get_matrix_client()
+    return await client.send_event(room_id, event_type, content, txn_id=txn_id, params=params)
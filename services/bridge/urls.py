@@ -0,0 +1,11 @@
+from django.urls import path
+
+from . import api, views
+
+urlpatterns = [
+    path("_matrix/app/v1/transactions/<str:txn_id>", views.transactions, name="transactions"),
+    # Unprefixed path used by homeservers predating the v1 prefix.
+    path("transactions/<str:txn_id>", views.transactions, name="transactions_legacy"),
+    path("api/bridge/rooms", api.RoomList.as_view(), name="bridge_rooms"),
+    path("api/bridge/rooms/<str:room_id>/events", api.RoomEventList.as_view(), name="bridge_room_events"),
+]
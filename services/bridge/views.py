@@ -0,0 +1,72 @@
+import hmac
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+
+from shared.utils.async_cache import async_cache
+from shared.utils.fastjson import JsonResponse, loads
+
+from .ingest import events_ingested, store_events, transactions_received
+from .models import MatrixEvent
+
+logger = logging.getLogger(__name__)
+
+
+def matrix_error(errcode, error, status):
+    """Matrix-style error response (`{"errcode": ..., "error": ...}`)."""
+    return JsonResponse({"errcode": errcode, "error": error}, status=status)
+
+
+def _authorized(request, token):
+    """Check the homeserver token (`Authorization: Bearer` or legacy `access_token` query)."""
+    header = request.headers.get("Authorization", "")
+    supplied = header[7:] if header.startswith("Bearer ") else request.GET.get("access_token", "")
+    return bool(supplied) and hmac.compare_digest(supplied.encode(), token.encode())
+
+
+@csrf_exempt
+@require_http_methods(["PUT"])
+async def transactions(request, txn_id):
+    """
+    Application-service transaction endpoint (`PUT /_matrix/app/v1/transactions/{txnId}`).
+
+    Transaction ids already committed are remembered in Redis for
+    `MATRIX_APPSERVICE["TXN_TTL"]` seconds, so a homeserver retry costs one
+    GET. New transactions are stored with a single bulk insert, then
+    `events_ingested` queues their processing on the signal bus before answering.
+    """
+    config = settings.MATRIX_APPSERVICE
+    if config["HS_TOKEN"]:
+        if not _authorized(request, config["HS_TOKEN"]):
+            return matrix_error("M_FORBIDDEN", "Bad homeserver token", 403)
+    elif not settings.DEBUG:
+        return matrix_error("M_FORBIDDEN", "MATRIX_HS_TOKEN is not configured", 403)
+
+    key = f"bridge:txn:{txn_id}"
+    if await async_cache.aget(key):
+        transactions_received.inc(1, "duplicate")
+        return JsonResponse({})
+    try:
+        body = loads(request.body)
+    except ValueError:
+        transactions_received.inc(1, "invalid")
+        return matrix_error("M_NOT_JSON", "Transaction body is not JSON", 400)
+    # Rejected before anything is stored or remembered, so a fixed retry of
+    # the same transaction id is not acknowledged as a duplicate.
+    events = body.get("events", []) if isinstance(body, dict) else None
+    if not isinstance(events, list):
+        transactions_received.inc(1, "invalid")
+        return matrix_error("M_BAD_JSON", "Transaction body must be an object with an `events` array", 400)
+
+    new_event_ids = await sync_to_async(store_events)(txn_id, events, config["BATCH_SIZE"])
+    # Only remember the transaction once its events are committed: if the
+    # insert fails the homeserver retries and the transaction is replayed.
+    await async_cache.aset(key, 1, timeout=config["TXN_TTL"])
+    if new_event_ids:
+        await events_ingested.asend(sender=MatrixEvent, txn_id=txn_id, event_ids=new_event_ids)
+    transactions_received.inc(1, "stored")
+    logger.info("Stored transaction", extra={"txn_id": txn_id, "events": len(events), "new": len(new_event_ids)})
+    return JsonResponse({})
@@ -6,4 +6,13 @@ class CoreConfig(BaseAppConfig):
     Base class of core service
 
     """
+
+    name = "services.core"
     default_auto_field = "django.db.models.BigAutoField"
+
+    def ready(self):
+        # pylint: disable=import-outside-toplevel
+        from shared.tasks import task_queue_collector
+        from shared.utils.metrics import REGISTRY
+
+        REGISTRY.add_collector(task_queue_collector)
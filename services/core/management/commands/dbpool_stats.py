@@ -0,0 +1,84 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+class Command(BaseCommand):
+    """
+    Report database connection reuse health: pool utilisation, wait time and
+    checkout latency for the configured `DB_CONNECTION_MODE`.
+
+    The command drives `--samples` checkouts (`SELECT 1`) from `--concurrency`
+    threads, then prints latency percentiles and, in `pool` mode, the psycopg
+    pool statistics of this process.
+    """
+
+    help = "Report database pool utilisation, wait time and checkout latency."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default", help="Database alias to inspect.")
+        parser.add_argument("--samples", type=int, default=200, help="Number of checkouts to time.")
+        parser.add_argument("--concurrency", type=int, default=4, help="Threads issuing checkouts.")
+
+    def _checkout(self, alias):
+        connection = connections[alias]
+        started = time.perf_counter()
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+        elapsed = time.perf_counter() - started
+        # Mimic the end of a request: pooled connections go back to the pool,
+        # persistent ones are kept or recycled according to CONN_MAX_AGE.
+        connection.close_if_unusable_or_obsolete()
+        if getattr(connection, "pool", None) is not None:
+            connection.close()
+        return elapsed
+
+    def handle(self, *args, **options):
+        alias = options["database"]
+        settings_dict = connections[alias].settings_dict
+        mode = settings_dict.get("CONNECTION_MODE", "persistent" if settings_dict["CONN_MAX_AGE"] else "none")
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Database '{alias}' connection mode: {mode}"))
+        self.stdout.write(f"  CONN_MAX_AGE: {settings_dict['CONN_MAX_AGE']}")
+        self.stdout.write(f"  CONN_HEALTH_CHECKS: {settings_dict['CONN_HEALTH_CHECKS']}")
+
+        samples, concurrency = options["samples"], max(1, options["concurrency"])
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            latencies = sorted(executor.map(lambda _: self._checkout(alias), range(samples)))
+        if not latencies:
+            return
+
+        def pct(value):
+            return latencies[min(len(latencies) - 1, int(value / 100 * len(latencies)))] * 1000
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Checkout latency ({samples} samples, {concurrency} threads)"))
+        self.stdout.write(f"  mean: {statistics.fmean(latencies) * 1000:.3f} ms")
+        self.stdout.write(f"  p50:  {pct(50):.3f} ms")
+        self.stdout.write(f"  p99:  {pct(99):.3f} ms")
+        self.stdout.write(f"  max:  {latencies[-1] * 1000:.3f} ms")
+
+        pool = getattr(connections[alias], "pool", None)
+        if pool is not None:
+            self._report_pool(pool.get_stats())
+
+    def _report_pool(self, stats):
+        size, maximum = stats.get("pool_size", 0), stats.get("pool_max", 1)
+        in_use = size - stats.get("pool_available", 0)
+        queued, wait_ms = stats.get("requests_queued", 0), stats.get("requests_wait_ms", 0)
+        self.stdout.write(self.style.MIGRATE_HEADING("Pool"))
+        self.stdout.write(f"  size: {size} (min {stats.get('pool_min')}, max {maximum})")
+        self.stdout.write(f"  in use: {in_use} ({in_use / max(maximum, 1):.0%} utilisation)")
+        self.stdout.write(
+            f"  requests: {stats.get('requests_num', 0)}, queued: {queued}, "
+            f"waiting now: {stats.get('requests_waiting', 0)}"
+        )
+        mean_wait = wait_ms / queued if queued else 0
+        self.stdout.write(f"  wait: {wait_ms} ms total, {mean_wait:.3f} ms mean per queued request")
+        self.stdout.write(
+            f"  connections opened: {stats.get('connections_num', 0)} in {stats.get('connections_ms', 0)} ms, "
+            f"errors: {stats.get('connections_errors', 0)}"
+        )
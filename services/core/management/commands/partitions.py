@@ -0,0 +1,87 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+from django.template.defaultfilters import filesizeformat
+
+from shared.models.partitioning import (
+    drop_partitions,
+    ensure_partitions,
+    get_partition_settings,
+    is_partitioned,
+    list_partitions,
+    partitioned_models,
+)
+
+
+class Command(BaseCommand):
+    """
+    Maintain the monthly partitions of partitioned tables (`shared.models.partitioning`).
+
+    Without options, list every partition with its estimated rows and size.
+    `--ensure` creates the current month and `PARTITIONS["MONTHS_AHEAD"]`
+    next ones (schedule it, e.g. daily: rows of a missing month land in the
+    default partition until it is created). `--retention` drops the months
+    older than `PARTITIONS["RETENTION_MONTHS"]` (or `--keep-months`): whole
+    tables are detached and dropped instead of deleting rows.
+    """
+
+    help = "List, create and expire the monthly partitions of partitioned tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument("models", nargs="*", help="Limit to these models (app_label.Model).")
+        parser.add_argument("--database", default="default", help="Database alias.")
+        parser.add_argument("--ensure", action="store_true", help="Create the current and upcoming months.")
+        parser.add_argument("--months-ahead", type=int, help="Override PARTITIONS['MONTHS_AHEAD'].")
+        parser.add_argument("--retention", action="store_true", help="Drop the partitions past retention.")
+        parser.add_argument("--keep-months", type=int, help="Override PARTITIONS['RETENTION_MONTHS'] for all models.")
+        parser.add_argument("--dry-run", action="store_true", help="Only show what --retention would drop.")
+
+    def handle(self, *args, **options):
+        alias = options["database"]
+        models = partitioned_models()
+        if options["models"]:
+            models = [model for model in models if model._meta.label in options["models"]]
+            unknown = set(options["models"]) - {model._meta.label for model in models}
+            if unknown:
+                raise CommandError(f"Not partitioned models: {', '.join(sorted(unknown))}")
+        retention = get_partition_settings()["RETENTION_MONTHS"]
+        for model in models:
+            label = model._meta.label
+            if not is_partitioned(model, alias):
+                self.stdout.write(self.style.WARNING(f"{label}: table is not partitioned (not PostgreSQL?)"))
+                continue
+            if options["ensure"]:
+                self.ensure(model, options["months_ahead"], alias)
+            if options["retention"]:
+                keep = options["keep_months"] if options["keep_months"] is not None else retention.get(label, 0)
+                self.expire(model, keep, alias, options["dry_run"])
+            if not options["ensure"] and not options["retention"]:
+                self.show(model, alias)
+
+    def ensure(self, model, months_ahead, alias):
+        """Create the current and upcoming months of `model`."""
+        label = model._meta.label
+        try:
+            names = ensure_partitions(model, months_ahead, using=alias)
+        except DatabaseError as error:
+            raise CommandError(f"{label}: {error}".strip()) from error
+        self.stdout.write(self.style.SUCCESS(f"{label}: partitions up to {names[-1]} exist"))
+
+    def expire(self, model, keep, alias, dry_run):
+        """Drop the months of `model` older than `keep` months (none when `keep` is 0)."""
+        label = model._meta.label
+        if not keep:
+            self.stdout.write(f"{label}: no retention configured, nothing dropped")
+            return
+        dropped = drop_partitions(model, keep, using=alias, dry_run=dry_run)
+        verb = "Would drop" if dry_run else "Dropped"
+        for name, month, rows, size in dropped:
+            self.stdout.write(f"{label}: {verb} {name} ({month:%Y-%m}, ~{rows:,} rows, {filesizeformat(size)})")
+        if not dropped:
+            self.stdout.write(f"{label}: nothing older than {keep} months")
+
+    def show(self, model, alias):
+        """Print the partitions of `model` with their estimated rows and size."""
+        self.stdout.write(self.style.MIGRATE_HEADING(f"{model._meta.label} ({model._meta.db_table})"))
+        for name, month, rows, size in list_partitions(model, alias):
+            period = f"{month:%Y-%m}" if month else "default"
+            self.stdout.write(f"  {period:<8} {name:<40} ~{rows:>12,} rows {filesizeformat(size):>10}")
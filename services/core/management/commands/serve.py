@@ -0,0 +1,68 @@
+import os
+import shlex
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from shared.utils.metrics import clear_multiprocess_dir
+from shared.utils.server import DEFAULT_SERVER, available_cpus, build_command
+
+
+class Command(BaseCommand):
+    """
+    Run the project under a multi-worker production server.
+
+    `config.asgi:application` is served by gunicorn with uvicorn workers (or
+    uvicorn's own process manager when gunicorn is not installed), with the
+    worker count derived from the CPUs available to the container unless
+    `WEB_CONCURRENCY` / `--workers` is set. The server replaces this process,
+    so it receives container signals directly:
+
+    - `SIGHUP` reloads the code and restarts workers gracefully,
+    - `SIGTERM` drains in-flight requests for `GRACEFUL_TIMEOUT` seconds.
+    """
+
+    help = "Serve the project with a production ASGI/WSGI server."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="0.0.0.0")
+        parser.add_argument("--port", type=int, default=8000)
+        parser.add_argument("--workers", type=int, help="Worker processes (default: derived from the CPUs).")
+        parser.add_argument("--server", choices=["auto", "gunicorn", "uvicorn"])
+        parser.add_argument("--interface", choices=["asgi", "wsgi"])
+        parser.add_argument("--backlog", type=int)
+        parser.add_argument("--keep-alive", type=int, help="Idle keep-alive timeout, in seconds.")
+        parser.add_argument("--dry-run", action="store_true", help="Print the server command and exit.")
+
+    def handle(self, *args, **options):
+        config = {**DEFAULT_SERVER, **getattr(settings, "SERVER", {})}
+        for option, key in (
+            ("workers", "WORKERS"),
+            ("server", "SERVER"),
+            ("interface", "INTERFACE"),
+            ("backlog", "BACKLOG"),
+            ("keep_alive", "KEEP_ALIVE"),
+        ):
+            if options[option] is not None:
+                config[key] = options[option]
+        try:
+            command, workers = build_command(options["host"], options["port"], config)
+        except RuntimeError as e:
+            raise CommandError(str(e)) from e
+
+        # Workers import the settings again: keep their defaults (e.g. the DB
+        # connection mode) in line with the interface actually served.
+        os.environ["SERVER_INTERFACE"] = config["INTERFACE"]
+        # Workers are separate processes: share /metrics through per-worker files.
+        if workers > 1 and not (os.environ.get("PROMETHEUS_MULTIPROC_DIR") or settings.METRICS.get("MULTIPROCESS_DIR")):
+            os.environ["PROMETHEUS_MULTIPROC_DIR"] = "/tmp/matrix-meta-metrics"
+        clear_multiprocess_dir(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+        self.stdout.write(
+            self.style.MIGRATE_HEADING(f"Serving with {workers} worker(s) ({available_cpus()} CPU(s) available)")
+        )
+        self.stdout.write(f"  {shlex.join(command)}")
+        if options["dry_run"]:
+            return
+        self.stdout.flush()
+        os.execvp(command[0], command)
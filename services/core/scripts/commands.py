@@ -3,9 +3,20 @@
 # minimal boilerplate code by using decorators to define commands and options. In the provided code
 # snippet, Typer is used to define commands `task1` and `task2` within the `app` CLI application.
 
+from typing import List
+
 import typer
+from rich.console import Console
+from rich.table import Table
 
 app = typer.Typer(name="core")  # TODO: get app name dynamically from Django
+console = Console()
+
+
+def _setup_django():
+    from scripts.commands.django import setup_django  # pylint: disable=import-outside-toplevel
+
+    setup_django()
 
 
 @app.command()
@@ -20,5 +31,86 @@ def task2():
     print("Task 2 executed for my_app1")
 
 
+@app.command()
+def worker(
+    queue: List[str] = typer.Option(["default"], "--queue", "-q", help="Queue to consume (repeatable)."),
+    concurrency: int = typer.Option(4, "--concurrency", "-c", help="Tasks at once (processes with --pool processes)."),
+    pool: str = typer.Option("threads", help="threads, asyncio (mostly async tasks) or processes (CPU-bound)."),
+    burst: bool = typer.Option(False, help="Exit once the queues are empty."),
+):
+    """Run a background task worker"""
+    import logging  # pylint: disable=import-outside-toplevel
+
+    _setup_django()
+    from shared.tasks import POOLS, run_worker  # pylint: disable=import-outside-toplevel
+
+    if pool not in POOLS:
+        raise typer.BadParameter(f"choose one of {', '.join(POOLS)}", param_hint="--pool")
+    logging.getLogger("shared.tasks").setLevel(logging.INFO)
+    console.print(f"[bold green]Worker[/] consuming {', '.join(queue)} ({pool} x{concurrency})")
+    run_worker(queue, concurrency, pool, burst=burst)
+
+
+@app.command()
+def queues():
+    """Show task queue depths"""
+    _setup_django()
+    from shared.tasks import get_broker  # pylint: disable=import-outside-toplevel
+
+    broker = get_broker()
+    table = Table(title="Task queues", header_style="bold magenta")
+    for column in ("Queue", "Ready", "Running", "Delayed", "Dead"):
+        table.add_column(column, justify="left" if column == "Queue" else "right")
+    for name in broker.queues():
+        depth = broker.depth(name)
+        table.add_row(name, *(str(depth[state]) for state in ("ready", "running", "delayed", "dead")))
+    console.print(table)
+
+
+@app.command("retry-dead")
+def retry_dead(
+    queue: str = typer.Option("default", "--queue", "-q", help="Queue whose dead letters are retried."),
+    limit: int = typer.Option(100, help="Messages to move at most."),
+):
+    """Re-enqueue dead-lettered tasks"""
+    _setup_django()
+    from shared.tasks import get_broker  # pylint: disable=import-outside-toplevel
+
+    moved = get_broker().requeue_dead(queue, limit)
+    console.print(f"Re-enqueued {moved} task(s) on [bold]{queue}[/]")
+
+
+@app.command()
+def plugins(
+    load: bool = typer.Option(False, "--load", help="Import every plugin and show its load time."),
+    refresh: bool = typer.Option(False, "--refresh", help="Rescan plugin sources and entry points."),
+):
+    """List bridge plugins"""
+    _setup_django()
+    from shared.plugins import GROUPS, get_plugins  # pylint: disable=import-outside-toplevel
+
+    registry = get_plugins()
+    if refresh:
+        registry.discover()
+    table = Table(title="Plugins", header_style="bold magenta")
+    for column in ("Group", "Name", "Source", "Target", "Load ms"):
+        table.add_column(column, justify="right" if column == "Load ms" else "left")
+    for group in GROUPS:
+        if load:
+            registry.load_all(group)
+        times = registry.load_times()
+        for name in registry.names(group):
+            spec = registry.spec(group, name)
+            seconds = times.get((group, name))
+            table.add_row(
+                group,
+                name,
+                spec.distribution or spec.source,
+                spec.target,
+                f"{seconds * 1000:.1f}" if seconds is not None else "-",
+            )
+    console.print(table)
+
+
 # Explicitly define what is exported when using `from commands import *`
 __all__ = ["app"]
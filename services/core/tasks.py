@@ -0,0 +1,15 @@
+from shared.tasks import task
+from shared.utils.transfer import run_import_job
+
+
+@task(max_retries=5, retry_backoff=10.0)
+def import_rows_job(job_id):
+    """
+    Import an uploaded file queued by `shared.utils.transfer.start_import`.
+
+    A retried or redelivered job resumes after its committed chunks.
+
+    Args:
+        job_id (str): The job, as returned by `start_import`.
+    """
+    run_import_job(job_id)
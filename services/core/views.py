@@ -1,19 +1,40 @@
-from django.core.cache import cache
-from django.http import JsonResponse
-from django.views.decorators.cache import cache_page
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
 
+from shared.decorators import cached_payload
+from shared.utils.fastjson import JsonResponse
+from shared.utils.metrics import REGISTRY
 
-@cache_page(60 * 10)
-def sample_api(request):
+
+@cached_payload("expensive_data", ttl=60 * 10, stale_ttl=60)
+async def expensive_data():
+    """Build the payload served by `sample_api`."""
+    return {"message": "Hello! This is a cached API response."}
+
+
+async def sample_api(request):
     """ "tets api view"""
-    cached_data = cache.get("expensive_data")
-    if not cached_data:
-        data = {"message": "Hello! This is a cached API response."}
-        cache.set("expensive_data", data, timeout=60 * 10)
-    else:
-        data = cached_data
-    return JsonResponse(data)
+    return JsonResponse(await expensive_data())
+
+
+async def health_check(request):
+    """Report that the process is serving requests."""
+    return JsonResponse({"healthy": True})
+
 
+def metrics(request):
+    """
+    Prometheus scrape endpoint.
 
-def health_check(request):
-    return JsonResponse({"healthy": True})
\ No newline at end of file
+    Sync on purpose: under ASGI it runs in a worker thread, so reading the
+    per-worker metric files never blocks the event loop. Scrapers must send
+    `Authorization: Bearer <METRICS["TOKEN"]>`; without a configured token the
+    endpoint answers 404.
+    """
+    token = settings.METRICS.get("TOKEN")
+    if not token:
+        raise Http404
+    if not constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return HttpResponse(status=401, headers={"WWW-Authenticate": "Bearer"})
+    return HttpResponse(REGISTRY.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
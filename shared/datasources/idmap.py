@@ -0,0 +1,384 @@
+import asyncio
+import functools
+import time
+import weakref
+
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from shared.utils.async_cache import AsyncCache
+from shared.utils.cache import LocalLRU
+from shared.utils.instrumentation import record_cache, record_cache_many
+from shared.utils.metrics import Counter
+
+DEFAULT_ID_MAPPING = {
+    "MODEL": "bridge.IdMapping",  # needs network, kind, remote_id, matrix_id and room_id fields
+    "CACHE": "default",
+    "TTL": 24 * 3600,  # Redis tier
+    "NEGATIVE_TTL": 30,  # "no mapping" answers, in Redis
+    "LOCAL_TTL": 300,  # in-process tier
+    "LOCAL_NEGATIVE_TTL": 2,
+    "LOCAL_MAXSIZE": 100_000,
+}
+
+_MISSING = ""  # cached "no mapping" (Matrix ids are never empty)
+
+idmap_lookups = Counter(
+    "idmap_lookups",
+    "Remote id lookups by the tier that answered (local, redis, database, missing).",
+    ("tier",),
+)
+
+
+def get_id_mapping_settings():
+    """`DEFAULT_ID_MAPPING` updated with the `ID_MAPPING` setting."""
+    return {**DEFAULT_ID_MAPPING, **getattr(settings, "ID_MAPPING", {})}
+
+
+class IdMap:  # pylint: disable=too-many-instance-attributes
+    """
+    Remote network id -> Matrix id translation, in bulk.
+
+    A lookup tries an in-process LRU, then one Redis `MGET` for what it
+    missed, then one indexed query for what Redis missed; every id of a batch
+    goes through each tier together, so a message referencing ten remote
+    ids costs at most one Redis and one database round-trip. Unknown ids are
+    cached too (`NEGATIVE_TTL`), so misses do not reach the database either.
+
+    In async code `aget()` batches every lookup made in the same event loop
+    tick (DataLoader style): `gather()`-ing the translation of a sender, a
+    room and a reply target sends one `MGET` and one query.
+
+    Writes go to the database first, then overwrite the Redis entries of the
+    written ids (including cached "no mapping" answers); cache fills only
+    `SET NX`, so a fill racing a write never restores a stale value. Other
+    processes may answer from their local tier for up to `LOCAL_TTL`
+    (`LOCAL_NEGATIVE_TTL` for unknown ids), which is why it is short for
+    negative answers: mappings are created but, once created, rarely change.
+
+    Args:
+        model (str): `app_label.Model` of the mapping table.
+        alias (str): Django cache alias of the Redis tier.
+        ttl (int): Redis expiry of known ids, in seconds.
+        negative_ttl (int): Redis expiry of unknown ids, in seconds.
+        local_ttl (float): In-process expiry of known ids, in seconds.
+        local_negative_ttl (float): In-process expiry of unknown ids, in seconds.
+        local_maxsize (int): Entries of the in-process tier.
+    """
+
+    def __init__(
+        self,
+        model="bridge.IdMapping",
+        alias="default",
+        ttl=DEFAULT_ID_MAPPING["TTL"],
+        negative_ttl=DEFAULT_ID_MAPPING["NEGATIVE_TTL"],
+        local_ttl=DEFAULT_ID_MAPPING["LOCAL_TTL"],
+        local_negative_ttl=DEFAULT_ID_MAPPING["LOCAL_NEGATIVE_TTL"],
+        local_maxsize=DEFAULT_ID_MAPPING["LOCAL_MAXSIZE"],
+    ):  # pylint: disable=too-many-arguments,too-many-positional-arguments
+        self.model_label = model
+        self.alias = alias
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.local_ttl = local_ttl
+        self.local_negative_ttl = local_negative_ttl
+        self.local = LocalLRU(local_maxsize)
+        self._async_cache = AsyncCache(alias)
+        self._pending = weakref.WeakKeyDictionary()  # loop -> {(network, kind): {remote_id: future}}
+
+    @functools.cached_property
+    def model(self):
+        """The mapping model class."""
+        return apps.get_model(self.model_label)
+
+    @property
+    def cache(self):
+        """The Django cache of the Redis tier."""
+        return caches[self.alias]
+
+    @staticmethod
+    def _key(network, kind, remote_id):
+        return f"idmap:{network}:{kind}:{remote_id}"
+
+    # Tiers -------------------------------------------------------------
+
+    def _from_local(self, network, kind, remote_ids, found):
+        missing = []
+        for remote_id in remote_ids:
+            item = self.local.get(self._key(network, kind, remote_id))
+            if item is None:
+                missing.append(remote_id)
+            elif item[0] != _MISSING:
+                found[remote_id] = item[0]
+        idmap_lookups.inc(len(remote_ids) - len(missing), "local")
+        return missing
+
+    def _remember_locally(self, network, kind, values):
+        for remote_id, matrix_id in values.items():
+            ttl = self.local_ttl if matrix_id != _MISSING else self.local_negative_ttl
+            self.local.set(self._key(network, kind, remote_id), matrix_id, ttl)
+
+    def _from_redis(self, network, kind, remote_ids, cached, found):
+        remembered = {}
+        missing = []
+        for remote_id in remote_ids:
+            value = cached.get(self._key(network, kind, remote_id))
+            if value is None:
+                missing.append(remote_id)
+                continue
+            remembered[remote_id] = value
+            if value != _MISSING:
+                found[remote_id] = value
+        self._remember_locally(network, kind, remembered)
+        idmap_lookups.inc(len(remembered), "redis")
+        return missing
+
+    def _query(self, network, kind, remote_ids):
+        rows = self.model.objects.filter(network=network, kind=kind, remote_id__in=remote_ids)
+        values = dict(rows.values_list("remote_id", "matrix_id"))
+        idmap_lookups.inc(len(values), "database")
+        idmap_lookups.inc(len(remote_ids) - len(values), "missing")
+        return {remote_id: values.get(remote_id, _MISSING) for remote_id in remote_ids}
+
+    def _fills(self, network, kind, values):
+        """Group database answers by Redis expiry: `{ttl: {key: value}}`."""
+        fills = {}
+        for remote_id, matrix_id in values.items():
+            ttl = self.ttl if matrix_id != _MISSING else self.negative_ttl
+            fills.setdefault(ttl, {})[self._key(network, kind, remote_id)] = matrix_id
+        return fills
+
+    # Sync redis helpers (django_redis client, same keys and encoding as AsyncCache)
+
+    def _redis_get_many(self, keys):
+        if not self._async_cache.is_native:
+            return self.cache.get_many(keys)
+        client = self.cache.client
+        started = time.perf_counter()
+        values = client.get_client(write=False).mget([client.make_key(key) for key in keys])
+        found = {key: client.decode(value) for key, value in zip(keys, values) if value is not None}
+        record_cache_many(time.perf_counter() - started, len(found), len(keys) - len(found))
+        return found
+
+    def _redis_set_many(self, data, ttl, nx):
+        if not self._async_cache.is_native:
+            if nx:
+                for key, value in data.items():
+                    self.cache.add(key, value, ttl)
+            else:
+                self.cache.set_many(data, ttl)
+            return
+        client = self.cache.client
+        started = time.perf_counter()
+        pipeline = client.get_client(write=True).pipeline(transaction=False)
+        for key, value in data.items():
+            pipeline.set(client.make_key(key), client.encode(value), px=int(ttl * 1000), nx=nx)
+        pipeline.execute()
+        record_cache(time.perf_counter() - started, op="set_many")
+
+    # Lookups -----------------------------------------------------------
+
+    def get_many(self, network, kind, remote_ids):
+        """
+        Translate remote ids of one network and kind.
+
+        Args:
+            network (str): Remote network (protocol adapter name).
+            kind (str): `event`, `room` or `user`.
+            remote_ids (iterable[str]): Ids to translate (duplicates are fine).
+
+        Returns:
+            dict: `{remote_id: matrix_id}` of the ids that have a mapping.
+        """
+        found = {}
+        missing = self._from_local(network, kind, list(dict.fromkeys(remote_ids)), found)
+        if not missing:
+            return found
+        cached = self._redis_get_many([self._key(network, kind, remote_id) for remote_id in missing])
+        missing = self._from_redis(network, kind, missing, cached, found)
+        if not missing:
+            return found
+        values = self._query(network, kind, missing)
+        for ttl, data in self._fills(network, kind, values).items():
+            self._redis_set_many(data, ttl, nx=True)
+        self._remember_locally(network, kind, values)
+        found.update((remote_id, matrix_id) for remote_id, matrix_id in values.items() if matrix_id != _MISSING)
+        return found
+
+    def get(self, network, kind, remote_id, default=None):
+        """The Matrix id of one remote id, or `default`."""
+        return self.get_many(network, kind, [remote_id]).get(remote_id, default)
+
+    async def aget_many(self, network, kind, remote_ids):
+        """`get_many` for async code (native `redis.asyncio`, database in a thread)."""
+        found = {}
+        missing = self._from_local(network, kind, list(dict.fromkeys(remote_ids)), found)
+        if not missing:
+            return found
+        cached = await self._async_cache.aget_many([self._key(network, kind, remote_id) for remote_id in missing])
+        missing = self._from_redis(network, kind, missing, cached, found)
+        if not missing:
+            return found
+        values = await sync_to_async(self._query)(network, kind, missing)
+        for ttl, data in self._fills(network, kind, values).items():
+            await self._async_cache.aset_many(data, ttl, nx=True)
+        self._remember_locally(network, kind, values)
+        found.update((remote_id, matrix_id) for remote_id, matrix_id in values.items() if matrix_id != _MISSING)
+        return found
+
+    async def aget(self, network, kind, remote_id, default=None):
+        """
+        Translate one remote id, batched with the other `aget()` calls of
+        this event loop tick.
+        """
+        item = self.local.get(self._key(network, kind, remote_id))
+        if item is not None:
+            idmap_lookups.inc(1, "local")
+            return item[0] if item[0] != _MISSING else default
+        loop = asyncio.get_running_loop()
+        pending = self._pending.get(loop)
+        if pending is None:
+            pending = self._pending[loop] = {}
+            loop.call_soon(self._schedule_flush, loop)
+        futures = pending.setdefault((network, kind), {})
+        future = futures.get(remote_id)
+        if future is None:
+            future = futures[remote_id] = loop.create_future()
+        matrix_id = await asyncio.shield(future)
+        return default if matrix_id is None else matrix_id
+
+    def _schedule_flush(self, loop):
+        pending = self._pending.pop(loop, {})
+        for (network, kind), futures in pending.items():
+            loop.create_task(self._flush(network, kind, futures))
+
+    async def _flush(self, network, kind, futures):
+        try:
+            found = await self.aget_many(network, kind, list(futures))
+        except Exception as error:  # pylint: disable=broad-except
+            for future in futures.values():
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for remote_id, future in futures.items():
+            if not future.done():
+                future.set_result(found.get(remote_id))
+
+    # Writes ------------------------------------------------------------
+
+    def _upsert(self, network, kind, mapping, room_id):
+        objects = [
+            self.model(network=network, kind=kind, remote_id=remote_id, matrix_id=matrix_id, room_id=room_id)
+            for remote_id, matrix_id in mapping.items()
+        ]
+        with transaction.atomic():
+            self.model.objects.bulk_create(
+                objects,
+                update_conflicts=True,
+                unique_fields=["network", "kind", "remote_id"],
+                update_fields=["matrix_id", "room_id", "updated_at"],
+            )
+
+    def _delete(self, network, kind, remote_ids):
+        return self.model.objects.filter(network=network, kind=kind, remote_id__in=remote_ids).delete()[0]
+
+    def set_many(self, network, kind, mapping, room_id=""):
+        """
+        Store `{remote_id: matrix_id}` (insert or update) and refresh the caches.
+
+        Args:
+            network (str): Remote network.
+            kind (str): `event`, `room` or `user`.
+            mapping (dict): Remote id -> Matrix id.
+            room_id (str): Room of event mappings.
+        """
+        if not mapping:
+            return
+        self._upsert(network, kind, mapping, room_id)
+        transaction.on_commit(lambda: self._written(network, kind, mapping), using=self.model.objects.db)
+
+    def _written(self, network, kind, values):
+        for ttl, data in self._fills(network, kind, values).items():
+            self._redis_set_many(data, ttl, nx=False)
+        self._remember_locally(network, kind, values)
+
+    def set(self, network, kind, remote_id, matrix_id, room_id=""):
+        """Map one remote id (see `set_many`)."""
+        self.set_many(network, kind, {remote_id: matrix_id}, room_id)
+
+    def delete_many(self, network, kind, remote_ids):
+        """Forget the mappings of `remote_ids`; they are cached as unknown from now on."""
+        remote_ids = list(remote_ids)
+        deleted = self._delete(network, kind, remote_ids)
+        values = dict.fromkeys(remote_ids, _MISSING)
+        transaction.on_commit(lambda: self._written(network, kind, values), using=self.model.objects.db)
+        return deleted
+
+    async def _awritten(self, network, kind, values):
+        for ttl, data in self._fills(network, kind, values).items():
+            await self._async_cache.aset_many(data, ttl)
+        self._remember_locally(network, kind, values)
+
+    async def aset_many(self, network, kind, mapping, room_id=""):
+        """`set_many` for async code. The caches are refreshed once the upsert is committed."""
+        if not mapping:
+            return
+        await sync_to_async(self._upsert)(network, kind, mapping, room_id)
+        await self._awritten(network, kind, mapping)
+
+    async def aset(self, network, kind, remote_id, matrix_id, room_id=""):
+        """`set` for async code."""
+        await self.aset_many(network, kind, {remote_id: matrix_id}, room_id)
+
+    async def adelete_many(self, network, kind, remote_ids):
+        """`delete_many` for async code."""
+        remote_ids = list(remote_ids)
+        deleted = await sync_to_async(self._delete)(network, kind, remote_ids)
+        await self._awritten(network, kind, dict.fromkeys(remote_ids, _MISSING))
+        return deleted
+
+    def forget_many(self, network, kind, remote_ids):
+        """
+        Drop cached answers of `remote_ids` (Redis and this process), so the
+        next lookups read the database; for rows written around `set_many`,
+        like bulk imports.
+        """
+        keys = [self._key(network, kind, remote_id) for remote_id in remote_ids]
+        self.cache.delete_many(keys)
+        for key in keys:
+            self.local.delete(key)
+
+    def clear_local(self):
+        """Drop the in-process tier (tests, or after bulk imports)."""
+        self.local.clear()
+
+
+@functools.lru_cache(maxsize=None)
+def get_id_map():
+    """The `IdMap` configured by `settings.ID_MAPPING`, shared by the process."""
+    config = get_id_mapping_settings()
+    return IdMap(
+        model=config["MODEL"],
+        alias=config["CACHE"],
+        ttl=config["TTL"],
+        negative_ttl=config["NEGATIVE_TTL"],
+        local_ttl=config["LOCAL_TTL"],
+        local_negative_ttl=config["LOCAL_NEGATIVE_TTL"],
+        local_maxsize=config["LOCAL_MAXSIZE"],
+    )
+
+
+def forget_imported(sender, rows, **kwargs):  # pylint: disable=unused-argument
+    """`shared.utils.transfer.rows_imported` receiver: drop the cached answers of imported mappings."""
+    id_map = get_id_map()
+    groups = {}
+    for row in rows:
+        groups.setdefault((row.network, row.kind), []).append(row.remote_id)
+    for (network, kind), remote_ids in groups.items():
+        id_map.forget_many(network, kind, remote_ids)
+
+
+__all__ = ["get_id_mapping_settings", "IdMap", "get_id_map", "forget_imported", "idmap_lookups"]
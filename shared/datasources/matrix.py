@@ -0,0 +1,304 @@
+import asyncio
+import logging
+import random
+import time
+import uuid
+import weakref
+from urllib.parse import quote
+
+from shared.utils.fastjson import dumps, loads
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - optional until the Matrix client is used
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+
+class MatrixError(Exception):
+    """
+    Error response of the homeserver (`{"errcode": ..., "error": ...}`).
+
+    Args:
+        status (int): HTTP status code.
+        errcode (str): Matrix error code, e.g. `M_FORBIDDEN`.
+        error (str): Human readable message.
+        retry_after_ms (int, optional): Delay requested by `M_LIMIT_EXCEEDED`.
+    """
+
+    def __init__(self, status, errcode, error="", retry_after_ms=None):
+        super().__init__(f"{status} {errcode}: {error}")
+        self.status = status
+        self.errcode = errcode
+        self.error = error
+        self.retry_after_ms = retry_after_ms
+
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def _quote(value):
+    return quote(value, safe="")
+
+
+class _RoomSender:
+    """Ordered outbound queue of one room, drained by a single task."""
+
+    def __init__(self):
+        self.queue = asyncio.Queue()
+        self.task = None
+
+
+class MatrixClient:  # pylint: disable=too-many-instance-attributes
+    """
+    Asyncio client for the Matrix client-server API.
+
+    - one keep-alive connection pool (httpx) shared by every call,
+    - retries of transport errors and 5xx with full-jitter exponential backoff,
+    - `M_LIMIT_EXCEEDED` handling: the whole client pauses for `retry_after_ms`
+      (or `Retry-After`) so concurrent calls don't keep hammering the limit,
+    - identical concurrent GETs (profiles, room state) share one request,
+    - sends go through a per-room queue drained by one task per room: events
+      keep their order within a room, rooms are sent in parallel, and a
+      burst for a room is flushed back to back on a warm connection. A room
+      whose queue is drained is forgotten, so idle rooms cost nothing.
+
+    Sends use client-generated transaction ids, so a retried PUT never
+    duplicates an event. Use it as an async context manager, or call
+    `aclose()`.
+
+    Args:
+        homeserver (str): Base URL, e.g. `https://matrix.example.org`.
+        access_token (str): User or application-service (`as_token`) token.
+        max_connections (int): Upper bound of open connections.
+        max_keepalive (int): Idle connections kept for reuse.
+        timeout (float): Per-request timeout, in seconds.
+        max_retries (int): Retries after the first attempt.
+        backoff_base (float): First backoff ceiling, in seconds.
+        backoff_max (float): Largest backoff ceiling, in seconds.
+        max_batch (int): Sends flushed per room before yielding to other tasks.
+        transport (httpx.AsyncBaseTransport, optional): Custom transport (tests).
+    """
+
+    def __init__(
+        self,
+        homeserver,
+        access_token,
+        *,
+        max_connections=100,
+        max_keepalive=20,
+        timeout=10.0,
+        max_retries=5,
+        backoff_base=0.25,
+        backoff_max=10.0,
+        max_batch=50,
+        transport=None,
+    ):  # pylint: disable=too-many-arguments
+        if httpx is None:
+            raise RuntimeError("The Matrix client needs httpx: `pip install httpx`.")
+        self.http = httpx.AsyncClient(
+            base_url=homeserver.rstrip("/"),
+            headers={"Authorization": f"Bearer {access_token}"},
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive),
+            timeout=timeout,
+            transport=transport,
+        )
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_batch = max_batch
+        self.stats = {"requests": 0, "retries": 0, "rate_limited": 0, "coalesced": 0, "sent": 0}
+        self._paused_until = 0.0
+        self._inflight = {}
+        self._rooms = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        """Flush pending sends, then close the connection pool."""
+        await self.flush()
+        for sender in self._rooms.values():
+            if sender.task is not None:
+                sender.task.cancel()
+        await self.http.aclose()
+
+    # Requests
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    async def request(self, method, path, *, params=None, json=None):
+        """
+        Send a request with retries and return the decoded JSON body.
+
+        Raises:
+            MatrixError: For 4xx responses other than rate limits, or when retries run out.
+            httpx.TransportError: When the homeserver stays unreachable.
+        """
+        attempt = 0
+        while True:
+            delay = self._paused_until - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.stats["requests"] += 1
+            try:
+                response = await self.http.request(
+                    method,
+                    path,
+                    params=params,
+                    content=None if json is None else dumps(json),
+                    headers=None if json is None else _JSON_HEADERS,
+                )
+            except httpx.TransportError:
+                if attempt >= self.max_retries:
+                    raise
+                error, wait = None, self._backoff(attempt)
+            else:
+                if response.status_code < 400:
+                    return loads(response.content) if response.content else {}
+                error = self._error(response)
+                if response.status_code == 429 or error.errcode == "M_LIMIT_EXCEEDED":
+                    self.stats["rate_limited"] += 1
+                    wait = (error.retry_after_ms or 0) / 1000 or self._backoff(attempt)
+                    # Pause the whole client, not just this call.
+                    self._paused_until = max(self._paused_until, time.monotonic() + wait)
+                elif response.status_code >= 500:
+                    wait = self._backoff(attempt)
+                else:
+                    raise error
+                if attempt >= self.max_retries:
+                    raise error
+            attempt += 1
+            self.stats["retries"] += 1
+            logger.debug("Retrying %s %s in %.3fs (%s)", method, path, wait, error or "transport error")
+            await asyncio.sleep(wait)
+
+    @staticmethod
+    def _error(response):
+        try:
+            body = loads(response.content)
+        except ValueError:
+            body = {}
+        if not isinstance(body, dict):
+            body = {}
+        retry_after_ms = body.get("retry_after_ms")
+        if retry_after_ms is None and response.headers.get("Retry-After", "").isdigit():
+            retry_after_ms = int(response.headers["Retry-After"]) * 1000
+        return MatrixError(
+            response.status_code, body.get("errcode", "M_UNKNOWN"), body.get("error", response.text), retry_after_ms
+        )
+
+    async def get(self, path, params=None):
+        """GET `path`; identical GETs already in flight share their response."""
+        key = (path, tuple(sorted((params or {}).items())))
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self.request("GET", path, params=params))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.stats["coalesced"] += 1
+        # Shield: one caller being cancelled must not cancel the shared request.
+        return await asyncio.shield(task)
+
+    # Client-server API
+
+    async def get_profile(self, user_id):
+        """Display name and avatar of `user_id`."""
+        return await self.get(f"/_matrix/client/v3/profile/{_quote(user_id)}")
+
+    async def get_room_state(self, room_id):
+        """Every current state event of `room_id`."""
+        return await self.get(f"/_matrix/client/v3/rooms/{_quote(room_id)}/state")
+
+    async def get_state_event(self, room_id, event_type, state_key=""):
+        """Content of one state event of `room_id`."""
+        return await self.get(
+            f"/_matrix/client/v3/rooms/{_quote(room_id)}/state/{_quote(event_type)}/{_quote(state_key)}"
+        )
+
+    async def send_event(self, room_id, event_type, content, txn_id=None, params=None):
+        """
+        Queue an event for `room_id` and wait for its `event_id`.
+
+        Args:
+            room_id (str): Target room.
+            event_type (str): E.g. `m.room.message`.
+            content (dict): Event content.
+            txn_id (str, optional): Idempotency key; generated when omitted.
+            params (dict, optional): Extra query parameters (`user_id` for appservice masquerading).
+        """
+        sender = self._rooms.get(room_id)
+        if sender is None:
+            sender = self._rooms[room_id] = _RoomSender()
+        future = asyncio.get_running_loop().create_future()
+        sender.queue.put_nowait((event_type, content, txn_id or uuid.uuid4().hex, params, future))
+        if sender.task is None or sender.task.done():
+            sender.task = asyncio.ensure_future(self._drain(room_id, sender))
+        response = await future
+        return response["event_id"]
+
+    async def send_message(self, room_id, body, msgtype="m.text", **kwargs):
+        """Send an `m.room.message` of `msgtype`; see `send_event()` for `kwargs`."""
+        return await self.send_event(room_id, "m.room.message", {"msgtype": msgtype, "body": body}, **kwargs)
+
+    async def _drain(self, room_id, sender):
+        path = f"/_matrix/client/v3/rooms/{_quote(room_id)}/send"
+        while not sender.queue.empty():
+            for _ in range(min(self.max_batch, sender.queue.qsize())):
+                event_type, content, txn_id, params, future = sender.queue.get_nowait()
+                try:
+                    response = await self.request(
+                        "PUT", f"{path}/{_quote(event_type)}/{_quote(txn_id)}", params=params, json=content
+                    )
+                except Exception as e:  # pylint: disable=broad-exception-caught
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    self.stats["sent"] += 1
+                    if not future.done():
+                        future.set_result(response)
+                finally:
+                    sender.queue.task_done()
+            await asyncio.sleep(0)  # let other rooms' senders run between batches
+        # Nothing can be queued between the emptiness check and here (no
+        # await), so the next send for this room starts a fresh sender.
+        if self._rooms.get(room_id) is sender:
+            del self._rooms[room_id]
+
+    async def flush(self):
+        """Wait until every queued send has completed."""
+        await asyncio.gather(*(sender.queue.join() for sender in list(self._rooms.values())))
+
+
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_matrix_client():
+    """
+    Return the `MatrixClient` of the running event loop, configured from
+    `settings.MATRIX_APPSERVICE` (`HOMESERVER_URL`, `AS_TOKEN`).
+
+    httpx connections are bound to the loop that opened them, so one client is
+    kept per loop and closed when the loop shuts down (its room senders are
+    cancelled along with the loop, so there is nothing left to flush).
+    """
+    from django.conf import settings  # pylint: disable=import-outside-toplevel
+
+    from shared.utils.async_cache import close_on_loop_shutdown  # pylint: disable=import-outside-toplevel
+
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        config = settings.MATRIX_APPSERVICE
+        client = _clients[loop] = MatrixClient(config["HOMESERVER_URL"], config["AS_TOKEN"])
+        close_on_loop_shutdown(loop, _clients, client.http.aclose)
+    return client
+
+
+__all__ = ["MatrixError", "MatrixClient", "get_matrix_client"]
@@ -1 +1,3 @@
 from .app_config import *
+from .cache import *
+from .ratelimit import *
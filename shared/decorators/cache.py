@@ -0,0 +1,59 @@
+import functools
+import inspect
+
+from shared.utils.cache import TieredCache
+
+
+def cached_payload(namespace, ttl, stale_ttl=0, key_func=None, **options):
+    """
+    Decorator caching the return value of an expensive payload builder in a `TieredCache`.
+
+    Works on both plain and `async` functions. The cache key is built from the
+    call arguments (or by `key_func(*args, **kwargs)` when given), and the
+    underlying `TieredCache` is exposed as `wrapper.cache` for stats and
+    invalidation.
+
+    Args:
+        namespace (str): Namespace of the cache entries.
+        ttl (int): Soft time-to-live of the payload, in seconds.
+        stale_ttl (int): Seconds a stale payload may be served while it is rebuilt.
+        key_func (Callable, optional): Builds the cache key from the call arguments.
+        **options: Extra `TieredCache` options (`local_ttl`, `beta`, `alias`, ...).
+
+    Example:
+        @cached_payload("expensive_data", ttl=600, stale_ttl=60)
+        async def expensive_data():
+            ...
+    """
+    tiered = TieredCache(namespace, ttl, stale_ttl=stale_ttl, **options)
+
+    def make_key(args, kwargs):
+        if key_func is not None:
+            return str(key_func(*args, **kwargs))
+        parts = [repr(arg) for arg in args]
+        parts.extend(f"{name}={value!r}" for name, value in sorted(kwargs.items()))
+        return ":".join(parts) or "default"
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                return await tiered.aget_or_set(
+                    make_key(args, kwargs), lambda: func(*args, **kwargs)
+                )
+
+            async_wrapper.cache = tiered
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return tiered.get_or_set(make_key(args, kwargs), lambda: func(*args, **kwargs))
+
+        wrapper.cache = tiered
+        return wrapper
+
+    return decorator
+
+
+__all__ = ["cached_payload"]
@@ -0,0 +1,169 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.http import HttpResponse, JsonResponse
+
+DEFAULT_PROBES = {
+    "LIVENESS_PATH": "/livez",
+    "READINESS_PATH": "/readyz",
+    "TIMEOUT": 1.0,
+    "CACHE_SECONDS": 2.0,
+    "DATABASE_ALIAS": "default",
+    "CACHE_ALIAS": "default",
+}
+
+# Probe checks run on their own small pool so a hung backend can only ever
+# block these threads, never the request workers.
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="readiness")
+_lock = threading.Lock()
+_cached = {"expires": 0.0, "result": None}
+
+LIVENESS_BODY = b'{"alive": true}'
+
+
+def get_probe_settings():
+    """`settings.HEALTH_PROBES` over the defaults."""
+    return {**DEFAULT_PROBES, **getattr(settings, "HEALTH_PROBES", {})}
+
+
+def check_database(alias):
+    """Run `SELECT 1` on the given database alias."""
+    connection = connections[alias]
+    connection.close_if_unusable_or_obsolete()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+    except Exception:
+        connection.close()
+        raise
+
+
+def check_cache(alias):
+    """PING the Redis server behind the cache alias (or round-trip a key on other backends)."""
+    cache = caches[alias]
+    client = getattr(cache, "client", None)
+    if client is not None and hasattr(client, "get_client"):
+        client.get_client(write=False).ping()
+    else:
+        cache.get("readiness-probe")
+
+
+def _run_check(check, alias, timeout):
+    started = time.perf_counter()
+    future = _executor.submit(check, alias)
+    try:
+        future.result(timeout=timeout)
+        status = {"ok": True}
+    except FutureTimeoutError:
+        status = {"ok": False, "error": f"timed out after {timeout}s"}
+    except Exception as e:  # pylint: disable=W0718
+        status = {"ok": False, "error": f"{e.__class__.__name__}: {e}"}
+    status["latency_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    return status
+
+
+def _cached_readiness():
+    if _cached["expires"] > time.monotonic():
+        return _cached["result"]
+    return None
+
+
+def readiness():
+    """
+    Check Postgres and Redis connectivity with bounded timeouts.
+
+    The result is cached for `HEALTH_PROBES["CACHE_SECONDS"]` so high-frequency
+    load-balancer probes do not translate into backend round-trips.
+
+    Returns:
+        dict: `{"ready": bool, "checks": {"database": {...}, "cache": {...}}}`.
+    """
+    result = _cached_readiness()
+    if result is not None:
+        return result
+    with _lock:
+        result = _cached_readiness()
+        if result is not None:
+            return result
+        config = get_probe_settings()
+        checks = {
+            "database": _run_check(check_database, config["DATABASE_ALIAS"], config["TIMEOUT"]),
+            "cache": _run_check(check_cache, config["CACHE_ALIAS"], config["TIMEOUT"]),
+        }
+        result = {"ready": all(check["ok"] for check in checks.values()), "checks": checks}
+        _cached["result"] = result
+        _cached["expires"] = time.monotonic() + config["CACHE_SECONDS"]
+        return result
+
+
+def _readiness_response(result):
+    response = JsonResponse(result, status=200 if result["ready"] else 503)
+    # Probes bypass CommonMiddleware: set the length so ASGI servers don't chunk.
+    response["Content-Length"] = str(len(response.content))
+    return response
+
+
+def _liveness_response():
+    # The body is encoded once at import; JsonResponse would serialize it on every probe.
+    response = HttpResponse(LIVENESS_BODY, content_type="application/json")  # pylint: disable=R5102
+    response["Content-Length"] = str(len(LIVENESS_BODY))
+    return response
+
+
+class ProbeMiddleware:
+    """
+    Answer load-balancer liveness and readiness probes before the rest of the stack.
+
+    Must be the first entry of `MIDDLEWARE`: probe requests never reach the
+    session, CSRF, auth or messages middleware (so they cost no Redis session
+    round-trip) and skip host validation and HTTPS redirects.
+
+    - `LIVENESS_PATH` (default `/livez`) returns a static body: the process is up.
+    - `READINESS_PATH` (default `/readyz`) reports Postgres and Redis
+      connectivity, see `readiness()`; it answers 503 when a dependency is down.
+
+    Works natively in both sync (WSGI) and async (ASGI) stacks.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        config = get_probe_settings()
+        self.liveness_path = config["LIVENESS_PATH"]
+        self.readiness_path = config["READINESS_PATH"]
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        path = request.path_info
+        if path == self.liveness_path:
+            return _liveness_response()
+        if path == self.readiness_path:
+            return _readiness_response(readiness())
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        path = request.path_info
+        if path == self.liveness_path:
+            return _liveness_response()
+        if path == self.readiness_path:
+            result = _cached_readiness()
+            if result is None:
+                result = await sync_to_async(readiness, thread_sensitive=False)()
+            return _readiness_response(result)
+        return await self.get_response(request)
+
+
+__all__ = ["ProbeMiddleware", "readiness", "check_database", "check_cache"]
@@ -0,0 +1,103 @@
+import re
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.core.exceptions import MiddlewareNotUsed
+
+from shared.utils.ratelimit import RateLimit, get_ratelimit_settings, resolve_key, too_many_requests
+
+
+class Rule:
+    """
+    One `RATELIMIT["RULES"]` entry: requests whose path matches `path` (and
+    method is in `methods`) are limited per `key`.
+
+    Args:
+        name (str): Scope of the limit in Redis keys and metrics.
+        path (str): Regular expression searched in `request.path`.
+        rate (str): E.g. `"100/m"`.
+        key (str | callable): Identity spec (see `resolve_key`), default `"ip"`.
+        algorithm (str): `token_bucket` (default) or `sliding_window`.
+        burst (int, optional): Token bucket capacity.
+        methods (list[str], optional): Limited methods (default: all).
+        cost (int): Units consumed per request.
+    """
+
+    def __init__(
+        self, name, path, rate, key="ip", algorithm="token_bucket", burst=None, methods=None, cost=1
+    ):  # pylint: disable=too-many-arguments,too-many-positional-arguments
+        self.name = name
+        self.path = re.compile(path)
+        self.methods = {method.upper() for method in methods} if methods else None
+        self.identity = resolve_key(key)
+        self.cost = cost
+        self.limiter = RateLimit(rate, algorithm, burst, scope=name)
+
+    def identify(self, request):
+        """The identity to limit, or None when the rule does not apply."""
+        if self.methods is not None and request.method not in self.methods:
+            return None
+        if not self.path.search(request.path):
+            return None
+        return self.identity(request)
+
+
+class RateLimitMiddleware:
+    """
+    Apply the `RATELIMIT["RULES"]` limits before the view runs.
+
+    Every matching rule is checked; the first refusal answers with a
+    Matrix-style `M_LIMIT_EXCEEDED` 429 and `Retry-After`. Allowed responses
+    carry `RateLimit-Limit`/`RateLimit-Remaining` of the tightest rule. Place
+    it after `AuthenticationMiddleware` so `user` keys see `request.user`.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        config = get_ratelimit_settings()
+        if not config["ENABLED"] or not config["RULES"]:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.rules = [Rule(**rule) for rule in config["RULES"]]
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def _matches(self, request):
+        for rule in self.rules:
+            identity = rule.identify(request)
+            if identity is not None:
+                yield rule, identity
+
+    @staticmethod
+    def _finish(response, tightest):
+        if tightest is not None:
+            for header, value in tightest.headers().items():
+                response[header] = value
+        return response
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        tightest = None
+        for rule, identity in self._matches(request):
+            decision = rule.limiter.hit(identity, rule.cost)
+            if not decision.allowed:
+                return too_many_requests(decision)
+            if tightest is None or decision.remaining < tightest.remaining:
+                tightest = decision
+        return self._finish(self.get_response(request), tightest)
+
+    async def __acall__(self, request):
+        tightest = None
+        for rule, identity in self._matches(request):
+            decision = await rule.limiter.ahit(identity, rule.cost)
+            if not decision.allowed:
+                return too_many_requests(decision)
+            if tightest is None or decision.remaining < tightest.remaining:
+                tightest = decision
+        return self._finish(await self.get_response(request), tightest)
+
+
+__all__ = ["Rule", "RateLimitMiddleware"]
@@ -0,0 +1,61 @@
+import re
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from shared.utils.log import new_request_id, request_id_var
+
+# Accept caller-provided ids only if they look like ids (no log injection).
+VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+
+class RequestIdMiddleware:
+    """
+    Bind a request id to the current context for structured logging.
+
+    The id is taken from the incoming `REQUEST_ID_HEADER` (default
+    `X-Request-ID`) when a proxy already assigned one, otherwise generated. It
+    is exposed to every log record through `shared.utils.log.RequestIdFilter`,
+    stored on `request.request_id` and echoed in the response header.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.header = getattr(settings, "REQUEST_ID_HEADER", "X-Request-ID")
+        self.meta_key = "HTTP_" + self.header.upper().replace("-", "_")
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def _bind(self, request):
+        request_id = request.META.get(self.meta_key, "")
+        if not VALID_REQUEST_ID.match(request_id):
+            request_id = new_request_id()
+        request.request_id = request_id
+        return request_id_var.set(request_id)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token = self._bind(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            request_id_var.reset(token)
+        response[self.header] = request.request_id
+        return response
+
+    async def __acall__(self, request):
+        token = self._bind(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            request_id_var.reset(token)
+        response[self.header] = request.request_id
+        return response
+
+
+__all__ = ["RequestIdMiddleware"]
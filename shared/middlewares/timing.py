@@ -0,0 +1,191 @@
+import cProfile
+import importlib.util
+import random
+import re
+import threading
+import time
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils.crypto import constant_time_compare
+
+from shared.utils.instrumentation import RequestStats, install_query_timer, request_stats_var
+from shared.utils.metrics import observe_request
+
+DEFAULT_PROFILING = {
+    "ENABLED": False,  # allow on-demand profiling at all
+    "HEADER": "X-Profile",  # request header that triggers a capture
+    "TOKEN": "",  # required header value; the header is ignored while empty
+    "SAMPLE_RATE": 0.0,  # fraction of requests profiled without the header
+    "ENGINE": "cprofile",  # "cprofile" or "pyinstrument" (if installed)
+    "DIR": "profiles",  # output directory, relative to BASE_DIR
+}
+
+
+def view_name(request):
+    """Return a low-cardinality name for the resolved view (`unresolved` on 404s)."""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unresolved"
+    return match.view_name or match._func_path  # pylint: disable=protected-access
+
+
+class _HybridMiddleware:
+    """Base for middleware that runs natively in both WSGI and ASGI stacks."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+
+class ServerTimingMiddleware(_HybridMiddleware):
+    """
+    Record per-view latency, DB query count/time and cache hits/misses/time.
+
+    The totals of each request are exposed in a `Server-Timing` response header
+    (visible in browser dev tools), e.g.::
+
+        Server-Timing: app;dur=12.41, db;dur=3.05;desc="4 queries",
+                       cache;dur=0.82;desc="2 hits, 1 misses"
+
+    and every request is counted in the `/metrics` request counter and latency
+    histogram (`shared.utils.metrics.observe_request`).
+    Queries are timed by a wrapper installed on every DB connection, cache
+    calls by `InstrumentedRedisClient` and `AsyncCache`.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.header = getattr(settings, "SERVER_TIMING_HEADER", settings.DEBUG)
+        connection_created.connect(install_query_timer, dispatch_uid="shared.query_timer")
+        for connection in connections.all(initialized_only=True):
+            install_query_timer(None, connection)
+
+    def _finish(self, request, response, stats, token):
+        request_stats_var.reset(token)
+        elapsed = time.perf_counter() - stats.started
+        observe_request(view_name(request), request.method, response.status_code, elapsed)
+        if self.header:
+            response["Server-Timing"] = (
+                f"app;dur={elapsed * 1000:.2f}, "
+                f'db;dur={stats.db_time * 1000:.2f};desc="{stats.db_queries} queries", '
+                f'cache;dur={stats.cache_time * 1000:.2f};desc="{stats.cache_hits} hits, {stats.cache_misses} misses"'
+            )
+        return response
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = request_stats_var.set(stats)
+        request.stats = stats
+        response = self.get_response(request)
+        return self._finish(request, response, stats, token)
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = request_stats_var.set(stats)
+        request.stats = stats
+        response = await self.get_response(request)
+        return self._finish(request, response, stats, token)
+
+
+class ProfilingMiddleware(_HybridMiddleware):
+    """
+    Capture an on-demand profile of a request and write it to disk.
+
+    A request is profiled when `PROFILING["ENABLED"]` and either it carries the
+    `PROFILING["HEADER"]` header with `PROFILING["TOKEN"]` as value (the header
+    is ignored while no token is configured) or it is picked by
+    `PROFILING["SAMPLE_RATE"]`.
+    Profiles go to `PROFILING["DIR"]` as `.prof` files (cProfile, open with
+    `snakeviz` or `pstats`) or `.html` (pyinstrument, when installed and
+    selected). The file name is returned in the `X-Profile-File` header.
+
+    Under ASGI every request of a worker shares the event loop thread, and
+    only one cProfile can be active per thread: while one request is being
+    profiled with cProfile, the others are served unprofiled.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        config = {**DEFAULT_PROFILING, **getattr(settings, "PROFILING", {})}
+        self.enabled = config["ENABLED"]
+        self.meta_key = "HTTP_" + config["HEADER"].upper().replace("-", "_")
+        self.token = config["TOKEN"]
+        self.sample_rate = config["SAMPLE_RATE"]
+        self.engine = config["ENGINE"]
+        if self.engine == "pyinstrument" and importlib.util.find_spec("pyinstrument") is None:
+            self.engine = "cprofile"
+        directory = Path(config["DIR"])
+        self.directory = directory if directory.is_absolute() else Path(settings.BASE_DIR) / directory
+        self._local = threading.local()
+
+    def should_profile(self, request):
+        """Return True when `request` asked for a profile with the token, or is sampled."""
+        if not self.enabled:
+            return False
+        requested = request.META.get(self.meta_key)
+        if requested is not None and self.token:
+            return constant_time_compare(requested, self.token)
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def _start(self):
+        if self.engine == "pyinstrument":
+            from pyinstrument import Profiler  # pylint: disable=import-outside-toplevel,import-error
+
+            profiler = Profiler(async_mode="enabled" if self.async_mode else "disabled")
+            profiler.start()
+            return profiler
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def _stop(self, request, response, profiler):
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", view_name(request))[:80]
+        stem = f"{time.strftime('%Y%m%d-%H%M%S')}-{slug}-{getattr(request, 'request_id', '') or id(request)}"
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if self.engine == "pyinstrument":
+            profiler.stop()
+            path = self.directory / f"{stem}.html"
+            path.write_text(profiler.output_html(), encoding="utf-8")
+        else:
+            profiler.disable()
+            path = self.directory / f"{stem}.prof"
+            profiler.dump_stats(path)
+        response["X-Profile-File"] = path.name
+        return response
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.should_profile(request):
+            return self.get_response(request)
+        profiler = self._start()
+        response = self.get_response(request)
+        return self._stop(request, response, profiler)
+
+    async def __acall__(self, request):
+        exclusive = self.engine == "cprofile"
+        if not self.should_profile(request) or (exclusive and getattr(self._local, "busy", False)):
+            return await self.get_response(request)
+        # Note: cProfile is per thread, so under ASGI it also sees other
+        # coroutines interleaved on the event loop; prefer pyinstrument there.
+        self._local.busy = exclusive
+        try:
+            profiler = self._start()
+            response = await self.get_response(request)
+            return self._stop(request, response, profiler)
+        finally:
+            self._local.busy = False
+
+
+__all__ = ["ServerTimingMiddleware", "ProfilingMiddleware", "view_name"]
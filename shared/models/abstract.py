@@ -0,0 +1,259 @@
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import models
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Time-ordered ids: milliseconds since ID_EPOCH_MS (41 bits, until 2089), a
+# per-process node (10 bits) and a per-millisecond sequence (12 bits). Ids
+# grow with time like an auto-increment, but are generated without a database
+# round-trip (rows can be referenced before they are inserted) and map back
+# to their creation time, so a time range is an id range.
+#
+# Two processes sharing a node would produce the same ids in the same
+# millisecond, so each process leases its node in the CACHE alias (shared by
+# every worker of every host) and renews the lease while it runs. Without the
+# cache, a random node is used and a warning logged.
+ID_EPOCH_MS = 1_577_836_800_000  # 2020-01-01T00:00:00Z
+_NODE_BITS, _SEQUENCE_BITS = 10, 12
+
+DEFAULT_TIME_ORDERED_IDS = {
+    "CACHE": "default",  # cache alias holding the node leases
+    "LEASE_TTL": 600,  # seconds a node stays leased without renewal (renewed every third of it)
+}
+
+_NODE_KEY = "ids:node:{}"
+_NODE_COUNTER_KEY = "ids:node-counter"
+
+
+def get_time_ordered_id_settings():
+    """`DEFAULT_TIME_ORDERED_IDS` updated with the `TIME_ORDERED_IDS` setting."""
+    return {**DEFAULT_TIME_ORDERED_IDS, **getattr(settings, "TIME_ORDERED_IDS", {})}
+
+
+class _IdGenerator:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)  # forked workers lease their own node
+
+    def _reset(self):
+        self.node = None
+        self.token = None
+        self.renew_at = 0.0
+        self.last_ms = 0
+        self.sequence = 0
+
+    def _lease(self):
+        """Lease a node no other process holds, or renew the lease of ours."""
+        options = get_time_ordered_id_settings()
+        cache, ttl = caches[options["CACHE"]], options["LEASE_TTL"]
+        try:
+            if self.token is not None and cache.get(_NODE_KEY.format(self.node)) == self.token:
+                cache.touch(_NODE_KEY.format(self.node), ttl)
+            else:
+                self.node, self.token = self._acquire(cache, ttl)
+        except Exception:  # pylint: disable=broad-exception-caught
+            if self.node is None:
+                self.node = random.getrandbits(_NODE_BITS)
+                logger.warning("Could not lease an id node, using the random node %d", self.node, exc_info=True)
+            else:
+                logger.warning("Could not renew the lease of id node %d", self.node, exc_info=True)
+            self.renew_at = time.monotonic() + min(ttl / 3, 10)
+            return
+        self.renew_at = time.monotonic() + ttl / 3
+
+    @staticmethod
+    def _acquire(cache, ttl):
+        token = uuid.uuid4().hex
+        cache.add(_NODE_COUNTER_KEY, 0, timeout=None)
+        start = cache.incr(_NODE_COUNTER_KEY)  # spreads the workers starting together over the nodes
+        for offset in range(1 << _NODE_BITS):
+            node = (start + offset) & ((1 << _NODE_BITS) - 1)
+            if cache.add(_NODE_KEY.format(node), token, timeout=ttl):
+                return node, token
+        raise RuntimeError(f"All {1 << _NODE_BITS} id nodes are leased")
+
+    def __call__(self):
+        with self._lock:
+            if time.monotonic() >= self.renew_at:
+                self._lease()
+            now = time.time_ns() // 1_000_000 - ID_EPOCH_MS
+            if now <= self.last_ms:
+                now = self.last_ms  # same millisecond, or the clock stepped back
+                self.sequence = (self.sequence + 1) & ((1 << _SEQUENCE_BITS) - 1)
+                if self.sequence == 0:  # 4096 ids this millisecond: borrow the next one
+                    now += 1
+            else:
+                self.sequence = 0
+            self.last_ms = now
+            return (now << (_NODE_BITS + _SEQUENCE_BITS)) | (self.node << _SEQUENCE_BITS) | self.sequence
+
+
+_generator = _IdGenerator()
+
+
+def time_ordered_id():
+    """A new time-ordered id (see `TimeOrderedModel`)."""
+    return _generator()
+
+
+def time_ordered_id_floor(when):
+    """
+    The smallest time-ordered id generated at or after `when`.
+
+    Args:
+        when (datetime.datetime): An aware datetime.
+
+    Example:
+        Mapping.objects.filter(id__lt=time_ordered_id_floor(cutoff))
+    """
+    milliseconds = max(0, int(when.timestamp() * 1000) - ID_EPOCH_MS)
+    return milliseconds << (_NODE_BITS + _SEQUENCE_BITS)
+
+
+def time_ordered_id_time(value):
+    """The creation time of a time-ordered id, as an aware datetime."""
+    milliseconds = (value >> (_NODE_BITS + _SEQUENCE_BITS)) + ID_EPOCH_MS
+    return datetime.fromtimestamp(milliseconds / 1000, tz=dt_timezone.utc)
+
+
+class TimeOrderedIdField(models.BigIntegerField):
+    """A `bigint` primary key filled by `time_ordered_id` when the instance is created."""
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("primary_key", True)
+        kwargs.setdefault("default", time_ordered_id)
+        kwargs.setdefault("editable", False)
+        super().__init__(*args, **kwargs)
+
+
+class BaseModel(models.Model):
+    """
+    Abstract base of the project's tables: a `bigint` auto-increment id and
+    creation/modification timestamps.
+
+    `updated_at` is set by `save()`; `QuerySet.update()` and `bulk_update()`
+    leave it alone unless it is passed explicitly.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    created_at = models.DateTimeField(auto_now_add=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+        get_latest_by = "created_at"
+
+
+class TimeOrderedModel(BaseModel):
+    """
+    `BaseModel` with a time-ordered id (`time_ordered_id`) instead of a
+    sequence: ids are known before the insert, never contend on a sequence
+    and keep append-only tables physically ordered by time, which keeps BRIN
+    indexes small and precise.
+    """
+
+    id = TimeOrderedIdField()
+
+    class Meta(BaseModel.Meta):
+        abstract = True
+
+
+class SoftDeleteQuerySet(models.QuerySet):
+    """QuerySet whose `delete()` marks rows deleted instead of removing them."""
+
+    def delete(self):
+        """Mark the rows deleted; returns `(count, {label: count})` like `QuerySet.delete()`."""
+        count = self.update(deleted_at=timezone.now())
+        return count, {self.model._meta.label: count}
+
+    delete.queryset_only = True
+
+    def hard_delete(self):
+        """Delete the rows for good (cascades like a regular `delete()`)."""
+        return super().delete()
+
+    def restore(self):
+        """Undelete the rows."""
+        return self.update(deleted_at=None)
+
+    def alive(self):
+        """The rows not deleted (for `all_objects`)."""
+        return self.filter(deleted_at__isnull=True)
+
+    def deleted(self):
+        """The deleted rows only."""
+        return self.filter(deleted_at__isnull=False)
+
+
+class SoftDeleteManager(models.Manager.from_queryset(SoftDeleteQuerySet)):
+    """Default manager of soft-deletable models: hides deleted rows."""
+
+    def get_queryset(self):
+        """The rows not deleted."""
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
+class SoftDeleteModel(models.Model):
+    """
+    Abstract mixin for soft deletion: `delete()` sets `deleted_at`.
+
+    `objects` hides deleted rows, `all_objects` sees every row; use
+    `hard_delete()` to really remove one. Unique constraints still apply to
+    deleted rows: add `condition=Q(deleted_at__isnull=True)` to those that
+    should not.
+    """
+
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = SoftDeleteManager()
+    all_objects = SoftDeleteQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    @property
+    def is_deleted(self):
+        """Whether the row is soft-deleted."""
+        return self.deleted_at is not None
+
+    def delete(self, using=None, keep_parents=False):
+        """Mark the row deleted (related rows are left alone)."""
+        self.deleted_at = timezone.now()
+        self.save(using=using, update_fields=["deleted_at"])
+        return 1, {self._meta.label: 1}
+
+    def hard_delete(self, using=None, keep_parents=False):
+        """Delete the row for good, cascading like a regular `delete()`."""
+        return super().delete(using=using, keep_parents=keep_parents)
+
+    def restore(self, using=None):
+        """Undelete the row."""
+        self.deleted_at = None
+        self.save(using=using, update_fields=["deleted_at"])
+
+
+__all__ = [
+    "ID_EPOCH_MS",
+    "DEFAULT_TIME_ORDERED_IDS",
+    "get_time_ordered_id_settings",
+    "time_ordered_id",
+    "time_ordered_id_floor",
+    "time_ordered_id_time",
+    "TimeOrderedIdField",
+    "BaseModel",
+    "TimeOrderedModel",
+    "SoftDeleteQuerySet",
+    "SoftDeleteManager",
+    "SoftDeleteModel",
+]
@@ -0,0 +1,410 @@
+import re
+from datetime import datetime, timezone
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections, models
+from django.db.models.fields import AutoFieldMixin
+from django.db.migrations.operations.base import Operation
+from django.db.migrations.operations.models import CreateModel
+
+# Monthly range partitioning of append-only tables (PostgreSQL declarative
+# partitioning). Every month lives in its own `<table>_pYYYYMM` table and rows
+# outside the existing months fall in `<table>_default`. Dropping a month is a
+# catalog operation, where a DELETE would rewrite indexes and leave bloat for
+# VACUUM. The partition key is a `DateTimeField` or a `BigIntegerField` of
+# epoch milliseconds (Matrix `origin_server_ts`).
+#
+# PostgreSQL requires the partition key in the primary key and in every
+# unique constraint: the table's primary key becomes `(pk, key)` (Django
+# still sees `pk` alone) and `unique=True` fields are refused, use a
+# `UniqueConstraint` that includes the key. Other databases get a plain table.
+
+DEFAULT_PARTITIONS = {
+    "MONTHS_AHEAD": 3,  # months created in advance by `manage.py partitions --ensure`
+    "RETENTION_MONTHS": {},  # {"app_label.Model": months to keep, 0 keeps everything}
+}
+
+_PARTITION_NAME = re.compile(r"_p(\d{4})(\d{2})$")
+
+
+def get_partition_settings():
+    """`DEFAULT_PARTITIONS` updated with the `PARTITIONS` setting."""
+    return {**DEFAULT_PARTITIONS, **getattr(settings, "PARTITIONS", {})}
+
+
+class PartitionedModel(models.Model):
+    """
+    Abstract mixin of models stored in monthly partitions of `partition_key`.
+
+    The table itself is created by the `CreatePartitionedModel` or
+    `ConvertToPartitioned` migration operations; `manage.py partitions`
+    creates upcoming months and drops expired ones.
+    """
+
+    partition_key = None
+
+    class Meta:
+        abstract = True
+
+
+def partitioned_models():
+    """Every installed concrete model declaring a `partition_key`."""
+    return [
+        model
+        for model in apps.get_models()
+        if issubclass(model, PartitionedModel) and model.partition_key and not model._meta.proxy
+    ]
+
+
+def month_start(value):
+    """The first instant of the (UTC) month of `value`."""
+    return datetime(value.year, value.month, 1, tzinfo=timezone.utc)
+
+
+def add_months(month, count):
+    """The month `count` months after the month start `month` (before when negative)."""
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def partition_name(model, month):
+    """`<table>_pYYYYMM`."""
+    return f"{model._meta.db_table}_p{month:%Y%m}"
+
+
+def _bound_sql(model, month):
+    field = model._meta.get_field(model.partition_key)
+    if isinstance(field, models.DateTimeField):
+        return f"'{month.isoformat()}'"
+    return str(int(month.timestamp() * 1000))
+
+
+def _validate(model, key):
+    field = model._meta.get_field(key)
+    if not isinstance(field, (models.DateTimeField, models.BigIntegerField)):
+        raise ValueError(f"{model._meta.label}: partition key {key!r} must be a DateTimeField or BigIntegerField")
+    for local in model._meta.local_fields:
+        if local.unique and not local.primary_key:
+            raise ValueError(
+                f"{model._meta.label}.{local.name}: unique fields are not allowed on a partitioned table; "
+                f"use a UniqueConstraint that includes {key!r}"
+            )
+    for constraint in model._meta.constraints:
+        if isinstance(constraint, models.UniqueConstraint) and key not in constraint.fields:
+            raise ValueError(f"{model._meta.label}: constraint {constraint.name!r} must include {key!r}")
+
+
+def create_partitioned_table(schema_editor, model, key):
+    """Create `model`'s table partitioned by range of `key`, with its default partition."""
+    _validate(model, key)
+    quote = schema_editor.quote_name
+    table = model._meta.db_table
+    sql, params = schema_editor.table_sql(model)
+    # The inline PRIMARY KEY of the pk column becomes a table constraint on (pk, key).
+    sql = sql.replace(" PRIMARY KEY", "", 1)
+    sql = (
+        f"{sql[:-1]}, PRIMARY KEY ({quote(model._meta.pk.column)}, {quote(model._meta.get_field(key).column)}))"
+        f" PARTITION BY RANGE ({quote(model._meta.get_field(key).column)})"
+    )
+    schema_editor.execute(sql, params or None)
+    schema_editor.execute(f"CREATE TABLE {quote(table + '_default')} PARTITION OF {quote(table)} DEFAULT")
+    # Indexes are created on the parent, which creates them on every partition.
+    schema_editor.deferred_sql.extend(schema_editor._model_indexes_sql(model))  # pylint: disable=protected-access
+
+
+def _upcoming_months(months_ahead=None, now=None):
+    months_ahead = get_partition_settings()["MONTHS_AHEAD"] if months_ahead is None else months_ahead
+    current = month_start(now or datetime.now(timezone.utc))
+    return [add_months(current, offset) for offset in range(months_ahead + 1)]
+
+
+def _months_with_rows(cursor, quote, table, column, field):
+    expression = quote(column)
+    if not isinstance(field, models.DateTimeField):
+        expression = f"to_timestamp({expression} / 1000.0)"
+    cursor.execute(f"SELECT DISTINCT date_trunc('month', {expression} AT TIME ZONE 'UTC') FROM {quote(table)}")
+    return [month_start(row[0]) for row in cursor.fetchall() if row[0] is not None]
+
+
+def _drop_table_constraints(schema_editor, table):
+    """Free the constraint and index names of `table` (about to be dropped) for its replacement."""
+    quote = schema_editor.quote_name
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass", [table])
+        constraints = [row[0] for row in cursor.fetchall()]
+        for name in constraints:
+            cursor.execute(f"ALTER TABLE {quote(table)} DROP CONSTRAINT {quote(name)}")
+        cursor.execute("SELECT indexname FROM pg_indexes WHERE tablename = %s", [table])
+        for (name,) in cursor.fetchall():
+            cursor.execute(f"DROP INDEX {quote(name)}")
+
+
+def rebuild_table(schema_editor, model, key=None):
+    """
+    Recreate `model`'s table, partitioned by `key` (plain when None), and
+    move its rows over. Partitions are created for every month holding rows,
+    the current one and `PARTITIONS["MONTHS_AHEAD"]`.
+
+    The old table is renamed, stripped of its constraints and indexes (so the
+    new one can reuse their names), copied with one `INSERT ... SELECT` and
+    dropped. Everything runs in the migration's transaction and holds an
+    exclusive lock on the table until it commits: plan a maintenance window
+    for large tables.
+    """
+    quote = schema_editor.quote_name
+    table = model._meta.db_table
+    old = f"{table}_unpartitioned" if key else f"{table}_partitioned"
+    pk = model._meta.pk
+    columns = ", ".join(quote(field.column) for field in model._meta.local_concrete_fields)
+    schema_editor.execute(f"ALTER TABLE {quote(table)} RENAME TO {quote(old)}")
+    _drop_table_constraints(schema_editor, old)
+    if isinstance(pk, AutoFieldMixin):
+        # The identity sequence goes with the column; the new table gets its own.
+        schema_editor.execute(f"ALTER TABLE {quote(old)} ALTER COLUMN {quote(pk.column)} DROP IDENTITY IF EXISTS")
+    if key:
+        create_partitioned_table(schema_editor, model, key)
+        with schema_editor.connection.cursor() as cursor:
+            field = model._meta.get_field(key)
+            months = set(_months_with_rows(cursor, quote, old, field.column, field))
+        for month in sorted(months.union(_upcoming_months())):
+            create_partition(schema_editor, model, month)
+    else:
+        schema_editor.create_model(model)
+    schema_editor.execute(f"INSERT INTO {quote(table)} ({columns}) SELECT {columns} FROM {quote(old)}")
+    if isinstance(pk, AutoFieldMixin):
+        schema_editor.execute(
+            f"SELECT setval(pg_get_serial_sequence(%s, %s), COALESCE(MAX({quote(pk.column)}), 0) + 1, false)"
+            f" FROM {quote(table)}",
+            [table, pk.column],
+        )
+    schema_editor.execute(f"DROP TABLE {quote(old)} CASCADE")
+
+
+def create_partition(schema_editor, model, month):
+    """
+    Create the partition of `month` unless it exists.
+
+    Rows of that month already in the default partition (a timestamp past
+    the months created in advance) are moved to it: the default partition
+    is detached, the month created and filled from it, and the default
+    partition attached again, which scans it once.
+    """
+    quote = schema_editor.quote_name
+    table, name = model._meta.db_table, partition_name(model, month)
+    default = f"{table}_default"
+    lower, upper = _bound_sql(model, month), _bound_sql(model, add_months(month, 1))
+    column = quote(model._meta.get_field(model.partition_key).column)
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT to_regclass(%s) IS NULL AND EXISTS (SELECT 1 FROM {quote(default)} "
+            f"WHERE {column} >= {lower} AND {column} < {upper})",
+            [quote(name)],
+        )
+        move = cursor.fetchone()[0]
+    if move:
+        schema_editor.execute(f"ALTER TABLE {quote(table)} DETACH PARTITION {quote(default)}")
+    schema_editor.execute(
+        f"CREATE TABLE IF NOT EXISTS {quote(name)} PARTITION OF {quote(table)} FOR VALUES FROM ({lower}) TO ({upper})"
+    )
+    if move:
+        columns = ", ".join(quote(field.column) for field in model._meta.local_concrete_fields)
+        condition = f"{column} >= {lower} AND {column} < {upper}"
+        schema_editor.execute(
+            f"INSERT INTO {quote(name)} ({columns}) SELECT {columns} FROM {quote(default)} WHERE {condition}"
+        )
+        schema_editor.execute(f"DELETE FROM {quote(default)} WHERE {condition}")
+        schema_editor.execute(f"ALTER TABLE {quote(table)} ATTACH PARTITION {quote(default)} DEFAULT")
+    return name
+
+
+def list_partitions(model, using="default"):
+    """
+    The partitions of `model`, oldest first.
+
+    Returns:
+        list[tuple]: `(name, month or None for the default partition, estimated rows, bytes)`.
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname, c.reltuples::bigint, pg_total_relation_size(c.oid) FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = %s::regclass ORDER BY c.relname",
+            [model._meta.db_table],
+        )
+        rows = cursor.fetchall()
+    partitions = []
+    for name, estimate, size in rows:
+        match = _PARTITION_NAME.search(name)
+        month = datetime(int(match[1]), int(match[2]), 1, tzinfo=timezone.utc) if match else None
+        partitions.append((name, month, max(estimate, 0), size))
+    return sorted(partitions, key=lambda partition: (partition[1] is not None, partition[1] or 0))
+
+
+def is_partitioned(model, using="default"):
+    """Whether `model`'s table is a partitioned PostgreSQL table."""
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)", [model._meta.db_table]
+        )
+        return cursor.fetchone() is not None
+
+
+def ensure_partitions(model, months_ahead=None, using="default", now=None):
+    """
+    Create the partitions of the current month and `months_ahead` following ones.
+
+    Returns:
+        list[str]: Names of the partitions (created or already there).
+    """
+    with connections[using].schema_editor() as schema_editor:
+        return [create_partition(schema_editor, model, month) for month in _upcoming_months(months_ahead, now)]
+
+
+def drop_partitions(model, keep_months, using="default", now=None, dry_run=False):
+    """
+    Drop the monthly partitions entirely older than the last `keep_months` months.
+
+    Each one is detached, then dropped: no row-by-row DELETE, no bloat. The
+    default partition is never dropped.
+
+    Returns:
+        list[tuple]: The dropped `(name, month, estimated rows, bytes)`.
+    """
+    cutoff = add_months(month_start(now or datetime.now(timezone.utc)), -keep_months)
+    expired = [partition for partition in list_partitions(model, using) if partition[1] and partition[1] < cutoff]
+    if dry_run or not expired:
+        return expired
+    with connections[using].schema_editor() as schema_editor:
+        quote = schema_editor.quote_name
+        for name, *_ in expired:
+            schema_editor.execute(f"ALTER TABLE {quote(model._meta.db_table)} DETACH PARTITION {quote(name)}")
+            schema_editor.execute(f"DROP TABLE {quote(name)}")
+    return expired
+
+
+class CreatePartitionedModel(CreateModel):
+    """
+    `CreateModel` whose table is range-partitioned by month of `partition_key`
+    on PostgreSQL (with the current and the next `months_ahead` partitions).
+    Write it in place of the `CreateModel` that `makemigrations` generated.
+    """
+
+    def __init__(self, name, fields, partition_key, months_ahead=None, **kwargs):
+        self.partition_key = partition_key
+        self.months_ahead = months_ahead
+        super().__init__(name, fields, **kwargs)
+
+    def deconstruct(self):
+        name, args, kwargs = super().deconstruct()
+        kwargs["partition_key"] = self.partition_key
+        if self.months_ahead is not None:
+            kwargs["months_ahead"] = self.months_ahead
+        return name, args, kwargs
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != "postgresql":
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        model = to_state.apps.get_model(app_label, self.name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return None
+        model.partition_key = self.partition_key
+        create_partitioned_table(schema_editor, model, self.partition_key)
+        for month in _upcoming_months(self.months_ahead):
+            create_partition(schema_editor, model, month)
+        return None
+
+    def describe(self):
+        return f"Create model {self.name} partitioned by {self.partition_key}"
+
+
+class ConvertToPartitioned(Operation):
+    """
+    Rebuild an existing table as monthly partitions of `partition_key`
+    (see `rebuild_table`). Reversible.
+
+    `operations` are the model changes the partitioned table needs (dropping
+    `unique=True`, a `UniqueConstraint` with the key, new indexes). On
+    PostgreSQL they only change the migration state, since the rebuilt table
+    is created from the final state, which spares building indexes on a
+    table about to be dropped. Elsewhere they run as usual and the table
+    stays plain.
+    """
+
+    reversible = True
+    reduces_to_sql = False
+
+    def __init__(self, model_name, partition_key, operations=()):
+        self.model_name = model_name
+        self.partition_key = partition_key
+        self.operations = list(operations)
+
+    def deconstruct(self):
+        kwargs = {"model_name": self.model_name, "partition_key": self.partition_key}
+        if self.operations:
+            kwargs["operations"] = self.operations
+        return self.__class__.__name__, [], kwargs
+
+    def state_forwards(self, app_label, state):
+        for operation in self.operations:
+            operation.state_forwards(app_label, state)
+
+    def _rebuilds(self, schema_editor, model):
+        return schema_editor.connection.vendor == "postgresql" and self.allow_migrate_model(
+            schema_editor.connection.alias, model
+        )
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self._rebuilds(schema_editor, model):
+            model.partition_key = self.partition_key
+            rebuild_table(schema_editor, model, self.partition_key)
+            return
+        for operation in self.operations:
+            state = from_state.clone()
+            operation.state_forwards(app_label, state)
+            operation.database_forwards(app_label, schema_editor, from_state, state)
+            from_state = state
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self._rebuilds(schema_editor, model):
+            rebuild_table(schema_editor, model)
+            return
+        states = [to_state]
+        for operation in self.operations[:-1]:
+            state = states[-1].clone()
+            operation.state_forwards(app_label, state)
+            states.append(state)
+        for operation, state in zip(reversed(self.operations), reversed(states)):
+            after = state.clone()
+            operation.state_forwards(app_label, after)
+            operation.database_backwards(app_label, schema_editor, after, state)
+
+    def describe(self):
+        return f"Convert {self.model_name} to monthly partitions of {self.partition_key}"
+
+    @property
+    def migration_name_fragment(self):
+        return f"partition_{self.model_name.lower()}"
+
+
+__all__ = [
+    "get_partition_settings",
+    "PartitionedModel",
+    "partitioned_models",
+    "month_start",
+    "add_months",
+    "partition_name",
+    "create_partitioned_table",
+    "rebuild_table",
+    "create_partition",
+    "list_partitions",
+    "is_partitioned",
+    "ensure_partitions",
+    "drop_partitions",
+    "CreatePartitionedModel",
+    "ConvertToPartitioned",
+]
@@ -0,0 +1,60 @@
+import abc
+
+
+class ProtocolAdapter(abc.ABC):
+    """
+    Base class of bridge protocol adapters (group `protocols`).
+
+    An adapter connects the bridge to one remote network: it is started with
+    the bridge, receives the Matrix events to relay with `deliver()` and
+    feeds remote messages back through the bridge itself.
+
+    Args:
+        config (dict, optional): The adapter's settings.
+    """
+
+    protocol = None  # set by `@protocol_adapter("<name>")`
+
+    def __init__(self, config=None):
+        self.config = config or {}
+
+    async def start(self):
+        """Connect to the remote network."""
+
+    async def stop(self):
+        """Disconnect; pending deliveries may be dropped."""
+
+    @abc.abstractmethod
+    async def deliver(self, event):
+        """
+        Relay a Matrix event to the remote network.
+
+        Args:
+            event (shared.types.RoomEvent): The event, already transformed.
+        """
+
+
+class MessageTransformer:
+    """
+    Base class of message transformers (group `transformers`).
+
+    Transformers rewrite events on their way between Matrix and a remote
+    network (formatting, mentions, media links). They run in ascending
+    `priority` order.
+    """
+
+    name = None  # set by `@message_transformer("<name>")`
+    priority = 100
+
+    def transform(self, event):
+        """
+        Args:
+            event (shared.types.RoomEvent): The event to rewrite.
+
+        Returns:
+            shared.types.RoomEvent: The event to pass on, or None to drop it.
+        """
+        return event
+
+
+__all__ = ["ProtocolAdapter", "MessageTransformer"]
@@ -0,0 +1,419 @@
+import ast
+import importlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from importlib import metadata
+from pathlib import Path
+
+from shared.signals import Signal
+from shared.utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+GROUPS = ("protocols", "transformers")
+ENTRY_POINT_PREFIX = "matrix_meta."
+MANIFEST_VERSION = 1
+# When two sources register the same name, the lower rank wins.
+SOURCE_RANK = {"settings": 0, "local": 1, "entry_point": 2}
+
+# Sent once per plugin after its first import, with `group`, `name`,
+# `source` and `seconds`: the hook for reporting slow plugins.
+plugin_loaded = Signal(name="plugins.loaded")
+
+_DECORATORS = {"protocol_adapter": "protocols", "message_transformer": "transformers"}
+
+
+@dataclass(slots=True)
+class PluginSpec:
+    """
+    What is known about a plugin before it is imported.
+
+    `target` is `module:attribute`, like an entry point value. `source` is
+    `local` (found in the project), `entry_point` or `settings`.
+    """
+
+    group: str
+    name: str
+    target: str
+    source: str
+    description: str = ""
+    distribution: str = ""
+
+    def as_dict(self):
+        """The spec as stored in the manifest."""
+        return {
+            "group": self.group,
+            "name": self.name,
+            "target": self.target,
+            "source": self.source,
+            "description": self.description,
+            "distribution": self.distribution,
+        }
+
+
+def scan_plugin_file(path, module):
+    """
+    Statically find the plugins declared in a module without importing it.
+
+    Looks for top-level classes and functions decorated with
+    `@protocol_adapter("<name>")` or `@message_transformer("<name>")`, the
+    same way `scripts/main.py` reads Typer commands.
+
+    Args:
+        path (Path): The source file.
+        module (str): Its dotted module path.
+
+    Returns:
+        list[dict]: `PluginSpec` fields of every declared plugin.
+    """
+    tree = ast.parse(path.read_text(encoding="utf-8"), filename=str(path))
+    found = []
+    for node in tree.body:
+        if not isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        for decorator in node.decorator_list:
+            if not (isinstance(decorator, ast.Call) and decorator.args and isinstance(decorator.args[0], ast.Constant)):
+                continue
+            func = decorator.func
+            name = func.attr if isinstance(func, ast.Attribute) else getattr(func, "id", None)
+            if name not in _DECORATORS:
+                continue
+            doc = (ast.get_docstring(node) or "").strip().splitlines()
+            found.append(
+                {
+                    "group": _DECORATORS[name],
+                    "name": decorator.args[0].value,
+                    "target": f"{module}:{node.name}",
+                    "source": "local",
+                    "description": doc[0] if doc else "",
+                    "distribution": "",
+                }
+            )
+    return found
+
+
+def _entry_point_fingerprint():
+    """
+    `sys.path` directories with their mtimes: installing or removing a
+    distribution adds or deletes its `*.dist-info` there, so an unchanged
+    fingerprint means the cached entry points are still valid.
+    """
+    fingerprint = []
+    for entry in sys.path:
+        try:
+            fingerprint.append([entry, os.stat(entry or ".").st_mtime_ns])
+        except OSError:
+            continue
+    return fingerprint
+
+
+class PluginRegistry:  # pylint: disable=too-many-instance-attributes
+    """
+    Lazily loaded plugins by group (`GROUPS`) and name.
+
+    Discovery never imports plugin code: local plugins are read from the
+    source files matching `patterns` (re-parsed only when a file's mtime or
+    size changes) and entry points (`matrix_meta.<group>`) are cached
+    until a `sys.path` directory changes, both in the JSON `manifest`. So
+    listing plugins costs a glob and a few `stat` calls however many bridges
+    are installed; a plugin's module is imported by the first `get()`.
+
+    Args:
+        root (Path): Project root the `patterns` and module paths are relative to.
+        patterns (tuple[str]): Globs of local plugin modules.
+        manifest (Path, optional): Cache file; discovery is not cached without it.
+        entry_points (bool): Also discover installed distributions' entry points.
+        extra (dict, optional): `{group: {name: "module:attribute"}}` from settings.
+        disabled (list[str], optional): `group:name` plugins to hide.
+    """
+
+    def __init__(
+        self, root, patterns, manifest=None, entry_points=True, extra=None, disabled=None
+    ):  # pylint: disable=too-many-arguments,too-many-positional-arguments
+        self.root = Path(root)
+        self.patterns = tuple(patterns)
+        self.manifest = Path(manifest) if manifest else None
+        self.entry_points = entry_points
+        self.extra = extra or {}
+        self.disabled = set(disabled or ())
+        self._specs = None
+        self._loaded = {}
+        self._load_times = {}
+        self._lock = threading.RLock()
+
+    def _read_manifest(self):
+        if self.manifest is None:
+            return {}
+        try:
+            cached = json.loads(self.manifest.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        return cached if cached.get("version") == MANIFEST_VERSION else {}
+
+    def _write_manifest(self, data):
+        try:
+            self.manifest.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.manifest.with_suffix(f".{os.getpid()}.tmp")
+            tmp_file.write_text(json.dumps(data), encoding="utf-8")
+            tmp_file.replace(self.manifest)
+        except OSError:
+            pass  # read-only checkout: keep working from the in-memory scan
+
+    def _scan_local(self, cached_files):
+        files, changed = {}, False
+        for pattern in self.patterns:
+            for path in sorted(self.root.glob(pattern)):
+                key = path.relative_to(self.root).as_posix()
+                stat = path.stat()
+                entry = cached_files.get(key)
+                if entry is None or entry["mtime_ns"] != stat.st_mtime_ns or entry["size"] != stat.st_size:
+                    module = key.removesuffix(".py").removesuffix("/__init__").replace("/", ".")
+                    try:
+                        plugins = scan_plugin_file(path, module)
+                    except (OSError, SyntaxError, UnicodeDecodeError) as e:
+                        logger.warning("Could not scan plugin module %s: %s", key, e)
+                        plugins = []
+                    entry = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "plugins": plugins}
+                    changed = True
+                files[key] = entry
+        return files, changed or files.keys() != cached_files.keys()
+
+    def _scan_entry_points(self, cached):
+        fingerprint = _entry_point_fingerprint()
+        if cached.get("fingerprint") == fingerprint:
+            return cached, False
+        plugins = []
+        installed = metadata.entry_points()  # one pass over the installed distributions
+        for group in GROUPS:
+            for entry_point in installed.select(group=ENTRY_POINT_PREFIX + group):
+                distribution = getattr(entry_point, "dist", None)
+                plugins.append(
+                    {
+                        "group": group,
+                        "name": entry_point.name,
+                        "target": entry_point.value,
+                        "source": "entry_point",
+                        "description": "",
+                        "distribution": distribution.name if distribution else "",
+                    }
+                )
+        return {"fingerprint": fingerprint, "plugins": plugins}, True
+
+    def discover(self):
+        """
+        (Re)build the plugin specs from the manifest, the sources and the
+        entry points.
+
+        Returns:
+            dict: `{group: {name: PluginSpec}}`.
+        """
+        cached = self._read_manifest()
+        files, files_changed = self._scan_local(cached.get("files", {}))
+        entry_points, entry_points_changed = ({}, False)
+        if self.entry_points:
+            entry_points, entry_points_changed = self._scan_entry_points(cached.get("entry_points", {}))
+        if self.manifest is not None and (files_changed or entry_points_changed):
+            self._write_manifest({"version": MANIFEST_VERSION, "files": files, "entry_points": entry_points})
+
+        specs = {group: {} for group in GROUPS}
+        found = [plugin for entry in files.values() for plugin in entry["plugins"]]
+        found += entry_points.get("plugins", [])
+        found += [
+            {"group": group, "name": name, "target": target, "source": "settings"}
+            for group, targets in self.extra.items()
+            for name, target in targets.items()
+        ]
+        for plugin in found:
+            spec = PluginSpec(**plugin)
+            if spec.group not in specs or f"{spec.group}:{spec.name}" in self.disabled:
+                continue
+            previous = specs[spec.group].get(spec.name)
+            if previous is not None:
+                winner, loser = sorted((previous, spec), key=lambda candidate: SOURCE_RANK[candidate.source])
+                if winner.target != loser.target:
+                    logger.warning("Plugin %s:%s: %s shadows %s", spec.group, spec.name, winner.target, loser.target)
+                spec = winner
+            specs[spec.group][spec.name] = spec
+        with self._lock:
+            self._specs = specs
+        return specs
+
+    @property
+    def specs(self):
+        """`PluginSpec`s by group and name, discovered on first use."""
+        if self._specs is None:
+            with self._lock:
+                if self._specs is None:
+                    self.discover()
+        return self._specs
+
+    def names(self, group):
+        """Registered plugin names of `group`, without importing any of them."""
+        return sorted(self.specs.get(group, ()))
+
+    def spec(self, group, name):
+        """`PluginSpec` of a plugin; raises LookupError for an unknown one."""
+        try:
+            return self.specs[group][name]
+        except KeyError:
+            raise LookupError(f"No plugin {name!r} in group {group!r}") from None
+
+    def get(self, group, name):
+        """
+        The plugin object (usually a class), imported on first use.
+
+        Raises:
+            LookupError: When no such plugin is registered.
+            ImportError: When its module or attribute cannot be imported.
+        """
+        key = (group, name)
+        loaded = self._loaded.get(key)
+        if loaded is not None:
+            return loaded
+        spec = self.spec(group, name)
+        with self._lock:
+            if key in self._loaded:
+                return self._loaded[key]
+            module_path, _, attribute = spec.target.partition(":")
+            started = time.perf_counter()
+            plugin = importlib.import_module(module_path)
+            for part in filter(None, attribute.split(".")):
+                try:
+                    plugin = getattr(plugin, part)
+                except AttributeError as e:
+                    raise ImportError(f"Plugin {group}:{name}: {spec.target} not found") from e
+            seconds = time.perf_counter() - started
+            self._loaded[key] = plugin
+            self._load_times[key] = seconds
+        logger.debug("Loaded plugin %s:%s in %.1f ms", group, name, seconds * 1000)
+        plugin_loaded.send(sender=PluginRegistry, group=group, name=name, source=spec.source, seconds=seconds)
+        return plugin
+
+    def load_all(self, group):
+        """Import every plugin of `group`; broken ones are logged and skipped."""
+        loaded = {}
+        for name in self.names(group):
+            try:
+                loaded[name] = self.get(group, name)
+            except ImportError:
+                logger.exception("Could not load plugin %s:%s", group, name)
+        return loaded
+
+    def register(self, group, name, target):
+        """
+        Register a plugin at runtime, over any discovered one of that name.
+
+        Args:
+            group (str): One of `GROUPS`.
+            name (str): Plugin name.
+            target (str | object): `module:attribute`, imported on first use,
+                or the plugin object itself.
+        """
+        if group not in GROUPS:
+            raise ValueError(f"Unknown plugin group {group!r}; expected one of {', '.join(GROUPS)}")
+        with self._lock:
+            if isinstance(target, str):
+                self.specs[group][name] = PluginSpec(group, name, target, "settings")
+                self._loaded.pop((group, name), None)
+                return
+            self.specs[group][name] = PluginSpec(group, name, f"{target.__module__}:{target.__qualname__}", "settings")
+            self._loaded[(group, name)] = target
+
+    def load_times(self):
+        """Seconds each loaded plugin's import took, by `(group, name)`."""
+        return dict(self._load_times)
+
+    def is_loaded(self, group, name):
+        """Whether the plugin's module was already imported by `get()`."""
+        return (group, name) in self._loaded
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_plugins():
+    """The project `PluginRegistry`, configured by `settings.PLUGINS`."""
+    global _registry  # pylint: disable=global-statement
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                from django.conf import settings  # pylint: disable=import-outside-toplevel
+
+                config = getattr(settings, "PLUGINS", {})
+                _registry = PluginRegistry(
+                    config.get("ROOT", settings.BASE_DIR),
+                    config.get("PATTERNS", ("services/*/plugins.py", "services/*/plugins/*.py")),
+                    manifest=config.get("MANIFEST"),
+                    entry_points=config.get("ENTRY_POINTS", True),
+                    extra=config.get("EXTRA"),
+                    disabled=config.get("DISABLED"),
+                )
+    return _registry
+
+
+def protocol_adapter(name):
+    """
+    Declare a `ProtocolAdapter` subclass as the `protocols` plugin `name`.
+
+    The decorator only names the class: the manifest scan reads it from the
+    source, so the module is imported when the adapter is first used. Classes
+    outside the scanned modules are registered with `PluginRegistry.register`.
+
+    Example:
+        @protocol_adapter("irc")
+        class IRCAdapter(ProtocolAdapter):
+            ...
+    """
+
+    def decorator(cls):
+        cls.protocol = name
+        return cls
+
+    return decorator
+
+
+def message_transformer(name):
+    """Declare a `MessageTransformer` subclass as the `transformers` plugin `name`."""
+
+    def decorator(cls):
+        cls.name = name
+        return cls
+
+    return decorator
+
+
+def transformers():
+    """Instances of every enabled `MessageTransformer`, in `priority` order."""
+    registry = get_plugins()
+    loaded = registry.load_all("transformers").values()
+    return sorted((transformer() for transformer in loaded), key=lambda transformer: transformer.priority)
+
+
+@REGISTRY.add_collector
+def plugin_collector():
+    """Import time of the plugins this process has loaded."""
+    if _registry is None:
+        return []
+    samples = [
+        ({"group": group, "plugin": name}, seconds) for (group, name), seconds in _registry.load_times().items()
+    ]
+    return [("plugin_load_seconds", "gauge", "Time the first import of a plugin took.", samples)] if samples else []
+
+
+__all__ = [
+    "GROUPS",
+    "PluginSpec",
+    "PluginRegistry",
+    "plugin_loaded",
+    "scan_plugin_file",
+    "get_plugins",
+    "protocol_adapter",
+    "message_transformer",
+    "transformers",
+]
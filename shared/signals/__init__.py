@@ -0,0 +1 @@
+from .bus import *
@@ -0,0 +1,519 @@
+import asyncio
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+import weakref
+
+from asgiref.sync import iscoroutinefunction
+from django import dispatch
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils.inspect import func_accepts_kwargs
+
+from shared.utils.metrics import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("block", "drop")
+
+signal_deliveries = Counter(
+    "signal_deliveries",
+    "Queued signal deliveries by signal, receiver and result.",
+    ("signal", "receiver", "result"),
+)
+signal_queue_wait = Histogram(
+    "signal_queue_wait_seconds", "Time queued signal deliveries waited for their receiver.", ("signal", "receiver")
+)
+signal_receiver_duration = Histogram(
+    "signal_receiver_duration_seconds", "Run time of queued signal receivers.", ("signal", "receiver")
+)
+
+_signals = weakref.WeakSet()
+
+
+class _ReceiverThreads:
+    """
+    Daemon threads running the synchronous receivers for the bus loop.
+
+    Used instead of a `ThreadPoolExecutor`, which refuses new work once the
+    interpreter starts exiting: `flush_signals` runs from `atexit` and still
+    needs the receivers to run.
+    """
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._idle = 0  # threads done with their last call, waiting for the next one
+        self._threads = []
+
+    async def run(self, func, *args):
+        """Run `func(*args)` on one of the threads and wait for its result."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.put((loop, future, func, args))
+        with self._lock:
+            if self._idle:
+                self._idle -= 1
+            elif len(self._threads) < self.max_workers:
+                thread = threading.Thread(target=self._work, name=f"signal-bus_{len(self._threads)}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        return await future
+
+    def _work(self):
+        while True:
+            loop, future, func, args = self._queue.get()
+            try:
+                result = func(*args)
+            except BaseException as e:  # pylint: disable=broad-exception-caught
+                loop.call_soon_threadsafe(_resolve, future, None, e)
+            else:
+                loop.call_soon_threadsafe(_resolve, future, result, None)
+            with self._lock:
+                self._idle += 1
+
+
+def _resolve(future, result, exception):
+    if future.cancelled():
+        return
+    if exception is not None:
+        future.set_exception(exception)
+    else:
+        future.set_result(result)
+
+
+class _BusLoop:
+    """
+    The event loop, on a daemon thread, that runs every queued receiver of
+    the process, and the threads its synchronous receivers run in.
+
+    Both are created on first use and again in a forked child, whose copy of
+    the parent's thread is not running.
+    """
+
+    def __init__(self, max_workers=8):
+        self.max_workers = max_workers
+        self.loop = None
+        self.threads = None
+        self._thread = None
+        self._lock = threading.Lock()
+        os.register_at_fork(after_in_child=self._forget)
+
+    def get(self):
+        """Event loop of the bus, started on first use."""
+        if self.loop is None:
+            with self._lock:
+                if self.loop is None:
+                    self._start()
+        return self.loop
+
+    def _start(self):
+        loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(loop)
+            loop.call_soon(ready.set)
+            loop.run_forever()
+
+        thread = threading.Thread(target=run, name="signal-bus", daemon=True)
+        thread.start()
+        ready.wait()
+        self.threads = _ReceiverThreads(self.max_workers)
+        self._thread = thread
+        self.loop = loop
+
+    def _forget(self):
+        # Only the forking thread survives in the child: start over.
+        self.loop = self.threads = self._thread = None
+        self._lock = threading.Lock()
+
+    def in_loop_thread(self):
+        """Whether the caller runs on the bus loop (where waiting for the bus would deadlock)."""
+        return self._thread is not None and threading.current_thread() is self._thread
+
+
+_bus = _BusLoop()
+
+
+def _make_id(target):
+    # Identity of a receiver or sender, as Django keys its receivers: bound
+    # methods are recreated on every attribute access, so use their parts.
+    if hasattr(target, "__func__"):
+        return (id(target.__self__), id(target.__func__))
+    return id(target)
+
+
+NONE_ID = _make_id(None)
+
+
+def _receiver_name(receiver):
+    receiver = getattr(receiver, "__func__", receiver)
+    name = getattr(receiver, "__qualname__", None) or type(receiver).__qualname__
+    return f"{getattr(receiver, '__module__', None) or type(receiver).__module__}.{name}"
+
+
+def _default_coalesce_key(sender, **named):
+    try:
+        return hash((sender, tuple(sorted(named.items()))))
+    except TypeError:  # unhashable argument values (lists, dicts)
+        return (id(sender), repr(sorted(named.items())))
+
+
+class _Channel:  # pylint: disable=too-many-instance-attributes
+    """Bounded queue of one queued receiver, drained by `concurrency` tasks on the bus loop."""
+
+    def __init__(
+        self, signal, receiver, weak, queue_size, overflow, block_timeout, coalesce, coalesce_key, concurrency
+    ):  # pylint: disable=too-many-arguments,too-many-positional-arguments
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy {overflow!r}, expected one of {OVERFLOW_POLICIES}")
+        self.signal = signal
+        self.name = _receiver_name(receiver)
+        self.is_async = iscoroutinefunction(receiver)
+        if weak:
+            is_method = hasattr(receiver, "__self__") and hasattr(receiver, "__func__")
+            self._ref = weakref.WeakMethod(receiver) if is_method else weakref.ref(receiver)
+        else:
+            self._ref = lambda: receiver
+        self.queue_size = queue_size
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.coalesce = coalesce
+        self.coalesce_key = coalesce_key or _default_coalesce_key
+        self.concurrency = concurrency
+        self.slots = threading.BoundedSemaphore(queue_size)
+        self.pending = {}  # coalesce key -> [sender, named, enqueued_at]
+        self.lock = threading.Lock()
+        self.counts = dict.fromkeys(("delivered", "failed", "dropped", "coalesced"), 0)
+        self.outstanding = 0
+        self.wait_time = self.run_time = self.max_run_time = 0.0
+        self._queue = None
+        self._loop = None
+        self._tasks = []
+
+    @property
+    def receiver(self):
+        """The receiver, or None once a weakly referenced one was garbage collected."""
+        return self._ref()
+
+    def _count(self, result):
+        with self.lock:
+            self.counts[result] += 1
+        signal_deliveries.inc(1, self.signal.name, self.name, result)
+
+    # Sender side (any thread) ------------------------------------------
+
+    def _coalesced(self, sender, named):
+        if not self.coalesce:
+            return None, False
+        key = self.coalesce_key(sender=sender, **named)
+        with self.lock:
+            entry = self.pending.get(key)
+            if entry is not None:
+                entry[0], entry[1] = sender, named  # the latest arguments win
+                self.counts["coalesced"] += 1
+        if entry is not None:
+            signal_deliveries.inc(1, self.signal.name, self.name, "coalesced")
+        return key, entry is not None
+
+    # A slot is released by the consumer that takes the delivery off the queue.
+    # pylint: disable=consider-using-with
+
+    def put(self, sender, named):
+        """Queue a delivery, blocking up to `block_timeout` when the queue is full."""
+        key, coalesced = self._coalesced(sender, named)
+        if coalesced:
+            return
+        if not self.slots.acquire(blocking=False):
+            # The bus thread must never wait for itself to make room.
+            if (
+                self.overflow != "block"
+                or _bus.in_loop_thread()
+                or not self.slots.acquire(timeout=self.block_timeout)
+            ):
+                self._count("dropped")
+                return
+        self._enqueue(key, sender, named)
+
+    async def aput(self, sender, named):
+        """`put` for coroutines: waits for room without blocking the event loop."""
+        key, coalesced = self._coalesced(sender, named)
+        if coalesced:
+            return
+        acquired = self.slots.acquire(blocking=False)
+        if not acquired and self.overflow == "block":
+            deadline = time.monotonic() + self.block_timeout
+            while not acquired and time.monotonic() < deadline:
+                await asyncio.sleep(0.005)
+                acquired = self.slots.acquire(blocking=False)
+        if not acquired:
+            self._count("dropped")
+            return
+        self._enqueue(key, sender, named)
+
+    # pylint: enable=consider-using-with
+
+    def _enqueue(self, key, sender, named):
+        with self.lock:
+            self.outstanding += 1
+            if key is not None:
+                self.pending[key] = [sender, named, time.perf_counter()]
+        loop = _bus.get()
+        if key is None:
+            loop.call_soon_threadsafe(self._push, loop, (sender, named, time.perf_counter()))
+        else:
+            loop.call_soon_threadsafe(loop.call_later, self.coalesce, self._flush_pending, loop, key)
+
+    # Bus side (bus loop thread) ------------------------------------------
+
+    def _push(self, loop, item):
+        if self._loop is not loop:
+            self._start(loop)
+        self._queue.put_nowait(item)
+
+    def _flush_pending(self, loop, key):
+        with self.lock:
+            entry = self.pending.pop(key, None)
+        if entry is None:
+            # Two senders raced to open the same window; one delivery carries both.
+            self.slots.release()
+            self._done()
+            return
+        self._push(loop, tuple(entry))
+
+    def _start(self, loop):
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._tasks = [loop.create_task(self._consume()) for _ in range(self.concurrency)]
+
+    def _done(self):
+        with self.lock:
+            self.outstanding -= 1
+
+    def _call(self, receiver, sender, named):
+        try:
+            return receiver(signal=self.signal, sender=sender, **named)
+        finally:
+            close_old_connections()
+
+    async def _consume(self):
+        while True:
+            sender, named, enqueued_at = await self._queue.get()
+            self.slots.release()
+            receiver = self.receiver
+            if receiver is None:  # weakly referenced receiver was garbage collected
+                self._done()
+                self._count("dropped")
+                continue
+            started = time.perf_counter()
+            try:
+                if self.is_async:
+                    await receiver(signal=self.signal, sender=sender, **named)
+                else:
+                    await _bus.threads.run(self._call, receiver, sender, named)
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception("Signal receiver %s failed", self.name, extra={"signal": self.signal.name})
+                result = "failed"
+            else:
+                result = "delivered"
+            elapsed = time.perf_counter() - started
+            with self.lock:
+                self.wait_time += started - enqueued_at
+                self.run_time += elapsed
+                self.max_run_time = max(self.max_run_time, elapsed)
+            signal_queue_wait.observe(started - enqueued_at, self.signal.name, self.name)
+            signal_receiver_duration.observe(elapsed, self.signal.name, self.name)
+            self._count(result)
+            self._done()
+
+    def close(self):
+        """Stop the tasks draining the queue; deliveries still queued are discarded."""
+        if self._loop is not None:
+            for task in self._tasks:
+                self._loop.call_soon_threadsafe(task.cancel)
+
+    def snapshot(self):
+        """Delivery counters and average/max latencies of the receiver."""
+        with self.lock:
+            finished = self.counts["delivered"] + self.counts["failed"]
+            return {
+                **self.counts,
+                "queued": self.outstanding,
+                "avg_wait_ms": self.wait_time / finished * 1000 if finished else 0.0,
+                "avg_run_ms": self.run_time / finished * 1000 if finished else 0.0,
+                "max_run_ms": self.max_run_time * 1000,
+            }
+
+
+class Signal(dispatch.Signal):
+    """
+    `django.dispatch.Signal` whose receivers can run off the request path.
+
+    `connect()` keeps Django's signature (and works with `@receiver`); extra
+    keyword options turn a receiver into a *queued* one:
+
+    - `background=True`: `send()`/`asend()` only enqueue the call and return;
+      it runs on the process' signal bus, a daemon thread with its own event
+      loop (`async def` receivers) and a thread pool (plain receivers, with
+      database connections closed afterwards, like at the end of a request).
+    - `queue_size`: bound of the receiver's queue. When it is full a sender
+      waits up to `block_timeout` seconds for room (`overflow="block"`, the
+      default) or the delivery is dropped right away (`overflow="drop"`).
+      Either way, drops are counted.
+    - `coalesce`: window in seconds. The first send for a given
+      `coalesce_key(sender=..., **kwargs)` (default: the sender and
+      arguments) opens the window; sends with the same key within it are
+      merged into one delivery carrying the latest arguments.
+    - `concurrency`: tasks draining the queue. With 1 (the default),
+      deliveries keep the order they were sent in.
+
+    Receivers connected without these options behave exactly as with Django
+    and their responses are returned; queued receivers are not part of the
+    responses. Every queued delivery is counted in `signal_deliveries`, and
+    its queue wait and run time are recorded per receiver
+    (`signal_queue_wait_seconds`, `signal_receiver_duration_seconds`, and
+    `stats()`).
+
+    Args:
+        use_caching (bool): Django's per-sender receivers cache.
+        name (str): Label of the signal in metrics and logs.
+        background (bool): Default of `connect(background=...)` for this signal.
+    """
+
+    def __init__(self, use_caching=False, *, name="signal", background=False):
+        super().__init__(use_caching=use_caching)
+        self.name = name
+        self.background = background
+        self._channels = {}
+        self._channels_lock = threading.Lock()
+        _signals.add(self)
+
+    def connect(
+        self,
+        receiver,
+        sender=None,
+        weak=True,
+        dispatch_uid=None,
+        *,
+        background=None,
+        queue_size=1000,
+        overflow="block",
+        block_timeout=1.0,
+        coalesce=0,
+        coalesce_key=None,
+        concurrency=1,
+    ):  # pylint: disable=arguments-differ,too-many-arguments
+        if not (self.background if background is None else background):
+            return super().connect(receiver, sender, weak, dispatch_uid)
+        if settings.configured and settings.DEBUG:
+            # Same checks as Django, also only under DEBUG: `func_accepts_kwargs`
+            # caches the receiver, which would keep weak receivers alive.
+            if not callable(receiver):
+                raise TypeError("Signal receivers must be callable.")
+            if not func_accepts_kwargs(receiver):
+                raise ValueError("Signal receivers must accept keyword arguments (**kwargs).")
+        lookup_key = self._lookup_key(receiver, sender, dispatch_uid)
+        channel = _Channel(
+            self, receiver, weak, queue_size, overflow, block_timeout, coalesce, coalesce_key, concurrency
+        )
+        with self._channels_lock:
+            # Copy on write: senders iterate without taking the lock.
+            channels = {key: entry for key, entry in self._channels.items() if entry[1].receiver is not None}
+            channels.setdefault(lookup_key, (_make_id(sender), channel))
+            self._channels = channels
+        return None
+
+    def disconnect(self, receiver=None, sender=None, dispatch_uid=None):
+        lookup_key = self._lookup_key(receiver, sender, dispatch_uid)
+        with self._channels_lock:
+            channels = dict(self._channels)
+            entry = channels.pop(lookup_key, None)
+            self._channels = channels
+        if entry is None:
+            return super().disconnect(receiver, sender, dispatch_uid)
+        entry[1].close()
+        return True
+
+    @staticmethod
+    def _lookup_key(receiver, sender, dispatch_uid):
+        return (dispatch_uid or _make_id(receiver), _make_id(sender))
+
+    def _queued(self, sender):
+        sender_id = _make_id(sender)
+        return [
+            channel
+            for channel_sender, channel in self._channels.values()
+            if channel_sender in (NONE_ID, sender_id) and channel.receiver is not None
+        ]
+
+    def has_listeners(self, sender=None):
+        return bool(self._queued(sender)) or super().has_listeners(sender)
+
+    def send(self, sender, **named):
+        for channel in self._queued(sender) if self._channels else ():
+            channel.put(sender, named)
+        return super().send(sender, **named)
+
+    def send_robust(self, sender, **named):
+        for channel in self._queued(sender) if self._channels else ():
+            try:
+                channel.put(sender, named)
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception("Could not queue %s for %s", self.name, channel.name)
+        return super().send_robust(sender, **named)
+
+    async def asend(self, sender, **named):
+        for channel in self._queued(sender) if self._channels else ():
+            await channel.aput(sender, named)
+        return await super().asend(sender, **named)
+
+    async def asend_robust(self, sender, **named):
+        for channel in self._queued(sender) if self._channels else ():
+            try:
+                await channel.aput(sender, named)
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception("Could not queue %s for %s", self.name, channel.name)
+        return await super().asend_robust(sender, **named)
+
+    def stats(self):
+        """Counters and latencies of the queued receivers, by receiver name."""
+        return {channel.name: channel.snapshot() for _, channel in self._channels.values()}
+
+    def flush(self, timeout=None):
+        """
+        Wait until every queued delivery of this signal has run (coalescing
+        windows included).
+
+        Returns:
+            bool: False when `timeout` seconds passed first.
+        """
+        if _bus.in_loop_thread():
+            raise RuntimeError("Signal.flush() cannot wait from a queued receiver.")
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while any(channel.outstanding for _, channel in self._channels.values()):
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+
+def flush_signals(timeout=None):
+    """Wait for the queued deliveries of every `Signal`; False when `timeout` passed first."""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    for signal in list(_signals):
+        remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+        if not signal.flush(remaining):
+            return False
+    return True
+
+
+# Give queued deliveries a chance to run when the process exits normally.
+atexit.register(flush_signals, 5.0)
+
+
+__all__ = ["OVERFLOW_POLICIES", "Signal", "flush_signals"]
@@ -0,0 +1,3 @@
+from .broker import *
+from .registry import *
+from .worker import *
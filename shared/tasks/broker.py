@@ -0,0 +1,192 @@
+import asyncio
+import functools
+import os
+import threading
+import time
+import weakref
+
+import redis
+from django.conf import settings
+from redis import asyncio as aioredis
+
+from shared.utils.async_cache import close_on_loop_shutdown
+from shared.utils.fastjson import dumps, loads
+
+GROUP = "workers"
+QUEUES_KEY = "tasks:queues"
+
+# Move due messages from the delayed set onto the stream atomically, so two
+# workers promoting at once cannot run a retry twice.
+PROMOTE_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+for _, message in ipairs(due) do
+    redis.call('XADD', KEYS[2], 'MAXLEN', '~', ARGV[3], '*', 'm', message)
+    redis.call('ZREM', KEYS[1], message)
+end
+return #due
+"""
+
+# Acknowledge and delete a finished message and, in the same step, schedule
+# its retry (ARGV[3] = "retried") or dead-letter it (ARGV[3] = "dead").
+FINISH_SCRIPT = """
+redis.call('XACK', KEYS[1], ARGV[1], ARGV[2])
+redis.call('XDEL', KEYS[1], ARGV[2])
+if ARGV[3] == 'retried' then
+    redis.call('ZADD', KEYS[2], ARGV[5], ARGV[4])
+elseif ARGV[3] == 'dead' then
+    redis.call('XADD', KEYS[3], 'MAXLEN', '~', ARGV[6], '*', 'm', ARGV[4])
+end
+return 1
+"""
+
+
+def stream_key(queue):
+    """Stream of the messages ready to run on `queue`."""
+    return f"tasks:{queue}"
+
+
+def delayed_key(queue):
+    """Sorted set of the countdowns and retries of `queue`, scored by due time."""
+    return f"tasks:{queue}:delayed"
+
+
+def dead_key(queue):
+    """Stream of the dead-lettered messages of `queue`."""
+    return f"tasks:{queue}:dead"
+
+
+class Broker:
+    """
+    Redis Streams broker for `shared.tasks`.
+
+    Every queue is a stream (`tasks:<queue>`) read by the `workers` consumer
+    group, so a message stays pending until a worker acknowledges it and a
+    crashed worker's messages can be reclaimed. Countdowns and retries wait in
+    a sorted set (`tasks:<queue>:delayed`) scored by due time; failures past
+    their retries go to `tasks:<queue>:dead`.
+
+    Args:
+        url (str): Redis URL.
+        max_length (int): Approximate cap on every stream (`XADD MAXLEN ~`).
+    """
+
+    def __init__(self, url, max_length=100_000):
+        self.url = url
+        self.max_length = max_length
+        self._sync = (None, None)
+        self._async = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._known = set()
+
+    def client(self):
+        """Synchronous client, recreated after a fork."""
+        pid, client = self._sync
+        if pid != os.getpid():
+            with self._lock:
+                pid, client = self._sync
+                if pid != os.getpid():
+                    client = redis.Redis.from_url(self.url)
+                    self._sync = (os.getpid(), client)
+        return client
+
+    def aclient(self):
+        """Asyncio client bound to the running event loop, closed when the loop shuts down."""
+        loop = asyncio.get_running_loop()
+        client = self._async.get(loop)
+        if client is None:
+            client = self._async[loop] = aioredis.Redis.from_url(self.url)
+            close_on_loop_shutdown(loop, self._async, functools.partial(client.aclose, close_connection_pool=True))
+        return client
+
+    def _push(self, client, queue, message, countdown):
+        message = {**message, "enqueued_at": time.time()}
+        if countdown and countdown > 0:
+            return client.zadd(delayed_key(queue), {dumps(message): time.time() + countdown})
+        return client.xadd(stream_key(queue), {"m": dumps(message)}, maxlen=self.max_length, approximate=True)
+
+    def enqueue(self, queue, message, countdown=None):
+        """Add a message to `queue`, or to its delayed set when `countdown` is given."""
+        client = self.client()
+        if queue not in self._known:  # listed for `depth()`/metrics once per process
+            client.sadd(QUEUES_KEY, queue)
+            self._known.add(queue)
+        self._push(client, queue, message, countdown)
+
+    async def aenqueue(self, queue, message, countdown=None):
+        """`enqueue` for async code."""
+        client = self.aclient()
+        if queue not in self._known:
+            await client.sadd(QUEUES_KEY, queue)
+            self._known.add(queue)
+        await self._push(client, queue, message, countdown)
+
+    def queues(self):
+        """Names of the queues messages were ever enqueued on."""
+        return sorted(name.decode() for name in self.client().smembers(QUEUES_KEY))
+
+    def depth(self, queue):
+        """
+        Message counts for `queue`.
+
+        Returns:
+            dict: `ready` (not yet read), `running` (read, not yet acknowledged),
+                `delayed` (countdowns and retries) and `dead`.
+        """
+        client = self.client()
+        pipe = client.pipeline(transaction=False)
+        pipe.xlen(stream_key(queue))
+        pipe.zcard(delayed_key(queue))
+        pipe.xlen(dead_key(queue))
+        length, delayed, dead = pipe.execute()
+        try:
+            running = client.xpending(stream_key(queue), GROUP)["pending"]
+        except redis.ResponseError:  # no worker has created the group yet
+            running = 0
+        return {"ready": max(0, length - running), "running": running, "delayed": delayed, "dead": dead}
+
+    def requeue_dead(self, queue, limit=100):
+        """
+        Move up to `limit` dead-lettered messages back onto `queue` with their
+        attempt count reset.
+
+        Returns:
+            int: Messages moved.
+        """
+        client = self.client()
+        moved = 0
+        for message_id, fields in client.xrange(dead_key(queue), count=limit):
+            message = loads(fields[b"m"])
+            for key in ("error", "traceback", "failed_at"):
+                message.pop(key, None)
+            message["attempt"] = 0
+            pipe = client.pipeline(transaction=True)
+            self._push(pipe, queue, message, None)
+            pipe.xdel(dead_key(queue), message_id)
+            pipe.execute()
+            moved += 1
+        return moved
+
+
+_broker = None
+
+
+def get_broker():
+    """The process-wide `Broker` configured by `settings.TASKS`."""
+    global _broker  # pylint: disable=global-statement
+    if _broker is None:
+        config = getattr(settings, "TASKS", {})
+        _broker = Broker(config.get("REDIS_URL", "redis://127.0.0.1:6379/4"), config.get("MAX_LENGTH", 100_000))
+    return _broker
+
+
+__all__ = [
+    "GROUP",
+    "QUEUES_KEY",
+    "PROMOTE_SCRIPT",
+    "FINISH_SCRIPT",
+    "Broker",
+    "get_broker",
+    "stream_key",
+    "delayed_key",
+    "dead_key",
+]
@@ -0,0 +1,174 @@
+import functools
+import random
+import uuid
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils.module_loading import autodiscover_modules
+
+from shared.tasks.broker import get_broker
+
+DEFAULTS = {
+    "DEFAULT_QUEUE": "default",
+    "MAX_RETRIES": 3,
+    "RETRY_BACKOFF": 2.0,
+    "RETRY_BACKOFF_MAX": 600.0,
+    "EAGER": False,
+}
+
+registry = {}
+
+
+def task_settings():
+    """`settings.TASKS` over `DEFAULTS`."""
+    return {**DEFAULTS, **getattr(settings, "TASKS", {})}
+
+
+class Task:
+    """
+    A function that can run later on a worker (`shared.tasks.Worker`).
+
+    Calling the task runs it inline; `delay()`/`apply_async()` (or
+    `adelay()`/`aapply_async()` from async code) put it on its queue and
+    return the task id. Arguments must be JSON serializable. With
+    `TASKS["EAGER"]` the task runs inline instead, for tests and local runs
+    without a worker.
+
+    Args:
+        func (callable): The function, plain or `async def`.
+        name (str, optional): Registry name (default `module.qualname`).
+        queue (str, optional): Queue name (default `TASKS["DEFAULT_QUEUE"]`).
+        max_retries (int, optional): Retries after the first failure before
+            the task is dead-lettered (default `TASKS["MAX_RETRIES"]`).
+        retry_backoff (float, optional): Delay before the first retry, doubled
+            for every further one (default `TASKS["RETRY_BACKOFF"]`).
+        timeout (float, optional): Seconds an `async` task may run. Plain
+            functions run in a thread and cannot be interrupted.
+    """
+
+    def __init__(
+        self, func, name=None, queue=None, max_retries=None, retry_backoff=None, timeout=None
+    ):  # pylint: disable=too-many-arguments,too-many-positional-arguments
+        functools.update_wrapper(self, func)
+        self.func = func
+        self.name = name or f"{func.__module__}.{func.__qualname__}"
+        self.is_async = iscoroutinefunction(func)
+        self._queue = queue
+        self._max_retries = max_retries
+        self._retry_backoff = retry_backoff
+        self.timeout = timeout
+
+    @property
+    def queue(self):
+        """Queue the task is enqueued on by default."""
+        return self._queue or task_settings()["DEFAULT_QUEUE"]
+
+    @property
+    def max_retries(self):
+        """Retries after the first failure before the task is dead-lettered."""
+        return task_settings()["MAX_RETRIES"] if self._max_retries is None else self._max_retries
+
+    def backoff(self, attempt):
+        """Seconds before retry number `attempt + 1`: exponential, jittered in its upper half."""
+        config = task_settings()
+        base = config["RETRY_BACKOFF"] if self._retry_backoff is None else self._retry_backoff
+        ceiling = min(config["RETRY_BACKOFF_MAX"], base * 2**attempt)
+        return random.uniform(ceiling / 2, ceiling)
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def run_sync(self, args, kwargs):
+        """Run in a worker thread, with fresh database connections like a request."""
+        close_old_connections()
+        try:
+            if self.is_async:
+                return async_to_sync(self.func)(*args, **kwargs)
+            return self.func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    def message(self, args, kwargs, attempt=0):
+        """Queue message running the task with `args` and `kwargs`."""
+        return {
+            "id": uuid.uuid4().hex,
+            "task": self.name,
+            "args": list(args),
+            "kwargs": kwargs,
+            "attempt": attempt,
+        }
+
+    def apply_async(self, args=(), kwargs=None, countdown=None, queue=None):
+        """
+        Enqueue the task.
+
+        Args:
+            args (tuple): Positional arguments.
+            kwargs (dict, optional): Keyword arguments.
+            countdown (float, optional): Seconds to wait before the task may run.
+            queue (str, optional): Overrides the task's queue.
+
+        Returns:
+            str: The task id.
+        """
+        message = self.message(args, kwargs or {})
+        if task_settings()["EAGER"]:
+            self.run_sync(message["args"], message["kwargs"])
+            return message["id"]
+        get_broker().enqueue(queue or self.queue, message, countdown)
+        return message["id"]
+
+    async def aapply_async(self, args=(), kwargs=None, countdown=None, queue=None):
+        """`apply_async` for async code: enqueues without blocking the event loop."""
+        message = self.message(args, kwargs or {})
+        if task_settings()["EAGER"]:
+            if self.is_async:
+                await self.func(*message["args"], **message["kwargs"])
+            else:
+                await sync_to_async(self.run_sync)(message["args"], message["kwargs"])
+            return message["id"]
+        await get_broker().aenqueue(queue or self.queue, message, countdown)
+        return message["id"]
+
+    def delay(self, *args, **kwargs):
+        """Shortcut of `apply_async(args, kwargs)`."""
+        return self.apply_async(args, kwargs)
+
+    async def adelay(self, *args, **kwargs):
+        """Shortcut of `aapply_async(args, kwargs)`."""
+        return await self.aapply_async(args, kwargs)
+
+    def __repr__(self):
+        return f"<Task {self.name}>"
+
+
+def task(func=None, **options):
+    """
+    Register a function as a `Task`; usable bare or with `Task` options.
+
+    Example:
+        @task(queue="bridge", max_retries=5)
+        async def send_event(room_id, event_type, content, txn_id):
+            ...
+
+        send_event.delay("!room:example.org", "m.room.message", {...}, txn_id)
+    """
+
+    def decorator(function):
+        registered = Task(function, **options)
+        registry[registered.name] = registered
+        return registered
+
+    return decorator(func) if func is not None else decorator
+
+
+def autodiscover():
+    """
+    Import the `tasks` module of every installed app so its tasks are
+    registered; `run_worker()` calls it before consuming.
+    """
+    autodiscover_modules("tasks")
+
+
+__all__ = ["Task", "task", "registry", "task_settings", "autodiscover"]
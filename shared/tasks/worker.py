@@ -0,0 +1,349 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+import redis
+from redis import asyncio as aioredis
+from redis.asyncio.retry import Retry
+from redis.backoff import ExponentialBackoff
+
+from shared.tasks.broker import (
+    FINISH_SCRIPT,
+    GROUP,
+    PROMOTE_SCRIPT,
+    QUEUES_KEY,
+    dead_key,
+    delayed_key,
+    get_broker,
+    stream_key,
+)
+from shared.tasks.registry import autodiscover, registry
+from shared.utils.fastjson import dumps, loads
+from shared.utils.metrics import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+POOLS = ("threads", "asyncio", "processes")
+
+tasks_processed = Counter(
+    "tasks_processed",
+    "Task runs by task and result (succeeded, retried, dead).",
+    ("task", "result"),
+)
+task_duration = Histogram("task_duration_seconds", "Task run time.", ("task",))
+
+
+def task_queue_collector():
+    """Depth of every known task queue, read from Redis at scrape time (registered by `CoreConfig.ready()`)."""
+    broker = get_broker()
+    try:
+        samples = [
+            ({"queue": queue, "state": state}, count)
+            for queue in broker.queues()
+            for state, count in broker.depth(queue).items()
+        ]
+    except redis.RedisError:
+        logger.warning("Task queue depth unavailable", exc_info=True)
+        return []
+    return [("task_queue_depth", "gauge", "Task messages by queue and state.", samples)]
+
+
+class Worker:  # pylint: disable=too-many-instance-attributes
+    """
+    Consume task queues until stopped.
+
+    One event loop reads the streams with `XREADGROUP`, never holding more
+    than `concurrency` messages. `async` tasks run on the loop; plain
+    functions run in a thread pool. A message is acknowledged once its task
+    finished: on failure it is re-queued with exponential backoff through the
+    delayed set, and dead-lettered after the task's `max_retries`. Messages a
+    crashed worker left pending longer than `visibility_timeout` are claimed
+    and count as a failed attempt; the worker keeps resetting the idle time of
+    the messages it is still running, so long tasks are not claimed.
+
+    Args:
+        queues (list[str]): Queues to consume, read in this order.
+        concurrency (int): Messages processed at once.
+        pool (str): `threads` runs plain functions on `concurrency` threads;
+            `asyncio` is for mostly-`async` tasks and keeps only a small
+            thread pool for the odd plain function.
+        name (str, optional): Consumer name (default `host-pid`).
+        burst (bool): Exit once the queues, including delayed messages, are empty.
+        block (float): Seconds a read waits for new messages.
+        visibility_timeout (float, optional): Seconds before a pending message
+            is reclaimed (default `TASKS["VISIBILITY_TIMEOUT"]`).
+        grace (float): Seconds running tasks get to finish after a stop.
+    """
+
+    def __init__(
+        self,
+        queues,
+        concurrency=4,
+        pool="threads",
+        name=None,
+        burst=False,
+        block=1.0,
+        visibility_timeout=None,
+        grace=30.0,
+    ):  # pylint: disable=too-many-arguments,too-many-positional-arguments
+        from django.conf import settings  # pylint: disable=import-outside-toplevel
+
+        if pool not in ("threads", "asyncio"):
+            raise ValueError(f"Worker pool must be 'threads' or 'asyncio', not {pool!r} (see run_worker())")
+        self.queues = list(queues)
+        self.concurrency = max(1, concurrency)
+        self.pool = pool
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}"
+        self.burst = burst
+        self.block = block
+        config = getattr(settings, "TASKS", {})
+        self.visibility_timeout = visibility_timeout or config.get("VISIBILITY_TIMEOUT", 300)
+        self.grace = grace
+        self.broker = get_broker()
+        self.processed = 0
+        self._stopping = None
+        self._promote = self._finish_script = self._executor = None
+        self._in_flight = {}  # message id -> queue, of the messages running here
+
+    def run(self):
+        """Run until SIGINT/SIGTERM (or, in burst mode, until the queues are empty)."""
+        asyncio.run(self.main())
+
+    def stop(self):
+        """Stop reading new messages; running tasks get `grace` seconds to finish."""
+        if self._stopping is not None:
+            self._stopping.set()
+
+    async def main(self):
+        """`run()` for a caller already in an event loop."""
+        loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, self.stop)
+            except (NotImplementedError, RuntimeError):  # not the main thread
+                pass
+        # Ride out dropped connections and Redis restarts instead of exiting.
+        client = aioredis.Redis.from_url(
+            self.broker.url,
+            retry=Retry(ExponentialBackoff(cap=2.0, base=0.1), 5),
+            retry_on_error=[redis.ConnectionError, redis.TimeoutError],
+        )
+        self._promote = client.register_script(PROMOTE_SCRIPT)
+        self._finish_script = client.register_script(FINISH_SCRIPT)
+        for queue in self.queues:
+            try:
+                await client.xgroup_create(stream_key(queue), GROUP, id="0", mkstream=True)
+            except redis.ResponseError as error:
+                if "BUSYGROUP" not in str(error):
+                    raise
+            await client.sadd(QUEUES_KEY, queue)
+        threads = self.concurrency if self.pool == "threads" else min(4, self.concurrency)
+        self._executor = ThreadPoolExecutor(threads, thread_name_prefix="task-worker")
+        logger.info("Worker %s consuming %s (%s x%d)", self.name, ", ".join(self.queues), self.pool, self.concurrency)
+
+        maintenance = asyncio.create_task(self._maintain(client))
+        running = set()
+        try:
+            await self._consume(client, running)
+        finally:
+            if running:
+                logger.info("Waiting up to %ss for %d running tasks", self.grace, len(running))
+                await asyncio.wait(running, timeout=self.grace)
+            maintenance.cancel()
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            await client.aclose()
+        logger.info("Worker %s stopped after %d tasks", self.name, self.processed)
+
+    async def _consume(self, client, running):
+        streams = {stream_key(queue): ">" for queue in self.queues}
+        while not self._stopping.is_set():
+            if len(running) >= self.concurrency:
+                await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                continue
+            try:
+                response = await client.xreadgroup(
+                    GROUP, self.name, streams, count=self.concurrency - len(running), block=int(self.block * 1000)
+                )
+            except (redis.ConnectionError, redis.TimeoutError):
+                logger.warning("Task queue read failed, retrying", exc_info=True)
+                await asyncio.sleep(1.0)
+                continue
+            if not response:
+                if self.burst and not running and not await self._remaining(client):
+                    return
+                continue
+            for stream, messages in response:
+                queue = stream.decode().removeprefix("tasks:")
+                for message_id, fields in messages:
+                    self._in_flight[message_id] = queue
+                    job = asyncio.create_task(self._handle(queue, message_id, fields[b"m"]))
+                    running.add(job)
+                    job.add_done_callback(running.discard)
+
+    async def _remaining(self, client):
+        """Messages still on the streams (unread or pending elsewhere) or delayed."""
+        pipe = client.pipeline(transaction=False)
+        for queue in self.queues:
+            pipe.xlen(stream_key(queue))
+            pipe.zcard(delayed_key(queue))
+        return sum(await pipe.execute())
+
+    async def _maintain(self, client):
+        """
+        Promote due delayed messages every half second; keep the running ones
+        and reclaim stale pending ones four times per `visibility_timeout`.
+        """
+        reclaimed_at = 0.0
+        while True:
+            try:
+                for queue in self.queues:
+                    keys = [delayed_key(queue), stream_key(queue)]
+                    await self._promote(keys=keys, args=[time.time(), 100, self.broker.max_length])
+                if time.monotonic() - reclaimed_at > self.visibility_timeout / 4:
+                    reclaimed_at = time.monotonic()
+                    await self._refresh(client)
+                    for queue in self.queues:
+                        await self._reclaim(client, queue)
+            except redis.RedisError:
+                logger.warning("Task maintenance failed", exc_info=True)
+            await asyncio.sleep(0.5)
+
+    async def _refresh(self, client):
+        """Reset the idle time of the messages running here, so no worker reclaims them."""
+        running = {}
+        for message_id, queue in list(self._in_flight.items()):
+            running.setdefault(queue, []).append(message_id)
+        for queue, message_ids in running.items():
+            await client.xclaim(stream_key(queue), GROUP, self.name, 0, message_ids, justid=True)
+
+    async def _reclaim(self, client, queue):
+        _, messages, *_ = await client.xautoclaim(
+            stream_key(queue), GROUP, self.name, int(self.visibility_timeout * 1000), count=100
+        )
+        for message_id, fields in messages:
+            if message_id in self._in_flight:  # still running here: the claim reset its idle time
+                continue
+            if not fields:  # trimmed or deleted meanwhile
+                await client.xack(stream_key(queue), GROUP, message_id)
+                continue
+            message = loads(fields[b"m"])
+            logger.warning("Reclaimed task %s (%s) after %ss", message["id"], message["task"], self.visibility_timeout)
+            error = TimeoutError(f"Not acknowledged within {self.visibility_timeout}s")
+            await self._finish(queue, message_id, message, registry.get(message["task"]), error, "")
+
+    async def _handle(self, queue, message_id, raw):
+        try:
+            await self._run(queue, message_id, loads(raw))
+        finally:
+            del self._in_flight[message_id]
+
+    async def _run(self, queue, message_id, message):
+        task = registry.get(message["task"])
+        error, details = None, ""
+        started = time.perf_counter()
+        try:
+            if task is None:
+                raise LookupError(f"Unknown task {message['task']!r}")
+            if task.is_async:
+                await asyncio.wait_for(task.func(*message["args"], **message["kwargs"]), task.timeout)
+            else:
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(self._executor, task.run_sync, message["args"], message["kwargs"])
+        except Exception as exception:  # pylint: disable=broad-except
+            error, details = exception, traceback.format_exc()
+        task_duration.observe(time.perf_counter() - started, message["task"])
+        await self._finish(queue, message_id, message, task, error, details)
+
+    async def _finish(
+        self, queue, message_id, message, task, error, details
+    ):  # pylint: disable=too-many-arguments,too-many-positional-arguments
+        payload, score = "", 0
+        if error is None:
+            result = "succeeded"
+        elif task is not None and message["attempt"] < task.max_retries:
+            result = "retried"
+            delay = task.backoff(message["attempt"])
+            payload = dumps({**message, "attempt": message["attempt"] + 1, "error": repr(error)})
+            score = time.time() + delay
+            logger.warning("Task %s (%s) failed, retry in %.1fs: %r", message["id"], message["task"], delay, error)
+        else:
+            result = "dead"
+            payload = dumps({**message, "error": repr(error), "traceback": details, "failed_at": time.time()})
+            logger.error("Task %s (%s) dead-lettered: %r", message["id"], message["task"], error)
+        await self._finish_script(
+            keys=[stream_key(queue), delayed_key(queue), dead_key(queue)],
+            args=[GROUP, message_id, result, payload, score, self.broker.max_length],
+        )
+        tasks_processed.inc(1, message["task"], result)
+        self.processed += 1
+
+
+def _child(queues, concurrency, index, burst):
+    Worker(queues, concurrency, name=f"{socket.gethostname()}-{os.getpid()}-{index}", burst=burst).run()
+
+
+def run_worker(queues, concurrency=4, pool="threads", burst=False):
+    """
+    Import every app's `tasks` module, then run a worker in this process, or
+    `concurrency` forked single-task workers for `pool="processes"` (CPU-bound
+    tasks). Children that die are restarted until SIGINT/SIGTERM, which is
+    forwarded to them.
+
+    Args:
+        queues (list[str]): Queues to consume.
+        concurrency (int): Tasks at once (threads/asyncio) or processes.
+        pool (str): One of `POOLS`.
+        burst (bool): Exit once the queues are empty.
+    """
+    if pool not in POOLS:
+        raise ValueError(f"Worker pool must be one of {', '.join(POOLS)}, not {pool!r}")
+    autodiscover()
+    if pool != "processes":
+        Worker(queues, concurrency, pool, burst=burst).run()
+        return
+
+    from django.db import connections  # pylint: disable=import-outside-toplevel
+
+    # Children must not inherit (and later share) the parent's sockets.
+    connections.close_all()
+    context = multiprocessing.get_context("fork")
+    stopping = False
+
+    def spawn(index):
+        process = context.Process(target=_child, args=(queues, 1, index, burst), daemon=False)
+        process.start()
+        return process
+
+    def forward(signum, frame):  # pylint: disable=unused-argument
+        nonlocal stopping
+        stopping = True
+        for process in children.values():
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)
+
+    children = {index: spawn(index) for index in range(max(1, concurrency))}
+    previous = {signum: signal.signal(signum, forward) for signum in (signal.SIGINT, signal.SIGTERM)}
+    try:
+        while children:
+            for index, process in list(children.items()):
+                process.join(timeout=0.2)
+                if process.is_alive():
+                    continue
+                if stopping or burst or process.exitcode == 0:
+                    del children[index]
+                else:
+                    logger.error("Worker process %d exited with %s, restarting", process.pid, process.exitcode)
+                    children[index] = spawn(index)
+    finally:
+        for signum, handler in previous.items():
+            signal.signal(signum, handler)
+
+
+__all__ = ["POOLS", "Worker", "run_worker", "tasks_processed", "task_duration", "task_queue_collector"]
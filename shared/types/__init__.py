@@ -0,0 +1,4 @@
+from .base import *
+from .constants import *
+from .customs import *
+from .enumerations import *
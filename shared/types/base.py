@@ -0,0 +1,121 @@
+import json
+from dataclasses import dataclass
+
+from shared.types.constants.matrix import EVENT_SIGIL, MAX_ID_LENGTH
+from shared.types.customs.identifiers import InvalidIdentifier, RoomId, UserId
+from shared.types.enumerations.matrix import _EVENT_TYPES, EventType, Membership
+
+_ROOMS = RoomId._interned  # pylint: disable=protected-access
+_USERS = UserId._interned  # pylint: disable=protected-access
+
+
+@dataclass(slots=True)
+class RoomEvent:  # pylint: disable=too-many-instance-attributes
+    """
+    A Matrix room event in compact form.
+
+    Slotted instead of a dict: no per-instance `__dict__`, and `room_id` /
+    `sender` are interned `RoomId` / `UserId` shared by every event of the
+    same room or user. `event_id`, `content` and `unsigned` keep the decoded
+    JSON objects as-is (no copy). Treat instances as read-only: the dataclass
+    is not frozen because frozen construction is ~4x slower.
+    """
+
+    event_id: str  # validated `$...`, kept as the decoded string (unique per event, no copy)
+    room_id: RoomId
+    sender: UserId
+    type: str  # an `EventType` member for known types, the raw string otherwise
+    origin_server_ts: int
+    content: dict
+    state_key: str = None
+    unsigned: dict = None
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Build an event from a decoded client-server/AS API event object.
+
+        Raises:
+            InvalidIdentifier: When an identifier is malformed.
+            KeyError: When a required key is missing.
+            TypeError: When `data` is not a mapping.
+        """
+        room_id, sender, event_id = data["room_id"], data["sender"], data["event_id"]
+        # Hot path: ids seen before are a dict hit, without the parse() call.
+        room_id = _ROOMS.get(room_id) or RoomId.parse(room_id)
+        sender = _USERS.get(sender) or UserId.parse(sender)
+        if event_id[:1] != EVENT_SIGIL or len(event_id) > MAX_ID_LENGTH:
+            raise InvalidIdentifier(f"Invalid EventId: {event_id!r}")
+        return cls(
+            event_id,
+            room_id,
+            sender,
+            _EVENT_TYPES.get(data["type"], data["type"]),
+            data.get("origin_server_ts", 0),
+            data.get("content") or {},
+            data.get("state_key"),
+            data.get("unsigned"),
+        )
+
+    @classmethod
+    def from_json(cls, raw, loads=json.loads):
+        """Decode a JSON event (str/bytes) and build it; `loads` can be a faster decoder."""
+        return cls.from_dict(loads(raw))
+
+    @classmethod
+    def parse_many(cls, items, errors=None):
+        """
+        Build events from decoded objects, skipping invalid ones.
+
+        Args:
+            items (iterable): Decoded event objects.
+            errors (list, optional): Receives `(index, exception)` for every skipped item.
+        """
+        events = []
+        append = events.append
+        for index, data in enumerate(items):
+            try:
+                append(cls.from_dict(data))
+            except (InvalidIdentifier, KeyError, TypeError, AttributeError) as e:
+                if errors is not None:
+                    errors.append((index, e))
+        return events
+
+    @property
+    def type_name(self):
+        """The event type as a plain string, whichever form `type` holds."""
+        return self.type.value if isinstance(self.type, EventType) else self.type
+
+    @property
+    def is_state(self):
+        """True for state events (those with a `state_key`)."""
+        return self.state_key is not None
+
+    @property
+    def membership(self):
+        """`Membership` of an `m.room.member` event, None for other events."""
+        if self.type is not EventType.MEMBER:
+            return None
+        try:
+            return Membership(self.content.get("membership"))
+        except ValueError:
+            return None
+
+    def to_dict(self):
+        """Back to the wire format (omitting unset optional keys)."""
+        data = {
+            "event_id": self.event_id,
+            "room_id": str(self.room_id),
+            "sender": str(self.sender),
+            "type": self.type_name,
+            "origin_server_ts": self.origin_server_ts,
+            "content": self.content,
+        }
+        if self.state_key is not None:
+            data["state_key"] = self.state_key
+        if self.unsigned is not None:
+            data["unsigned"] = self.unsigned
+        return data
+
+
+__all__ = ["RoomEvent"]
@@ -0,0 +1 @@
+from .matrix import *
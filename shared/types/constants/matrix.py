@@ -0,0 +1,20 @@
+# Sigils of the Matrix identifiers (https://spec.matrix.org/latest/appendices/#identifier-grammar)
+USER_SIGIL = "@"
+ROOM_SIGIL = "!"
+ROOM_ALIAS_SIGIL = "#"
+EVENT_SIGIL = "$"
+
+# Identifiers, including sigil and server name, are limited to 255 bytes.
+MAX_ID_LENGTH = 255
+
+# Most distinct identifiers kept per interned type before new ones stop being cached.
+MAX_INTERNED_IDS = 200_000
+
+__all__ = [
+    "USER_SIGIL",
+    "ROOM_SIGIL",
+    "ROOM_ALIAS_SIGIL",
+    "EVENT_SIGIL",
+    "MAX_ID_LENGTH",
+    "MAX_INTERNED_IDS",
+]
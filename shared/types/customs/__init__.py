@@ -0,0 +1 @@
+from .identifiers import *
@@ -0,0 +1,123 @@
+from shared.types.constants.matrix import (
+    EVENT_SIGIL,
+    MAX_INTERNED_IDS,
+    ROOM_ALIAS_SIGIL,
+    ROOM_SIGIL,
+    USER_SIGIL,
+)
+
+
+class InvalidIdentifier(ValueError):
+    """Raised when a string is not a valid Matrix identifier of the requested kind."""
+
+
+class MatrixId(str):
+    """
+    Base of the Matrix identifier types: a `str` subclass, so ids can be used
+    anywhere a string is expected (dict keys, JSON, ORM filters) at no cost.
+
+    `parse()` validates and interns: every occurrence of the same id shares
+    one object, so the few rooms and senders repeated across thousands of
+    events are stored once. Validation is the identifier grammar of
+    `shared.validators.identifiers`, the one `EVENT_SCHEMA` applies.
+    Subclasses set `sigil` and `kind` (a key of `IDENTIFIER_PATTERNS`).
+    """
+
+    __slots__ = ()
+    sigil = ""
+    kind = None
+    _interned = {}  # replaced by one dict per subclass in __init_subclass__
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._interned = {}
+
+    @classmethod
+    def parse(cls, value):
+        """
+        Return the interned identifier for `value`.
+
+        Raises:
+            InvalidIdentifier: Not an identifier of this kind, or longer than 255 bytes.
+        """
+        try:
+            interned = cls._interned.get(value)
+        except TypeError:  # unhashable, so certainly not an identifier
+            interned = None
+        if interned is not None:
+            return interned
+        # shared.validators imports shared.types: resolve the checker lazily.
+        from shared.validators.identifiers import identifier_checker  # pylint: disable=import-outside-toplevel
+
+        if not identifier_checker(cls.kind)(value):
+            raise InvalidIdentifier(f"Invalid {cls.__name__}: {value!r}")
+        identifier = cls(value)
+        if len(cls._interned) < MAX_INTERNED_IDS:
+            cls._interned[value] = identifier
+        return identifier
+
+    @classmethod
+    def is_valid(cls, value):
+        """Return True when `value` parses as this kind of identifier."""
+        try:
+            cls.parse(value)
+        except InvalidIdentifier:
+            return False
+        return True
+
+    @property
+    def localpart(self):
+        """The part between the sigil and the first colon."""
+        return self[1:].partition(":")[0]
+
+    @property
+    def server_name(self):
+        """The part after the first colon ("" when the id has none)."""
+        return self.partition(":")[2]
+
+    def __repr__(self):
+        return f"{type(self).__name__}({str.__repr__(self)})"
+
+
+class UserId(MatrixId):
+    """`@localpart:server.name`"""
+
+    __slots__ = ()
+    sigil = USER_SIGIL
+    kind = "user_id"
+
+
+class RoomId(MatrixId):
+    """`!opaque:server.name` (newer room versions may omit the server name)."""
+
+    __slots__ = ()
+    sigil = ROOM_SIGIL
+    kind = "room_id"
+
+
+class RoomAlias(MatrixId):
+    """`#alias:server.name`"""
+
+    __slots__ = ()
+    sigil = ROOM_ALIAS_SIGIL
+    kind = "room_alias"
+
+
+class EventId(MatrixId):
+    """`$opaque` (room versions 3+) or `$opaque:server.name`."""
+
+    __slots__ = ()
+    sigil = EVENT_SIGIL
+    kind = "event_id"
+
+    @classmethod
+    def parse(cls, value):
+        # Event ids are unique per event: validating is useful, interning is not.
+        from shared.validators.identifiers import identifier_checker  # pylint: disable=import-outside-toplevel
+
+        if not identifier_checker("event_id")(value):
+            raise InvalidIdentifier(f"Invalid EventId: {value!r}")
+        return cls(value)
+
+
+__all__ = ["InvalidIdentifier", "MatrixId", "UserId", "RoomId", "RoomAlias", "EventId"]
@@ -0,0 +1,57 @@
+from enum import Enum
+
+
+class EventType(str, Enum):
+    """Event types the services handle; members compare equal to their string."""
+
+    MESSAGE = "m.room.message"
+    MEMBER = "m.room.member"
+    CREATE = "m.room.create"
+    NAME = "m.room.name"
+    TOPIC = "m.room.topic"
+    AVATAR = "m.room.avatar"
+    POWER_LEVELS = "m.room.power_levels"
+    JOIN_RULES = "m.room.join_rules"
+    HISTORY_VISIBILITY = "m.room.history_visibility"
+    CANONICAL_ALIAS = "m.room.canonical_alias"
+    ENCRYPTED = "m.room.encrypted"
+    ENCRYPTION = "m.room.encryption"
+    REDACTION = "m.room.redaction"
+    REACTION = "m.reaction"
+    TYPING = "m.typing"
+    RECEIPT = "m.receipt"
+    PRESENCE = "m.presence"
+
+    @classmethod
+    def parse(cls, value):
+        """Return the member for a known type, or the string itself for custom types."""
+        return _EVENT_TYPES.get(value, value)
+
+
+class Membership(str, Enum):
+    """`content.membership` of `m.room.member` events."""
+
+    INVITE = "invite"
+    JOIN = "join"
+    KNOCK = "knock"
+    LEAVE = "leave"
+    BAN = "ban"
+
+
+class MessageType(str, Enum):
+    """`content.msgtype` of `m.room.message` events."""
+
+    TEXT = "m.text"
+    NOTICE = "m.notice"
+    EMOTE = "m.emote"
+    IMAGE = "m.image"
+    FILE = "m.file"
+    AUDIO = "m.audio"
+    VIDEO = "m.video"
+    LOCATION = "m.location"
+
+
+# Plain dict lookup: much cheaper than `EventType(value)` and its ValueError.
+_EVENT_TYPES = {member.value: member for member in EventType}
+
+__all__ = ["EventType", "Membership", "MessageType"]
@@ -0,0 +1,159 @@
+import os
+
+from django import forms
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.http import Http404
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from unfold.decorators import action
+
+from shared.utils.fastjson import JsonResponse
+from shared.utils.transfer import FORMATS, export_response, get_import_job, start_import, transfer_fields
+
+
+class ImportForm(forms.Form):
+    """Upload of an import: the file, its format (guessed from the extension when blank) and conflict handling."""
+
+    file = forms.FileField(help_text="CSV with a header line, or JSON Lines (one object per line).")
+    format = forms.ChoiceField(
+        choices=[("", "From the file extension"), ("csv", "CSV"), ("jsonl", "JSON Lines")], required=False
+    )
+    conflicts = forms.ChoiceField(
+        choices=[
+            ("update", "Update existing rows"),
+            ("skip", "Keep existing rows"),
+            ("error", "Fail on existing rows"),
+        ],
+        initial="update",
+    )
+
+    def clean(self):
+        cleaned = super().clean()
+        upload = cleaned.get("file")
+        if upload is not None and not cleaned.get("format"):
+            extension = os.path.splitext(upload.name)[1].lstrip(".").lower()
+            cleaned["format"] = {"ndjson": "jsonl", "json": "jsonl"}.get(extension, extension)
+            if cleaned["format"] not in FORMATS:
+                self.add_error("format", "Pick the format: the file extension is neither .csv nor .jsonl.")
+        return cleaned
+
+
+class TransferAdminMixin:
+    """
+    `ModelAdmin` mixin adding streaming exports and background imports.
+
+    Exports (the whole table from the changelist buttons, or the selected
+    rows through the actions) stream CSV or JSON Lines from a server-side
+    cursor (`shared.utils.transfer.export_response`). Imports upload a file
+    that a task worker loads in chunks of upserts (`start_import`), with a
+    progress page that refreshes until the job is done. Neither ever holds
+    the table in memory.
+
+    Attributes:
+        transfer_fields (list[str]): Exported and importable columns (default: every concrete field).
+        import_unique_fields (list[str]): Conflict target of imports, a unique constraint
+            (default: the primary key).
+        import_schema (str): Dotted path of a `shared.validators.Schema` checking imported rows.
+    """
+
+    transfer_fields = None
+    import_unique_fields = None
+    import_schema = None
+    import_template = "admin/transfer/import.html"
+    actions = ("export_selected_csv", "export_selected_jsonl")
+    actions_list = ("export_csv", "export_jsonl", "import_file")
+
+    def get_transfer_fields(self, request):  # pylint: disable=unused-argument
+        """Exported and importable columns."""
+        return self.transfer_fields or transfer_fields(self.model)
+
+    def export(self, request, queryset, export_format):
+        """Streaming export of `queryset` in `export_format`."""
+        return export_response(request, queryset, export_format, self.get_transfer_fields(request))
+
+    @admin.action(description="Export selected rows as CSV", permissions=["view"])
+    def export_selected_csv(self, request, queryset):
+        """Changelist action: the selected rows as CSV."""
+        return self.export(request, queryset, "csv")
+
+    @admin.action(description="Export selected rows as JSON Lines", permissions=["view"])
+    def export_selected_jsonl(self, request, queryset):
+        """Changelist action: the selected rows as JSON Lines."""
+        return self.export(request, queryset, "jsonl")
+
+    @action(description="Export CSV", url_path="export-csv", permissions=["view"])
+    def export_csv(self, request):
+        """Changelist button: every row (of `get_queryset`) as CSV."""
+        return self.export(request, self.get_queryset(request), "csv")
+
+    @action(description="Export JSON Lines", url_path="export-jsonl", permissions=["view"])
+    def export_jsonl(self, request):
+        """Changelist button: every row (of `get_queryset`) as JSON Lines."""
+        return self.export(request, self.get_queryset(request), "jsonl")
+
+    def has_import_permission(self, request, obj=None):  # pylint: disable=unused-argument
+        """Imports create and update rows: both permissions are needed."""
+        return self.has_add_permission(request) and self.has_change_permission(request)
+
+    @action(description="Import", url_path="import", permissions=["import"])
+    def import_file(self, request):
+        """Changelist button: the upload form, which queues the import."""
+        form = ImportForm(request.POST or None, request.FILES or None)
+        if request.method == "POST" and form.is_valid():
+            job_id = start_import(
+                self.model,
+                form.cleaned_data["file"],
+                form.cleaned_data["format"],
+                conflicts=form.cleaned_data["conflicts"],
+                unique_fields=self.import_unique_fields,
+                schema=self.import_schema,
+                user=request.user.get_username(),
+            )
+            messages.info(request, f"Import queued as job {job_id}.")
+            return redirect(self._import_status_url(job_id))
+        return self._render_import(request, form=form)
+
+    def import_status_view(self, request, job_id):
+        """Progress page of an import job (its state as JSON with `?json`)."""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        job = get_import_job(job_id)
+        if job is None or job["model"] != self.model._meta.label:
+            raise Http404("Unknown or expired import job")
+        if "json" in request.GET:
+            return JsonResponse(job)
+        return self._render_import(request, job=job)
+
+    def _import_status_url(self, job_id):
+        info = self.model._meta.app_label, self.model._meta.model_name
+        return reverse(f"{self.admin_site.name}:{info[0]}_{info[1]}_import_status", args=[job_id])
+
+    def _render_import(self, request, form=None, job=None):
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": f"Import {self.model._meta.verbose_name_plural}",
+            "form": form,
+            "job": job,
+            "percent": int(100 * job["position"] / job["size"]) if job and job["size"] else 0,
+            "columns": self.get_transfer_fields(request),
+            "unique_fields": self.import_unique_fields or [self.model._meta.pk.name],
+        }
+        return TemplateResponse(request, self.import_template, context)
+
+    def get_urls(self):
+        """The admin's URLs and the import progress page."""
+        info = self.model._meta.app_label, self.model._meta.model_name
+        return [
+            path(
+                "import/<str:job_id>/",
+                self.admin_site.admin_view(self.import_status_view),
+                name=f"{info[0]}_{info[1]}_import_status",
+            ),
+            *super().get_urls(),
+        ]
+
+
+__all__ = ["ImportForm", "TransferAdminMixin"]
@@ -0,0 +1,237 @@
+import asyncio
+import functools
+import time
+import weakref
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+from shared.utils.instrumentation import record_cache, record_cache_many
+
+try:
+    from redis import asyncio as aioredis
+except ImportError:  # pragma: no cover - redis is pulled in by django-redis
+    aioredis = None
+
+_closers = set()
+
+
+def close_on_loop_shutdown(loop, clients, close):
+    """
+    Close a per-loop client in its own loop when that loop shuts down.
+
+    `asyncio.run` (which `async_to_sync` uses for every async view under
+    WSGI) cancels the pending tasks before closing the loop: the task
+    scheduled here waits until then, drops the loop's entry from `clients`
+    and awaits `close()`, so the connections do not outlive the loop.
+
+    Args:
+        loop (asyncio.AbstractEventLoop): The running loop the client belongs to.
+        clients (weakref.WeakKeyDictionary): The per-loop clients, keyed by loop.
+        close (callable): Coroutine function closing the client.
+    """
+
+    async def wait():
+        try:
+            await loop.create_future()
+        finally:
+            clients.pop(loop, None)
+            await close()
+
+    closer = loop.create_task(wait())
+    _closers.add(closer)
+    closer.add_done_callback(_closers.discard)
+
+
+class AsyncCache:
+    """
+    Native asyncio access to a `django_redis` cache alias.
+
+    Django's `BaseCache.aget`/`aset` fall back to `sync_to_async`, so every call
+    under ASGI hops to a worker thread and blocks on the synchronous client.
+    This wrapper talks to Redis through `redis.asyncio` instead, while reusing
+    the alias' own key function, serializer and compressor so values stay
+    interchangeable with the synchronous `django.core.cache.caches[alias]`.
+
+    Backends that are not `django_redis` (e.g. locmem in local runs) are
+    transparently delegated to Django's `a*` methods.
+
+    Args:
+        alias (str): The cache alias from `settings.CACHES` (default is "default").
+    """
+
+    def __init__(self, alias="default"):
+        self.alias = alias
+        # redis.asyncio connections are bound to the loop that created them;
+        # keep one client per loop (WSGI runs async views in throwaway loops).
+        self._clients = weakref.WeakKeyDictionary()
+
+    @property
+    def cache(self):
+        """The synchronous Django cache of the alias."""
+        return caches[self.alias]
+
+    @property
+    def is_native(self):
+        """Whether the alias is a `django_redis` cache reachable through `redis.asyncio`."""
+        return aioredis is not None and hasattr(self.cache, "client") and hasattr(
+            self.cache.client, "encode"
+        )
+
+    def _get_client(self):
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            config = settings.CACHES[self.alias]
+            location = config["LOCATION"]
+            if isinstance(location, (list, tuple)):
+                location = location[0]
+            options = config.get("OPTIONS", {})
+            # Same pool class, size and timeouts as the synchronous client.
+            pool_kwargs = dict(options.get("CONNECTION_POOL_KWARGS", {}))
+            if options.get("SOCKET_TIMEOUT"):
+                pool_kwargs.setdefault("socket_timeout", options["SOCKET_TIMEOUT"])
+            if options.get("SOCKET_CONNECT_TIMEOUT"):
+                pool_kwargs.setdefault("socket_connect_timeout", options["SOCKET_CONNECT_TIMEOUT"])
+            if options.get("CONNECTION_POOL_CLASS", "").endswith("BlockingConnectionPool"):
+                pool_class = aioredis.BlockingConnectionPool
+            else:
+                pool_class = aioredis.ConnectionPool
+            client = aioredis.Redis(connection_pool=pool_class.from_url(location, **pool_kwargs))
+            self._clients[loop] = client
+            close_on_loop_shutdown(loop, self._clients, functools.partial(client.aclose, close_connection_pool=True))
+        return client
+
+    def get_client(self):
+        """The `redis.asyncio` client of the running loop (native backends only)."""
+        return self._get_client()
+
+    def _make_key(self, key, version=None):
+        return str(self.cache.client.make_key(key, version=version))
+
+    def _timeout_ms(self, timeout):
+        # None: no expiry; 0: do not store (Django's `timeout=0`).
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.cache.default_timeout
+        if timeout is None:
+            return None
+        return max(int(timeout * 1000), 0)
+
+    async def aget(self, key, default=None, version=None):
+        """Return the value of `key`, or `default` when it is missing."""
+        if not self.is_native:
+            return await self.cache.aget(key, default, version=version)
+        started = time.perf_counter()
+        value = await self._get_client().get(self._make_key(key, version))
+        record_cache(time.perf_counter() - started, hit=value is not None)
+        if value is None:
+            return default
+        return self.cache.client.decode(value)
+
+    async def aset(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        """Store `value` under `key`; a `timeout` of 0 deletes the key instead, like django-redis."""
+        if not self.is_native:
+            return await self.cache.aset(key, value, timeout, version=version)
+        timeout_ms = self._timeout_ms(timeout)
+        if timeout_ms == 0:
+            return await self.adelete(key, version=version)
+        started = time.perf_counter()
+        result = await self._get_client().set(
+            self._make_key(key, version),
+            self.cache.client.encode(value),
+            px=timeout_ms,
+        )
+        record_cache(time.perf_counter() - started, op="set")
+        return bool(result)
+
+    async def aadd(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        """Store `value` unless `key` exists; returns whether it was missing."""
+        if not self.is_native:
+            return await self.cache.aadd(key, value, timeout, version=version)
+        timeout_ms = self._timeout_ms(timeout)
+        started = time.perf_counter()
+        if timeout_ms == 0:  # nothing is stored, but an existing value is kept
+            result = not await self._get_client().exists(self._make_key(key, version))
+        else:
+            result = await self._get_client().set(
+                self._make_key(key, version),
+                self.cache.client.encode(value),
+                px=timeout_ms,
+                nx=True,
+            )
+        record_cache(time.perf_counter() - started, op="add")
+        return bool(result)
+
+    async def adelete(self, key, version=None):
+        """Delete `key`; returns whether it existed."""
+        if not self.is_native:
+            return await self.cache.adelete(key, version=version)
+        started = time.perf_counter()
+        result = await self._get_client().delete(self._make_key(key, version))
+        record_cache(time.perf_counter() - started, op="delete")
+        return bool(result)
+
+    async def aget_many(self, keys, version=None):
+        """Return `{key: value}` for the `keys` that exist, in one `MGET`."""
+        if not self.is_native:
+            return await self.cache.aget_many(keys, version=version)
+        keys = list(keys)
+        if not keys:
+            return {}
+        started = time.perf_counter()
+        values = await self._get_client().mget([self._make_key(key, version) for key in keys])
+        found = sum(value is not None for value in values)
+        record_cache_many(time.perf_counter() - started, found, len(values) - found)
+        return {
+            key: self.cache.client.decode(value)
+            for key, value in zip(keys, values)
+            if value is not None
+        }
+
+    async def aset_many(self, data, timeout=DEFAULT_TIMEOUT, version=None, nx=False):
+        """
+        Set every `{key: value}` of `data` in one pipelined round-trip.
+
+        With `nx`, keys that already exist are left alone (`SET NX`).
+
+        Returns:
+            list: The keys that were not set.
+        """
+        if not self.is_native:
+            if not nx:
+                return await self.cache.aset_many(data, timeout, version=version)
+            return [key for key, value in data.items() if not await self.cache.aadd(key, value, timeout, version)]
+        if not data:
+            return []
+        timeout_ms = self._timeout_ms(timeout)
+        if timeout_ms == 0:  # nothing is stored; like `aadd`, existing keys count as not set
+            if nx:
+                return list(await self.aget_many(data, version=version))
+            await self.adelete_many(data, version=version)
+            return []
+        started = time.perf_counter()
+        pipeline = self._get_client().pipeline(transaction=False)
+        for key, value in data.items():
+            pipeline.set(self._make_key(key, version), self.cache.client.encode(value), px=timeout_ms, nx=nx)
+        results = await pipeline.execute()
+        record_cache(time.perf_counter() - started, op="set_many")
+        return [key for key, result in zip(data, results) if not result]
+
+    async def adelete_many(self, keys, version=None):
+        """Delete `keys` in one round-trip; returns how many existed."""
+        if not self.is_native:
+            return await self.cache.adelete_many(keys, version=version)
+        keys = list(keys)
+        if not keys:
+            return 0
+        started = time.perf_counter()
+        result = await self._get_client().delete(*(self._make_key(key, version) for key in keys))
+        record_cache(time.perf_counter() - started, op="delete_many")
+        return result
+
+
+async_cache = AsyncCache()
+
+
+__all__ = ["close_on_loop_shutdown", "AsyncCache", "async_cache"]
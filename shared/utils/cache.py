@@ -0,0 +1,402 @@
+import asyncio
+import functools
+import inspect
+import logging
+import math
+import random
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import caches
+
+from shared.utils.async_cache import AsyncCache
+
+logger = logging.getLogger(__name__)
+
+_refresh_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="cache-refresh")
+
+# Deletes a recomputation lock only while it still holds the caller's token:
+# a lock that expired and was taken by another worker is left alone.
+RELEASE_LOCK_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+
+class LocalLRU:
+    """
+    A small thread-safe, size-bounded LRU used as the in-process cache tier.
+
+    Entries are stored as `(value, expires_at)` pairs; expired entries are
+    dropped lazily on read.
+
+    Args:
+        maxsize (int): Maximum number of entries kept in memory.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, now=None):
+        """Return the `(value, expires_at)` of `key`, or None when it is missing or expired."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            if item[1] <= now:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return item
+
+    def set(self, key, value, ttl):
+        """Store `value` for `ttl` seconds, evicting the least recently used entries past `maxsize`."""
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        """Drop `key` if present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class CacheStats:
+    """
+    Thread-safe hit/miss/stampede counters for a `TieredCache`.
+    """
+
+    FIELDS = (
+        "local_hits",
+        "remote_hits",
+        "misses",
+        "recomputes",
+        "early_refreshes",
+        "stale_served",
+        "stampedes_avoided",
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(self.FIELDS, 0)
+
+    def incr(self, name, amount=1):
+        """Add `amount` to the counter `name`."""
+        with self._lock:
+            self._counts[name] += amount
+
+    def snapshot(self):
+        """Return a copy of every counter."""
+        with self._lock:
+            return dict(self._counts)
+
+    def reset(self):
+        """Set every counter back to zero."""
+        with self._lock:
+            self._counts = dict.fromkeys(self.FIELDS, 0)
+
+
+class TieredCache:  # pylint: disable=too-many-instance-attributes
+    """
+    Two-tier, stampede-protected cache for expensive payloads.
+
+    Lookups go through an in-process LRU first and the Redis-backed Django
+    cache alias second. Values are stored in Redis inside a small envelope
+    (`value`, `delta` = cost of the last computation, `expires` = soft expiry)
+    with a hard TTL of `ttl + stale_ttl`, which enables:
+
+    - **single-flight recomputation**: only the worker that wins a Redis
+      `SET NX` lock recomputes a missing or expired value; the others wait for
+      it (on a cold miss) or keep serving what they have.
+    - **probabilistic early refresh** (XFetch): a fresh value is refreshed in
+      the background with a probability that grows as expiry approaches and
+      with the cost of the computation, so hot keys rarely expire at all.
+    - **stale-while-revalidate**: for `stale_ttl` seconds after expiry the old
+      value is served immediately while one worker revalidates it.
+
+    Background refreshes run on a small thread pool (coroutine functions in
+    their own event loop there), so they outlive the request that started
+    them; a failed refresh is logged and the previous value kept.
+
+    Args:
+        namespace (str): Key prefix shared by every entry of this cache.
+        ttl (int): Soft time-to-live of a value, in seconds.
+        stale_ttl (int): Seconds an expired value may still be served while it is revalidated.
+        local_ttl (float): Time-to-live of the in-process tier, capped by the soft expiry.
+        local_maxsize (int): Maximum entries of the in-process tier.
+        beta (float): XFetch aggressiveness; `0` disables early refresh.
+        lock_timeout (int): Expiry of the recomputation lock, in seconds.
+        alias (str): Django cache alias backing the shared tier.
+    """
+
+    def __init__(
+        self,
+        namespace,
+        ttl,
+        *,
+        stale_ttl=0,
+        local_ttl=5,
+        local_maxsize=1024,
+        beta=1.0,
+        lock_timeout=10,
+        alias="default",
+    ):  # pylint: disable=too-many-arguments
+        self.namespace = namespace
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.local_ttl = local_ttl
+        self.beta = beta
+        self.lock_timeout = lock_timeout
+        self.alias = alias
+        self.local = LocalLRU(local_maxsize)
+        self.stats = CacheStats()
+        self._async_cache = AsyncCache(alias)
+        self._scripts = weakref.WeakKeyDictionary()
+
+    @property
+    def cache(self):
+        """The Django cache of the shared tier."""
+        return caches[self.alias]
+
+    # Keys and envelopes -------------------------------------------------
+
+    def _key(self, key):
+        return f"tiered:{self.namespace}:{key}"
+
+    def _lock_key(self, key):
+        return f"tiered-lock:{self.namespace}:{key}"
+
+    def _envelope(self, value, delta):
+        return {"value": value, "delta": delta, "expires": time.time() + self.ttl}
+
+    def _hard_ttl(self):
+        return self.ttl + self.stale_ttl
+
+    def _should_refresh_early(self, envelope, now):
+        if self.beta <= 0:
+            return False
+        delta = envelope.get("delta") or 0.0
+        # XFetch: -log(U) is exponentially distributed, so the refresh
+        # probability rises smoothly as `expires` approaches.
+        return now - delta * self.beta * math.log(random.random() or 1e-12) >= envelope["expires"]
+
+    def _remember_locally(self, key, envelope, now):
+        remaining = envelope["expires"] - now
+        if remaining > 0:
+            self.local.set(key, envelope["value"], min(self.local_ttl, remaining))
+
+    def _classify(self, envelope, now):
+        """Return `fresh`, `refresh` (fresh but due early) or `stale`."""
+        if envelope["expires"] <= now:
+            return "stale"
+        if self._should_refresh_early(envelope, now):
+            return "refresh"
+        return "fresh"
+
+    # Recomputation locks -----------------------------------------------
+
+    def _release_args(self, key, token):
+        return [self.cache.make_key(self._lock_key(key))], [self.cache.client.encode(token)]
+
+    def _release(self, key, token):
+        if not self._async_cache.is_native:  # no scripting (locmem): the lock is process-local anyway
+            if self.cache.get(self._lock_key(key)) == token:
+                self.cache.delete(self._lock_key(key))
+            return
+        client = self.cache.client.get_client(write=True)
+        script = self._scripts.get(client)
+        if script is None:
+            client.script_load(RELEASE_LOCK_SCRIPT)  # so the first call needs no NOSCRIPT retry
+            script = self._scripts[client] = client.register_script(RELEASE_LOCK_SCRIPT)
+        keys, args = self._release_args(key, token)
+        script(keys=keys, args=args)
+
+    async def _arelease(self, key, token):
+        if not self._async_cache.is_native:
+            if await self.cache.aget(self._lock_key(key)) == token:
+                await self.cache.adelete(self._lock_key(key))
+            return
+        client = self._async_cache.get_client()
+        script = self._scripts.get(client)
+        if script is None:
+            await client.script_load(RELEASE_LOCK_SCRIPT)
+            script = self._scripts[client] = client.register_script(RELEASE_LOCK_SCRIPT)
+        keys, args = self._release_args(key, token)
+        await script(keys=keys, args=args)
+
+    def _refresh_in_background(self, key, refresh):
+        # A thread of its own: under WSGI the event loop of an async view is
+        # closed, cancelling its tasks, as soon as the view returns.
+        def run():
+            try:
+                refresh()
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception("Background refresh of %s failed, the previous value is kept", self._key(key))
+
+        _refresh_executor.submit(run)
+
+    # Synchronous API ----------------------------------------------------
+
+    def _compute_and_store(self, key, compute):
+        started = time.perf_counter()
+        value = compute()
+        envelope = self._envelope(value, time.perf_counter() - started)
+        self.cache.set(self._key(key), envelope, timeout=self._hard_ttl())
+        self._remember_locally(key, envelope, time.time())
+        self.stats.incr("recomputes")
+        return value
+
+    def _refresh_locked(self, key, compute, token):
+        try:
+            return self._compute_and_store(key, compute)
+        finally:
+            self._release(key, token)
+
+    def get_or_set(self, key, compute):
+        """
+        Return the cached value for `key`, computing it with `compute()` if needed.
+
+        Args:
+            key (str): Cache key, relative to the namespace.
+            compute (Callable[[], Any]): Zero-argument function producing the value.
+
+        Returns:
+            Any: The cached or freshly computed value.
+        """
+        local = self.local.get(key)
+        if local is not None:
+            self.stats.incr("local_hits")
+            return local[0]
+
+        now = time.time()
+        envelope = self.cache.get(self._key(key))
+        if envelope is not None:
+            state = self._classify(envelope, now)
+            if state == "fresh":
+                self.stats.incr("remote_hits")
+                self._remember_locally(key, envelope, now)
+                return envelope["value"]
+            self.stats.incr("remote_hits" if state == "refresh" else "stale_served")
+            token = uuid.uuid4().hex
+            if self.cache.add(self._lock_key(key), token, timeout=self.lock_timeout):
+                if state == "refresh":
+                    self.stats.incr("early_refreshes")
+                self._refresh_in_background(key, functools.partial(self._refresh_locked, key, compute, token))
+            elif state == "stale":
+                self.stats.incr("stampedes_avoided")
+            return envelope["value"]
+
+        self.stats.incr("misses")
+        token = uuid.uuid4().hex
+        if self.cache.add(self._lock_key(key), token, timeout=self.lock_timeout):
+            return self._refresh_locked(key, compute, token)
+
+        # Somebody else is computing this value: wait for it rather than
+        # piling onto the backend, and fall back to computing it ourselves.
+        self.stats.incr("stampedes_avoided")
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            envelope = self.cache.get(self._key(key))
+            if envelope is not None:
+                self._remember_locally(key, envelope, time.time())
+                return envelope["value"]
+        return self._compute_and_store(key, compute)
+
+    def invalidate(self, key):
+        """Drop `key` from both tiers (only this process' local tier is affected)."""
+        self.local.delete(key)
+        self.cache.delete(self._key(key))
+
+    # Asynchronous API ---------------------------------------------------
+
+    async def _acompute_and_store(self, key, compute):
+        started = time.perf_counter()
+        value = compute()
+        if inspect.isawaitable(value):
+            value = await value
+        envelope = self._envelope(value, time.perf_counter() - started)
+        await self._async_cache.aset(self._key(key), envelope, timeout=self._hard_ttl())
+        self._remember_locally(key, envelope, time.time())
+        self.stats.incr("recomputes")
+        return value
+
+    async def _arefresh_locked(self, key, compute, token):
+        try:
+            return await self._acompute_and_store(key, compute)
+        finally:
+            await self._arelease(key, token)
+
+    async def aget_or_set(self, key, compute):
+        """
+        Async counterpart of `get_or_set`; `compute` may be sync or a coroutine function.
+
+        A background refresh calls `compute` from another thread and event
+        loop, so it must not capture objects bound to the caller's loop.
+        """
+        local = self.local.get(key)
+        if local is not None:
+            self.stats.incr("local_hits")
+            return local[0]
+
+        now = time.time()
+        envelope = await self._async_cache.aget(self._key(key))
+        if envelope is not None:
+            state = self._classify(envelope, now)
+            if state == "fresh":
+                self.stats.incr("remote_hits")
+                self._remember_locally(key, envelope, now)
+                return envelope["value"]
+            self.stats.incr("remote_hits" if state == "refresh" else "stale_served")
+            token = uuid.uuid4().hex
+            if await self._async_cache.aadd(self._lock_key(key), token, timeout=self.lock_timeout):
+                if state == "refresh":
+                    self.stats.incr("early_refreshes")
+                self._refresh_in_background(
+                    key, lambda: asyncio.run(self._arefresh_locked(key, compute, token))
+                )
+            elif state == "stale":
+                self.stats.incr("stampedes_avoided")
+            return envelope["value"]
+
+        self.stats.incr("misses")
+        token = uuid.uuid4().hex
+        if await self._async_cache.aadd(self._lock_key(key), token, timeout=self.lock_timeout):
+            return await self._arefresh_locked(key, compute, token)
+
+        self.stats.incr("stampedes_avoided")
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            envelope = await self._async_cache.aget(self._key(key))
+            if envelope is not None:
+                self._remember_locally(key, envelope, time.time())
+                return envelope["value"]
+        return await self._acompute_and_store(key, compute)
+
+    async def ainvalidate(self, key):
+        """Async counterpart of `invalidate`."""
+        self.local.delete(key)
+        await self._async_cache.adelete(self._key(key))
+
+
+__all__ = ["LocalLRU", "CacheStats", "TieredCache"]
@@ -0,0 +1,227 @@
+import datetime
+import importlib
+import importlib.util
+import pickle
+import uuid
+import warnings
+import zlib
+from urllib.parse import urlsplit, urlunsplit
+
+from django_redis.compressors.base import BaseCompressor
+from django_redis.exceptions import CompressorError
+from django_redis.serializers.base import BaseSerializer
+
+SERIALIZERS = {
+    "json": "shared.utils.fastjson.JSONSerializer",
+    "msgpack": "shared.utils.cache_backends.MsgpackSerializer",
+    "pickle": "django_redis.serializers.pickle.PickleSerializer",
+}
+
+# Compression algorithm -> module it needs.
+COMPRESSORS = {"zstd": "pyzstd", "lz4": "lz4", "zlib": "zlib", "none": None}
+
+# Compressed values are recognised by their frame header, so a cache can
+# switch algorithm (or threshold) and still read every value already stored.
+# None of these prefixes can start a JSON, msgpack (longer than one byte) or
+# pickle payload.
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+_LZ4_MAGIC = b"\x04\x22\x4d\x18"
+_ZLIB_FLAGS = (b"\x01", b"\x5e", b"\x9c", b"\xda")
+
+
+def compressor_available(algorithm):
+    """Return True when the module needed by `algorithm` is importable."""
+    module = COMPRESSORS[algorithm]
+    return module is None or importlib.util.find_spec(module) is not None
+
+
+def with_db(url, db):
+    """Return the Redis `url` pointing at database number `db`."""
+    parts = urlsplit(url)
+    return urlunsplit(parts._replace(path=f"/{db}"))
+
+
+def redis_cache(
+    location,
+    *,
+    serializer="pickle",
+    compressor="zstd",
+    compress_min_length=1024,
+    compress_level=None,
+    max_connections=50,
+    socket_timeout=1.0,
+    socket_connect_timeout=1.0,
+    pool_timeout=2.0,
+    timeout=300,
+    key_prefix="",
+):  # pylint: disable=too-many-arguments
+    """
+    Build a `CACHES` entry for a `django_redis` cache.
+
+    - `serializer`: `pickle`, `json` (orjson), `msgpack` or a dotted path.
+      JSON and msgpack are faster and smaller but have no tuples (they come
+      back as lists): opt in for caches holding JSON-shaped data.
+    - `compressor`: `zstd`, `lz4` or `zlib`, applied only to values of at
+      least `compress_min_length` bytes (small values cost more to compress
+      than they save), or `none`. Falls back to `zlib` with a warning when
+      the library is not installed.
+    - one blocking pool of at most `max_connections` per process: callers
+      wait up to `pool_timeout` seconds for a free connection instead of
+      opening more than Redis should handle.
+
+    Args:
+        location (str): Redis URL, e.g. `redis://127.0.0.1:6379/1`.
+        serializer (str): A `SERIALIZERS` name or a serializer class path.
+        compressor (str): A `COMPRESSORS` name.
+        compress_min_length (int): Smallest serialized value that is compressed.
+        compress_level (int, optional): Algorithm specific level (library default when unset).
+        max_connections (int): Size of the connection pool.
+        socket_timeout (float): Seconds a command may take before failing.
+        socket_connect_timeout (float): Seconds to establish a connection.
+        pool_timeout (float): Seconds to wait for a free pooled connection.
+        timeout (int): Default expiry of cache entries, in seconds.
+        key_prefix (str): Prefix of every key of the alias.
+
+    Returns:
+        dict: The cache settings.
+    """
+    compressor = (compressor or "none").lower()
+    if compressor not in COMPRESSORS:
+        raise ValueError(f"Unknown cache compressor {compressor!r}, expected one of {tuple(COMPRESSORS)}")
+    if not compressor_available(compressor):
+        warnings.warn(
+            f"Cache compressor {compressor!r} requires `{COMPRESSORS[compressor]}`; falling back to zlib.",
+            RuntimeWarning,
+            stacklevel=2,
+        )
+        compressor = "zlib"
+
+    options = {
+        "CLIENT_CLASS": "shared.utils.instrumentation.InstrumentedRedisClient",
+        "SERIALIZER": SERIALIZERS.get(serializer, serializer),
+        "SOCKET_TIMEOUT": socket_timeout,
+        "SOCKET_CONNECT_TIMEOUT": socket_connect_timeout,
+        "CONNECTION_POOL_CLASS": "redis.BlockingConnectionPool",
+        "CONNECTION_POOL_KWARGS": {
+            "max_connections": max_connections,
+            "timeout": pool_timeout,
+            "health_check_interval": 30,
+        },
+    }
+    if compressor != "none":
+        options["COMPRESSOR"] = "shared.utils.cache_backends.ThresholdCompressor"
+        options["COMPRESS_ALGORITHM"] = compressor
+        options["COMPRESS_MIN_LENGTH"] = compress_min_length
+        options["COMPRESS_LEVEL"] = compress_level
+    return {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": location,
+        "TIMEOUT": timeout,
+        "KEY_PREFIX": key_prefix,
+        "OPTIONS": options,
+    }
+
+
+def _zstd(level):
+    import pyzstd  # pylint: disable=import-outside-toplevel
+
+    return (lambda value: pyzstd.compress(value, level)) if level is not None else pyzstd.compress, pyzstd.decompress
+
+
+def _lz4(level):
+    from lz4 import frame  # pylint: disable=import-outside-toplevel
+
+    return (lambda value: frame.compress(value, compression_level=level or 0)), frame.decompress
+
+
+def _zlib(level):
+    return (lambda value: zlib.compress(value, 6 if level is None else level)), zlib.decompress
+
+
+_CODECS = {"zstd": _zstd, "lz4": _lz4, "zlib": _zlib}
+
+
+class ThresholdCompressor(BaseCompressor):
+    """
+    `django_redis` compressor compressing values of `COMPRESS_MIN_LENGTH`
+    bytes or more with `COMPRESS_ALGORITHM` (`zstd`, `lz4` or `zlib`).
+
+    Decompression detects the algorithm from the frame header and returns
+    anything else untouched, so uncompressed small values cost nothing to
+    read and changing the algorithm needs no cache flush.
+    """
+
+    def __init__(self, options):
+        super().__init__(options)
+        self.min_length = options.get("COMPRESS_MIN_LENGTH", 1024)
+        self._compress = _CODECS[options.get("COMPRESS_ALGORITHM", "zstd")](options.get("COMPRESS_LEVEL"))[0]
+        self._decompressors = {}
+
+    def _decompressor(self, algorithm):
+        decompress = self._decompressors.get(algorithm)
+        if decompress is None:
+            decompress = self._decompressors[algorithm] = _CODECS[algorithm](None)[1]
+        return decompress
+
+    def compress(self, value):
+        if len(value) < self.min_length:
+            return value
+        return self._compress(value)
+
+    def decompress(self, value):
+        head = value[:4]
+        if head == _ZSTD_MAGIC:
+            algorithm = "zstd"
+        elif head == _LZ4_MAGIC:
+            algorithm = "lz4"
+        elif value[:1] == b"x" and value[1:2] in _ZLIB_FLAGS:
+            algorithm = "zlib"
+        else:
+            return value
+        try:
+            return self._decompressor(algorithm)(value)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            raise CompressorError(e) from e
+
+
+def _msgpack_default(obj):
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    from shared.utils.fastjson import default  # pylint: disable=import-outside-toplevel
+
+    return default(obj)
+
+
+class MsgpackSerializer(BaseSerializer):
+    """
+    msgpack serializer: more compact than JSON for numbers and binary data.
+
+    Encodes the same extra types as `fastjson` (datetimes as ISO 8601
+    strings) and still reads values written by the pickle serializer.
+    """
+
+    def __init__(self, options):
+        super().__init__(options)
+        self._msgpack = importlib.import_module("msgpack")
+
+    def dumps(self, value):
+        return self._msgpack.packb(value, default=_msgpack_default, use_bin_type=True)
+
+    def loads(self, value):
+        # A lone 0x80 is an empty msgpack map; pickle adds a protocol byte.
+        if value[:1] == b"\x80" and len(value) > 1:
+            return pickle.loads(value)
+        return self._msgpack.unpackb(value, raw=False, strict_map_key=False)
+
+
+__all__ = [
+    "SERIALIZERS",
+    "COMPRESSORS",
+    "compressor_available",
+    "with_db",
+    "redis_cache",
+    "ThresholdCompressor",
+    "MsgpackSerializer",
+]
@@ -0,0 +1,87 @@
+import importlib.util
+import warnings
+
+CONNECTION_MODES = ("pool", "persistent", "none")
+
+
+def psycopg_pool_available():
+    """Return True when psycopg 3 and psycopg_pool are importable (required by Django's native pool)."""
+    return bool(importlib.util.find_spec("psycopg") and importlib.util.find_spec("psycopg_pool"))
+
+
+def default_connection_mode(interface):
+    """
+    Connection mode used when `DB_CONNECTION_MODE` is not set.
+
+    Persistent connections belong to the thread that opened them. Under ASGI
+    sync ORM calls run in executor threads, so they pile up (one per thread,
+    closed only at `CONN_MAX_AGE`); ASGI gets the pool when psycopg 3 is
+    installed, else persistent connections validated by `CONN_HEALTH_CHECKS`
+    rather than a new connection per request.
+
+    Args:
+        interface (str): "asgi" or "wsgi", the application being served.
+    """
+    if interface != "asgi":
+        return "persistent"
+    return "pool" if psycopg_pool_available() else "persistent"
+
+
+def configure_connection_mode(
+    database,
+    mode="persistent",
+    conn_max_age=600,
+    health_checks=True,
+    pool_options=None,
+):  # pylint: disable=too-many-arguments
+    """
+    Apply a connection reuse strategy to a `DATABASES` entry.
+
+    - `pool`: Django 5.1+ native psycopg 3 connection pool (`OPTIONS["pool"]`).
+      Falls back to `persistent` with a warning when psycopg 3 / psycopg_pool
+      are not installed (`psycopg[binary,pool]` is a project dependency).
+    - `persistent`: one long-lived connection per worker thread, reused for
+      `conn_max_age` seconds and validated before reuse when `health_checks`.
+    - `none`: Django's default, a new connection per request.
+
+    Args:
+        database (dict): The database settings to update in place.
+        mode (str): One of `CONNECTION_MODES`.
+        conn_max_age (int): Lifetime of persistent connections, in seconds.
+        health_checks (bool): Enable `CONN_HEALTH_CHECKS` for persistent connections.
+        pool_options (dict, optional): Options passed to `psycopg_pool.ConnectionPool`.
+
+    Returns:
+        dict: The updated `database` mapping.
+    """
+    mode = (mode or "persistent").lower()
+    if mode not in CONNECTION_MODES:
+        raise ValueError(f"Unknown database connection mode {mode!r}, expected one of {CONNECTION_MODES}")
+
+    if mode == "pool" and not psycopg_pool_available():
+        warnings.warn(
+            "DB_CONNECTION_MODE=pool requires `psycopg[pool]`; falling back to persistent connections.",
+            RuntimeWarning,
+            stacklevel=2,
+        )
+        mode = "persistent"
+
+    options = database.setdefault("OPTIONS", {})
+    options.pop("pool", None)
+    if mode == "pool":
+        # Pooled connections are returned to the pool at the end of each
+        # request; Django refuses persistent connections on top of a pool.
+        database["CONN_MAX_AGE"] = 0
+        database["CONN_HEALTH_CHECKS"] = False
+        options["pool"] = pool_options or True
+    elif mode == "persistent":
+        database["CONN_MAX_AGE"] = conn_max_age
+        database["CONN_HEALTH_CHECKS"] = health_checks
+    else:
+        database["CONN_MAX_AGE"] = 0
+        database["CONN_HEALTH_CHECKS"] = False
+    database["CONNECTION_MODE"] = mode
+    return database
+
+
+__all__ = ["CONNECTION_MODES", "configure_connection_mode", "psycopg_pool_available"]
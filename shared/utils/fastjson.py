@@ -0,0 +1,140 @@
+import dataclasses
+import datetime
+import decimal
+import enum
+import json
+import pickle
+
+from django import http
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models.query import QuerySet
+from django.utils.duration import duration_iso_string
+from django.utils.functional import Promise
+from django_redis.serializers.base import BaseSerializer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - the stdlib encoder is used instead
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+def default(obj):
+    """
+    Encode the types that neither orjson nor `json` handle natively, the same
+    way `DjangoJSONEncoder` does (lazy strings, decimals as strings, durations
+    as ISO 8601) plus sets, querysets, UTF-8 bytes and dataclasses.
+
+    Raises:
+        TypeError: When `obj` is not serializable, including bytes that are
+            not valid UTF-8.
+    """
+    if isinstance(obj, (Promise, decimal.Decimal)):
+        return str(obj)
+    if isinstance(obj, datetime.timedelta):
+        return duration_iso_string(obj)
+    if isinstance(obj, (set, frozenset, QuerySet)):
+        return list(obj)
+    if isinstance(obj, bytes):
+        try:
+            return obj.decode()
+        except UnicodeDecodeError as e:
+            raise TypeError("Object of type bytes is not JSON serializable unless it is UTF-8") from e
+    if isinstance(obj, enum.Enum):
+        return obj.value
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class _StdlibEncoder(DjangoJSONEncoder):
+    def default(self, o):
+        try:
+            return super().default(o)
+        except TypeError:
+            return default(o)
+
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_UTC_Z
+
+    def dumps(obj, indent=False):
+        """
+        Serialize `obj` to compact UTF-8 JSON bytes (2-space indented with `indent`).
+
+        Dicts with non-string keys are retried with `OPT_NON_STR_KEYS`, which
+        would halve throughput if enabled for every call.
+        """
+        option = _OPTIONS | orjson.OPT_INDENT_2 if indent else _OPTIONS
+        try:
+            return orjson.dumps(obj, default=default, option=option)
+        except orjson.JSONEncodeError:
+            return orjson.dumps(obj, default=default, option=option | orjson.OPT_NON_STR_KEYS)
+
+    def loads(data):
+        """Deserialize JSON from `bytes`, `bytearray`, `memoryview` or `str`."""
+        return orjson.loads(data)
+
+else:
+
+    def dumps(obj, indent=False):
+        """Serialize `obj` to compact UTF-8 JSON bytes (2-space indented with `indent`)."""
+        return json.dumps(
+            obj,
+            cls=_StdlibEncoder,
+            ensure_ascii=False,
+            indent=2 if indent else None,
+            separators=None if indent else (",", ":"),
+        ).encode()
+
+    def loads(data):
+        """Deserialize JSON from `bytes`, `bytearray`, `memoryview` or `str`."""
+        return json.loads(bytes(data) if isinstance(data, memoryview) else data)
+
+
+class JsonResponse(http.JsonResponse):
+    """
+    Drop-in `django.http.JsonResponse` encoding with `dumps`.
+
+    Passing `encoder` or `json_dumps_params` keeps Django's stdlib encoding,
+    since those only make sense for `json.dumps`.
+    """
+
+    def __init__(self, data, encoder=None, safe=True, json_dumps_params=None, **kwargs):
+        if encoder is not None or json_dumps_params:
+            super().__init__(data, encoder or DjangoJSONEncoder, safe, json_dumps_params, **kwargs)
+            return
+        if safe and not isinstance(data, dict):
+            raise TypeError("In order to allow non-dict objects to be serialized set the safe parameter to False.")
+        kwargs.setdefault("content_type", "application/json")
+        # Skip JsonResponse.__init__, which would encode with json.dumps.
+        super(http.JsonResponse, self).__init__(content=dumps(data), **kwargs)  # pylint: disable=bad-super-call
+
+
+class JSONSerializer(BaseSerializer):
+    """
+    `django_redis` serializer using `dumps`/`loads` (`OPTIONS["SERIALIZER"]`).
+
+    JSON has no tuples, so they come back as lists: opt in per alias
+    (`CACHE_SERIALIZER=json`) for caches holding JSON-shaped data. Values
+    written by the pickle serializer are still read, so switching an existing
+    cache over does not turn live keys into errors, and values JSON cannot
+    encode (e.g. non UTF-8 bytes) are pickled instead of failing the write.
+    """
+
+    def dumps(self, value):
+        """Encode `value` as JSON, or pickle it when JSON cannot represent it."""
+        try:
+            return dumps(value)
+        except TypeError:
+            return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    def loads(self, value):
+        """Decode a value written by `dumps()` or by the pickle serializer."""
+        if value[:1] == b"\x80":  # pickle protocol 2+ header, never valid JSON
+            return pickle.loads(value)
+        return loads(value)
+
+
+__all__ = ["BACKEND", "default", "dumps", "loads", "JsonResponse", "JSONSerializer"]
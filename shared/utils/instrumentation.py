@@ -0,0 +1,158 @@
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from django_redis.client import DefaultClient
+
+from shared.utils.metrics import cache_lookups, cache_roundtrip_duration, db_query_duration
+
+
+@dataclass
+class RequestStats:
+    """Per-request counters filled by the DB and cache instrumentation."""
+
+    started: float = field(default_factory=time.perf_counter)
+    db_queries: int = 0
+    db_time: float = 0.0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    cache_calls: int = 0
+    cache_time: float = 0.0
+
+
+request_stats_var = ContextVar("request_stats", default=None)
+
+
+def current_stats():
+    """Return the `RequestStats` of the current request, or None outside a request."""
+    return request_stats_var.get()
+
+
+def record_query(elapsed, alias="default"):
+    """Account a database query to the current request and to the metrics."""
+    db_query_duration.observe(elapsed, alias)
+    stats = request_stats_var.get()
+    if stats is not None:
+        stats.db_queries += 1
+        stats.db_time += elapsed
+
+
+def record_cache(elapsed, hit=None, op="get"):
+    """
+    Account a cache round-trip to the current request and to the metrics.
+
+    Args:
+        elapsed (float): Duration of the call, in seconds.
+        hit (bool, optional): True/False for lookups, None for writes.
+        op (str): Cache operation, used as metrics label.
+    """
+    cache_roundtrip_duration.observe(elapsed, op)
+    if hit is not None:
+        cache_lookups.inc(1, "hit" if hit else "miss")
+    stats = request_stats_var.get()
+    if stats is not None:
+        stats.cache_calls += 1
+        stats.cache_time += elapsed
+        if hit is True:
+            stats.cache_hits += 1
+        elif hit is False:
+            stats.cache_misses += 1
+
+
+def record_cache_many(elapsed, hits, misses):
+    """Account a multi-key lookup (`get_many`/`MGET`) to the current request and to the metrics."""
+    cache_roundtrip_duration.observe(elapsed, "get_many")
+    if hits:
+        cache_lookups.inc(hits, "hit")
+    if misses:
+        cache_lookups.inc(misses, "miss")
+    stats = request_stats_var.get()
+    if stats is not None:
+        stats.cache_calls += 1
+        stats.cache_time += elapsed
+        stats.cache_hits += hits
+        stats.cache_misses += misses
+
+
+def query_timer(execute, sql, params, many, context):  # pylint: disable=too-many-arguments
+    """`connection.execute_wrappers` hook timing every query into the request stats."""
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        record_query(time.perf_counter() - started, context["connection"].alias)
+
+
+def install_query_timer(sender, connection, **kwargs):  # pylint: disable=W0613
+    """
+    `connection_created` receiver installing `query_timer` on every new connection.
+
+    Installing it per connection (rather than with `execute_wrapper()` around
+    the request) also covers queries that async views run in worker threads,
+    since the request stats travel with the context.
+    """
+    if query_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_timer)
+
+
+class InstrumentedRedisClient(DefaultClient):
+    """
+    `django_redis` client that accounts every round-trip to the current request.
+
+    Select it with `CACHES[...]["OPTIONS"]["CLIENT_CLASS"]`; outside a request
+    the overhead is a context variable lookup per call.
+    """
+
+    def get(self, key, default=None, version=None, client=None):
+        started = time.perf_counter()
+        value = super().get(key, default=default, version=version, client=client)
+        record_cache(time.perf_counter() - started, hit=value is not default)
+        return value
+
+    def get_many(self, keys, version=None, client=None):
+        started = time.perf_counter()
+        keys = list(keys)
+        values = super().get_many(keys, version=version, client=client)
+        record_cache_many(time.perf_counter() - started, len(values), len(keys) - len(values))
+        return values
+
+    def set(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().set(*args, **kwargs)
+        finally:
+            record_cache(time.perf_counter() - started, op="set")
+
+    def set_many(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().set_many(*args, **kwargs)
+        finally:
+            record_cache(time.perf_counter() - started, op="set_many")
+
+    def add(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().add(*args, **kwargs)
+        finally:
+            record_cache(time.perf_counter() - started, op="add")
+
+    def delete(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().delete(*args, **kwargs)
+        finally:
+            record_cache(time.perf_counter() - started, op="delete")
+
+
+__all__ = [
+    "RequestStats",
+    "request_stats_var",
+    "current_stats",
+    "record_query",
+    "record_cache",
+    "record_cache_many",
+    "query_timer",
+    "install_query_timer",
+    "InstrumentedRedisClient",
+]
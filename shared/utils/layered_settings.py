@@ -0,0 +1,182 @@
+"""
+Layered settings for `config/settings.py`: defaults < TOML profile < environment.
+
+The TOML file and `.env` are read once, on the first lookup. Dynaconf (slow to
+import) is only loaded when the TOML file uses its `@` tokens or
+`dynaconf_merge`; plain tables are read with `tomllib`.
+"""
+
+import os
+from pathlib import Path
+
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    try:
+        import tomli as tomllib
+    except ImportError:
+        from dynaconf.vendor import tomllib
+
+__all__ = [
+    "LayeredSettings",
+    "coerce",
+]
+
+_TRUE = ("true", "1", "yes", "on")
+_FALSE = ("false", "0", "no", "off", "")
+
+
+def coerce(name, value, cast):
+    """
+    Convert the environment string `value` of setting `name` to `cast`.
+
+    Booleans accept true/false, 1/0, yes/no and on/off; lists, tuples and dicts
+    accept TOML literals (`["a", "b"]`, `{ a = 1 }`), and lists and tuples also
+    a comma-separated string.
+
+    Args:
+        name (str): Setting name, used in the error message.
+        value (str): Raw environment value.
+        cast (type | callable): Target type, or any callable taking the string.
+
+    Returns:
+        The converted value.
+
+    Raises:
+        ImproperlyConfigured: If `value` cannot be converted.
+    """
+    try:
+        if cast is bool:
+            lowered = value.strip().lower()
+            if lowered not in _TRUE + _FALSE:
+                raise ValueError(value)
+            return lowered in _TRUE
+        if cast in (list, tuple, dict):
+            stripped = value.strip()
+            if cast is dict or stripped.startswith("["):
+                parsed = tomllib.loads(f"value = {stripped}")["value"]
+            else:
+                parsed = [item.strip() for item in stripped.split(",") if item.strip()]
+            if not isinstance(parsed, list if cast is tuple else cast):
+                raise ValueError(value)
+            return cast(parsed)
+        return cast(value)
+    except (ValueError, TypeError, tomllib.TOMLDecodeError) as exc:
+        type_name = getattr(cast, "__name__", repr(cast))
+        raise ImproperlyConfigured(f"Setting {name}={value!r} is not a valid {type_name}.") from exc
+
+
+def _uses_dynaconf(value):
+    if isinstance(value, str):
+        return value.startswith("@")
+    if isinstance(value, dict):
+        return any(str(key).lower() == "dynaconf_merge" or _uses_dynaconf(item) for key, item in value.items())
+    if isinstance(value, list):
+        return any(_uses_dynaconf(item) for item in value)
+    return False
+
+
+class LayeredSettings:
+    """
+    Resolve settings through layers, lowest to highest precedence:
+
+    1. the default passed to `get()`,
+    2. the `[default]` table of `settings_file`, then the table of the profile
+       named by the `env_switcher` variable (`default_env` when unset), then
+       `[global]`,
+    3. the environment (`.env` included), `<envvar_prefix>_<NAME>` or plain
+       `<NAME>`, the latter winning.
+
+    Environment values are strings. They are returned as-is unless `get()` is
+    given a `cast`, or the value of the lower layers is neither a string nor
+    None, in which case they are converted to its type (`"false"` -> False for
+    a bool, `"10"` -> 10 for an int).
+
+    Args:
+        settings_file (Path | str): TOML file with one table per profile.
+        env_switcher (str): Environment variable selecting the profile.
+        default_env (str): Profile used when `env_switcher` is unset.
+        envvar_prefix (str): Prefix of namespaced environment variables.
+        dotenv_path (Path | str | None): `.env` file loaded (without overriding
+            the environment) before the first lookup, when it exists.
+    """
+
+    def __init__(
+        self,
+        settings_file,
+        *,
+        env_switcher="DJANGO_ENV",
+        default_env="development",
+        envvar_prefix="DJANGO",
+        dotenv_path=None,
+    ):
+        self.settings_file = Path(settings_file)
+        self.env_switcher = env_switcher
+        self.default_env = default_env
+        self.envvar_prefix = envvar_prefix
+        self.dotenv_path = Path(dotenv_path) if dotenv_path else None
+        self._values = None
+
+    @property
+    def environment(self):
+        """Name of the selected profile, lowercase."""
+        self._load()
+        return os.environ.get(self.env_switcher, self.default_env).lower()
+
+    def get(self, name, default=None, cast=None):
+        """
+        Resolve `name` through the layers.
+
+        Args:
+            name (str): Setting name, uppercase.
+            default: Value when no layer defines the setting.
+            cast (type | callable | None): Conversion applied to environment
+                values; inferred from the lower layers when None.
+
+        Returns:
+            The resolved value.
+        """
+        self._load()
+        value = self._values.get(name, default)
+        raw = os.environ.get(name)
+        if raw is None and self.envvar_prefix:
+            raw = os.environ.get(f"{self.envvar_prefix}_{name}")
+        if raw is None:
+            return value
+        if cast is None and value is not None and not isinstance(value, str):
+            cast = type(value)
+        return coerce(name, raw, cast) if cast is not None else raw
+
+    def _load(self):
+        if self._values is not None:
+            return
+        if self.dotenv_path and self.dotenv_path.is_file():
+            from dotenv import load_dotenv  # pylint: disable=import-outside-toplevel
+
+            load_dotenv(self.dotenv_path, override=False)
+        tables = {}
+        if self.settings_file.is_file():
+            with self.settings_file.open("rb") as handle:
+                tables = {key.lower(): table for key, table in tomllib.load(handle).items()}
+        environment = os.environ.get(self.env_switcher, self.default_env).lower()
+        if _uses_dynaconf(tables):
+            self._values = self._load_with_dynaconf(environment)
+            return
+        values = {}
+        for profile in ("default", environment, "global"):
+            values.update({key.upper(): value for key, value in tables.get(profile, {}).items()})
+        self._values = values
+
+    def _load_with_dynaconf(self, environment):
+        from dynaconf import Dynaconf  # pylint: disable=import-outside-toplevel
+
+        config = Dynaconf(
+            settings_files=[str(self.settings_file)],
+            environments=True,
+            env=environment,
+            envvar_prefix=False,
+            load_dotenv=False,
+        )
+        return {key.upper(): value for key, value in config.as_dict().items()}
@@ -0,0 +1,180 @@
+import atexit
+import datetime
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+import traceback
+import uuid
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+
+# Request id of the current request/task, set by `RequestIdMiddleware`.
+request_id_var = ContextVar("request_id", default=None)
+# True inside `shared.utils.tools.debug_mode()`: disables sampling and routes print to rich.
+debug_scope = ContextVar("debug_scope", default=False)
+
+# Attributes every LogRecord has; anything else was passed through `extra=`.
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message",
+    "asctime",
+    "request_id",
+    "sample_rate",
+}
+
+
+def new_request_id():
+    """Return a fresh random request id (32 hex characters)."""
+    return uuid.uuid4().hex
+
+
+def get_request_id():
+    """Return the request id of the current context, if any."""
+    return request_id_var.get()
+
+
+class RequestIdFilter(logging.Filter):
+    """
+    Stamp every record with the request id of the current context.
+
+    Runs on the emitting thread, where the context variable is visible, before
+    the record is handed to the background listener.
+    """
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only a fraction of high-volume records.
+
+    The rate is taken from the record itself (`extra={"sample_rate": 0.01}`),
+    then from the longest matching logger prefix in `rates`, then `default`.
+    WARNING and above are never sampled out, nor is anything logged inside
+    `debug_mode()`.
+
+    Args:
+        rates (dict, optional): `{logger name prefix: keep probability}`.
+        default (float): Keep probability for everything else.
+    """
+
+    def __init__(self, rates=None, default=1.0):
+        super().__init__()
+        self.default = default
+        self.rates = sorted((rates or {}).items(), key=lambda item: len(item[0]), reverse=True)
+
+    def rate_for(self, record):
+        """Keep probability of `record`."""
+        rate = getattr(record, "sample_rate", None)
+        if rate is not None:
+            return rate
+        for prefix, prefix_rate in self.rates:
+            if record.name == prefix or record.name.startswith(prefix + "."):
+                return prefix_rate
+        return self.default
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or debug_scope.get():
+            return True
+        rate = self.rate_for(record)
+        return rate >= 1.0 or random.random() < rate
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Render records as single-line JSON documents.
+
+    Standard fields are `ts`, `level`, `logger`, `message` and `request_id`;
+    values passed with `extra=` are added as top-level keys.
+    """
+
+    def __init__(self, dumps=None, **kwargs):
+        super().__init__(**kwargs)
+        self.dumps = dumps or (lambda payload: json.dumps(payload, default=str, ensure_ascii=False))
+
+    def format(self, record):
+        payload = {
+            "ts": datetime.datetime.fromtimestamp(record.created, tz=datetime.timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exc_info"] = "".join(traceback.format_exception(*record.exc_info))
+        elif record.exc_text:
+            payload["exc_info"] = record.exc_text
+        if record.stack_info:
+            payload["stack_info"] = record.stack_info
+        return self.dumps(payload)
+
+
+class NonBlockingHandler(QueueHandler):
+    """
+    Logging handler that only enqueues records on the calling thread.
+
+    Formatting and stream I/O happen in a `QueueListener` thread owned by the
+    handler, so request threads never block on stdout/stderr or on JSON
+    rendering. The queue is bounded: when it is full, records are dropped and
+    counted in `dropped` rather than blocking the caller.
+
+    Usable from `LOGGING` with `"()": "shared.utils.log.NonBlockingHandler"`;
+    the configured `formatter` is applied by the listener's stream handler.
+
+    Args:
+        stream: Output stream of the listener (default `sys.stderr`).
+        maxsize (int): Maximum number of pending records.
+    """
+
+    def __init__(self, stream=None, maxsize=10000):
+        super().__init__(queue.Queue(maxsize=maxsize))
+        self.target = logging.StreamHandler(stream or sys.stderr)
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+        self.listener = QueueListener(self.queue, self.target, respect_handler_level=False)
+        self.listener.start()
+        atexit.register(self.close)
+
+    def setFormatter(self, fmt):
+        # Formatting is done by the listener thread, not by the queue handler.
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # Keep the record intact (exc_info included) for the listener thread;
+        # only resolve `%` arguments now, while they still hold their values.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+    def close(self):
+        listener, self.listener = self.listener, None
+        if listener is not None and listener._thread is not None:  # pylint: disable=protected-access
+            listener.stop()
+        self.target.flush()
+        super().close()
+
+
+__all__ = [
+    "request_id_var",
+    "debug_scope",
+    "new_request_id",
+    "get_request_id",
+    "RequestIdFilter",
+    "SamplingFilter",
+    "JsonFormatter",
+    "NonBlockingHandler",
+]
@@ -0,0 +1,466 @@
+import abc
+import bisect
+import gc
+import glob
+import json
+import math
+import mmap
+import os
+import resource
+import struct
+import threading
+import time
+
+# Upper bounds (seconds) of the latency histogram buckets.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Round-trips to Redis/Postgres are much shorter than whole requests.
+ROUNDTRIP_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5)
+
+_HEADER = struct.Struct("<i4x")
+_LENGTH = struct.Struct("<i")
+_VALUE = struct.Struct("<d")
+
+
+class MemoryStore:
+    """Per-process `key -> float` store used when metrics are not shared."""
+
+    def __init__(self):
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, key, amount):
+        """Add `amount` to `key`."""
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def inc_many(self, pairs):
+        """Add every `(key, amount)` of `pairs` under one lock acquisition."""
+        with self._lock:
+            for key, amount in pairs:
+                self._values[key] = self._values.get(key, 0.0) + amount
+
+    def items(self):
+        """Return the `(key, value)` pairs."""
+        with self._lock:
+            return list(self._values.items())
+
+    def close(self):
+        """Nothing to release; present for parity with `MmapStore`."""
+
+
+class MmapStore:
+    """
+    Append-only `key -> float` store backed by a memory-mapped file.
+
+    Every process owns its own file, so writers never contend across
+    processes; the scraping process sums the files of all workers. Layout:
+    an 8-byte header holding the used size, then entries made of a 4-byte key
+    length, the UTF-8 key padded to 8 bytes and an 8-byte double.
+
+    Args:
+        path (str): File backing the store; created or grown as needed.
+        initial_size (int): Initial file size in bytes.
+    """
+
+    def __init__(self, path, initial_size=64 * 1024):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a+b")  # pylint: disable=consider-using-with
+        if os.fstat(self._file.fileno()).st_size == 0:
+            self._file.truncate(initial_size)
+        self._capacity = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), self._capacity)
+        self._used = _HEADER.unpack_from(self._map, 0)[0] or _HEADER.size
+        self._positions = {key: position for key, _, position in self._entries(self._map, self._used)}
+
+    @staticmethod
+    def _entries(data, used):
+        offset = _HEADER.size
+        while offset < used:
+            length = _LENGTH.unpack_from(data, offset)[0]
+            key = bytes(data[offset + 4 : offset + 4 + length]).decode("utf-8")
+            position = offset + 4 + length + (-(4 + length) % 8)
+            yield key, _VALUE.unpack_from(data, position)[0], position
+            offset = position + 8
+
+    @classmethod
+    def read(cls, path):
+        """Return the `(key, value)` pairs of a store file written by any process."""
+        with open(path, "rb") as handle:
+            data = handle.read()
+        if len(data) < _HEADER.size:
+            return []
+        used = min(_HEADER.unpack_from(data, 0)[0], len(data))
+        return [(key, value) for key, value, _ in cls._entries(data, used)]
+
+    def _allocate(self, key):
+        encoded = key.encode("utf-8")
+        padding = -(4 + len(encoded)) % 8
+        entry = _LENGTH.pack(len(encoded)) + encoded + b" " * padding + _VALUE.pack(0.0)
+        while self._used + len(entry) > self._capacity:
+            self._capacity *= 2
+            self._map.close()
+            self._file.truncate(self._capacity)
+            self._map = mmap.mmap(self._file.fileno(), self._capacity)
+        self._map[self._used : self._used + len(entry)] = entry
+        position = self._used + len(entry) - 8
+        self._used += len(entry)
+        # Publish the entry only once it is fully written.
+        _HEADER.pack_into(self._map, 0, self._used)
+        self._positions[key] = position
+        return position
+
+    def inc(self, key, amount):
+        """Add `amount` to `key`, appending the key on first use."""
+        with self._lock:
+            position = self._positions.get(key)
+            if position is None:
+                position = self._allocate(key)
+            _VALUE.pack_into(self._map, position, _VALUE.unpack_from(self._map, position)[0] + amount)
+
+    def inc_many(self, pairs):
+        """Add every `(key, amount)` of `pairs` under one lock acquisition."""
+        with self._lock:
+            for key, amount in pairs:
+                position = self._positions.get(key)
+                if position is None:
+                    position = self._allocate(key)
+                _VALUE.pack_into(self._map, position, _VALUE.unpack_from(self._map, position)[0] + amount)
+
+    def items(self):
+        """Return the `(key, value)` pairs of this process's file."""
+        with self._lock:
+            return [(key, value) for key, value, _ in self._entries(self._map, self._used)]
+
+    def close(self):
+        """Unmap and close the backing file."""
+        with self._lock:
+            self._map.close()
+            self._file.close()
+
+
+def multiprocess_dir():
+    """
+    Directory shared by the workers for mmap-backed metrics, or None.
+
+    Taken from `PROMETHEUS_MULTIPROC_DIR` (the variable prometheus_client uses)
+    or `settings.METRICS["MULTIPROCESS_DIR"]`.
+    """
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        return directory
+    from django.conf import settings  # pylint: disable=import-outside-toplevel
+
+    if not settings.configured:
+        return None
+    return getattr(settings, "METRICS", {}).get("MULTIPROCESS_DIR")
+
+
+def clear_multiprocess_dir(directory=None):
+    """Remove the store files of previous runs; call once before starting workers."""
+    directory = directory or multiprocess_dir()
+    if directory:
+        for path in glob.glob(os.path.join(directory, "metrics-*.db")):
+            os.remove(path)
+
+
+class MetricsRegistry:
+    """
+    Registry of counters and histograms plus scrape-time collectors.
+
+    Values live in a `MemoryStore`, or in a per-process `MmapStore` when a
+    multiprocess directory is configured (`directory` argument or
+    `multiprocess_dir()`). The store is opened lazily and reopened after a
+    fork, so a registry created before gunicorn forks its workers is safe.
+
+    Args:
+        directory (str, optional): Shared directory for mmap-backed stores.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self.metrics = {}
+        self.collectors = []
+        self._store = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def store(self):
+        """Store of the current process, (re)created after a fork."""
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    directory = self.directory or multiprocess_dir()
+                    if directory:
+                        os.makedirs(directory, exist_ok=True)
+                        self._store = MmapStore(os.path.join(directory, f"metrics-{os.getpid()}.db"))
+                    else:
+                        self._store = MemoryStore()
+                    self._pid = os.getpid()
+        return self._store
+
+    def register(self, metric):
+        """Add `metric` to the scrape output and return it."""
+        self.metrics[metric.name] = metric
+        return metric
+
+    def add_collector(self, collector):
+        """
+        Register a scrape-time collector.
+
+        Args:
+            collector (callable): Returns `[(name, type, help, [(labels dict, value), ...]), ...]`.
+        """
+        self.collectors.append(collector)
+        return collector
+
+    def values(self):
+        """Return `{key: value}` summed over every worker's store."""
+        store = self.store
+        if not isinstance(store, MmapStore):
+            return dict(store.items())
+        totals = {}
+        for path in glob.glob(os.path.join(os.path.dirname(store.path), "metrics-*.db")):
+            items = store.items() if path == store.path else MmapStore.read(path)
+            for key, value in items:
+                totals[key] = totals.get(key, 0.0) + value
+        return totals
+
+    def render(self):
+        """Render every metric in the Prometheus text exposition format (0.0.4)."""
+        grouped = {}
+        for key, value in self.values().items():
+            name, suffix, labels = json.loads(key)
+            grouped.setdefault(name, []).append((suffix, labels, value))
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            lines.extend(metric.render(grouped.get(name, [])))
+        for collector in self.collectors:
+            for name, kind, documentation, samples in collector():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.extend(f"{name}{format_labels(labels)} {format_value(value)}" for labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(labels):
+    """Render `labels` as a Prometheus label set (`{a="1",b="2"}`), or "" when empty."""
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def format_value(value):
+    """Render a sample value, integers without a decimal part and `NaN`/`+Inf`/`-Inf` as Prometheus spells them."""
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric(abc.ABC):
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.registry = registry or REGISTRY
+        self._keys = {}
+        self.registry.register(self)
+
+    def _key(self, suffix, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labels}")
+        return json.dumps([self.name, suffix, list(labels)])
+
+    def _header(self, name=None):
+        name = name or self.name
+        return [f"# HELP {name} {self.documentation}", f"# TYPE {name} {self.kind}"]
+
+    @abc.abstractmethod
+    def render(self, samples):
+        """
+        Render the exposition lines of the metric.
+
+        Args:
+            samples (list[tuple[str, list, float]]): `(suffix, label values, value)`
+                of every stored series of the metric, summed over workers.
+        """
+
+
+class Counter(_Metric):
+    """Monotonic counter; `inc(1, "label value", ...)` with values in `labelnames` order."""
+
+    kind = "counter"
+
+    def inc(self, amount, *labels):
+        """Add `amount` to the series of `labels`."""
+        key = self._keys.get(labels)
+        if key is None:
+            key = self._keys[labels] = self._key("", labels)
+        self.registry.store.inc(key, amount)
+
+    def render(self, samples):
+        lines = self._header(f"{self.name}_total")
+        for _, labels, value in sorted(samples, key=lambda sample: sample[1]):
+            lines.append(f"{self.name}_total{format_labels(dict(zip(self.labelnames, labels)))} {format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    """
+    Cumulative histogram; `observe(seconds, "label value", ...)`.
+
+    Args:
+        buckets (tuple[float]): Bucket upper bounds, ascending.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), registry=None, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value, *labels):
+        """Count `value` in its bucket of the series of `labels`."""
+        keys = self._keys.get(labels)
+        if keys is None:
+            suffixes = [f"b{index}" for index in range(len(self.buckets) + 1)] + ["sum", "count"]
+            keys = self._keys[labels] = [self._key(suffix, labels) for suffix in suffixes]
+        # One store call (one lock acquisition) per observation.
+        self.registry.store.inc_many(
+            ((keys[bisect.bisect_left(self.buckets, value)], 1), (keys[-2], value), (keys[-1], 1))
+        )
+
+    def render(self, samples):
+        series = {}
+        for suffix, labels, value in samples:
+            series.setdefault(tuple(labels), {})[suffix] = value
+        lines = self._header()
+        for labels, values in sorted(series.items()):
+            label_dict = dict(zip(self.labelnames, labels))
+            cumulative = 0
+            for index, bound in enumerate(self.buckets + (float("inf"),)):
+                cumulative += values.get(f"b{index}", 0)
+                bucket_labels = format_labels({**label_dict, "le": format_value(bound)})
+                lines.append(f"{self.name}_bucket{bucket_labels} {format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{format_labels(label_dict)} {format_value(values.get('sum', 0))}")
+            lines.append(f"{self.name}_count{format_labels(label_dict)} {format_value(values.get('count', 0))}")
+        return lines
+
+
+REGISTRY = MetricsRegistry()
+
+http_requests = Counter("http_requests", "HTTP requests by view, method and status.", ("view", "method", "status"))
+http_request_duration = Histogram("http_request_duration_seconds", "HTTP request latency by view.", ("view",))
+db_query_duration = Histogram(
+    "db_query_duration_seconds", "Database query latency.", ("alias",), buckets=ROUNDTRIP_BUCKETS
+)
+cache_roundtrip_duration = Histogram(
+    "cache_roundtrip_duration_seconds",
+    "Redis cache round-trip latency by operation.",
+    ("op",),
+    buckets=ROUNDTRIP_BUCKETS,
+)
+cache_lookups = Counter("cache_lookups", "Cache lookups by result.", ("result",))
+
+
+def observe_request(view, method, status, elapsed):
+    """Record a finished request; called by `ServerTimingMiddleware`."""
+    http_requests.inc(1, view, method, str(status))
+    http_request_duration.observe(elapsed, view)
+
+
+_STARTED = time.time()
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+@REGISTRY.add_collector
+def process_collector():
+    """Memory, CPU, thread and GC stats of the process answering the scrape."""
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    metrics = [
+        ("process_cpu_seconds_total", "counter", "User and system CPU time.", [({}, usage.ru_utime + usage.ru_stime)]),
+        ("process_max_resident_memory_bytes", "gauge", "Peak resident memory.", [({}, usage.ru_maxrss * 1024)]),
+        ("process_threads", "gauge", "Python threads.", [({}, threading.active_count())]),
+        ("process_uptime_seconds", "gauge", "Time since the metrics module was loaded.",
+         [({}, time.time() - _STARTED)]),
+    ]
+    try:
+        with open("/proc/self/statm", encoding="ascii") as handle:
+            resident_pages = int(handle.read().split()[1])
+        metrics.append(
+            ("process_resident_memory_bytes", "gauge", "Resident memory.", [({}, resident_pages * _PAGE_SIZE)])
+        )
+    except OSError:
+        pass
+    stats = gc.get_stats()
+    metrics += [
+        (
+            "python_gc_collections_total",
+            "counter",
+            "GC runs per generation.",
+            [({"generation": str(generation)}, stat["collections"]) for generation, stat in enumerate(stats)],
+        ),
+        (
+            "python_gc_objects_collected_total",
+            "counter",
+            "Objects collected per generation.",
+            [({"generation": str(generation)}, stat["collected"]) for generation, stat in enumerate(stats)],
+        ),
+        (
+            "python_gc_objects_tracked",
+            "gauge",
+            "Objects pending collection per generation.",
+            [({"generation": str(generation)}, count) for generation, count in enumerate(gc.get_count())],
+        ),
+    ]
+    return metrics
+
+
+@REGISTRY.add_collector
+def database_pool_collector():
+    """Connection pool stats of the initialised database connections (pool mode only)."""
+    from django.db import connections  # pylint: disable=import-outside-toplevel
+
+    samples = {"pool_size": [], "pool_available": [], "requests_waiting": [], "requests_num": []}
+    for connection in connections.all(initialized_only=True):
+        # None outside pool mode; an initialised pooled connection already opened its pool.
+        pool = getattr(connection, "pool", None)
+        if pool is None:
+            continue
+        stats = pool.get_stats()
+        for field, series in samples.items():
+            series.append(({"alias": connection.alias}, stats.get(field, 0)))
+    return [
+        (f"db_{field}", "gauge", f"psycopg pool `{field}` statistic.", series)
+        for field, series in samples.items()
+        if series
+    ]
+
+
+__all__ = [
+    "LATENCY_BUCKETS",
+    "ROUNDTRIP_BUCKETS",
+    "MemoryStore",
+    "MmapStore",
+    "multiprocess_dir",
+    "clear_multiprocess_dir",
+    "MetricsRegistry",
+    "Counter",
+    "Histogram",
+    "REGISTRY",
+    "http_requests",
+    "http_request_duration",
+    "db_query_duration",
+    "cache_roundtrip_duration",
+    "cache_lookups",
+    "observe_request",
+]
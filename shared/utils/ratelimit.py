@@ -0,0 +1,352 @@
+import logging
+import math
+import re
+import threading
+import weakref
+from dataclasses import dataclass
+
+import redis
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+
+from shared.utils.async_cache import AsyncCache
+from shared.utils.cache import LocalLRU
+from shared.utils.fastjson import JsonResponse
+from shared.utils.metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+ALGORITHMS = ("token_bucket", "sliding_window")
+
+DEFAULT_RATELIMIT = {
+    "ENABLED": True,
+    "CACHE": "default",  # django_redis alias holding the counters
+    "FAIL_OPEN": True,  # allow requests while Redis is unreachable
+    "LEASE": 10,  # max tokens a process reserves per Redis call (1 = every request asks Redis)
+    "LEASE_HEADROOM": 0.5,  # only lease while this fraction of the limit is still free
+    "LEASE_TTL": 1.0,  # seconds a lease may be used
+    "IP_HEADER": "",  # e.g. "X-Forwarded-For" behind a trusted proxy
+    "RULES": [],
+}
+
+ratelimit_decisions = Counter(
+    "ratelimit_decisions",
+    "Rate limit decisions by scope and result (allowed, limited, local, error).",
+    ("scope", "result"),
+)
+
+# Both scripts read the clock from Redis (`TIME`), so every web worker and
+# host agrees on it, and reserve up to ARGV[4] units in one call: the caller
+# serves the extra units from memory (see `RateLimit.hit`). Extra units are
+# only granted while the key stays above ARGV[5] of its limit.
+# Reply: {allowed, granted, remaining, retry_after_ms}.
+TOKEN_BUCKET_SCRIPT = """
+local capacity, rate = tonumber(ARGV[1]), tonumber(ARGV[2])
+local cost, want, headroom = tonumber(ARGV[3]), tonumber(ARGV[4]), tonumber(ARGV[5])
+local clock = redis.call('TIME')
+local now = clock[1] * 1000 + math.floor(clock[2] / 1000)
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local last = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - last) * rate)
+if tokens < cost then
+    return {0, 0, math.floor(tokens), math.ceil((cost - tokens) / rate)}
+end
+local granted = cost
+if want > cost and tokens - want >= capacity * headroom then
+    granted = want
+end
+tokens = tokens - granted
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate) + 1000)
+return {1, granted, math.floor(tokens), 0}
+"""
+
+# Sliding window counter: the previous fixed window's count, weighted by how
+# much of it still overlaps the sliding window, plus the current count.
+SLIDING_WINDOW_SCRIPT = """
+local limit, window = tonumber(ARGV[1]), tonumber(ARGV[2])
+local cost, want, headroom = tonumber(ARGV[3]), tonumber(ARGV[4]), tonumber(ARGV[5])
+local clock = redis.call('TIME')
+local now = clock[1] * 1000 + math.floor(clock[2] / 1000)
+local index = math.floor(now / window)
+local elapsed = now - index * window
+local counts = redis.call('HMGET', KEYS[1], index, index - 1)
+local current, previous = tonumber(counts[1]) or 0, tonumber(counts[2]) or 0
+local used = previous * (window - elapsed) / window + current
+if used + cost > limit then
+    local free = limit - current - cost
+    local retry
+    if free >= 0 and previous > 0 then
+        retry = math.ceil(window * (1 - free / previous)) - elapsed
+    else
+        local wait = 0
+        if current > 0 then
+            wait = math.max(0, window * (1 - (limit - cost) / current))
+        end
+        retry = window - elapsed + math.ceil(wait)
+    end
+    return {0, 0, math.max(0, math.floor(limit - used)), math.max(1, retry)}
+end
+local granted = cost
+if want > cost and limit - used - want >= limit * headroom then
+    granted = want
+end
+redis.call('HINCRBY', KEYS[1], index, granted)
+redis.call('HDEL', KEYS[1], index - 2)
+redis.call('PEXPIRE', KEYS[1], window * 2)
+return {1, granted, math.floor(limit - used - granted), 0}
+"""
+
+_SCRIPTS = {"token_bucket": TOKEN_BUCKET_SCRIPT, "sliding_window": SLIDING_WINDOW_SCRIPT}
+_PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+_RATE = re.compile(r"^\s*(\d+)\s*/\s*(\d*)\s*([smhd])\w*\s*$")
+
+
+def get_ratelimit_settings():
+    """`settings.RATELIMIT` over `DEFAULT_RATELIMIT`."""
+    return {**DEFAULT_RATELIMIT, **getattr(settings, "RATELIMIT", {})}
+
+
+def parse_rate(rate):
+    """
+    Parse `"<count>/<period>"`, e.g. `"100/m"`, `"10/s"` or `"500/15m"`.
+
+    Returns:
+        tuple: `(count, period in seconds)`.
+    """
+    match = _RATE.match(rate)
+    if match is None:
+        raise ValueError(f"Invalid rate {rate!r}; expected e.g. '100/m' or '10/5s'")
+    count, multiplier, unit = match.groups()
+    return int(count), int(multiplier or 1) * _PERIODS[unit]
+
+
+@dataclass(slots=True)
+class Decision:
+    """Outcome of one rate limit check."""
+
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float = 0.0  # seconds until the request would be allowed
+
+    def headers(self):
+        """`RateLimit-*` headers of the decision, plus `Retry-After` when refused."""
+        headers = {"RateLimit-Limit": str(self.limit), "RateLimit-Remaining": str(max(0, self.remaining))}
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+
+class RateLimit:  # pylint: disable=too-many-instance-attributes
+    """
+    A rate limit shared by every process through atomic Redis Lua scripts.
+
+    `token_bucket` allows bursts of `burst` requests refilled at `rate`;
+    `sliding_window` allows `rate` requests in any window of its period.
+
+    Callers far under their limit do not pay a Redis round-trip per request:
+    while a key has more than `LEASE_HEADROOM` of its limit free, one call
+    reserves up to `LEASE` units and the process serves the rest from memory
+    for `LEASE_TTL` seconds. Reserved units count as used, so a limit is never
+    exceeded, but an idle process can hold back up to `LEASE - 1` units of a
+    key for that long. Near the limit every request asks Redis.
+
+    Args:
+        rate (str): E.g. `"100/m"` (see `parse_rate`).
+        algorithm (str): One of `ALGORITHMS`.
+        burst (int, optional): Bucket capacity (token bucket; default: the rate's count).
+        scope (str): Name of the limit in Redis keys and metrics.
+        lease (int, optional): Overrides `RATELIMIT["LEASE"]`.
+        alias (str, optional): Overrides `RATELIMIT["CACHE"]`.
+    """
+
+    def __init__(
+        self, rate, algorithm="token_bucket", burst=None, scope="default", lease=None, alias=None
+    ):  # pylint: disable=too-many-arguments,too-many-positional-arguments
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown rate limit algorithm {algorithm!r}; expected one of {', '.join(ALGORITHMS)}")
+        config = get_ratelimit_settings()
+        self.rate = rate
+        self.algorithm = algorithm
+        self.scope = scope
+        count, period = parse_rate(rate)
+        if algorithm == "token_bucket":
+            self.limit = burst or count
+            self._args = (self.limit, count / (period * 1000))  # capacity, tokens per ms
+        else:
+            self.limit = count
+            self._args = (count, period * 1000)  # limit, window in ms
+        self.lease = max(1, lease if lease is not None else config["LEASE"])
+        self.headroom = config["LEASE_HEADROOM"]
+        self.lease_ttl = config["LEASE_TTL"]
+        self.fail_open = config["FAIL_OPEN"]
+        self.alias = alias or config["CACHE"]
+        self._leases = LocalLRU(maxsize=10_000)
+        self._lock = threading.Lock()
+        self._scripts = weakref.WeakKeyDictionary()
+        self._async_cache = AsyncCache(self.alias)
+        self._available = True
+
+    def key(self, identity):
+        """Redis key of the counters of `identity`."""
+        return f"ratelimit:{self.scope}:{identity}"
+
+    def _take_local(self, key, cost):
+        item = self._leases.get(key)
+        if item is None:
+            return None
+        lease = item[0]
+        with self._lock:
+            if lease[0] < cost:
+                return None
+            lease[0] -= cost
+            lease[1] -= cost
+            return Decision(True, self.limit, lease[1])
+
+    def _decide(self, key, cost, reply):
+        allowed, granted, remaining, retry_ms = (int(value) for value in reply)
+        if not allowed:
+            ratelimit_decisions.inc(1, self.scope, "limited")
+            return Decision(False, self.limit, remaining, retry_ms / 1000)
+        self._available = True
+        if granted > cost:
+            self._leases.set(key, [granted - cost, remaining + granted - cost], self.lease_ttl)
+        ratelimit_decisions.inc(1, self.scope, "allowed")
+        return Decision(True, self.limit, remaining + granted - cost)
+
+    def _failed(self, error):
+        if self._available:  # once per outage, not once per request
+            self._available = False
+            action = "allowing" if self.fail_open else "refusing"
+            logger.warning("Rate limit %s unavailable, %s requests: %r", self.scope, action, error)
+        ratelimit_decisions.inc(1, self.scope, "error")
+        return Decision(self.fail_open, self.limit, self.limit if self.fail_open else 0, 0 if self.fail_open else 1)
+
+    def _script_args(self, cost):
+        return [*self._args, cost, max(cost, self.lease), self.headroom]
+
+    def hit(self, identity, cost=1):
+        """
+        Consume `cost` units for `identity`.
+
+        Returns:
+            Decision: Whether the request may proceed.
+        """
+        key = self.key(identity)
+        decision = self._take_local(key, cost)
+        if decision is not None:
+            ratelimit_decisions.inc(1, self.scope, "local")
+            return decision
+        if not self._async_cache.is_native:
+            return self._failed("cache alias is not Redis")
+        try:
+            client = caches[self.alias].client.get_client(write=True)
+            script = self._scripts.get(client)
+            if script is None:
+                client.script_load(_SCRIPTS[self.algorithm])  # so the first call needs no NOSCRIPT retry
+                script = self._scripts[client] = client.register_script(_SCRIPTS[self.algorithm])
+            reply = script(keys=[key], args=self._script_args(cost))
+        except redis.RedisError as error:
+            return self._failed(error)
+        return self._decide(key, cost, reply)
+
+    async def ahit(self, identity, cost=1):
+        """`hit` for async code, on a native `redis.asyncio` client."""
+        key = self.key(identity)
+        decision = self._take_local(key, cost)
+        if decision is not None:
+            ratelimit_decisions.inc(1, self.scope, "local")
+            return decision
+        if not self._async_cache.is_native:
+            return self._failed("cache alias is not Redis")
+        try:
+            client = self._async_cache.get_client()
+            script = self._scripts.get(client)
+            if script is None:
+                await client.script_load(_SCRIPTS[self.algorithm])
+                script = self._scripts[client] = client.register_script(_SCRIPTS[self.algorithm])
+            reply = await script(keys=[key], args=self._script_args(cost))
+        except redis.RedisError as error:
+            return self._failed(error)
+        return self._decide(key, cost, reply)
+
+    def reset(self, identity):
+        """Forget the counters of `identity` (in Redis and this process)."""
+        key = self.key(identity)
+        self._leases.delete(key)
+        caches[self.alias].client.get_client(write=True).delete(key)
+
+
+def client_ip(request):
+    """The caller's address: `REMOTE_ADDR`, or the first hop of `RATELIMIT["IP_HEADER"]` when set."""
+    header = get_ratelimit_settings()["IP_HEADER"]
+    if header:
+        forwarded = request.META.get("HTTP_" + header.upper().replace("-", "_"), "")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def _user_key(request):
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+    return f"ip:{client_ip(request)}"
+
+
+_KEYS = {"ip": client_ip, "user": _user_key, "route": lambda request: "all"}
+
+
+def resolve_key(spec):
+    """
+    Turn a key spec into `key(request) -> str | None` (None: the limit does not apply).
+
+    Specs: `"ip"`, `"user"` (the user id, the address for anonymous callers),
+    `"route"` (one shared bucket), `"header:<Name>"`, `"param:<name>"` (query
+    parameter, e.g. `param:user_id` for application-service puppets), a
+    callable or its dotted path.
+    """
+    if callable(spec):
+        return spec
+    if spec in _KEYS:
+        return _KEYS[spec]
+    kind, _, name = spec.partition(":")
+    if kind == "header":
+        meta_key = "HTTP_" + name.upper().replace("-", "_")
+        return lambda request: request.META.get(meta_key) or None
+    if kind == "param":
+        return lambda request: request.GET.get(name) or None
+    return import_string(spec)
+
+
+def too_many_requests(decision):
+    """A Matrix-style `M_LIMIT_EXCEEDED` 429 response for a refused `decision`."""
+    response = JsonResponse(
+        {
+            "errcode": "M_LIMIT_EXCEEDED",
+            "error": "Too many requests",
+            "retry_after_ms": max(1, math.ceil(decision.retry_after * 1000)),
+        },
+        status=429,
+    )
+    for header, value in decision.headers().items():
+        response[header] = value
+    return response
+
+
+__all__ = [
+    "ALGORITHMS",
+    "TOKEN_BUCKET_SCRIPT",
+    "SLIDING_WINDOW_SCRIPT",
+    "get_ratelimit_settings",
+    "parse_rate",
+    "Decision",
+    "RateLimit",
+    "client_ip",
+    "resolve_key",
+    "too_many_requests",
+    "ratelimit_decisions",
+]
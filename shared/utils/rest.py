@@ -0,0 +1,311 @@
+import base64
+import hashlib
+import operator
+from functools import reduce
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.cache import get_conditional_response
+from django.utils.functional import cached_property
+from rest_framework import parsers, renderers, serializers
+from rest_framework.exceptions import APIException, ErrorDetail, ParseError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from shared.utils.fastjson import dumps, loads
+from shared.validators.schema import SchemaValidationError
+
+_LINE_SEPARATORS = (b"\xe2\x80\xa8", b"\xe2\x80\xa9")
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """
+    `JSONRenderer` encoding with `shared.utils.fastjson` (orjson when installed).
+
+    Output matches DRF's default settings (`UNICODE_JSON`, `COMPACT_JSON`);
+    with either turned off, or `STRICT_JSON` off, DRF's own encoding is used.
+    Any requested indent renders with 2 spaces.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if self.ensure_ascii or not self.compact or not self.strict:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b""
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        ret = dumps(data, indent=bool(indent))
+        # Like DRF, escape U+2028/U+2029 so the output is a strict JavaScript
+        # subset. Looking for their lead byte first is a memchr; the 3-byte
+        # searches would cost as much as the encoding itself.
+        if b"\xe2" in ret:
+            ret = ret.replace(_LINE_SEPARATORS[0], b"\\u2028").replace(_LINE_SEPARATORS[1], b"\\u2029")
+        return ret
+
+
+class FastJSONParser(parsers.JSONParser):
+    """
+    `JSONParser` decoding with `shared.utils.fastjson`.
+
+    orjson only reads UTF-8 and always rejects `NaN`/`Infinity`, which is
+    what `STRICT_JSON` asks for; other charsets or non-strict parsing go
+    through DRF's parser.
+    """
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get("encoding", settings.DEFAULT_CHARSET)
+        if not self.strict or encoding.lower().replace("_", "-") not in ("utf-8", "utf8"):
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return loads(stream.read())
+        except ValueError as exc:
+            raise ParseError(f"JSON parse error - {exc}") from exc
+
+
+class FlatSerializer(serializers.Serializer):  # pylint: disable=abstract-method
+    """
+    Read-only serializer for `QuerySet.values()` rows.
+
+    Declared fields document the output (browsable API, schema) but values
+    are copied as they come from the database, skipping DRF's per-field
+    `to_representation`: only declare fields whose database values already
+    are JSON types. `source` renames are honoured; `projection()` lists the
+    columns to pass to `values()`.
+    """
+
+    @classmethod
+    def projection(cls):
+        """Columns to pass to `values()` for the declared fields."""
+        declared = cls._declared_fields  # pylint: disable=no-member  # set by the serializer metaclass
+        return [field.source or name for name, field in declared.items()]
+
+    @cached_property
+    def _pairs(self):
+        return [(name, field.source) for name, field in self.fields.items()]
+
+    def to_representation(self, instance):
+        return {name: instance[source] for name, source in self._pairs}
+
+
+def _issue_detail(issue):
+    key = issue.path or api_settings.NON_FIELD_ERRORS_KEY
+    return {key: [ErrorDetail(issue.message, code=issue.code)]}
+
+
+class SchemaListSerializer(serializers.ListSerializer):  # pylint: disable=abstract-method
+    """
+    `many=True` list of a `SchemaSerializer`: the whole list is checked by one
+    `Schema.validate_many()` call instead of running each item's fields.
+
+    Errors keep DRF's shape (one dict per item, `{}` for valid items); with
+    `fail_fast` (the child's `schema_fail_fast`) only the first invalid item
+    is reported.
+    """
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            message = self.error_messages["not_a_list"].format(input_type=type(data).__name__)
+            raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [message]}, code="not_a_list")
+        if not self.allow_empty and not data:
+            raise serializers.ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [self.error_messages["empty"]]}, code="empty"
+            )
+        if self.max_length is not None and len(data) > self.max_length:
+            message = self.error_messages["max_length"].format(max_length=self.max_length)
+            raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [message]}, code="max_length")
+        if self.min_length is not None and len(data) < self.min_length:
+            message = self.error_messages["min_length"].format(min_length=self.min_length)
+            raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [message]}, code="min_length")
+        try:
+            self.child.schema.validate_many(data, fail_fast=self.child.schema_fail_fast)
+        except SchemaValidationError as error:
+            errors = [{} for _ in data]
+            for issue in error.issues:
+                errors[issue.index] = _issue_detail(issue)
+            raise serializers.ValidationError(errors) from error
+        return data
+
+
+class SchemaSerializer(serializers.Serializer):  # pylint: disable=abstract-method
+    """
+    Serializer validating its input with a compiled `shared.validators.Schema`.
+
+    `to_internal_value` is one call of the schema's compiled check instead of
+    a `run_validation` per declared field, and `many=True` validates the
+    whole list at once (`SchemaListSerializer`). Validated data is the input
+    as-is: no coercion, no copy. Declared fields still drive the output and
+    the API schema; per-field `validate_<field>` methods are not called, and
+    neither is `validate()` for the items of a `many=True` list.
+
+    Example:
+        class EventSerializer(SchemaSerializer):
+            schema = EVENT_SCHEMA
+    """
+
+    schema = None
+    schema_fail_fast = True
+
+    class Meta:
+        list_serializer_class = SchemaListSerializer
+
+    def to_internal_value(self, data):
+        issue = self.schema.check(data)
+        if issue is not None:
+            raise serializers.ValidationError(_issue_detail(issue))
+        return data
+
+
+class InvalidParam(APIException):
+    """A 400 Matrix-style `M_INVALID_PARAM` error for a malformed query parameter."""
+
+    status_code = 400
+    default_code = "M_INVALID_PARAM"
+
+    def __init__(self, error):
+        super().__init__({"errcode": self.default_code, "error": error})
+
+
+class KeysetPagination(BasePagination):  # pylint: disable=abstract-method
+    """
+    Keyset (seek) pagination over the view's `keyset_ordering`.
+
+    Each page is one `WHERE (keys) after (last row's keys) ORDER BY keys
+    LIMIT n` query, so deep pages cost what the first one does when an index
+    covers the ordering, unlike `LIMIT/OFFSET` which reads and discards every
+    previous row. The ordering must be unique (end it with the primary key).
+    Responses follow the Matrix list APIs: `{"chunk": [...], "next_batch": token}`,
+    with `next_batch` passed back as `?from=`; a malformed token, or one
+    whose values do not fit the ordering fields, is an `InvalidParam` error.
+    Works on model instances and `values()` rows.
+    """
+
+    page_size = 100
+    max_page_size = 1000
+    page_size_query_param = "limit"
+    cursor_query_param = "from"
+
+    def __init__(self):
+        self.next_batch = None
+
+    @staticmethod
+    def encode_cursor(values):
+        """Opaque `next_batch` token of a row's ordering values."""
+        return base64.urlsafe_b64encode(dumps(list(values))).rstrip(b"=").decode()
+
+    @staticmethod
+    def decode_cursor(token, fields):
+        """
+        The ordering values of an `encode_cursor` token.
+
+        Args:
+            token (str): The `?from=` parameter.
+            fields (list[django.db.models.Field]): The ordering fields; each
+                value is converted with its field's `to_python`.
+        """
+        try:
+            values = loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+            if not isinstance(values, list) or len(values) != len(fields) or None in values:
+                raise ValueError(token)
+            return [field.to_python(value) for field, value in zip(fields, values)]
+        except (ValueError, TypeError, ValidationError):
+            raise InvalidParam("Invalid pagination token") from None
+
+    @staticmethod
+    def ordering_fields(queryset, keys):
+        """The model fields (or annotations' output fields) of the ordering `keys`."""
+        meta, annotations = queryset.model._meta, queryset.query.annotations
+        return [
+            annotations[key].output_field if key in annotations else meta.pk if key == "pk" else meta.get_field(key)
+            for key in keys
+        ]
+
+    @staticmethod
+    def seek(ordering, values):
+        """The filter selecting rows strictly after `values` in `ordering`."""
+        fields = [(name.lstrip("-"), "lt" if name.startswith("-") else "gt") for name in ordering]
+        branches = []
+        for index, (name, lookup) in enumerate(fields):
+            equal = {field: value for (field, _), value in zip(fields[:index], values)}
+            branches.append(Q(**equal, **{f"{name}__{lookup}": values[index]}))
+        # The redundant bound on the leading column gives the planner an index range.
+        leading, lookup = fields[0]
+        return Q(**{f"{leading}__{lookup}e": values[0]}) & reduce(operator.or_, branches)
+
+    def get_page_size(self, request):
+        """`?limit=` within `1..max_page_size`, `page_size` when absent or not a number."""
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Rows of the page after `?from=`; sets `next_batch` when more follow."""
+        ordering = view.keyset_ordering
+        keys = [name.lstrip("-") for name in ordering]
+        size = self.get_page_size(request)
+        token = request.query_params.get(self.cursor_query_param)
+        if token:
+            values = self.decode_cursor(token, self.ordering_fields(queryset, keys))
+            queryset = queryset.filter(self.seek(ordering, values))
+        rows = list(queryset.order_by(*ordering)[: size + 1])
+        if len(rows) > size:
+            rows = rows[:size]
+            last = rows[-1]
+            get = last.__getitem__ if isinstance(last, dict) else last.__getattribute__
+            self.next_batch = self.encode_cursor(get(key) for key in keys)
+        return rows
+
+    def get_paginated_response(self, data):
+        """`{"chunk": data, "next_batch": token or null}`."""
+        return Response({"chunk": data, "next_batch": self.next_batch})
+
+
+class ConditionalListMixin:
+    """
+    `ListModelMixin` answering conditional GETs of a page.
+
+    The `ETag` hashes the view's `etag_fields` of the page's rows (rows with
+    an unchanged key set must render identically, e.g. immutable events),
+    the next token and the renderer. A matching `If-None-Match` returns 304
+    before serializing and rendering the page.
+    """
+
+    etag_fields = ("pk",)
+
+    def get_etag(self, rows):
+        """Quoted ETag of a page of `rows`."""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(self.request.accepted_renderer.format.encode())
+        digest.update(str(getattr(self.paginator, "next_batch", None)).encode())
+        for row in rows:
+            get = row.__getitem__ if isinstance(row, dict) else row.__getattribute__
+            digest.update(repr(tuple(get(field) for field in self.etag_fields)).encode())
+        return f'"{digest.hexdigest()}"'
+
+    def list(self, request, *args, **kwargs):
+        """The page, or a 304 when `If-None-Match` has its ETag."""
+        rows = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+        etag = self.get_etag(rows)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            not_modified["ETag"] = etag
+            return not_modified
+        response = self.get_paginated_response(self.get_serializer(rows, many=True).data)
+        response["ETag"] = etag
+        return response
+
+
+__all__ = [
+    "FastJSONRenderer",
+    "FastJSONParser",
+    "FlatSerializer",
+    "SchemaListSerializer",
+    "SchemaSerializer",
+    "InvalidParam",
+    "KeysetPagination",
+    "ConditionalListMixin",
+]
@@ -0,0 +1,145 @@
+import importlib.util
+import math
+import os
+import sys
+from pathlib import Path
+
+DEFAULT_SERVER = {
+    "SERVER": "auto",  # "auto" (gunicorn if installed, else uvicorn), "gunicorn" or "uvicorn"
+    "INTERFACE": "asgi",  # "asgi" (config.asgi) or "wsgi" (config.wsgi)
+    "WORKERS": 0,  # 0 derives the count from the CPUs available to the container
+    "MAX_WORKERS": 16,
+    "THREADS": 4,  # gthread threads per WSGI worker
+    "BACKLOG": 2048,  # pending connections queued by the kernel
+    "KEEP_ALIVE": 5,  # seconds an idle keep-alive connection is held open
+    "TIMEOUT": 60,  # seconds before a silent worker is killed and restarted
+    "GRACEFUL_TIMEOUT": 30,  # seconds workers get to finish requests on reload/stop
+    "MAX_REQUESTS": 10000,  # recycle workers after this many requests (0 disables)
+    "MAX_REQUESTS_JITTER": 1000,
+}
+
+APPLICATIONS = {"asgi": "config.asgi:application", "wsgi": "config.wsgi:application"}
+
+
+def available_cpus():
+    """
+    Return the number of CPUs this process may actually use.
+
+    Honours the scheduler affinity mask and the cgroup CPU quota (v2
+    `cpu.max`, v1 `cpu.cfs_quota_us`), which is what limits a container even
+    though `os.cpu_count()` reports every core of the host.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # macOS / Windows
+        cpus = os.cpu_count() or 1
+    quota = None
+    try:
+        limit, period = Path("/sys/fs/cgroup/cpu.max").read_text(encoding="ascii").split()
+        if limit != "max":
+            quota = int(limit) / int(period)
+    except (OSError, ValueError):
+        try:
+            limit = int(Path("/sys/fs/cgroup/cpu/cpu.cfs_quota_us").read_text(encoding="ascii"))
+            period = int(Path("/sys/fs/cgroup/cpu/cpu.cfs_period_us").read_text(encoding="ascii"))
+            if limit > 0:
+                quota = limit / period
+        except (OSError, ValueError):
+            pass
+    if quota:
+        cpus = min(cpus, max(1, math.ceil(quota)))
+    return max(1, cpus)
+
+
+def default_workers(interface, max_workers):
+    """
+    Worker processes for the available CPUs.
+
+    ASGI workers multiplex requests on an event loop and are CPU bound, so one
+    per CPU; WSGI workers block on I/O, so the usual `2 * CPUs + 1`.
+    """
+    cpus = available_cpus()
+    workers = cpus if interface == "asgi" else 2 * cpus + 1
+    return max(1, min(workers, max_workers))
+
+
+def resolve_server(server):
+    """Pick the server binary, raising RuntimeError when it is not installed."""
+    installed = {name: importlib.util.find_spec(name) is not None for name in ("gunicorn", "uvicorn")}
+    if server == "auto":
+        server = "gunicorn" if installed["gunicorn"] else "uvicorn"
+    if not installed.get(server):
+        raise RuntimeError(f"{server} is not installed; install the project dependencies with `poetry install`.")
+    return server
+
+
+def uvicorn_worker_class():
+    """Import path of the gunicorn worker class running uvicorn."""
+    # uvicorn >= 0.30 moved the gunicorn worker to the `uvicorn-worker` package.
+    if importlib.util.find_spec("uvicorn_worker") is not None:
+        return "uvicorn_worker.UvicornWorker"
+    return "uvicorn.workers.UvicornWorker"
+
+
+def build_command(host, port, config):
+    """
+    Build the argv of the production server.
+
+    Args:
+        host (str): Bind address.
+        port (int): Bind port.
+        config (dict): `DEFAULT_SERVER` keys, usually `settings.SERVER` merged with CLI overrides.
+
+    Returns:
+        tuple[list[str], int]: The command line and the resolved worker count.
+    """
+    config = {**DEFAULT_SERVER, **config}
+    interface = config["INTERFACE"]
+    workers = config["WORKERS"] or default_workers(interface, config["MAX_WORKERS"])
+    server = resolve_server(config["SERVER"])
+    if server == "uvicorn" and interface == "wsgi":
+        raise RuntimeError("uvicorn only serves the ASGI application; use gunicorn for WSGI.")
+
+    if server == "gunicorn":
+        command = [
+            sys.executable, "-m", "gunicorn", APPLICATIONS[interface],
+            f"--bind={host}:{port}",
+            f"--workers={workers}",
+            f"--backlog={config['BACKLOG']}",
+            f"--keep-alive={config['KEEP_ALIVE']}",
+            f"--timeout={config['TIMEOUT']}",
+            f"--graceful-timeout={config['GRACEFUL_TIMEOUT']}",
+            f"--max-requests={config['MAX_REQUESTS']}",
+            f"--max-requests-jitter={config['MAX_REQUESTS_JITTER']}",
+            # Worker heartbeat files in tmpfs: a slow overlay filesystem can stall workers.
+            "--worker-tmp-dir=/dev/shm" if os.path.isdir("/dev/shm") else "--worker-tmp-dir=/tmp",
+        ]
+        if interface == "asgi":
+            command.append(f"--worker-class={uvicorn_worker_class()}")
+        else:
+            command += ["--worker-class=gthread", f"--threads={config['THREADS']}"]
+        return command, workers
+
+    command = [
+        sys.executable, "-m", "uvicorn", APPLICATIONS[interface],
+        f"--host={host}",
+        f"--port={port}",
+        f"--workers={workers}",
+        f"--backlog={config['BACKLOG']}",
+        f"--timeout-keep-alive={config['KEEP_ALIVE']}",
+        f"--timeout-graceful-shutdown={config['GRACEFUL_TIMEOUT']}",
+        "--no-access-log",  # requests are logged by the structured logging pipeline
+    ]
+    if config["MAX_REQUESTS"]:
+        command.append(f"--limit-max-requests={config['MAX_REQUESTS']}")
+    return command, workers
+
+
+__all__ = [
+    "DEFAULT_SERVER",
+    "APPLICATIONS",
+    "available_cpus",
+    "default_workers",
+    "resolve_server",
+    "build_command",
+]
@@ -1,43 +1,66 @@
 import builtins
+import logging
+import sys
 
 from contextlib import contextmanager
+from django.conf import settings
 from rich import print as rich_print
-from config import settings
 
+from shared.utils.log import debug_scope
 
-def override_print(enabled=settings.DEBUG):
+print_logger = logging.getLogger("print")
+_builtin_print = builtins.print
+
+
+def structured_print(*args, sep=" ", end="\n", file=None, flush=False):
+    """
+    `print` replacement for production: routes output to the `print` logger.
+
+    The message goes through the non-blocking logging pipeline (JSON lines with
+    the request id) instead of being rendered synchronously or dropped. Inside
+    `debug_mode()` it renders with `rich.print`; explicit `file=` targets other
+    than stdout/stderr are written as usual.
+    """
+    if debug_scope.get():
+        rich_print(*args, sep=sep, end=end, file=file, flush=flush)
+    elif file not in (None, sys.stdout, sys.stderr):
+        _builtin_print(*args, sep=sep, end=end, file=file, flush=flush)
+    else:
+        print_logger.info(sep.join(str(arg) for arg in args))
+
+
+def override_print(enabled=None):
     """
-    Overrides the global print function based on the provided `use_debug` parameter.
-    - If `use_debug` is True: Uses `rich.print` for enhanced output.
-    - If `use_debug` is False: Disables `print` entirely.
+    Overrides the global print function based on the provided `enabled` parameter.
+    - If `enabled` is True: Uses `rich.print` for enhanced output.
+    - If `enabled` is False: Sends `print` output to the structured logging pipeline.
 
     Args:
-        use_debug (bool): Controls whether `rich.print` is enabled (default is `settings.DEBUG`).
+        enabled (bool): Controls whether `rich.print` is enabled (default is `settings.DEBUG`,
+            read lazily when the function is called rather than at import time).
     """
+    if enabled is None:
+        enabled = settings.DEBUG
     if enabled:
         # Enable `rich.print` in debug mode
         builtins.print = rich_print
     else:
-        # Disable `print` in production
-        def disabled_print(*args, **kwargs):
-            pass  # Silently ignore print statements
-
-        builtins.print = disabled_print
+        # Log `print` output in production
+        builtins.print = structured_print
 
 
 @contextmanager
-def debug_mode():  # TODO: convert to the Class debug with sub context
+def debug_mode():
     """
-    A context manager that temporarily overrides the global print function
-    to always use `rich.print`, regardless of any settings.
-    """
-    # Save the current `print` function
-    original_print = builtins.print
+    A context manager that temporarily makes `print` use `rich.print` and
+    disables log sampling, regardless of any settings.
 
+    Nothing global is patched: `structured_print` (installed by `override_print`)
+    reads `debug_scope`, a context variable, so the override is scoped to the
+    current thread/task and concurrent requests keep their structured output.
+    """
+    token = debug_scope.set(True)
     try:
-        # Always enable `rich.print`
-        builtins.print = rich_print
         yield  # Allow code execution within the context
     finally:
-        # Restore the original `print` function
-        builtins.print = original_print
+        debug_scope.reset(token)
@@ -0,0 +1,521 @@
+import csv
+import io
+import logging
+import time
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.core.files.storage import storages
+from django.core.handlers.asgi import ASGIRequest
+from django.core.management.color import no_style
+from django.db import DataError, IntegrityError, connections, models, transaction
+from django.http import StreamingHttpResponse
+from django.utils.module_loading import import_string
+
+from shared.signals import Signal
+from shared.utils.fastjson import dumps, loads
+from shared.utils.metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TRANSFER = {
+    "CHUNK_SIZE": 2000,  # rows per cursor fetch, per streamed write and per import transaction
+    "QUEUE": "default",  # task queue of import jobs
+    "TASK": "services.core.tasks.import_rows_job",  # task running `run_import_job(job_id)`
+    "STORAGE": "default",  # where uploads wait for the worker: it must be shared with the workers
+    "UPLOAD_PREFIX": "imports/",
+    "CACHE": "default",  # job progress
+    "JOB_TTL": 7 * 24 * 3600,
+    "LOCK_TTL": 120,  # seconds without progress before another worker may resume a job
+    "MAX_ERRORS": 100,  # rejected rows kept in a job's report (all are counted)
+}
+
+FORMATS = {"csv": "text/csv; charset=utf-8", "jsonl": "application/x-ndjson"}
+CONFLICTS = ("update", "skip", "error")
+
+transfer_rows = Counter("transfer_rows", "Rows exported or imported through bulk transfers.", ("direction", "model"))
+
+# Sent after every committed import chunk with `rows` (the saved instances),
+# so caches of the model can be refreshed; `sender` is the model.
+rows_imported = Signal(name="transfer.rows_imported")
+
+
+def get_transfer_settings():
+    """`DEFAULT_TRANSFER` updated with the `TRANSFER` setting."""
+    return {**DEFAULT_TRANSFER, **getattr(settings, "TRANSFER", {})}
+
+
+def transfer_fields(model):
+    """Default columns of a model: every concrete field, foreign keys by their `_id` column."""
+    return [field.attname for field in model._meta.concrete_fields]
+
+
+# Export ------------------------------------------------------------------
+
+
+class _Echo:
+    """Write target of `csv.writer` that hands the formatted line back instead of buffering it."""
+
+    def write(self, value):
+        """Return `value`, the line `csv.writer` formatted."""
+        return value
+
+
+def _text(value):
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return dumps(value).decode()
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def _rows(queryset, fields, chunk_size):
+    # Inside a transaction the server-side cursor streams; in autocommit
+    # PostgreSQL would materialise the whole result of a WITH HOLD cursor first.
+    if not queryset.query.is_sliced:  # a sliced query keeps the ordering its slice depends on
+        queryset = queryset.order_by()
+    with transaction.atomic(using=queryset.db):
+        yield from queryset.values_list(*fields).iterator(chunk_size=chunk_size)
+
+
+def iter_csv(queryset, fields, chunk_size):
+    """Yield a CSV export (header line first) in blocks of `chunk_size` rows."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields).encode()
+    label, lines = queryset.model._meta.label, []
+    for row in _rows(queryset, fields, chunk_size):
+        lines.append(writer.writerow([_text(value) for value in row]))
+        if len(lines) >= chunk_size:
+            transfer_rows.inc(len(lines), "export", label)
+            yield "".join(lines).encode()
+            lines = []
+    if lines:
+        transfer_rows.inc(len(lines), "export", label)
+        yield "".join(lines).encode()
+
+
+def iter_jsonl(queryset, fields, chunk_size):
+    """Yield a JSON Lines export (one object per row) in blocks of `chunk_size` rows."""
+    label, lines = queryset.model._meta.label, []
+    for row in _rows(queryset, fields, chunk_size):
+        lines.append(dumps(dict(zip(fields, row))))
+        if len(lines) >= chunk_size:
+            transfer_rows.inc(len(lines), "export", label)
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+    if lines:
+        transfer_rows.inc(len(lines), "export", label)
+        yield b"\n".join(lines) + b"\n"
+
+
+async def _aiter(iterator):
+    # Django serves a sync iterator to ASGI by reading it whole into a list:
+    # pull it block by block instead, always in the same thread (the cursor's).
+    # A client disconnect closes this generator: close the sync one too, in
+    # that thread, so its transaction ends now instead of whenever it is
+    # collected, maybe in another thread.
+    pull = sync_to_async(next, thread_sensitive=True)
+    try:
+        while (block := await pull(iterator, None)) is not None:
+            yield block
+    finally:
+        await sync_to_async(iterator.close, thread_sensitive=True)()
+
+
+def export_response(
+    request, queryset, export_format="csv", fields=None, filename=None, chunk_size=None
+):  # pylint: disable=too-many-arguments,too-many-positional-arguments
+    """
+    Stream `queryset` as a CSV or JSON Lines attachment.
+
+    Rows are read through a server-side cursor `chunk_size` at a time (in
+    storage order) and written as they come, so memory stays flat whatever
+    the size of the table. The export is one consistent snapshot.
+
+    Args:
+        request (HttpRequest): The current request (ASGI requests get an async stream).
+        queryset (QuerySet): Rows to export.
+        export_format (str): `csv` or `jsonl`.
+        fields (list[str], optional): Columns (default `transfer_fields(model)`).
+        filename (str, optional): Attachment name (default `<table>.<format>`).
+        chunk_size (int, optional): Rows per fetch (default `TRANSFER["CHUNK_SIZE"]`).
+    """
+    fields = list(fields or transfer_fields(queryset.model))
+    chunk_size = chunk_size or get_transfer_settings()["CHUNK_SIZE"]
+    iterator = (iter_csv if export_format == "csv" else iter_jsonl)(queryset, fields, chunk_size)
+    content = _aiter(iterator) if isinstance(request, ASGIRequest) else iterator
+    response = StreamingHttpResponse(content, content_type=FORMATS[export_format])
+    filename = filename or f"{queryset.model._meta.db_table}.{export_format}"
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+# Import ------------------------------------------------------------------
+
+
+def read_rows(file, import_format):
+    """
+    Yield the rows of an uploaded CSV or JSON Lines file, one at a time.
+
+    JSON lines that cannot be decoded are yielded as the `ValueError`, so
+    the importer can reject that row and carry on.
+    """
+    if import_format == "csv":
+        yield from csv.DictReader(io.TextIOWrapper(file, encoding="utf-8-sig", newline=""))
+        return
+    for line in file:
+        if not line.strip():
+            continue
+        try:
+            row = loads(line)
+        except ValueError as error:
+            yield error
+            continue
+        yield row if isinstance(row, dict) else ValueError("Not a JSON object")
+
+
+class RowConverter:
+    """
+    Turn imported rows (dicts of column -> value) into unsaved model instances.
+
+    Columns are field names or attnames. CSV values are text: empty strings
+    are None for nullable fields, JSON fields are decoded, and every other
+    value goes through the field's `to_python` (and the `max_length` of
+    text fields). With a `schema` (`shared.validators.Schema`) the converted
+    values, None values left out, are checked before the instance is built.
+
+    Raises:
+        ValueError: When a column matches no field of the model.
+    """
+
+    def __init__(self, model, columns, text, schema=None):
+        by_name = {}
+        for field in model._meta.concrete_fields:
+            by_name[field.name] = by_name[field.attname] = field
+        unknown = [column for column in columns if column not in by_name]
+        if unknown:
+            raise ValueError(f"Unknown column(s) for {model._meta.label}: {', '.join(unknown)}")
+        self.model = model
+        self.fields = [(column, by_name[column]) for column in columns]
+        self.text = text
+        self.schema = schema
+
+    def value(self, field, value):
+        """The Python value of `field` for an imported `value`."""
+        if value is None or (self.text and value == "" and field.null):
+            return None
+        if isinstance(field, models.JSONField):
+            return loads(value) if self.text else value
+        value = field.to_python(value)
+        if isinstance(value, str) and field.max_length is not None and len(value) > field.max_length:
+            raise ValueError(f"{field.name}: longer than {field.max_length} characters")
+        return value
+
+    def __call__(self, row):
+        values = {}
+        for column, field in self.fields:
+            if column in row:
+                values[field.attname] = self.value(field, row[column])
+        if self.schema is not None:
+            issue = self.schema.check({key: value for key, value in values.items() if value is not None})
+            if issue is not None:
+                raise ValueError(f"{issue.path}: {issue.message}" if issue.path else issue.message)
+        return self.model(**values)
+
+
+def import_rows(
+    model, rows, text=False, unique_fields=None, conflicts="update", chunk_size=None, schema=None, skip=0, progress=None
+):  # pylint: disable=too-many-arguments,too-many-positional-arguments,too-many-locals
+    """
+    Insert or update rows in chunks of `chunk_size`, one transaction each.
+
+    Conflicts on `unique_fields` (a unique constraint of the model):
+
+    - `update`: upsert, `bulk_create(update_conflicts=True)`, updating the
+      imported columns (but the primary key and `auto_now_add` fields).
+      Without `unique_fields`, rows are matched on the primary key instead:
+      existing ones go through `bulk_update()`, the others are created.
+    - `skip`: `bulk_create(ignore_conflicts=True)`, existing rows are kept.
+    - `error`: plain `bulk_create()`; a conflict fails the import.
+
+    Rows that do not convert (or fail `schema`) are rejected and counted;
+    the others still import.
+
+    Args:
+        model (type[Model]): Target model.
+        rows (iterable): Dicts of column -> value (or exceptions, see `read_rows`).
+        text (bool): Values are CSV text (see `RowConverter`).
+        unique_fields (list[str], optional): Conflict target.
+        conflicts (str): `update`, `skip` or `error`.
+        chunk_size (int, optional): Rows per transaction (default `TRANSFER["CHUNK_SIZE"]`).
+        schema (Schema, optional): Checks of the converted values.
+        skip (int): Rows to pass over first (already imported by an interrupted run).
+        progress (callable, optional): Called with the running totals after every committed chunk.
+
+    Returns:
+        dict: Totals: `rows` (last row read), `imported`, `rejected` and `errors` (the first
+        `TRANSFER["MAX_ERRORS"]`, as `{"row": n, "error": message}`).
+    """
+    config = get_transfer_settings()
+    chunk_size = chunk_size or config["CHUNK_SIZE"]
+    totals = {"rows": 0, "imported": 0, "rejected": 0, "errors": []}
+    convert, chunk = None, []
+
+    def reject(number, error):
+        totals["rejected"] += 1
+        if len(totals["errors"]) < config["MAX_ERRORS"]:
+            totals["errors"].append({"row": number, "error": str(error)})
+
+    def flush():
+        saved = _save_chunk(model, chunk, convert.fields, unique_fields, conflicts)
+        totals["imported"] += len(chunk)
+        transfer_rows.inc(len(chunk), "import", model._meta.label)
+        rows_imported.send(sender=model, rows=saved)
+        chunk.clear()
+        if progress is not None:
+            progress(totals)
+
+    for number, row in enumerate(rows, 1):
+        if number <= skip:
+            continue
+        totals["rows"] = number
+        if isinstance(row, Exception):
+            reject(number, row)
+            continue
+        try:
+            if convert is None:
+                convert = RowConverter(model, list(row), text, schema)
+            chunk.append(convert(row))
+        except (ValueError, ValidationError, TypeError) as error:
+            if convert is None:  # unknown columns: nothing can be imported
+                raise
+            reject(number, error.messages[0] if isinstance(error, ValidationError) else error)
+            continue
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+    elif progress is not None:
+        progress(totals)
+    return totals
+
+
+def _save_chunk(model, instances, fields, unique_fields, conflicts):
+    columns = [field for _, field in fields]
+    manager = model._default_manager  # pylint: disable=protected-access
+    with transaction.atomic(using=manager.db):
+        if conflicts == "skip":
+            return manager.bulk_create(instances, ignore_conflicts=True)
+        if conflicts == "error":
+            return manager.bulk_create(instances)
+        keep = set(unique_fields or ())
+        instances = _last_duplicates(model, instances, unique_fields)
+        update_fields = [
+            field.name
+            for field in columns
+            if not field.primary_key and not getattr(field, "auto_now_add", False) and field.name not in keep
+        ]
+        if unique_fields and update_fields:
+            return manager.bulk_create(
+                instances, update_conflicts=True, unique_fields=unique_fields, update_fields=update_fields
+            )
+        if unique_fields:  # nothing to update: the unique columns are all there is
+            return manager.bulk_create(instances, ignore_conflicts=True)
+        pks = [instance.pk for instance in instances if instance.pk is not None]
+        existing = set(manager.filter(pk__in=pks).values_list("pk", flat=True)) if pks else set()
+        updated = [instance for instance in instances if instance.pk in existing]
+        if updated and update_fields:
+            manager.bulk_update(updated, update_fields)
+        return updated + manager.bulk_create([instance for instance in instances if instance.pk not in existing])
+
+
+def _last_duplicates(model, instances, unique_fields):
+    # One upsert cannot touch a row twice: the last duplicate of a chunk wins.
+    # Rows with a null key (new rows without an id) are never duplicates.
+    attnames = [model._meta.get_field(name).attname for name in unique_fields or (model._meta.pk.name,)]
+    unique = {}
+    for index, instance in enumerate(instances):
+        key = tuple(getattr(instance, name) for name in attnames)
+        unique[index if None in key else key] = instance
+    return list(unique.values())
+
+
+def reset_sequences(model):
+    """Move the primary key sequence of `model` past imported explicit ids."""
+    connection = connections[model._default_manager.db]  # pylint: disable=protected-access
+    statements = connection.ops.sequence_reset_sql(no_style(), [model])
+    if statements:
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+
+
+# Background import jobs --------------------------------------------------
+
+
+def _job_key(job_id):
+    return f"transfer:job:{job_id}"
+
+
+def get_import_job(job_id):
+    """The state of an import job (a dict), or None when unknown or expired."""
+    return caches[get_transfer_settings()["CACHE"]].get(_job_key(job_id))
+
+
+def _save_job(job):
+    config = get_transfer_settings()
+    caches[config["CACHE"]].set(_job_key(job["id"]), job, config["JOB_TTL"])
+
+
+def start_import(
+    model, upload, import_format, conflicts="update", unique_fields=None, schema=None, user=None
+):  # pylint: disable=too-many-arguments,too-many-positional-arguments
+    """
+    Store an uploaded file and queue its import on a worker.
+
+    The file is copied to the `TRANSFER["STORAGE"]` storage in chunks (never
+    read whole) and the `TRANSFER["TASK"]` task (`services.core.tasks.import_rows_job`)
+    imports it; follow it with `get_import_job()`.
+
+    Args:
+        model (type[Model]): Target model.
+        upload (File): The uploaded file.
+        import_format (str): `csv` or `jsonl`.
+        conflicts (str): See `import_rows`.
+        unique_fields (list[str], optional): See `import_rows`.
+        schema (str, optional): Dotted path of a `shared.validators.Schema`.
+        user (str, optional): Who started the job, for the report.
+
+    Returns:
+        str: The job id.
+    """
+    if import_format not in FORMATS or conflicts not in CONFLICTS:
+        raise ValueError(f"Unsupported import: {import_format}, {conflicts}")
+    config = get_transfer_settings()
+    job_id = uuid.uuid4().hex
+    path = storages[config["STORAGE"]].save(f"{config['UPLOAD_PREFIX']}{job_id}.{import_format}", upload)
+    job = {
+        "id": job_id,
+        "model": model._meta.label,
+        "format": import_format,
+        "conflicts": conflicts,
+        "unique_fields": list(unique_fields or []),
+        "schema": schema,
+        "path": path,
+        "size": upload.size,
+        "user": user,
+        "status": "queued",
+        "position": 0,
+        "rows": 0,  # rows read and committed (or rejected) so far
+        "imported": 0,
+        "rejected": 0,
+        "errors": [],
+        "error": None,
+        "queued_at": time.time(),
+        "started_at": None,
+        "finished_at": None,
+    }
+    _save_job(job)
+    import_string(config["TASK"]).apply_async((job_id,), queue=config["QUEUE"])
+    return job_id
+
+
+def run_import_job(job_id):
+    """
+    Run a queued import (the body of the `import_rows_job` task).
+
+    Progress (bytes read, rows done) is saved after every committed chunk. A
+    redelivered job resumes after the rows already committed, and a job
+    another worker is running (its lock refreshed by every chunk) is left to it.
+    """
+    config = get_transfer_settings()
+    cache = caches[config["CACHE"]]
+    job = get_import_job(job_id)
+    if job is None or job["status"] in ("done", "failed"):
+        return
+    lock = f"{_job_key(job_id)}:lock"
+    if not cache.add(lock, 1, config["LOCK_TTL"]):
+        logger.info("Import job %s is running elsewhere", job_id)
+        return
+    storage = storages[config["STORAGE"]]
+    model = apps.get_model(job["model"])
+    # Totals of an earlier, interrupted run: its committed rows are skipped.
+    earlier = {"imported": job["imported"], "rejected": job["rejected"], "errors": list(job["errors"])}
+    job.update(status="running", started_at=job["started_at"] or time.time())
+    _save_job(job)
+    try:
+        with storage.open(job["path"], "rb") as file:
+
+            def progress(totals):
+                job.update(
+                    position=_tell(file),
+                    rows=max(job["rows"], totals["rows"]),
+                    imported=earlier["imported"] + totals["imported"],
+                    rejected=earlier["rejected"] + totals["rejected"],
+                    errors=(earlier["errors"] + totals["errors"])[: config["MAX_ERRORS"]],
+                )
+                _save_job(job)
+                cache.touch(lock, config["LOCK_TTL"])
+
+            import_rows(
+                model,
+                read_rows(file, job["format"]),
+                text=job["format"] == "csv",
+                unique_fields=job["unique_fields"] or None,
+                conflicts=job["conflicts"],
+                chunk_size=config["CHUNK_SIZE"],
+                schema=import_string(job["schema"]) if job["schema"] else None,
+                skip=job["rows"],
+                progress=progress,
+            )
+        if isinstance(model._meta.pk, models.fields.AutoFieldMixin):
+            reset_sequences(model)
+        job.update(status="done", position=job["size"])
+    except (ValueError, DataError, IntegrityError) as error:  # bad file or conflicts="error": retrying cannot help
+        logger.warning("Import job %s failed", job_id, exc_info=True)
+        job.update(status="failed", error=str(error))
+    finally:
+        if job["status"] in ("done", "failed"):
+            job["finished_at"] = time.time()
+            storage.delete(job["path"])
+        _save_job(job)
+        cache.delete(lock)
+    logger.info(
+        "Import job %s %s",
+        job_id,
+        job["status"],
+        extra={"model": job["model"], "rows": job["rows"], "imported": job["imported"], "rejected": job["rejected"]},
+    )
+
+
+def _tell(file):
+    try:
+        return file.tell()
+    except (AttributeError, OSError, ValueError):
+        return 0
+
+
+__all__ = [
+    "DEFAULT_TRANSFER",
+    "FORMATS",
+    "CONFLICTS",
+    "rows_imported",
+    "get_transfer_settings",
+    "transfer_fields",
+    "iter_csv",
+    "iter_jsonl",
+    "export_response",
+    "read_rows",
+    "RowConverter",
+    "import_rows",
+    "reset_sequences",
+    "get_import_job",
+    "start_import",
+    "run_import_job",
+]
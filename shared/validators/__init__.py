@@ -0,0 +1,3 @@
+from .identifiers import *
+from .matrix import *
+from .schema import *
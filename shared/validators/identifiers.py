@@ -0,0 +1,82 @@
+import functools
+import re
+
+from shared.types.constants.matrix import MAX_ID_LENGTH, MAX_INTERNED_IDS
+
+# Identifier grammar (https://spec.matrix.org/latest/appendices/#identifier-grammar).
+# User and room localparts accept the historical grammar (any printable ASCII
+# but ":"), which homeservers still send for old accounts.
+SERVER_NAME = r"(?:\[[0-9A-Fa-f:.]{2,45}\]|[A-Za-z0-9.\-]{1,255})(?::[0-9]{1,5})?"
+_HISTORICAL_LOCALPART = r"[\x21-\x39\x3b-\x7e]+"
+
+IDENTIFIER_PATTERNS = {
+    "user_id": re.compile(rf"@{_HISTORICAL_LOCALPART}:{SERVER_NAME}"),
+    "room_id": re.compile(rf"!{_HISTORICAL_LOCALPART}(?::{SERVER_NAME})?"),
+    "room_alias": re.compile(rf"#[^:\x00]+:{SERVER_NAME}"),
+    "event_id": re.compile(r"\$[\x21-\x7e]+"),
+    "server_name": re.compile(SERVER_NAME),
+}
+
+
+def utf8_length(value):
+    """Length of `value` in UTF-8 bytes, without encoding ASCII strings."""
+    return len(value) if value.isascii() else len(value.encode())
+
+
+class IdentifierChecker:
+    """
+    Validate one kind of identifier: grammar and the 255 bytes limit.
+
+    With `remember`, ids that passed are kept (up to `MAX_INTERNED_IDS`), so
+    the few rooms and senders repeated across a batch cost a set lookup after
+    the first regex match; compiled validators test `value in checker.seen`
+    themselves before calling the checker. Event ids are unique per event
+    and are not remembered.
+    """
+
+    __slots__ = ("kind", "remember", "seen", "_fullmatch")
+
+    def __init__(self, kind, remember=True):
+        self.kind = kind
+        self.remember = remember
+        self.seen = set()
+        self._fullmatch = IDENTIFIER_PATTERNS[kind].fullmatch
+
+    def __call__(self, value):
+        if not isinstance(value, str):
+            return False
+        if value in self.seen:
+            return True
+        if self._fullmatch(value) is None:
+            return False
+        if len(value) > MAX_ID_LENGTH // 4 and utf8_length(value) > MAX_ID_LENGTH:
+            return False
+        if self.remember and len(self.seen) < MAX_INTERNED_IDS:
+            self.seen.add(value)
+        return True
+
+
+@functools.lru_cache(maxsize=None)
+def identifier_checker(kind):
+    """
+    The shared `IdentifierChecker` of `kind`.
+
+    Args:
+        kind (str): A key of `IDENTIFIER_PATTERNS` (`user_id`, `room_id`, ...).
+    """
+    return IdentifierChecker(kind, remember=kind != "event_id")
+
+
+def is_valid_identifier(kind, value):
+    """Whether `value` is a valid Matrix identifier of `kind`."""
+    return identifier_checker(kind)(value)
+
+
+__all__ = [
+    "SERVER_NAME",
+    "IDENTIFIER_PATTERNS",
+    "utf8_length",
+    "IdentifierChecker",
+    "identifier_checker",
+    "is_valid_identifier",
+]
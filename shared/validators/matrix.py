@@ -0,0 +1,48 @@
+from shared.types.constants.matrix import MAX_ID_LENGTH
+from shared.validators.schema import Integer, Object, Schema, String
+
+# Largest integer of canonical JSON (https://spec.matrix.org/latest/appendices/#canonical-json).
+MAX_CANONICAL_INT = 2**53 - 1
+
+# Most events accepted in one batch (homeservers send transactions of far fewer).
+MAX_TRANSACTION_EVENTS = 10_000
+
+# A room event as pushed to application services and returned by the
+# client-server API. `type` and `state_key` fit the 255 characters columns of
+# `bridge.MatrixEvent`; keys that are not declared are ignored.
+EVENT_SCHEMA = Schema(
+    "event",
+    {
+        "event_id": String(identifier="event_id"),
+        "room_id": String(identifier="room_id"),
+        "sender": String(identifier="user_id"),
+        "type": String(min_length=1, max_bytes=MAX_ID_LENGTH),
+        "origin_server_ts": Integer(minimum=0, maximum=MAX_CANONICAL_INT),
+        "content": Object(required=False, nullable=True),
+        "state_key": String(required=False, max_bytes=MAX_ID_LENGTH),
+        "unsigned": Object(required=False, nullable=True),
+    },
+)
+
+
+def validate_events(events, fail_fast=True):
+    """
+    Validate a batch of decoded room events against `EVENT_SCHEMA`.
+
+    Args:
+        events (list[dict]): Decoded events.
+        fail_fast (bool): Stop at the first invalid event.
+
+    Raises:
+        SchemaValidationError: When an event is invalid, or `events` is not a list of
+            at most `MAX_TRANSACTION_EVENTS`.
+    """
+    return EVENT_SCHEMA.validate_many(events, fail_fast=fail_fast, max_items=MAX_TRANSACTION_EVENTS)
+
+
+def partition_events(events):
+    """Split a batch of decoded room events into the valid ones and the issues of the others."""
+    return EVENT_SCHEMA.partition(events, max_items=MAX_TRANSACTION_EVENTS)
+
+
+__all__ = ["MAX_CANONICAL_INT", "MAX_TRANSACTION_EVENTS", "EVENT_SCHEMA", "validate_events", "partition_events"]
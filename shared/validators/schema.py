@@ -0,0 +1,450 @@
+import functools
+import itertools
+import re
+from dataclasses import dataclass
+
+from shared.validators.identifiers import identifier_checker, utf8_length
+
+_MISSING = object()
+
+
+@dataclass(frozen=True, slots=True)
+class ValidationIssue:
+    """
+    Why an item was rejected: the first failed check of the item.
+
+    Attributes:
+        index (int): Position of the item in the batch (0 for single items).
+        path (str): Dotted path of the field (`content.body`, `members[2]`), "" for the item itself.
+        code (str): Matrix error code (`M_BAD_JSON`, `M_MISSING_PARAM`, `M_INVALID_PARAM`, `M_TOO_LARGE`).
+        message (str): Human-readable reason.
+    """
+
+    index: int
+    path: str
+    code: str
+    message: str
+
+    def __str__(self):
+        where = f"{self.path}: " if self.path else ""
+        return f"item {self.index}: {where}{self.message}"
+
+    def to_dict(self):
+        """The issue as JSON: `index`, `path`, `errcode` and `error`."""
+        return {"index": self.index, "path": self.path, "errcode": self.code, "error": self.message}
+
+
+class SchemaValidationError(ValueError):
+    """
+    Raised by `Schema.validate()` and `Schema.validate_many()`.
+
+    Attributes:
+        issues (list[ValidationIssue]): One per rejected item, in batch order.
+    """
+
+    def __init__(self, issues):
+        self.issues = issues
+        super().__init__(str(issues[0]) if len(issues) == 1 else f"{len(issues)} invalid items, first {issues[0]}")
+
+    def to_dict(self):
+        """A Matrix error body (`errcode`/`error`) with the issues attached."""
+        return {
+            "errcode": self.issues[0].code,
+            "error": str(self),
+            "issues": [issue.to_dict() for issue in self.issues],
+        }
+
+
+class _Emitter:
+    """Accumulates the source of a compiled validator and the constants it references."""
+
+    def __init__(self):
+        self.lines = []
+        self.namespace = {"MISSING": _MISSING, "utf8_length": utf8_length}
+        self.depth = 1
+        self._names = itertools.count()
+
+    def line(self, code):
+        """Append a line of `code` at the current indentation."""
+        self.lines.append("    " * self.depth + code)
+
+    def name(self, prefix):
+        """A fresh variable name."""
+        return f"{prefix}{next(self._names)}"
+
+    def const(self, value, prefix="C"):
+        """Bind `value` as a global of the compiled function; returns its name."""
+        name = self.name(prefix)
+        self.namespace[name] = value
+        return name
+
+    def fail(self, path, code, message):
+        """Emit the return of an issue; `path` is an expression."""
+        self.line(f"return ({path}, {code!r}, {message!r})")
+
+    def block(self, header, body):
+        """Emit `header` and, indented, what `body()` emits."""
+        self.line(header)
+        self.depth += 1
+        body()
+        self.depth -= 1
+
+
+def _join(path, key):
+    """Expression of the path of `key` below `path` (evaluated only when a check fails)."""
+    return repr(key) if path is None else f"{path} + {'.' + key!r}"
+
+
+class Field:
+    """
+    Base of the schema field types.
+
+    Args:
+        required (bool): Reject items without the key.
+        nullable (bool): Accept `None` (and skip the other checks).
+    """
+
+    type_name = "a value"
+
+    def __init__(self, required=True, nullable=False):
+        self.required = required
+        self.nullable = nullable
+
+    def type_test(self, var):
+        """Expression that is true when `var` has the wrong type."""
+        raise NotImplementedError
+
+    def emit(self, emitter, var, path):
+        """Emit the type check and the other checks of the value in `var`."""
+        emitter.block(
+            f"if {self.type_test(var)}:", lambda: emitter.fail(path, "M_BAD_JSON", f"Expected {self.type_name}")
+        )
+        self.emit_checks(emitter, var, path)
+
+    def emit_checks(self, emitter, var, path):
+        """Emit the checks of a value of the right type."""
+
+
+class String(Field):
+    """
+    A JSON string.
+
+    Args:
+        min_length (int, optional): Fewest characters.
+        max_length (int, optional): Most characters.
+        max_bytes (int, optional): Most UTF-8 bytes (what Matrix limits).
+        choices (iterable, optional): Accepted values.
+        pattern (str, optional): Regular expression the whole value must match.
+        identifier (str, optional): Matrix identifier kind (`user_id`, `room_id`, `room_alias`, `event_id`, ...).
+    """
+
+    type_name = "a string"
+
+    def __init__(
+        self,
+        min_length=None,
+        max_length=None,
+        max_bytes=None,
+        choices=None,
+        pattern=None,
+        identifier=None,
+        **kwargs,
+    ):  # pylint: disable=too-many-arguments,too-many-positional-arguments
+        super().__init__(**kwargs)
+        self.min_length = min_length
+        self.max_length = max_length
+        self.max_bytes = max_bytes
+        self.choices = frozenset(choices) if choices is not None else None
+        self.pattern = re.compile(pattern) if isinstance(pattern, str) else pattern
+        self.identifier = identifier
+
+    def type_test(self, var):
+        return f"type({var}) is not str and not isinstance({var}, str)"
+
+    def emit_checks(self, emitter, var, path):
+        if self.min_length:
+            message = "Empty" if self.min_length == 1 else f"Shorter than {self.min_length} characters"
+            emitter.block(
+                f"if len({var}) < {self.min_length}:", lambda: emitter.fail(path, "M_INVALID_PARAM", message)
+            )
+        if self.max_length is not None:
+            emitter.block(
+                f"if len({var}) > {self.max_length}:",
+                lambda: emitter.fail(path, "M_TOO_LARGE", f"Longer than {self.max_length} characters"),
+            )
+        if self.max_bytes is not None:
+            # Strings of up to max_bytes // 4 characters cannot exceed it: skip the byte count.
+            emitter.block(
+                f"if len({var}) > {self.max_bytes // 4} and utf8_length({var}) > {self.max_bytes}:",
+                lambda: emitter.fail(path, "M_TOO_LARGE", f"Longer than {self.max_bytes} bytes"),
+            )
+        if self.choices is not None:
+            choices = emitter.const(self.choices)
+            emitter.block(
+                f"if {var} not in {choices}:",
+                lambda: emitter.fail(path, "M_INVALID_PARAM", f"Not one of {', '.join(sorted(self.choices))}"),
+            )
+        if self.pattern is not None:
+            fullmatch = emitter.const(self.pattern.fullmatch, "P")
+            emitter.block(
+                f"if {fullmatch}({var}) is None:",
+                lambda: emitter.fail(path, "M_INVALID_PARAM", f"Does not match {self.pattern.pattern}"),
+            )
+        if self.identifier is not None:
+            checker = identifier_checker(self.identifier)
+            check = emitter.const(checker, "I")
+            test = f"not {check}({var})"
+            if checker.remember:  # inline the cache hit, the common case
+                test = f"{var} not in {emitter.const(checker.seen, 'S')} and {test}"
+            emitter.block(
+                f"if {test}:",
+                lambda: emitter.fail(path, "M_INVALID_PARAM", f"Not a valid {self.identifier}"),
+            )
+
+
+class Integer(Field):
+    """
+    A JSON integer (booleans are rejected).
+
+    Args:
+        minimum (int, optional): Smallest accepted value.
+        maximum (int, optional): Largest accepted value.
+    """
+
+    type_name = "an integer"
+
+    def __init__(self, minimum=None, maximum=None, **kwargs):
+        super().__init__(**kwargs)
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def type_test(self, var):
+        return f"type({var}) is not int"
+
+    def emit_checks(self, emitter, var, path):
+        if self.minimum is not None:
+            emitter.block(
+                f"if {var} < {self.minimum}:",
+                lambda: emitter.fail(path, "M_INVALID_PARAM", f"Smaller than {self.minimum}"),
+            )
+        if self.maximum is not None:
+            emitter.block(
+                f"if {var} > {self.maximum}:",
+                lambda: emitter.fail(path, "M_INVALID_PARAM", f"Larger than {self.maximum}"),
+            )
+
+
+class Boolean(Field):
+    """A JSON boolean."""
+
+    type_name = "a boolean"
+
+    def type_test(self, var):
+        return f"type({var}) is not bool"
+
+
+class Object(Field):
+    """
+    A JSON object; keys that the schema does not declare are allowed.
+
+    Args:
+        schema (Schema, optional): Checks of the object's keys.
+        max_keys (int, optional): Most keys.
+    """
+
+    type_name = "an object"
+
+    def __init__(self, schema=None, max_keys=None, **kwargs):
+        super().__init__(**kwargs)
+        self.schema = schema
+        self.max_keys = max_keys
+
+    def type_test(self, var):
+        return f"type({var}) is not dict and not isinstance({var}, dict)"
+
+    def emit_checks(self, emitter, var, path):
+        if self.max_keys is not None:
+            emitter.block(
+                f"if len({var}) > {self.max_keys}:",
+                lambda: emitter.fail(path, "M_TOO_LARGE", f"More than {self.max_keys} keys"),
+            )
+        if self.schema is not None:
+            _emit_fields(emitter, self.schema.fields, var, path)
+
+
+class Array(Field):
+    """
+    A JSON array.
+
+    Args:
+        items (Field, optional): Checks of every element.
+        max_items (int, optional): Most elements.
+    """
+
+    type_name = "an array"
+
+    def __init__(self, items=None, max_items=None, **kwargs):
+        super().__init__(**kwargs)
+        self.items = items
+        self.max_items = max_items
+
+    def type_test(self, var):
+        return f"type({var}) is not list and not isinstance({var}, list)"
+
+    def emit_checks(self, emitter, var, path):
+        if self.max_items is not None:
+            emitter.block(
+                f"if len({var}) > {self.max_items}:",
+                lambda: emitter.fail(path, "M_TOO_LARGE", f"More than {self.max_items} items"),
+            )
+        if self.items is None:
+            return
+        index, item = emitter.name("i"), emitter.name("x")
+        item_path = f"'%s[%d]' % ({path}, {index})"
+
+        def body():
+            if self.items.nullable:
+                emitter.block(f"if {item} is not None:", lambda: self.items.emit(emitter, item, item_path))
+            else:
+                self.items.emit(emitter, item, item_path)
+
+        emitter.block(f"for {index}, {item} in enumerate({var}):", body)
+
+
+def _emit_fields(emitter, fields, var, path):
+    skip = functools.partial(emitter.line, "pass")
+    for key, field in fields.items():
+        value = emitter.name("v")
+        field_path = _join(path, key)
+        emitter.line(f"{value} = {var}.get({key!r}, MISSING)")
+        if field.required:
+            missing = functools.partial(emitter.fail, field_path, "M_MISSING_PARAM", "Missing required field")
+            emitter.block(f"if {value} is MISSING:", missing)
+        else:
+            emitter.block(f"if {value} is MISSING:", skip)
+        if field.nullable:
+            emitter.block(f"elif {value} is None:", skip)
+        emitter.block("else:", functools.partial(field.emit, emitter, value, field_path))
+
+
+class Schema:
+    """
+    Checks of a JSON object, compiled once into a Python function.
+
+    The declared fields are turned into straight-line code (one `if` per
+    check, constants bound as globals, nested objects inlined) and `exec`-ed
+    when the schema is created, so validating an item costs a single
+    function call with no per-field dispatch. Each item stops at its first
+    failed check. Validated items are returned as they are: nothing is
+    coerced or copied.
+
+    Example:
+        MEMBER = Schema("member", {"user_id": String(identifier="user_id"), "age": Integer(minimum=0)})
+        MEMBER.validate_many(items)  # raises SchemaValidationError
+
+    Args:
+        name (str): Name of the compiled function (shows in tracebacks and profiles).
+        fields (dict): `{key: Field}`.
+    """
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = fields
+        emitter = _Emitter()
+        emitter.line("if type(item) is not dict and not isinstance(item, dict):")
+        emitter.line("    return ('', 'M_BAD_JSON', 'Expected an object')")
+        _emit_fields(emitter, fields, "item", None)
+        emitter.line("return None")
+        function_name = "check_" + re.sub(r"\W", "_", name)
+        self.source = f"def {function_name}(item):\n" + "\n".join(emitter.lines) + "\n"
+        namespace = emitter.namespace
+        exec(compile(self.source, f"<schema {name}>", "exec"), namespace)  # pylint: disable=exec-used
+        self._check = namespace[function_name]
+
+    def __repr__(self):
+        return f"Schema({self.name!r})"
+
+    def check(self, item, index=0):
+        """Return the `ValidationIssue` of `item`, or None when it is valid."""
+        issue = self._check(item)
+        return None if issue is None else ValidationIssue(index, *issue)
+
+    def validate(self, item):
+        """
+        Raises:
+            SchemaValidationError: When `item` is invalid.
+        """
+        issue = self._check(item)
+        if issue is not None:
+            raise SchemaValidationError([ValidationIssue(0, *issue)])
+        return item
+
+    def validate_many(self, items, fail_fast=True, max_items=None):
+        """
+        Validate a batch in one call.
+
+        Args:
+            items (list): Decoded JSON objects.
+            fail_fast (bool): Stop at the first invalid item; otherwise report every invalid item.
+            max_items (int, optional): Reject larger batches outright.
+
+        Returns:
+            list: `items`, unchanged.
+
+        Raises:
+            SchemaValidationError: With the issue of the first (or of every) invalid item.
+        """
+        issues = self._batch_issue(items, max_items)
+        if issues:
+            raise SchemaValidationError(issues)
+        check = self._check
+        for index, item in enumerate(items):
+            issue = check(item)
+            if issue is not None:
+                issues.append(ValidationIssue(index, *issue))
+                if fail_fast:
+                    break
+        if issues:
+            raise SchemaValidationError(issues)
+        return items
+
+    def partition(self, items, max_items=None):
+        """
+        Split a batch into its valid items and the issues of the others.
+
+        Returns:
+            tuple[list, list[ValidationIssue]]: Valid items (in order) and issues.
+        """
+        issues = self._batch_issue(items, max_items)
+        if issues:
+            return [], issues
+        valid = []
+        append, check = valid.append, self._check
+        for index, item in enumerate(items):
+            issue = check(item)
+            if issue is None:
+                append(item)
+            else:
+                issues.append(ValidationIssue(index, *issue))
+        return valid, issues
+
+    @staticmethod
+    def _batch_issue(items, max_items):
+        if not isinstance(items, (list, tuple)):
+            return [ValidationIssue(0, "", "M_BAD_JSON", "Expected an array")]
+        if max_items is not None and len(items) > max_items:
+            return [ValidationIssue(0, "", "M_TOO_LARGE", f"More than {max_items} items")]
+        return []
+
+
+__all__ = [
+    "ValidationIssue",
+    "SchemaValidationError",
+    "Field",
+    "String",
+    "Integer",
+    "Boolean",
+    "Object",
+    "Array",
+    "Schema",
+]
@@ -0,0 +1,155 @@
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from services.bridge.ingest import build_events, store_events
+from services.bridge.models import MatrixEvent
+
+HS_TOKEN = "hs-secret"
+
+
+def make_event(**overrides):
+    event = {
+        "event_id": f"${uuid.uuid4().hex}:test.hs",
+        "room_id": "!room:test.hs",
+        "sender": "@alice:test.hs",
+        "type": "m.room.message",
+        "origin_server_ts": int(time.time() * 1000),
+        "content": {"msgtype": "m.text", "body": "hello"},
+    }
+    event.update(overrides)
+    return event
+
+
+def appservice(**overrides):
+    return override_settings(MATRIX_APPSERVICE={**settings.MATRIX_APPSERVICE, "HS_TOKEN": HS_TOKEN, **overrides})
+
+
+@appservice()
+class TransactionEndpointTests(TestCase):
+    def put(self, body, txn_id=None, token=HS_TOKEN):
+        txn_id = txn_id or uuid.uuid4().hex
+        headers = {"Authorization": f"Bearer {token}"} if token is not None else {}
+        data = body if isinstance(body, (bytes, str)) else json.dumps(body)
+        return self.async_client.put(
+            f"/_matrix/app/v1/transactions/{txn_id}", data, content_type="application/json", headers=headers
+        )
+
+    async def test_rejects_missing_or_wrong_token(self):
+        for token in (None, "wrong"):
+            response = await self.put({"events": [make_event()]}, token=token)
+            self.assertEqual(response.status_code, 403)
+            self.assertEqual(response.json()["errcode"], "M_FORBIDDEN")
+        self.assertEqual(await MatrixEvent.objects.acount(), 0)
+
+    async def test_accepts_legacy_access_token_query(self):
+        txn_id = uuid.uuid4().hex
+        response = await self.async_client.put(
+            f"/transactions/{txn_id}?access_token={HS_TOKEN}",
+            json.dumps({"events": [make_event()]}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(await MatrixEvent.objects.acount(), 1)
+
+    @override_settings(DEBUG=False)
+    async def test_refuses_everyone_without_configured_token(self):
+        with appservice(HS_TOKEN=""):
+            response = await self.put({"events": [make_event()]})
+        self.assertEqual(response.status_code, 403)
+
+    async def test_retried_transaction_is_acknowledged_without_storing(self):
+        txn_id = uuid.uuid4().hex
+        body = {"events": [make_event(), make_event()]}
+        self.assertEqual((await self.put(body, txn_id)).status_code, 200)
+        with mock.patch("services.bridge.views.store_events") as store:
+            response = await self.put(body, txn_id)
+        self.assertEqual(response.status_code, 200)
+        store.assert_not_called()
+        self.assertEqual(await MatrixEvent.objects.acount(), 2)
+
+    async def test_rejects_body_without_events_array(self):
+        for body in ({"events": None}, {"events": 5}, {"events": {"a": 1}}, [make_event()], "null"):
+            with self.subTest(body=body):
+                response = await self.put(body)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()["errcode"], "M_BAD_JSON")
+
+    async def test_rejects_non_json_body(self):
+        response = await self.put(b"{not json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["errcode"], "M_NOT_JSON")
+
+    async def test_rejected_transaction_is_not_remembered(self):
+        txn_id = uuid.uuid4().hex
+        self.assertEqual((await self.put({"events": None}, txn_id)).status_code, 400)
+        self.assertEqual((await self.put({"events": [make_event()]}, txn_id)).status_code, 200)
+        self.assertEqual(await MatrixEvent.objects.acount(), 1)
+
+
+class StoreEventsTests(TestCase):
+    def test_inserts_batch_and_skips_known_duplicate_and_malformed_events(self):
+        known = make_event()
+        store_events("txn-1", [known])
+        repeated = make_event()
+        events = [known, repeated, repeated, make_event(), make_event(room_id="not-a-room")]
+
+        new_ids = store_events("txn-2", events, batch_size=500)
+
+        self.assertEqual(new_ids, [repeated["event_id"], events[3]["event_id"]])
+        self.assertEqual(MatrixEvent.objects.count(), 3)
+        stored = MatrixEvent.objects.filter(txn_id="txn-2").values_list("event_id", flat=True)
+        self.assertEqual(set(stored), set(new_ids))
+
+    def test_one_insert_per_batch(self):
+        events = [make_event() for _ in range(5)]
+        # SAVEPOINT, 3 INSERTs of 2 rows, RELEASE.
+        with self.assertNumQueries(5):
+            store_events("txn", events, batch_size=2)
+        self.assertEqual(MatrixEvent.objects.count(), 5)
+
+    def test_events_without_integer_timestamp_are_skipped(self):
+        kept = make_event()
+        events = [kept, make_event(origin_server_ts=None), make_event(origin_server_ts="1"), make_event()]
+        del events[3]["origin_server_ts"]
+
+        rows = build_events("txn", events)
+
+        self.assertEqual([row.event_id for row in rows], [kept["event_id"]])
+        self.assertEqual(rows[0].origin_server_ts, kept["origin_server_ts"])
+
+    def test_events_that_fail_to_parse_are_logged(self):
+        kept, broken = make_event(), make_event(sender="alice")
+        # As if the schema had let the event through.
+        with mock.patch("services.bridge.ingest.partition_events", return_value=([kept, broken], [])):
+            with self.assertLogs("services.bridge.ingest", "WARNING") as logs:
+                rows = build_events("txn", [kept, broken])
+
+        self.assertEqual([row.event_id for row in rows], [kept["event_id"]])
+        self.assertEqual(logs.records[0].errors[0]["event_id"], broken["event_id"])
+
+
+class OverlappingDeliveryTests(TransactionTestCase):
+    def test_concurrent_deliveries_report_each_event_once(self):
+        events = [make_event() for _ in range(200)]
+        barrier = threading.Barrier(2)
+
+        def deliver(txn_id):
+            try:
+                barrier.wait()
+                return store_events(txn_id, events, batch_size=50)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            reported = list(pool.map(deliver, ["txn-a", "txn-b"]))
+
+        self.assertEqual(sorted(reported[0] + reported[1]), sorted(event["event_id"] for event in events))
+        self.assertEqual(MatrixEvent.objects.count(), 200)
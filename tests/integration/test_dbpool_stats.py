@@ -0,0 +1,45 @@
+import io
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from services.core.management.commands.dbpool_stats import Command
+
+
+class DbPoolStatsTests(TestCase):
+    def test_checkout_latency_is_reported(self):
+        out = io.StringIO()
+
+        call_command("dbpool_stats", samples=6, concurrency=2, stdout=out)
+
+        output = out.getvalue()
+        self.assertIn("Database 'default' connection mode:", output)
+        self.assertIn("Checkout latency (6 samples, 2 threads)", output)
+        for line in ("mean:", "p50:", "p99:", "max:"):
+            self.assertIn(line, output)
+        self.assertNotIn("Pool", output.split("Checkout latency")[1])
+
+    def test_pool_statistics(self):
+        out = io.StringIO()
+        command = Command(stdout=out)
+
+        command._report_pool(  # pylint: disable=protected-access
+            {
+                "pool_min": 2,
+                "pool_max": 10,
+                "pool_size": 4,
+                "pool_available": 1,
+                "requests_num": 50,
+                "requests_queued": 4,
+                "requests_wait_ms": 10,
+                "connections_num": 4,
+                "connections_ms": 12,
+            }
+        )
+
+        output = out.getvalue()
+        self.assertIn("size: 4 (min 2, max 10)", output)
+        self.assertIn("in use: 3 (30% utilisation)", output)
+        self.assertIn("requests: 50, queued: 4, waiting now: 0", output)
+        self.assertIn("wait: 10 ms total, 2.500 ms mean per queued request", output)
+        self.assertIn("connections opened: 4 in 12 ms, errors: 0", output)
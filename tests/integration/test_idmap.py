@@ -0,0 +1,121 @@
+import asyncio
+import uuid
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.core.cache import caches
+from django.db import transaction
+from django.test import TestCase
+
+from services.bridge.models import IdMapping
+from shared.datasources.idmap import IdMap
+
+
+class IdMapTests(TestCase):
+    def setUp(self):
+        self.network = f"test-{uuid.uuid4().hex}"
+        self.addCleanup(self.forget)
+
+    def forget(self):
+        client = caches["default"].client.get_client(write=True)
+        keys = client.keys(f"*idmap:{self.network}:*")
+        if keys:
+            client.delete(*keys)
+
+    def make(self):
+        return IdMap(model="bridge.IdMapping", alias="default")
+
+    def row(self, remote_id, kind="user"):
+        IdMapping.objects.create(
+            network=self.network, kind=kind, remote_id=remote_id, matrix_id=f"@{remote_id}:test.hs"
+        )
+
+    def test_lookups_go_local_then_redis_then_database(self):
+        self.row("a")
+        self.row("b")
+        id_map = self.make()
+        expected = {"a": "@a:test.hs", "b": "@b:test.hs"}
+
+        with self.assertNumQueries(1):
+            self.assertEqual(id_map.get_many(self.network, "user", ["a", "b", "a"]), expected)
+
+        id_map.clear_local()  # a fresh process: Redis answers
+        with self.assertNumQueries(0):
+            self.assertEqual(id_map.get_many(self.network, "user", ["a", "b"]), expected)
+
+        with mock.patch.object(id_map, "_redis_get_many") as redis, self.assertNumQueries(0):
+            self.assertEqual(id_map.get_many(self.network, "user", ["a", "b"]), expected)
+        redis.assert_not_called()
+
+    def test_unknown_ids_are_cached(self):
+        id_map = self.make()
+
+        with self.assertNumQueries(1):
+            self.assertIsNone(id_map.get(self.network, "user", "ghost"))
+        with self.assertNumQueries(0):
+            self.assertEqual(id_map.get(self.network, "user", "ghost", "unknown"), "unknown")
+            id_map.clear_local()
+            self.assertEqual(id_map.get_many(self.network, "user", ["ghost"]), {})
+
+        self.row("ghost")  # written behind the map's back: still cached as unknown
+        self.assertIsNone(id_map.get(self.network, "user", "ghost"))
+        id_map.forget_many(self.network, "user", ["ghost"])
+        self.assertEqual(id_map.get(self.network, "user", "ghost"), "@ghost:test.hs")
+
+    def test_writes_refresh_the_caches_once_committed(self):
+        id_map, other = self.make(), self.make()
+        self.assertIsNone(id_map.get(self.network, "user", "a"))
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            id_map.set(self.network, "user", "a", "@a:test.hs")
+            self.assertIsNone(other.get(self.network, "user", "a"))  # uncommitted: Redis keeps the old answer
+        for callback in callbacks:
+            callback()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(id_map.get(self.network, "user", "a"), "@a:test.hs")
+            other.clear_local()
+            self.assertEqual(other.get(self.network, "user", "a"), "@a:test.hs")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            id_map.delete_many(self.network, "user", ["a"])
+        with self.assertNumQueries(0):
+            self.assertIsNone(id_map.get(self.network, "user", "a"))
+
+    def test_rolled_back_writes_leave_the_caches_alone(self):
+        id_map = self.make()
+        self.row("a")
+        id_map.get(self.network, "user", "a")
+
+        with self.captureOnCommitCallbacks(execute=True), self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                id_map.set(self.network, "user", "a", "@renamed:test.hs")
+                raise RuntimeError("rolled back")
+
+        id_map.clear_local()
+        with self.assertNumQueries(0):
+            self.assertEqual(id_map.get(self.network, "user", "a"), "@a:test.hs")
+
+    def test_aget_batches_a_loop_tick_into_one_mget_and_one_query(self):
+        for remote_id in "abc":
+            self.row(remote_id)
+        id_map = self.make()
+        mget = mock.patch.object(
+            id_map._async_cache, "aget_many", wraps=id_map._async_cache.aget_many  # pylint: disable=protected-access
+        )
+
+        async def lookup(*remote_ids):
+            lookups = (id_map.aget(self.network, "user", remote_id, "-") for remote_id in remote_ids)
+            return await asyncio.gather(*lookups)
+
+        # The database is reached from the loop through sync_to_async, in this thread.
+        with mget as aget_many, self.assertNumQueries(1):
+            found = async_to_sync(lookup)("a", "b", "a", "c", "ghost")
+
+        self.assertEqual(found, ["@a:test.hs", "@b:test.hs", "@a:test.hs", "@c:test.hs", "-"])
+        aget_many.assert_called_once()
+        self.assertEqual(len(aget_many.call_args.args[0]), 4)
+
+        with mget as aget_many, self.assertNumQueries(0):
+            self.assertEqual(async_to_sync(lookup)("b", "ghost"), ["@b:test.hs", "-"])
+        aget_many.assert_not_called()
@@ -0,0 +1,74 @@
+import unittest
+from datetime import datetime, timezone
+
+from django.db import connection
+from django.test import TestCase
+
+from services.bridge.models import MatrixEvent
+from shared.models.partitioning import drop_partitions, ensure_partitions, list_partitions
+
+
+def month(year, number):
+    return datetime(year, number, 1, tzinfo=timezone.utc)
+
+
+def event(event_id, when):
+    return MatrixEvent.objects.create(
+        event_id=event_id,
+        room_id="!room:test.hs",
+        sender="@alice:test.hs",
+        type="m.room.message",
+        origin_server_ts=int(when.timestamp() * 1000),
+        txn_id="txn",
+    )
+
+
+def rows_in(name):
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT event_id FROM {connection.ops.quote_name(name)} ORDER BY event_id")
+        return [row[0] for row in cursor.fetchall()]
+
+
+@unittest.skipUnless(connection.vendor == "postgresql", "partitioning needs PostgreSQL")
+class PartitionTests(TestCase):
+    def test_ensure_creates_the_upcoming_months(self):
+        names = ensure_partitions(MatrixEvent, months_ahead=2, now=datetime(2001, 11, 15, tzinfo=timezone.utc))
+
+        self.assertEqual(
+            names, ["bridge_matrixevent_p200111", "bridge_matrixevent_p200112", "bridge_matrixevent_p200201"]
+        )
+        months = [partition[1] for partition in list_partitions(MatrixEvent)]
+        self.assertIsNone(months[0])  # the default partition comes first
+        self.assertTrue({month(2001, 11), month(2001, 12), month(2002, 1)}.issubset(months))
+        self.assertEqual(ensure_partitions(MatrixEvent, months_ahead=2, now=month(2001, 11)), names)
+
+    def test_rows_in_the_default_partition_move_to_their_new_month(self):
+        ensure_partitions(MatrixEvent, months_ahead=0, now=month(2001, 1))
+        event("$early:test.hs", datetime(2001, 1, 20, tzinfo=timezone.utc))
+        event("$future:test.hs", datetime(2001, 3, 5, tzinfo=timezone.utc))
+        event("$later:test.hs", datetime(2001, 5, 5, tzinfo=timezone.utc))
+        self.assertEqual(rows_in("bridge_matrixevent_default"), ["$future:test.hs", "$later:test.hs"])
+
+        ensure_partitions(MatrixEvent, months_ahead=2, now=month(2001, 1))
+
+        self.assertEqual(rows_in("bridge_matrixevent_p200103"), ["$future:test.hs"])
+        self.assertEqual(rows_in("bridge_matrixevent_default"), ["$later:test.hs"])
+        self.assertEqual(MatrixEvent.objects.count(), 3)
+        self.assertIn("bridge_matrixevent_default", [partition[0] for partition in list_partitions(MatrixEvent)])
+
+    def test_drop_removes_only_the_months_before_the_cutoff(self):
+        ensure_partitions(MatrixEvent, months_ahead=3, now=month(2001, 1))
+        event("$old:test.hs", datetime(2001, 2, 10, tzinfo=timezone.utc))
+        now = datetime(2001, 4, 10, tzinfo=timezone.utc)
+
+        planned = drop_partitions(MatrixEvent, keep_months=1, now=now, dry_run=True)
+        self.assertEqual([name for name, *_ in planned], ["bridge_matrixevent_p200101", "bridge_matrixevent_p200102"])
+        self.assertEqual(MatrixEvent.objects.count(), 1)
+
+        dropped = drop_partitions(MatrixEvent, keep_months=1, now=now)
+
+        self.assertEqual(dropped, planned)
+        names = [partition[0] for partition in list_partitions(MatrixEvent)]
+        self.assertNotIn("bridge_matrixevent_p200102", names)
+        self.assertIn("bridge_matrixevent_p200103", names)
+        self.assertEqual(MatrixEvent.objects.count(), 0)
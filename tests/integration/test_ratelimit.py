@@ -0,0 +1,140 @@
+import json
+import uuid
+from unittest import mock
+
+import redis
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from shared.decorators import ratelimit
+from shared.utils.ratelimit import Decision, RateLimit, parse_rate, too_many_requests
+
+
+def forget(limit):
+    client = caches[limit.alias].client.get_client(write=True)
+    keys = client.keys(f"ratelimit:{limit.scope}:*")
+    if keys:
+        client.delete(*keys)
+
+
+class RateLimitTests(SimpleTestCase):
+    def make(self, rate, algorithm="token_bucket", **options):
+        limit = RateLimit(rate, algorithm, scope=f"test-{uuid.uuid4().hex}", **options)
+        self.addCleanup(forget, limit)
+        return limit
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate("100/m"), (100, 60))
+        self.assertEqual(parse_rate("10 / 5s"), (10, 5))
+        self.assertEqual(parse_rate("500/15min"), (500, 900))
+        with self.assertRaises(ValueError):
+            parse_rate("100 per minute")
+
+    def test_token_bucket_allows_burst_then_denies(self):
+        limit = self.make("3/m", lease=1)
+        decisions = [limit.hit("alice") for _ in range(4)]
+
+        self.assertEqual([decision.allowed for decision in decisions], [True, True, True, False])
+        self.assertEqual([decision.remaining for decision in decisions[:3]], [2, 1, 0])
+        # One token every 20 s.
+        self.assertAlmostEqual(decisions[3].retry_after, 20, delta=0.5)
+        self.assertEqual(decisions[3].headers()["Retry-After"], "20")
+        self.assertTrue(limit.hit("bob").allowed)
+
+    def test_sliding_window_allows_limit_per_window(self):
+        limit = self.make("3/m", "sliding_window", lease=1)
+        decisions = [limit.hit("alice") for _ in range(4)]
+
+        self.assertEqual([decision.allowed for decision in decisions], [True, True, True, False])
+        # Until the end of this window, plus the third of the next one after
+        # which the weighted count of this window leaves room for one more.
+        self.assertGreater(decisions[3].retry_after, 20)
+        self.assertLessEqual(decisions[3].retry_after, 80)
+        self.assertEqual(decisions[3].remaining, 0)
+
+    def test_reset_forgets_the_identity(self):
+        limit = self.make("1/m", lease=1)
+        self.assertTrue(limit.hit("alice").allowed)
+        self.assertFalse(limit.hit("alice").allowed)
+        limit.reset("alice")
+        self.assertTrue(limit.hit("alice").allowed)
+
+    def test_lease_serves_further_hits_from_memory(self):
+        limit = self.make("100/m", lease=5)
+        with mock.patch.object(limit, "_decide", wraps=limit._decide) as decide:  # pylint: disable=protected-access
+            decisions = [limit.hit("alice") for _ in range(6)]
+
+        self.assertTrue(all(decision.allowed for decision in decisions))
+        self.assertEqual(decide.call_count, 2)  # the 1st and 6th hit asked Redis
+        self.assertEqual([decision.remaining for decision in decisions[:5]], [99, 98, 97, 96, 95])
+
+    def test_leases_never_overshoot_the_limit(self):
+        for algorithm in ("token_bucket", "sliding_window"):
+            with self.subTest(algorithm=algorithm):
+                # Two processes sharing one limit, each leasing up to 10 units.
+                first = self.make("40/h", algorithm, lease=10)
+                second = RateLimit("40/h", algorithm, scope=first.scope, lease=10)
+                allowed = sum(limit.hit("alice").allowed for _ in range(50) for limit in (first, second))
+                self.assertEqual(allowed, 40)
+
+    def test_no_lease_near_the_limit(self):
+        limit = self.make("10/h", lease=10)
+        limit.hit("alice", cost=5)
+        # Only 5 of 10 units left: below LEASE_HEADROOM, every hit asks Redis.
+        with mock.patch.object(limit, "_take_local", return_value=None) as local:
+            decisions = [limit.hit("alice") for _ in range(6)]
+        self.assertEqual([decision.allowed for decision in decisions], [True] * 5 + [False])
+        self.assertEqual(local.call_count, 6)
+
+    async def test_async_hit(self):
+        limit = self.make("2/m", lease=1)
+        decisions = [await limit.ahit("alice") for _ in range(3)]
+        self.assertEqual([decision.allowed for decision in decisions], [True, True, False])
+
+    def test_redis_errors_follow_fail_open(self):
+        for fail_open in (True, False):
+            with self.subTest(fail_open=fail_open), override_settings(RATELIMIT={"FAIL_OPEN": fail_open}):
+                limit = self.make("1/m", lease=1)
+                with mock.patch("shared.utils.ratelimit.caches") as mocked:
+                    mocked.__getitem__.return_value.client.get_client.side_effect = redis.ConnectionError
+                    decision = limit.hit("alice")
+                self.assertIs(decision.allowed, fail_open)
+
+    def test_too_many_requests_response(self):
+        response = too_many_requests(Decision(False, 10, 0, retry_after=1.2))
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(
+            json.loads(response.content),
+            {"errcode": "M_LIMIT_EXCEEDED", "error": "Too many requests", "retry_after_ms": 1200},
+        )
+        self.assertEqual(response["Retry-After"], "2")
+        self.assertEqual(response["RateLimit-Remaining"], "0")
+
+
+class RateLimitDecoratorTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def decorate(self, view, rate, **options):
+        limited = ratelimit(rate, scope=f"test-{uuid.uuid4().hex}", **options)(view)
+        self.addCleanup(forget, limited.limiter)
+        return limited
+
+    def test_sync_view(self):
+        view = self.decorate(lambda request: HttpResponse("ok"), "2/m", methods=["POST"])
+        statuses = [view(self.factory.post("/")).status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+        self.assertEqual(view(self.factory.get("/")).status_code, 200)
+
+    async def test_async_view(self):
+        async def view(request):
+            return HttpResponse("ok")
+
+        view = self.decorate(view, "1/m", key="header:X-Puppet")
+        first = await view(self.factory.get("/", headers={"X-Puppet": "@a:test"}))
+        self.assertEqual(first["RateLimit-Remaining"], "0")
+        self.assertEqual((await view(self.factory.get("/", headers={"X-Puppet": "@a:test"}))).status_code, 429)
+        self.assertEqual((await view(self.factory.get("/", headers={"X-Puppet": "@b:test"}))).status_code, 200)
+        # Requests without the header are not limited.
+        self.assertEqual((await view(self.factory.get("/"))).status_code, 200)
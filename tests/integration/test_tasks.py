@@ -0,0 +1,148 @@
+import asyncio
+import time
+import uuid
+
+import redis
+from django.test import SimpleTestCase
+
+from shared.tasks import GROUP, PROMOTE_SCRIPT, Worker, dead_key, delayed_key, get_broker, stream_key, task
+from shared.utils.fastjson import dumps, loads
+
+runs = []
+
+
+@task(name="tests.record", max_retries=1, retry_backoff=0.01)
+def record(value):
+    runs.append(value)
+
+
+@task(name="tests.fail", max_retries=1, retry_backoff=0.01)
+def fail(value):
+    runs.append(value)
+    raise ValueError(value)
+
+
+@task(name="tests.slow", max_retries=1, retry_backoff=0.01)
+def slow(value):
+    time.sleep(1.5)
+    runs.append(value)
+
+
+class TaskQueueTests(SimpleTestCase):
+    def setUp(self):
+        runs.clear()
+        self.queue = f"test-{uuid.uuid4().hex}"
+        self.broker = get_broker()
+        self.redis = redis.Redis.from_url(self.broker.url)
+        self.addCleanup(self.redis.close)
+        self.addCleanup(self.redis.delete, stream_key(self.queue), delayed_key(self.queue), dead_key(self.queue))
+        self.addCleanup(self.redis.srem, "tasks:queues", self.queue)
+
+    def enqueue(self, registered, value, countdown=None):
+        self.broker.enqueue(self.queue, registered.message([value], {}), countdown)
+
+    def work(self, **options):
+        Worker([self.queue], concurrency=2, burst=True, block=0.1, **options).run()
+
+    def dead_letters(self):
+        return [loads(fields[b"m"]) for _, fields in self.redis.xrange(dead_key(self.queue))]
+
+    def test_promote_script_moves_only_due_messages(self):
+        now = time.time()
+        self.redis.zadd(delayed_key(self.queue), {dumps({"id": "due"}): now - 1, dumps({"id": "later"}): now + 60})
+
+        promoted = self.redis.register_script(PROMOTE_SCRIPT)(
+            keys=[delayed_key(self.queue), stream_key(self.queue)], args=[now, 100, 1000]
+        )
+
+        self.assertEqual(promoted, 1)
+        promoted_ids = [loads(fields[b"m"])["id"] for _, fields in self.redis.xrange(stream_key(self.queue))]
+        self.assertEqual(promoted_ids, ["due"])
+        self.assertEqual(self.redis.zrange(delayed_key(self.queue), 0, -1), [dumps({"id": "later"})])
+
+    def test_succeeded_tasks_are_acknowledged_and_deleted(self):
+        for value in range(3):
+            self.enqueue(record, value)
+        self.enqueue(record, 3, countdown=0.2)
+
+        self.work()
+
+        self.assertEqual(sorted(runs), [0, 1, 2, 3])
+        self.assertEqual(self.broker.depth(self.queue), {"ready": 0, "running": 0, "delayed": 0, "dead": 0})
+
+    def test_failed_task_is_retried_then_dead_lettered(self):
+        self.enqueue(fail, "boom")
+
+        self.work()
+
+        self.assertEqual(runs, ["boom", "boom"])
+        [dead] = self.dead_letters()
+        self.assertEqual((dead["task"], dead["attempt"]), ("tests.fail", 1))
+        self.assertIn("ValueError", dead["traceback"])
+        self.assertEqual(self.broker.depth(self.queue)["dead"], 1)
+
+        self.assertEqual(self.broker.requeue_dead(self.queue), 1)
+        message = loads(self.redis.xrange(stream_key(self.queue))[0][1][b"m"])
+        self.assertEqual(message["attempt"], 0)
+        self.assertNotIn("traceback", message)
+
+    def test_unknown_task_is_dead_lettered(self):
+        self.broker.enqueue(self.queue, {**record.message([1], {}), "task": "tests.missing"})
+
+        self.work()
+
+        [dead] = self.dead_letters()
+        self.assertIn("LookupError", dead["error"])
+
+    def test_stale_message_of_another_consumer_is_reclaimed(self):
+        self.enqueue(record, "orphan")
+        self.redis.xgroup_create(stream_key(self.queue), GROUP, id="0")
+        self.redis.xreadgroup(GROUP, "crashed", {stream_key(self.queue): ">"})
+        time.sleep(0.3)
+
+        self.work(visibility_timeout=0.2)
+
+        # The claim counts as a failed attempt; the retry then runs.
+        self.assertEqual(runs, ["orphan"])
+        self.assertEqual(self.broker.depth(self.queue), {"ready": 0, "running": 0, "delayed": 0, "dead": 0})
+
+    def test_running_task_outliving_the_visibility_timeout_is_not_reclaimed(self):
+        self.enqueue(slow, "once")
+
+        self.work(visibility_timeout=0.2)
+
+        self.assertEqual(runs, ["once"])
+        self.assertEqual(self.dead_letters(), [])
+        self.assertEqual(self.broker.depth(self.queue), {"ready": 0, "running": 0, "delayed": 0, "dead": 0})
+
+    def test_refresh_keeps_running_messages_from_other_workers(self):
+        async def scenario():
+            client = self.broker.aclient()
+            await client.xgroup_create(stream_key(self.queue), GROUP, id="0", mkstream=True)
+            self.enqueue(record, "running")
+            [(_, [(message_id, _)])] = await client.xreadgroup(GROUP, "busy", {stream_key(self.queue): ">"})
+            busy = Worker([self.queue], name="busy", visibility_timeout=0.2)
+            busy._in_flight[message_id] = self.queue  # pylint: disable=protected-access
+            await asyncio.sleep(0.3)
+            await busy._refresh(client)  # pylint: disable=protected-access
+            other = Worker([self.queue], name="other", visibility_timeout=0.2)
+            _, claimed, *_ = await client.xautoclaim(stream_key(self.queue), GROUP, other.name, 200)
+            await client.aclose()
+            return claimed
+
+        self.assertEqual(asyncio.run(scenario()), [])
+
+    def test_loop_clients_are_closed_with_their_loop(self):
+        async def ping():
+            client = self.broker.aclient()
+            self.assertIs(self.broker.aclient(), client)
+            await client.ping()
+            return client
+
+        client = asyncio.run(ping())
+
+        connections = client.connection_pool._available_connections  # pylint: disable=protected-access
+        self.assertTrue(connections)
+        self.assertFalse(any(connection.is_connected for connection in connections))
+        self.assertEqual(len(self.broker._async), 0)  # pylint: disable=protected-access
+        self.assertIsNot(asyncio.run(ping()), client)
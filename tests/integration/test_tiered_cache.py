@@ -0,0 +1,137 @@
+import asyncio
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import SimpleTestCase
+
+from shared.utils import cache as cache_module
+from shared.utils.cache import TieredCache
+
+
+def wait_for_lock_release(tiered, key, timeout=5):
+    """Wait until the background refresh of `key` is over."""
+    deadline = time.monotonic() + timeout
+    while tiered.cache.get(tiered._lock_key(key)) is not None:  # pylint: disable=protected-access
+        if time.monotonic() > deadline:
+            raise AssertionError(f"{key} is still locked")
+        time.sleep(0.02)
+
+
+class TieredCacheTests(SimpleTestCase):
+    def make(self, **options):
+        tiered = TieredCache(f"test-{uuid.uuid4().hex}", **{"ttl": 60, "lock_timeout": 5, **options})
+        self.addCleanup(self.forget, tiered)
+        return tiered
+
+    @staticmethod
+    def forget(tiered):
+        client = caches[tiered.alias].client.get_client(write=True)
+        keys = client.keys(f"*{tiered.namespace}*")
+        if keys:
+            client.delete(*keys)
+
+    def slow(self, calls, value="value", delay=0.3):
+        def compute():
+            calls.append(threading.current_thread().name)
+            time.sleep(delay)
+            return value
+
+        return compute
+
+    def test_concurrent_misses_compute_once(self):
+        tiered, calls = self.make(), []
+        compute = self.slow(calls)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            values = list(pool.map(lambda _: tiered.get_or_set("key", compute), range(8)))
+
+        self.assertEqual(values, ["value"] * 8)
+        self.assertEqual(len(calls), 1)
+        stats = tiered.stats.snapshot()
+        self.assertEqual((stats["recomputes"], stats["misses"], stats["stampedes_avoided"]), (1, 8, 7))
+
+    def test_concurrent_async_misses_compute_once(self):
+        tiered, calls = self.make(), []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.3)
+            return "value"
+
+        async def callers():
+            return await asyncio.gather(*(tiered.aget_or_set("key", compute) for _ in range(5)))
+
+        self.assertEqual(asyncio.run(callers()), ["value"] * 5)
+        self.assertEqual(len(calls), 1)
+
+    def test_lock_is_released_only_by_its_owner(self):
+        tiered = self.make()
+        lock_key = tiered._lock_key("key")  # pylint: disable=protected-access
+
+        tiered.get_or_set("key", lambda: "value")
+        self.assertIsNone(tiered.cache.get(lock_key))
+
+        tiered.cache.set(lock_key, "other-worker")
+        tiered._release("key", "expired-token")  # pylint: disable=protected-access
+        self.assertEqual(tiered.cache.get(lock_key), "other-worker")
+        tiered._release("key", "other-worker")  # pylint: disable=protected-access
+        self.assertIsNone(tiered.cache.get(lock_key))
+
+    def test_async_lock_release(self):
+        tiered = self.make()
+        lock_key = tiered._lock_key("key")  # pylint: disable=protected-access
+
+        async def release(token):
+            await tiered._arelease("key", token)  # pylint: disable=protected-access
+
+        tiered.cache.set(lock_key, "other-worker")
+        asyncio.run(release("expired-token"))
+        self.assertEqual(tiered.cache.get(lock_key), "other-worker")
+        asyncio.run(release("other-worker"))
+        self.assertIsNone(tiered.cache.get(lock_key))
+
+    def test_stale_value_is_served_while_one_worker_revalidates(self):
+        tiered, calls = self.make(ttl=1, stale_ttl=60, local_ttl=0), []
+        tiered.get_or_set("key", lambda: "old")
+        time.sleep(1.1)
+
+        values = [tiered.get_or_set("key", self.slow(calls, "new", delay=0.2)) for _ in range(3)]
+        wait_for_lock_release(tiered, "key")
+
+        self.assertEqual(values, ["old"] * 3)
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(calls[0].startswith("cache-refresh"))
+        self.assertEqual(tiered.get_or_set("key", lambda: "unused"), "new")
+        self.assertEqual(tiered.stats.snapshot()["stale_served"], 3)
+
+    def test_early_refresh_recomputes_a_fresh_value_in_the_background(self):
+        tiered, calls = self.make(ttl=10, local_ttl=0), []
+        tiered.get_or_set("key", self.slow([], "old", delay=0.05))
+
+        # -log(U) is huge for a tiny U: the refresh is due however far expiry is.
+        with mock.patch.object(cache_module.random, "random", return_value=1e-300):
+            self.assertEqual(tiered.get_or_set("key", self.slow(calls, "new", delay=0)), "old")
+        wait_for_lock_release(tiered, "key")
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(tiered.stats.snapshot()["early_refreshes"], 1)
+        self.assertEqual(tiered.get_or_set("key", lambda: "unused"), "new")
+
+    def test_failed_background_refresh_keeps_the_value_and_the_lock_is_freed(self):
+        tiered = self.make(ttl=1, stale_ttl=60, local_ttl=0)
+        tiered.get_or_set("key", lambda: "old")
+        time.sleep(1.1)
+
+        def fail():
+            raise RuntimeError("backend down")
+
+        with self.assertLogs("shared.utils.cache", "ERROR"):
+            self.assertEqual(tiered.get_or_set("key", fail), "old")
+            wait_for_lock_release(tiered, "key")
+            time.sleep(0.05)  # the failure is logged after the release
+
+        self.assertEqual(tiered.get_or_set("key", lambda: "new"), "old")  # still stale: revalidated again
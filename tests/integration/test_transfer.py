@@ -0,0 +1,173 @@
+import asyncio
+import io
+from unittest import mock
+
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from django.db import IntegrityError
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from services.bridge.models import IdMapping
+from shared.utils.transfer import (
+    _aiter,
+    get_import_job,
+    get_transfer_settings,
+    import_rows,
+    read_rows,
+    run_import_job,
+    start_import,
+)
+
+UNIQUE = ["network", "kind", "remote_id"]
+
+
+def mapping(remote_id, matrix_id=None):
+    matrix_id = matrix_id or f"@{remote_id}:test.hs"
+    return {"network": "test", "kind": "user", "remote_id": remote_id, "matrix_id": matrix_id}
+
+
+def csv_file(*rows):
+    lines = ["network,kind,remote_id,matrix_id"] + [",".join(row.values()) for row in rows]
+    return io.BytesIO(("\n".join(lines) + "\n").encode())
+
+
+def matrix_ids():
+    return dict(IdMapping.objects.filter(network="test").values_list("remote_id", "matrix_id"))
+
+
+class ImportRowsTests(TestCase):
+    def setUp(self):
+        IdMapping.objects.create(**mapping("a"))
+
+    def test_update_conflicts_upsert_and_last_duplicate_wins(self):
+        rows = [mapping("a", "@new:test.hs"), mapping("b"), mapping("b", "@b2:test.hs")]
+
+        totals = import_rows(IdMapping, rows, unique_fields=UNIQUE, chunk_size=10)
+
+        self.assertEqual(totals, {"rows": 3, "imported": 3, "rejected": 0, "errors": []})
+        self.assertEqual(matrix_ids(), {"a": "@new:test.hs", "b": "@b2:test.hs"})
+
+    def test_skip_conflicts_keeps_existing_rows(self):
+        import_rows(IdMapping, [mapping("a", "@new:test.hs"), mapping("b")], unique_fields=UNIQUE, conflicts="skip")
+
+        self.assertEqual(matrix_ids(), {"a": "@a:test.hs", "b": "@b:test.hs"})
+
+    def test_error_conflicts_fail_the_chunk(self):
+        with self.assertRaises(IntegrityError):
+            import_rows(IdMapping, [mapping("b"), mapping("a")], unique_fields=UNIQUE, conflicts="error")
+        self.assertEqual(matrix_ids(), {"a": "@a:test.hs"})
+
+    def test_rows_are_matched_on_the_primary_key_without_unique_fields(self):
+        existing = IdMapping.objects.get(remote_id="a")
+        rows = [{"id": existing.pk, **mapping("a", "@renamed:test.hs")}, mapping("b")]
+
+        totals = import_rows(IdMapping, rows)
+
+        self.assertEqual(totals["imported"], 2)
+        self.assertEqual(matrix_ids(), {"a": "@renamed:test.hs", "b": "@b:test.hs"})
+        self.assertEqual(IdMapping.objects.get(remote_id="a").pk, existing.pk)
+
+    def test_rejected_rows_are_counted_and_the_others_imported(self):
+        jsonl = io.BytesIO(
+            b'{"network": "test", "kind": "user", "remote_id": "b", "matrix_id": "@b:test.hs"}\n'
+            b"not json\n"
+            b"[1]\n"
+            b'{"network": "test", "kind": "user", "remote_id": "c", "matrix_id": "' + b"x" * 300 + b'"}\n'
+        )
+
+        totals = import_rows(IdMapping, read_rows(jsonl, "jsonl"), unique_fields=UNIQUE)
+
+        self.assertEqual((totals["rows"], totals["imported"], totals["rejected"]), (4, 1, 3))
+        self.assertEqual([error["row"] for error in totals["errors"]], [2, 3, 4])
+        self.assertIn("longer than 255", totals["errors"][2]["error"])
+        self.assertEqual(set(matrix_ids()), {"a", "b"})
+
+    def test_unknown_columns_fail_the_import(self):
+        with self.assertRaises(ValueError):
+            import_rows(IdMapping, [{**mapping("b"), "colour": "red"}])
+
+    def test_skip_passes_over_rows_and_progress_follows_each_chunk(self):
+        calls = []
+        rows = read_rows(csv_file(*(mapping(name) for name in "bcdef")), "csv")
+
+        def progress(totals):
+            calls.append((totals["rows"], totals["imported"]))
+
+        import_rows(IdMapping, rows, text=True, unique_fields=UNIQUE, chunk_size=2, skip=1, progress=progress)
+
+        # After each committed chunk, then the final totals.
+        self.assertEqual(calls, [(3, 2), (5, 4), (5, 4)])
+        self.assertEqual(set(matrix_ids()), {"a", "c", "d", "e", "f"})
+
+
+@override_settings(
+    STORAGES={
+        "default": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    }
+)
+class ImportJobTests(TestCase):
+    def start(self, *rows):
+        upload = ContentFile(csv_file(*rows).getvalue(), name="mappings.csv")
+        with mock.patch("services.core.tasks.import_rows_job.apply_async") as apply_async:
+            job_id = start_import(IdMapping, upload, "csv", unique_fields=UNIQUE, user="admin")
+        apply_async.assert_called_once_with((job_id,), queue=get_transfer_settings()["QUEUE"])
+        self.addCleanup(caches["default"].delete_many, [f"transfer:job:{job_id}", f"transfer:job:{job_id}:lock"])
+        return job_id
+
+    def test_job_imports_the_upload_and_deletes_it(self):
+        job_id = self.start(mapping("a"), mapping("b"))
+        path = get_import_job(job_id)["path"]
+
+        run_import_job(job_id)
+
+        job = get_import_job(job_id)
+        self.assertEqual((job["status"], job["rows"], job["imported"]), ("done", 2, 2))
+        self.assertEqual(job["position"], job["size"])
+        self.assertFalse(storages["default"].exists(path))
+        self.assertEqual(set(matrix_ids()), {"a", "b"})
+
+    def test_redelivered_job_resumes_after_the_committed_rows(self):
+        job_id = self.start(*(mapping(name) for name in "abcd"))
+        # An earlier run committed the first two rows, one of them rejected.
+        job = get_import_job(job_id)
+        job.update(status="running", rows=2, imported=1, rejected=1, errors=[{"row": 2, "error": "bad"}])
+        caches["default"].set(f"transfer:job:{job_id}", job)
+
+        run_import_job(job_id)
+
+        job = get_import_job(job_id)
+        self.assertEqual((job["status"], job["rows"], job["imported"], job["rejected"]), ("done", 4, 3, 1))
+        self.assertEqual(job["errors"], [{"row": 2, "error": "bad"}])
+        self.assertEqual(set(matrix_ids()), {"c", "d"})
+
+    def test_job_running_elsewhere_is_left_alone(self):
+        job_id = self.start(mapping("a"))
+        caches["default"].add(f"transfer:job:{job_id}:lock", 1)
+
+        run_import_job(job_id)
+
+        self.assertEqual(get_import_job(job_id)["status"], "queued")
+        self.assertEqual(matrix_ids(), {})
+
+
+class StreamTests(SimpleTestCase):
+    def test_closing_the_async_stream_closes_the_sync_iterator(self):
+        closed = []
+
+        def blocks():
+            try:
+                yield b"first"
+                yield b"second"
+            finally:
+                closed.append(True)
+
+        async def read_one():
+            stream = _aiter(blocks())
+            first = await anext(stream)
+            await stream.aclose()  # what a client disconnect does
+            return first
+
+        self.assertEqual(asyncio.run(read_one()), b"first")
+        self.assertEqual(closed, [True])
@@ -0,0 +1,50 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from shared.utils import database
+from shared.utils.database import configure_connection_mode, default_connection_mode
+
+
+def configure(mode, **kwargs):
+    return configure_connection_mode({"OPTIONS": {"pool": True, "sslmode": "require"}}, mode, **kwargs)
+
+
+def summary(db):
+    return db["CONNECTION_MODE"], db["CONN_MAX_AGE"], db["CONN_HEALTH_CHECKS"]
+
+
+class ConnectionModeTests(SimpleTestCase):
+    def test_default_mode_follows_the_interface(self):
+        with mock.patch.object(database, "psycopg_pool_available", return_value=True):
+            self.assertEqual(default_connection_mode("asgi"), "pool")
+            self.assertEqual(default_connection_mode("wsgi"), "persistent")
+        with mock.patch.object(database, "psycopg_pool_available", return_value=False):
+            self.assertEqual(default_connection_mode("asgi"), "persistent")
+
+    def test_pool(self):
+        with mock.patch.object(database, "psycopg_pool_available", return_value=True):
+            db = configure("POOL", pool_options={"max_size": 4})
+
+        self.assertEqual(summary(db), ("pool", 0, False))
+        self.assertEqual(db["OPTIONS"], {"pool": {"max_size": 4}, "sslmode": "require"})
+
+    def test_pool_without_psycopg_3_falls_back_to_persistent(self):
+        with mock.patch.object(database, "psycopg_pool_available", return_value=False):
+            with self.assertWarns(RuntimeWarning):
+                db = configure("pool", conn_max_age=30)
+
+        self.assertEqual(summary(db), ("persistent", 30, True))
+        self.assertNotIn("pool", db["OPTIONS"])
+
+    def test_persistent_and_none(self):
+        db = configure(None, conn_max_age=60, health_checks=False)
+        self.assertEqual(summary(db), ("persistent", 60, False))
+
+        db = configure("none")
+        self.assertEqual(summary(db), ("none", 0, False))
+        self.assertEqual(db["OPTIONS"], {"sslmode": "require"})
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            configure("pgbouncer")
@@ -0,0 +1,62 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+from typer.testing import CliRunner
+
+from scripts.commands import django as cli
+
+
+class DjangoCliTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(cli.state, {"in_process": False, "django_ready": True})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.runner = CliRunner()
+
+    def invoke(self, *args):
+        return self.runner.invoke(cli.app, list(args))
+
+    def test_batch_runs_each_step_in_process_and_skips_blank_ones(self):
+        result = self.invoke("batch", "check", "  ", "check --tag models")
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(result.output.count("Running step"), 2)
+        self.assertIn("Batch timings", result.output)
+        self.assertIn("check --tag models", result.output)
+
+    def test_failing_steps_still_print_the_timings(self):
+        for steps, expected in (
+            (["check", 'migrate "unbalanced'], "ValueError"),
+            (["unknowncommand", "check"], "❌ (1)"),
+        ):
+            with self.subTest(steps=steps):
+                result = self.invoke("batch", *steps)
+
+                self.assertEqual(result.exit_code, 1)
+                self.assertIn("Batch timings", result.output)
+                self.assertIn(expected, result.output)
+
+    def test_crashing_step_stops_the_batch_unless_keep_going(self):
+        with mock.patch.object(cli, "call_command_in_process", side_effect=[RuntimeError("boom"), None]) as call:
+            result = self.invoke("batch", "migrate", "check")
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn("❌ (RuntimeError)", result.output)
+        call.assert_called_once_with("migrate", [])
+
+        with mock.patch.object(cli, "call_command_in_process", side_effect=[RuntimeError("boom"), None]) as call:
+            result = self.invoke("batch", "--keep-going", "migrate", "check --deploy")
+        self.assertEqual(result.exit_code, 1)
+        self.assertEqual(call.call_args_list, [mock.call("migrate", []), mock.call("check", ["--deploy"])])
+
+    def test_pool_stats_runs_in_process_or_in_a_subprocess(self):
+        args = ["--samples=10", "--concurrency=2", "--database=default"]
+
+        with mock.patch.object(cli, "call_command_in_process") as call:
+            result = self.invoke("--in-process", "database", "pool-stats", "--samples", "10", "--concurrency", "2")
+        self.assertEqual(result.exit_code, 0, result.output)
+        call.assert_called_once_with("dbpool_stats", args)
+
+        with mock.patch.object(cli.subprocess, "run") as run:
+            result = self.invoke("--subprocess", "database", "pool-stats", "--samples", "10", "--concurrency", "2")
+        self.assertEqual(result.exit_code, 0, result.output)
+        run.assert_called_once_with(["python", "manage.py", "dbpool_stats", *args], check=True)
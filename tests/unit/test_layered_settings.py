@@ -0,0 +1,55 @@
+import os
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase
+
+from shared.utils.layered_settings import LayeredSettings
+
+SETTINGS_TOML = """
+[default]
+DEBUG = true
+CACHE_TIMEOUT = 300
+
+[production]
+DEBUG = false
+CACHE_TIMEOUT = 600
+"""
+
+
+class LayeredSettingsTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / "settings.toml"
+        self.path.write_text(SETTINGS_TOML)
+
+    def resolve(self, name, default=None, cast=None, **environ):
+        with mock.patch.dict(os.environ, environ, clear=True):
+            return LayeredSettings(self.path).get(name, default, cast)
+
+    def test_profile_overrides_default_table(self):
+        self.assertEqual(self.resolve("CACHE_TIMEOUT"), 300)
+        self.assertEqual(self.resolve("CACHE_TIMEOUT", DJANGO_ENV="production"), 600)
+        self.assertIs(self.resolve("DEBUG", DJANGO_ENV="production"), False)
+
+    def test_strings_are_not_coerced(self):
+        self.assertEqual(self.resolve("POSTGRES_PASSWORD", POSTGRES_PASSWORD="1e5"), "1e5")
+        self.assertEqual(self.resolve("SECRET_KEY", "insecure", SECRET_KEY="0x1F"), "0x1F")
+
+    def test_environment_follows_type_of_lower_layers(self):
+        self.assertIs(self.resolve("DEBUG", DEBUG="false"), False)
+        self.assertIs(self.resolve("DEBUG", DJANGO_DEBUG="on"), True)
+        self.assertEqual(self.resolve("CACHE_TIMEOUT", CACHE_TIMEOUT="10"), 10)
+        self.assertEqual(self.resolve("HOSTS", ["a"], HOSTS="b.com, c.com"), ["b.com", "c.com"])
+        self.assertEqual(self.resolve("HOSTS", ["a"], HOSTS='["b.com"]'), ["b.com"])
+        self.assertEqual(self.resolve("RATES", {}, RATES='{ "bridge" = 0.1 }'), {"bridge": 0.1})
+
+    def test_explicit_cast(self):
+        self.assertEqual(self.resolve("PORT", cast=int, PORT="5433"), 5433)
+
+    def test_invalid_value_is_reported(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, "DEBUG='maybe'"):
+            self.resolve("DEBUG", DEBUG="maybe")
@@ -0,0 +1,50 @@
+import asyncio
+
+import httpx
+from django.test import SimpleTestCase
+
+from shared.datasources import matrix
+from shared.datasources.matrix import MatrixClient, MatrixError, get_matrix_client
+
+
+def homeserver(request):
+    if "/send/" in request.url.path:
+        return httpx.Response(200, json={"event_id": "$event:test.hs"})
+    if request.url.path.endswith("/list"):
+        return httpx.Response(403, json=["not", "an", "object"])
+    return httpx.Response(404, text="Not found")
+
+
+class MatrixClientTests(SimpleTestCase):
+    def matrix_client(self):
+        return MatrixClient("http://hs.test", "token", transport=httpx.MockTransport(homeserver), max_retries=0)
+
+    async def test_drained_rooms_are_forgotten(self):
+        async with self.matrix_client() as client:
+            for index in range(20):
+                self.assertEqual(await client.send_message(f"!room{index}:test.hs", "hi"), "$event:test.hs")
+            await client.flush()
+            self.assertEqual(client._rooms, {})  # pylint: disable=protected-access
+            self.assertEqual(await client.send_message("!room0:test.hs", "again"), "$event:test.hs")
+            self.assertEqual(client.stats["sent"], 21)
+
+    async def test_error_body_that_is_not_an_object(self):
+        async with self.matrix_client() as client:
+            for path, status in (("/list", 403), ("/missing", 404)):
+                with self.subTest(path=path):
+                    with self.assertRaises(MatrixError) as raised:
+                        await client.request("GET", path)
+                    self.assertEqual(raised.exception.status, status)
+                    self.assertEqual(raised.exception.errcode, "M_UNKNOWN")
+
+    def test_loop_client_is_closed_with_its_loop(self):
+        async def current():
+            client = get_matrix_client()
+            self.assertIs(get_matrix_client(), client)
+            return client
+
+        first, second = asyncio.run(current()), asyncio.run(current())
+
+        self.assertIsNot(first, second)
+        self.assertTrue(first.http.is_closed and second.http.is_closed)
+        self.assertEqual(len(matrix._clients), 0)  # pylint: disable=protected-access
@@ -0,0 +1,74 @@
+import multiprocessing
+import os
+import tempfile
+
+from django.test import SimpleTestCase
+
+from shared.utils.metrics import Counter, Histogram, MetricsRegistry, MmapStore, format_value
+
+
+def worker_increments(directory):
+    registry = MetricsRegistry(directory)
+    Counter("jobs", "Jobs.", ("queue",), registry=registry).inc(2, "default")
+
+
+class MmapStoreTests(SimpleTestCase):
+    def setUp(self):
+        temporary = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(temporary.cleanup)
+        self.directory = temporary.name
+
+    def test_values_survive_growth_and_reopening(self):
+        path = os.path.join(self.directory, "metrics-1.db")
+        store = MmapStore(path, initial_size=64)
+        store.inc("a", 1)
+        store.inc_many([(f"key-{index}", index) for index in range(50)])  # grows the 64-byte file
+        store.inc("a", 0.5)
+        store.close()
+
+        self.assertGreater(os.path.getsize(path), 64)
+        expected = [("a", 1.5)] + [(f"key-{index}", float(index)) for index in range(50)]
+        self.assertEqual(MmapStore.read(path), expected)
+
+        reopened = MmapStore(path)
+        reopened.inc("a", 1)
+        self.assertEqual(reopened.items()[0], ("a", 2.5))
+        self.assertEqual(len(reopened.items()), 51)
+        reopened.close()
+
+    def test_truncated_or_empty_files_read_as_empty(self):
+        path = os.path.join(self.directory, "metrics-2.db")
+        with open(path, "wb") as handle:
+            handle.write(b"\x00" * 4)
+        self.assertEqual(MmapStore.read(path), [])
+
+    def test_scrape_sums_the_workers(self):
+        registry = MetricsRegistry(self.directory)
+        jobs = Counter("jobs", "Jobs.", ("queue",), registry=registry)
+        latency = Histogram("latency_seconds", "Latency.", registry=registry, buckets=(0.1, 1.0))
+        jobs.inc(1, "default")
+        latency.observe(0.5)
+
+        context = multiprocessing.get_context("fork")
+        for _ in range(2):
+            process = context.Process(target=worker_increments, args=(self.directory,))
+            process.start()
+            process.join()
+            self.assertEqual(process.exitcode, 0)
+
+        self.assertEqual(len(os.listdir(self.directory)), 3)
+        output = registry.render()
+        self.assertIn('jobs_total{queue="default"} 5\n', output)
+        self.assertIn('latency_seconds_bucket{le="0.1"} 0\n', output)
+        self.assertIn('latency_seconds_bucket{le="1"} 1\n', output)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 1\n', output)
+        self.assertIn("latency_seconds_sum 0.5\n", output)
+        registry.store.close()
+
+
+class FormatValueTests(SimpleTestCase):
+    def test_special_values(self):
+        special = {float("nan"): "NaN", float("inf"): "+Inf", float("-inf"): "-Inf"}
+        for value, expected in {3.0: "3", 0.25: "0.25", **special}.items():
+            with self.subTest(value=value):
+                self.assertEqual(format_value(value), expected)
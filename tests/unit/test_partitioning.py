@@ -0,0 +1,134 @@
+from datetime import datetime, timezone
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from services.bridge.models import IdMapping, MatrixEvent
+from shared.models import partitioning
+from shared.models.partitioning import (
+    ConvertToPartitioned,
+    add_months,
+    drop_partitions,
+    month_start,
+    partition_name,
+    partitioned_models,
+)
+
+
+def month(year, number):
+    return datetime(year, number, 1, tzinfo=timezone.utc)
+
+
+class FakeState:
+    def __init__(self, applied=()):
+        self.applied = tuple(applied)
+        self.apps = mock.Mock()
+
+    def clone(self):
+        return FakeState(self.applied)
+
+
+class FakeOperation:
+    def __init__(self, name, calls):
+        self.name, self.calls = name, calls
+
+    def state_forwards(self, app_label, state):
+        state.applied += (self.name,)
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        self.calls.append(("forwards", self.name, from_state.applied, to_state.applied))
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        self.calls.append(("backwards", self.name, from_state.applied, to_state.applied))
+
+
+class MonthTests(SimpleTestCase):
+    def test_month_start(self):
+        self.assertEqual(month_start(datetime(2024, 2, 29, 23, 59, tzinfo=timezone.utc)), month(2024, 2))
+        self.assertEqual(month_start(datetime(2024, 1, 1, tzinfo=timezone.utc)), month(2024, 1))
+
+    def test_add_months_crosses_years_both_ways(self):
+        for start, count, expected in (
+            (month(2024, 1), 0, month(2024, 1)),
+            (month(2024, 11), 2, month(2025, 1)),
+            (month(2024, 12), 1, month(2025, 1)),
+            (month(2024, 1), -1, month(2023, 12)),
+            (month(2024, 3), -15, month(2022, 12)),
+            (month(2024, 6), 30, month(2026, 12)),
+        ):
+            with self.subTest(start=start, count=count):
+                self.assertEqual(add_months(start, count), expected)
+
+    def test_upcoming_months(self):
+        now = datetime(2024, 11, 30, 12, tzinfo=timezone.utc)
+        upcoming = partitioning._upcoming_months(2, now)  # pylint: disable=protected-access
+
+        self.assertEqual(upcoming, [month(2024, 11), month(2024, 12), month(2025, 1)])
+
+    def test_partition_names_and_bounds(self):
+        self.assertEqual(partition_name(MatrixEvent, month(2025, 3)), "bridge_matrixevent_p202503")
+        bound = partitioning._bound_sql(MatrixEvent, month(2025, 3))  # pylint: disable=protected-access
+        self.assertEqual(bound, str(int(month(2025, 3).timestamp() * 1000)))
+
+    def test_partitioned_models(self):
+        models = partitioned_models()
+
+        self.assertIn(MatrixEvent, models)
+        self.assertNotIn(IdMapping, models)
+
+
+class DropPartitionsTests(SimpleTestCase):
+    def test_cutoff_keeps_the_current_and_last_months(self):
+        partitions = [("t_default", None, 0, 0)] + [
+            (partition_name(MatrixEvent, month(2024, number)), month(2024, number), 10, 8192) for number in (1, 2, 3, 4)
+        ]
+        now = datetime(2024, 4, 20, tzinfo=timezone.utc)
+
+        with mock.patch.object(partitioning, "list_partitions", return_value=partitions):
+            expired = drop_partitions(MatrixEvent, keep_months=2, now=now, dry_run=True)
+            self.assertEqual([partition[1] for partition in expired], [month(2024, 1)])
+            self.assertEqual(drop_partitions(MatrixEvent, keep_months=4, now=now, dry_run=True), [])
+
+
+class ConvertToPartitionedTests(SimpleTestCase):
+    def test_operations_run_in_order_elsewhere_than_postgresql(self):
+        calls = []
+        operation = ConvertToPartitioned(
+            "MatrixEvent", "origin_server_ts", [FakeOperation(name, calls) for name in ("a", "b", "c")]
+        )
+        schema_editor = mock.Mock(**{"connection.vendor": "sqlite"})
+        start = FakeState(["initial"])
+        end = start.clone()
+        operation.state_forwards("bridge", end)
+
+        operation.database_forwards("bridge", schema_editor, start, end)
+        operation.database_backwards("bridge", schema_editor, end, start)
+
+        self.assertEqual(end.applied, ("initial", "a", "b", "c"))
+        self.assertEqual(
+            calls,
+            [
+                ("forwards", "a", ("initial",), ("initial", "a")),
+                ("forwards", "b", ("initial", "a"), ("initial", "a", "b")),
+                ("forwards", "c", ("initial", "a", "b"), ("initial", "a", "b", "c")),
+                ("backwards", "c", ("initial", "a", "b", "c"), ("initial", "a", "b")),
+                ("backwards", "b", ("initial", "a", "b"), ("initial", "a")),
+                ("backwards", "a", ("initial", "a"), ("initial",)),
+            ],
+        )
+
+    def test_postgresql_rebuilds_the_table(self):
+        operation = ConvertToPartitioned("MatrixEvent", "origin_server_ts", [FakeOperation("a", [])])
+        schema_editor = mock.Mock(**{"connection.vendor": "postgresql", "connection.alias": "default"})
+        state = FakeState()
+        model = state.apps.get_model.return_value
+
+        with mock.patch.object(partitioning, "rebuild_table") as rebuild:
+            with mock.patch.object(ConvertToPartitioned, "allow_migrate_model", return_value=True):
+                operation.database_forwards("bridge", schema_editor, state, state)
+                operation.database_backwards("bridge", schema_editor, state, state)
+
+        self.assertEqual(
+            rebuild.call_args_list,
+            [mock.call(schema_editor, model, "origin_server_ts"), mock.call(schema_editor, model)],
+        )
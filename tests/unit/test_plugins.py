@@ -0,0 +1,130 @@
+import os
+import sys
+import tempfile
+import textwrap
+import uuid
+from importlib import metadata
+from pathlib import Path
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from shared.plugins import PluginRegistry, ProtocolAdapter, plugin_loaded
+from shared.plugins import registry as registry_module
+
+PLUGIN_MODULE = '''
+from shared.plugins import ProtocolAdapter, protocol_adapter
+
+
+@protocol_adapter("{name}")
+class Adapter(ProtocolAdapter):
+    """Adapter of {name}."""
+
+    async def deliver(self, event):
+        pass
+'''
+
+
+def entry_points(*names):
+    return metadata.EntryPoints(
+        metadata.EntryPoint(name=name, value=f"remote_{name}:Adapter", group="matrix_meta.protocols")
+        for name in names
+    )
+
+
+class PluginRegistryTests(SimpleTestCase):
+    def setUp(self):
+        temporary = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(temporary.cleanup)
+        self.root = Path(temporary.name)
+        self.package = f"bridges_{uuid.uuid4().hex}"
+        (self.root / self.package).mkdir()
+        self.manifest = self.root / ".cache" / "plugins.json"
+        self.manifest.parent.mkdir()  # the root is on sys.path: keep its mtime, part of the fingerprint, stable
+        sys.path.insert(0, str(self.root))
+        self.addCleanup(sys.path.remove, str(self.root))
+        self.addCleanup(self.forget_modules)
+
+    def forget_modules(self):
+        for module in [module for module in sys.modules if module.startswith(self.package)]:
+            del sys.modules[module]
+
+    def write_plugin(self, module, name):
+        path = self.root / self.package / f"{module}.py"
+        path.write_text(textwrap.dedent(PLUGIN_MODULE.format(name=name)), encoding="utf-8")
+        return path
+
+    def registry(self, **options):
+        options = {"manifest": self.manifest, "entry_points": False, **options}
+        return PluginRegistry(self.root, (f"{self.package}/*.py",), **options)
+
+    def test_manifest_is_rescanned_only_when_a_file_changes(self):
+        path = self.write_plugin("irc", "irc")
+        self.assertEqual(self.registry().names("protocols"), ["irc"])
+
+        with mock.patch.object(registry_module, "scan_plugin_file", wraps=registry_module.scan_plugin_file) as scan:
+            self.assertEqual(self.registry().names("protocols"), ["irc"])
+            scan.assert_not_called()
+
+            path.write_text(path.read_text(encoding="utf-8").replace('"irc"', '"ircv3"'), encoding="utf-8")
+            stat = path.stat()
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+            self.assertEqual(self.registry().names("protocols"), ["ircv3"])
+            scan.assert_called_once()
+
+            path.unlink()
+            self.assertEqual(self.registry().names("protocols"), [])
+
+    def test_entry_points_are_cached_until_the_fingerprint_changes(self):
+        with mock.patch.object(registry_module.metadata, "entry_points", return_value=entry_points("xmpp")) as found:
+            self.assertEqual(self.registry(entry_points=True).names("protocols"), ["xmpp"])
+            self.assertEqual(self.registry(entry_points=True).names("protocols"), ["xmpp"])
+            self.assertEqual(found.call_count, 1)
+
+            with mock.patch.object(registry_module, "_entry_point_fingerprint", return_value=[["/new/site", 1]]):
+                self.assertEqual(self.registry(entry_points=True).names("protocols"), ["xmpp"])
+            self.assertEqual(found.call_count, 2)
+
+    def test_settings_win_over_local_plugins_which_win_over_entry_points(self):
+        self.write_plugin("irc", "irc")
+        extra = {"protocols": {"irc": "configured:Adapter"}}
+
+        with mock.patch.object(registry_module.metadata, "entry_points", return_value=entry_points("irc", "xmpp")):
+            with self.assertLogs("shared.plugins.registry", "WARNING") as logs:
+                local = self.registry(entry_points=True)
+                configured = self.registry(entry_points=True, extra=extra)
+                self.assertEqual(local.spec("protocols", "irc").source, "local")
+                self.assertEqual(configured.spec("protocols", "irc").source, "settings")
+
+        self.assertEqual(local.spec("protocols", "xmpp").source, "entry_point")
+        self.assertIn(f"{self.package}.irc:Adapter shadows remote_irc:Adapter", logs.output[0])
+        self.assertEqual(self.registry(extra=extra, disabled=["protocols:irc"]).names("protocols"), [])
+
+    def test_plugins_are_imported_on_first_use_and_reported(self):
+        self.write_plugin("irc", "irc")
+        registry, loaded = self.registry(), []
+
+        def receiver(**kwargs):
+            loaded.append((kwargs["group"], kwargs["name"], kwargs["source"]))
+
+        plugin_loaded.connect(receiver)
+        self.addCleanup(plugin_loaded.disconnect, receiver)
+
+        self.assertEqual(registry.names("protocols"), ["irc"])
+        self.assertNotIn(f"{self.package}.irc", sys.modules)
+        self.assertFalse(registry.is_loaded("protocols", "irc"))
+
+        adapter = registry.get("protocols", "irc")
+        self.assertIs(registry.get("protocols", "irc"), adapter)
+
+        self.assertEqual(adapter.protocol, "irc")
+        self.assertTrue(issubclass(adapter, ProtocolAdapter))
+        self.assertIn(f"{self.package}.irc", sys.modules)
+        self.assertEqual(loaded, [("protocols", "irc", "local")])
+        self.assertIn(("protocols", "irc"), registry.load_times())
+        with self.assertRaises(LookupError):
+            registry.get("protocols", "missing")
+
+    def test_adapters_must_implement_deliver(self):
+        with self.assertRaises(TypeError):
+            ProtocolAdapter()  # pylint: disable=abstract-class-instantiated
@@ -0,0 +1,29 @@
+import asyncio
+import tempfile
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from shared.middlewares.timing import ProfilingMiddleware
+
+
+class ProfilingMiddlewareTests(SimpleTestCase):
+    def test_one_cprofile_at_a_time_under_asgi(self):
+        async def view(request):  # pylint: disable=unused-argument
+            await asyncio.sleep(0.05)
+            return HttpResponse("ok")
+
+        async def requests(middleware):
+            factory = RequestFactory(headers={"X-Profile": "secret"})
+            return await asyncio.gather(*(middleware(factory.get("/")) for _ in range(3)))
+
+        with tempfile.TemporaryDirectory() as directory:
+            config = {"ENABLED": True, "TOKEN": "secret", "ENGINE": "cprofile", "DIR": directory}
+            with override_settings(PROFILING=config):
+                middleware = ProfilingMiddleware(view)
+                responses = asyncio.run(requests(middleware))
+                later = asyncio.run(requests(middleware))
+
+        self.assertEqual([response.status_code for response in responses], [200] * 3)
+        self.assertEqual(sum("X-Profile-File" in response for response in responses), 1)
+        self.assertEqual(sum("X-Profile-File" in response for response in later), 1)
@@ -0,0 +1,137 @@
+from django.test import SimpleTestCase
+
+from shared.validators import (
+    EVENT_SCHEMA,
+    Array,
+    Boolean,
+    Integer,
+    Object,
+    Schema,
+    SchemaValidationError,
+    String,
+    is_valid_identifier,
+)
+
+MEMBER = Schema(
+    "test member",
+    {
+        "user_id": String(identifier="user_id"),
+        "name": String(required=False, min_length=1, max_length=5),
+        "role": String(required=False, choices=["admin", "user"]),
+        "code": String(required=False, pattern=r"[a-z]+"),
+        "bio": String(required=False, max_bytes=8),
+        "age": Integer(required=False, minimum=0, maximum=150),
+        "active": Boolean(required=False),
+        "profile": Object(Schema("test profile", {"avatar": String(nullable=True)}), required=False, max_keys=2),
+        "tags": Array(String(), required=False, max_items=2),
+        "aliases": Array(String(nullable=True), required=False),
+        "extra": Object(required=False, nullable=True),
+    },
+)
+
+
+def issue(item):
+    found = MEMBER.check(item)
+    return None if found is None else (found.path, found.code, found.message)
+
+
+class SchemaTests(SimpleTestCase):
+    def test_valid_item(self):
+        item = {
+            "user_id": "@alice:test.hs",
+            "name": "Alice",
+            "role": "admin",
+            "code": "abc",
+            "bio": "héllo",
+            "age": 30,
+            "active": True,
+            "profile": {"avatar": None},
+            "tags": ["a", "b"],
+            "aliases": [None, "x"],
+            "extra": None,
+            "undeclared": object(),
+        }
+        self.assertIsNone(MEMBER.check(item))
+        self.assertIs(MEMBER.validate(item), item)
+
+    def test_first_failed_check_of_each_field(self):
+        alice = {"user_id": "@alice:test.hs"}
+        for item, expected in (
+            ([], ("", "M_BAD_JSON", "Expected an object")),
+            ({}, ("user_id", "M_MISSING_PARAM", "Missing required field")),
+            ({"user_id": None}, ("user_id", "M_BAD_JSON", "Expected a string")),
+            ({"user_id": "alice"}, ("user_id", "M_INVALID_PARAM", "Not a valid user_id")),
+            ({**alice, "name": ""}, ("name", "M_INVALID_PARAM", "Empty")),
+            ({**alice, "name": "Alice!"}, ("name", "M_TOO_LARGE", "Longer than 5 characters")),
+            ({**alice, "role": "owner"}, ("role", "M_INVALID_PARAM", "Not one of admin, user")),
+            ({**alice, "code": "ab1"}, ("code", "M_INVALID_PARAM", "Does not match [a-z]+")),
+            ({**alice, "bio": "ééééé"}, ("bio", "M_TOO_LARGE", "Longer than 8 bytes")),
+            ({**alice, "age": True}, ("age", "M_BAD_JSON", "Expected an integer")),
+            ({**alice, "age": -1}, ("age", "M_INVALID_PARAM", "Smaller than 0")),
+            ({**alice, "age": 151}, ("age", "M_INVALID_PARAM", "Larger than 150")),
+            ({**alice, "active": 1}, ("active", "M_BAD_JSON", "Expected a boolean")),
+            ({**alice, "profile": None}, ("profile", "M_BAD_JSON", "Expected an object")),
+            ({**alice, "profile": {"a": 1, "b": 2, "c": 3}}, ("profile", "M_TOO_LARGE", "More than 2 keys")),
+            ({**alice, "profile": {"avatar": 1}}, ("profile.avatar", "M_BAD_JSON", "Expected a string")),
+            ({**alice, "profile": {}}, ("profile.avatar", "M_MISSING_PARAM", "Missing required field")),
+            ({**alice, "tags": "a"}, ("tags", "M_BAD_JSON", "Expected an array")),
+            ({**alice, "tags": ["a", "b", "c"]}, ("tags", "M_TOO_LARGE", "More than 2 items")),
+            ({**alice, "tags": ["a", 2]}, ("tags[1]", "M_BAD_JSON", "Expected a string")),
+            ({**alice, "aliases": [None, 3]}, ("aliases[1]", "M_BAD_JSON", "Expected a string")),
+        ):
+            with self.subTest(item=item):
+                self.assertEqual(issue(item), expected)
+
+    def test_validate_many_reports_first_or_every_invalid_item(self):
+        items = [{"user_id": "@a:test.hs"}, {"user_id": "b"}, {}]
+
+        with self.assertRaises(SchemaValidationError) as raised:
+            MEMBER.validate_many(items)
+        self.assertEqual([(issue.index, issue.path) for issue in raised.exception.issues], [(1, "user_id")])
+
+        with self.assertRaises(SchemaValidationError) as raised:
+            MEMBER.validate_many(items, fail_fast=False)
+        self.assertEqual([issue.index for issue in raised.exception.issues], [1, 2])
+        body = raised.exception.to_dict()
+        self.assertEqual(body["errcode"], "M_INVALID_PARAM")
+        self.assertEqual(
+            body["issues"][1],
+            {"index": 2, "path": "user_id", "errcode": "M_MISSING_PARAM", "error": "Missing required field"},
+        )
+
+        self.assertEqual(MEMBER.validate_many(items[:1]), items[:1])
+
+    def test_partition(self):
+        items = [{"user_id": "@a:test.hs"}, {"user_id": "b"}, {"user_id": "@c:test.hs"}]
+
+        valid, issues = MEMBER.partition(items)
+
+        self.assertEqual(valid, [items[0], items[2]])
+        self.assertEqual([issue.index for issue in issues], [1])
+
+    def test_batch_checks(self):
+        for items, max_items, code in (({"user_id": "@a:test.hs"}, None, "M_BAD_JSON"), ([{}] * 3, 2, "M_TOO_LARGE")):
+            with self.subTest(code=code):
+                self.assertEqual(MEMBER.partition(items, max_items=max_items)[1][0].code, code)
+                with self.assertRaises(SchemaValidationError):
+                    MEMBER.validate_many(items, max_items=max_items)
+
+    def test_event_schema(self):
+        event = {
+            "event_id": "$abc:test.hs",
+            "room_id": "!room:test.hs",
+            "sender": "@alice:test.hs",
+            "type": "m.room.message",
+            "origin_server_ts": 1_700_000_000_000,
+        }
+        self.assertIsNone(EVENT_SCHEMA.check(event))
+        for overrides in ({"origin_server_ts": "1"}, {"origin_server_ts": 2**53}, {"type": ""}, {"state_key": 1}):
+            with self.subTest(overrides=overrides):
+                self.assertIsNotNone(EVENT_SCHEMA.check({**event, **overrides}))
+
+    def test_identifiers(self):
+        self.assertTrue(is_valid_identifier("room_id", "!opaque"))
+        self.assertTrue(is_valid_identifier("user_id", "@alice:[::1]:8448"))
+        self.assertFalse(is_valid_identifier("user_id", "@alice"))
+        self.assertFalse(is_valid_identifier("user_id", f"@{'a' * 300}:test.hs"))
+        self.assertFalse(is_valid_identifier("event_id", 1))
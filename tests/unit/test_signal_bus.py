@@ -0,0 +1,95 @@
+import subprocess
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from shared.signals import Signal
+
+EXIT_SCRIPT = """
+import sys, time
+import django
+
+django.setup()
+from shared.signals import Signal
+
+def write(sender, **kwargs):
+    time.sleep(0.2)
+    with open(sys.argv[1], "a") as f:
+        f.write(kwargs["line"])
+
+signal = Signal(name="exit")
+signal.connect(write, background=True, weak=False)
+for line in "abc":
+    signal.send(sender=None, line=line)
+"""
+
+
+class SignalBusTests(SimpleTestCase):
+    def test_queued_receivers_run_off_the_sending_thread(self):
+        calls = []
+
+        def sync_receiver(sender, **kwargs):
+            calls.append(("sync", kwargs["value"], threading.current_thread().name))
+
+        async def async_receiver(sender, **kwargs):
+            calls.append(("async", kwargs["value"], threading.current_thread().name))
+
+        signal = Signal(name="test")
+        signal.connect(sync_receiver, background=True)
+        signal.connect(async_receiver, background=True)
+        self.assertEqual(signal.send(sender=None, value=1), [])
+        self.assertTrue(signal.flush(timeout=5))
+
+        self.assertEqual(sorted(call[:2] for call in calls), [("async", 1), ("sync", 1)])
+        self.assertTrue(all(call[2].startswith("signal-bus") for call in calls))
+        self.assertEqual({stats["delivered"] for stats in signal.stats().values()}, {1})
+
+    def test_coalesced_deliveries_carry_the_latest_arguments(self):
+        calls = []
+
+        def receiver(sender, **kwargs):
+            calls.append((kwargs["user"], kwargs["body"]))
+
+        signal = Signal(name="test")
+        signal.connect(receiver, background=True, coalesce=0.2, coalesce_key=lambda user, **kwargs: user)
+        for body in range(3):
+            signal.send(sender=None, user="@alice:test", body=body)
+        signal.send(sender=None, user="@bob:test", body=0)
+        self.assertTrue(signal.flush(timeout=5))
+
+        self.assertEqual(sorted(calls), [("@alice:test", 2), ("@bob:test", 0)])
+        self.assertEqual(signal.stats()[f"{__name__}.{receiver.__qualname__}"]["coalesced"], 2)
+
+    def test_disconnect_and_sender_filter(self):
+        calls = []
+
+        def receiver(sender, **kwargs):
+            calls.append(sender)
+
+        signal = Signal(name="test")
+        signal.connect(receiver, sender=str, background=True)
+        self.assertTrue(signal.has_listeners(str))
+        self.assertFalse(signal.has_listeners(int))
+        signal.send(sender=int)
+        signal.send(sender=str)
+        self.assertTrue(signal.flush(timeout=5))
+        self.assertTrue(signal.disconnect(receiver, sender=str))
+        signal.send(sender=str)
+
+        self.assertEqual(calls, [str])
+        self.assertFalse(signal.has_listeners(str))
+
+    def test_queued_deliveries_run_when_the_process_exits(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = Path(directory) / "out"
+            subprocess.run(
+                [sys.executable, "-c", EXIT_SCRIPT, str(output)],
+                check=True,
+                timeout=30,
+                cwd=settings.BASE_DIR,
+            )
+            self.assertEqual(output.read_text(), "abc")
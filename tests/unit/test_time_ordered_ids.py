@@ -0,0 +1,64 @@
+from datetime import datetime, timezone
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import SimpleTestCase
+
+from shared.models import abstract
+from shared.models.abstract import time_ordered_id_floor, time_ordered_id_time
+
+
+class IdGeneratorTests(SimpleTestCase):
+    def make(self):
+        generator = abstract._IdGenerator()  # pylint: disable=protected-access
+        self.addCleanup(self.release, generator)
+        return generator
+
+    @staticmethod
+    def release(generator):
+        if generator.token is not None:
+            caches["default"].delete(abstract._NODE_KEY.format(generator.node))  # pylint: disable=protected-access
+
+    def test_processes_lease_distinct_nodes(self):
+        generators = [self.make() for _ in range(3)]
+
+        ids = [generator() for generator in generators]
+
+        self.assertEqual(len({generator.node for generator in generators}), 3)
+        self.assertEqual(len(set(ids)), 3)
+
+    def test_lease_is_renewed_and_replaced_once_lost(self):
+        generator = self.make()
+        generator()
+        node = generator.node
+
+        generator.renew_at = 0
+        generator()
+        self.assertEqual(generator.node, node)
+
+        caches["default"].set(abstract._NODE_KEY.format(node), "other-process")  # pylint: disable=protected-access
+        self.addCleanup(caches["default"].delete, abstract._NODE_KEY.format(node))  # pylint: disable=protected-access
+        generator.renew_at = 0
+        generator()
+        self.assertNotEqual(generator.node, node)
+
+    def test_random_node_without_the_cache(self):
+        generator = abstract._IdGenerator()  # pylint: disable=protected-access
+
+        with mock.patch.object(abstract.caches["default"], "add", side_effect=ConnectionError("down")):
+            with self.assertLogs("shared.models.abstract", "WARNING"):
+                generator()
+
+        self.assertIsNotNone(generator.node)
+        self.assertIsNone(generator.token)
+        self.assertGreater(generator.renew_at, 0)
+
+    def test_ids_grow_and_map_back_to_their_time(self):
+        generator = self.make()
+        before = datetime.now(timezone.utc)
+
+        ids = [generator() for _ in range(5000)]  # more than one millisecond's sequence
+
+        self.assertEqual(ids, sorted(set(ids)))
+        self.assertGreaterEqual(ids[0], time_ordered_id_floor(before))
+        self.assertLess(abs((time_ordered_id_time(ids[0]) - before).total_seconds()), 1)
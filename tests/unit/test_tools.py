@@ -0,0 +1,34 @@
+import builtins
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from shared.utils import tools
+from shared.utils.tools import debug_mode, structured_print
+
+
+class DebugModeTests(SimpleTestCase):
+    def test_debug_mode_is_scoped_to_the_current_thread(self):
+        original, entered, done, outside = builtins.print, threading.Event(), threading.Event(), []
+
+        def other_request():
+            entered.wait()
+            with self.assertLogs("print", "INFO") as logs:
+                structured_print("from", "another", "request")
+            outside.extend(logs.output)
+            done.set()
+
+        thread = threading.Thread(target=other_request)
+        thread.start()
+        with mock.patch.object(tools, "rich_print") as rich_print, debug_mode():
+            self.assertIs(builtins.print, original)
+            entered.set()
+            done.wait(5)
+            structured_print("debugging")
+        thread.join()
+
+        rich_print.assert_called_once_with("debugging", sep=" ", end="\n", file=None, flush=False)
+        self.assertEqual(outside, ["INFO:print:from another request"])
+        with self.assertLogs("print", "INFO"):
+            structured_print("after")